@@ -1,11 +1,23 @@
 import sys
 import socket
 import os
+import json
 import time
 
 from datetime import date, datetime
 
-from flask import Flask, g, jsonify, redirect, render_template, request, send_from_directory, url_for
+from flask import (
+    Flask,
+    Response,
+    g,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_from_directory,
+    stream_with_context,
+    url_for,
+)
 from jinja2 import ChoiceLoader, FileSystemLoader
 from werkzeug.middleware.proxy_fix import ProxyFix
 
@@ -21,11 +33,14 @@ from common.utils import (
 import common.config as mod_cfg
 from common import data as db
 from common import search as search_mod
+from common import search_suggest
 from common import areas as areas_mod
 from common import projects as projects_mod
 from common import collections as collections_mod
 from common import settings as settings_mod
 from common import content_catalog as content_catalog_mod
+from common import schema_registry
+from common import sql_profile
 from common import user_paths
 from common.network_log import log_network
 from core.security import configure_security
@@ -176,11 +191,25 @@ def _should_network_log():
     return True
 
 
+@app.before_request
+def _db_request_scope_start():
+    if (request.path or "").startswith("/static/"):
+        return None
+    db.begin_request_scope()
+    return None
+
+
+@app.teardown_request
+def _db_request_scope_finish(exc):
+    db.end_request_scope(exc)
+
+
 @app.before_request
 def _network_log_request_start():
     if not _should_network_log():
         return None
     g.network_log_start = time.perf_counter()
+    sql_profile.begin_request(request.endpoint)
     log_network(
         "request_start",
         method=request.method,
@@ -205,6 +234,7 @@ def _network_log_request_finish(response):
         duration_ms = None
         if started is not None:
             duration_ms = int((time.perf_counter() - started) * 1000)
+        sql_stats = sql_profile.end_request(request.endpoint, duration_ms) or {}
         log_network(
             "request_finish",
             method=request.method,
@@ -214,12 +244,18 @@ def _network_log_request_finish(response):
             duration_ms=duration_ms,
             location=response.headers.get("Location"),
             content_type=response.headers.get("Content-Type"),
+            sql_statements=sql_stats.get("sql_statements"),
+            sql_ms=sql_stats.get("sql_ms"),
+            sql_rows=sql_stats.get("sql_rows"),
+            sql_slowest=sql_stats.get("sql_slowest") or None,
+            sql_repeated=sql_stats.get("sql_repeated") or None,
         )
     return response
 
 
 @app.teardown_request
 def _network_log_request_exception(exc):
+    sql_profile.discard_request()
     if exc is None or not _should_network_log():
         return None
     started = getattr(g, "network_log_start", None)
@@ -262,6 +298,7 @@ from modules.icons.routes import icons_bp
 from modules.projects.routes import projects_bp
 from modules.pocket_api.routes import pocket_api_bp
 from modules.logger_api.routes import logger_api_bp
+from modules.notes import watcher as notes_watcher
 
 _dbg("Registering blueprints")
 app.register_blueprint(auth_bp)
@@ -290,6 +327,14 @@ app.register_blueprint(pocket_api_bp)
 app.register_blueprint(logger_api_bp)
 configure_security(app)
 _dbg("Blueprints registered")
+# Every module has registered its migrations by now; apply whatever is still
+# pending so request handlers only ever see the in-memory readiness check.
+for _migration_name, _migration_status in schema_registry.run_all(db._get_conn()):
+    if _migration_status.startswith("failed"):
+        _dbg(f"Schema migration {_migration_name} {_migration_status}")
+if __name__ != "__main__":
+    # Served by run_waitress; app.run below starts it in the serving process.
+    notes_watcher.start(app)
 
 
 @app.route("/files/collections", methods=["GET", "POST"])
@@ -481,6 +526,28 @@ def home_alias():
     return redirect("/" + (f"?{query}" if query else ""))
 
 
+def _search_result_urls(results, query, area, scope):
+    """Attach ``url`` to each result and build the "Show more" links."""
+    for item in results["primary"] + results["secondary"]:
+        params = {item["id_param"]: item["id"]}
+        params.update(item.get("extra_url_params") or {})
+        if area:
+            params["area"] = area
+        item["url"] = url_for(item["view_route"], **params)
+    more_results_links = []
+    for item in results.get("more", []):
+        args = {"q": query, "route": item["route"], "scope": scope}
+        if area:
+            args["area"] = area
+        more_results_links.append(
+            {
+                "table": item["table"],
+                "url": url_for("search_route", **args),
+            }
+        )
+    return more_results_links
+
+
 @app.route("/search")
 def search_route():
     query = (request.args.get("q") or "").strip()
@@ -501,25 +568,10 @@ def search_route():
         results = search_mod.search_note_content(query, area=area, route=route)
     else:
         results = search_mod.search_all(query, area=area, route=route)
-    for item in results["primary"] + results["secondary"]:
-        params = {item["id_param"]: item["id"]}
-        params.update(item.get("extra_url_params") or {})
-        if area:
-            params["area"] = area
-        item["url"] = url_for(item["view_route"], **params)
-    more_results_links = []
-    for item in results.get("more", []):
-        args = {"q": query, "route": item["route"], "scope": scope}
-        if area:
-            args["area"] = area
-        more_results_links.append(
-            {
-                "table": item["table"],
-                "url": url_for("search_route", **args),
-            }
-        )
+    more_results_links = _search_result_urls(results, query, area, scope)
     audio_playlists = []
     audio_search_items = None
+    audio_search_page = None
     audio_search_col_list = []
     audio_other_results = []
     media_search = None
@@ -527,7 +579,7 @@ def search_route():
     if route == "media" and query and scope != "note_content":
         from modules.media import routes as media_routes
 
-        media_search = media_routes.build_media_search_context(query, request.args)
+        media_search = media_routes.cached_media_search_context(query, request.args)
         media_other_results = [
             item
             for item in results["primary"] + results["secondary"]
@@ -541,12 +593,24 @@ def search_route():
         audio_routes._ensure_default_playlist(conn)
         audio_playlists = audio_routes._list_playlists(conn)
         if route == "audio" and query:
-            audio_search_items = audio_routes._fetch_audio_search(
+            audio_search = audio_routes._cached_audio_search(
                 area,
                 query,
                 sort_col=sort_col,
                 sort_dir=sort_dir,
+                page=request.args.get("page", type=int) or 1,
             )
+            audio_search_items = audio_search["items"]
+            audio_search_page = {
+                key: audio_search[key] for key in ("total", "page", "total_pages")
+            }
+            page_args = {"q": query, "route": "audio", "scope": scope, "sort": sort_col, "dir": sort_dir}
+            if area:
+                page_args["area"] = area
+            if audio_search["page"] > 1:
+                audio_search_page["prev_url"] = url_for("search_route", page=audio_search["page"] - 1, **page_args)
+            if audio_search["page"] < audio_search["total_pages"]:
+                audio_search_page["next_url"] = url_for("search_route", page=audio_search["page"] + 1, **page_args)
             tbl = audio_routes._get_tbl()
             audio_search_col_list = [
                 col for col in audio_routes.AUDIO_TABLE_COLUMNS if tbl and col in tbl["col_list"]
@@ -558,7 +622,7 @@ def search_route():
             ]
     total_results = len(results["primary"]) + len(results["secondary"])
     if audio_search_items is not None:
-        total_results = len(audio_search_items) + len(audio_other_results)
+        total_results = audio_search_page["total"] + len(audio_other_results)
     if media_search is not None:
         total_results = media_search["total"] + len(media_other_results)
     search_all_areas_url = ""
@@ -580,10 +644,13 @@ def search_route():
         total_results=total_results,
         search_all_areas_url=search_all_areas_url,
         more_results_links=more_results_links,
+        pending_sources=results.get("pending") or [],
+        pending_token=results.get("pending_token") or "",
         results_primary=results["primary"],
         results_secondary=results["secondary"],
         audio_playlists=audio_playlists,
         audio_search_items=audio_search_items,
+        audio_search_page=audio_search_page,
         audio_search_col_list=audio_search_col_list,
         audio_other_results=audio_other_results,
         audio_sort_col=sort_col,
@@ -593,6 +660,56 @@ def search_route():
     )
 
 
+@app.route("/search/pending")
+def search_pending_route():
+    """Results of the search sources that outlasted their time budget."""
+    query = (request.args.get("q") or "").strip()
+    area = request_area_param() or None
+    results = search_mod.collect_pending_results(request.args.get("token") or "")
+    if results is None:
+        return jsonify({"ok": False, "error": "unknown search"}), 404
+    more_results_links = _search_result_urls(results, query, area, "metadata")
+    items = []
+    for item in results["primary"] + results["secondary"]:
+        if item.get("match_field") == "content":
+            match_text = item.get("match_value") or ""
+        else:
+            match_text = f"{item.get('match_field')}: {item.get('match_snippet') or ''}"
+        items.append(
+            {
+                "table": item.get("table") or "",
+                "title": str(item.get("title") or item.get("match_value") or item.get("id")),
+                "url": item["url"],
+                "match": str(match_text),
+            }
+        )
+    return jsonify(
+        {
+            "ok": True,
+            "items": items,
+            "more": more_results_links,
+            "pending": [marker["table"] for marker in results["pending"]],
+        }
+    )
+
+
+@app.route("/api/search/suggest")
+def search_suggest_route():
+    """Title-prefix suggestions for the search box, one NDJSON line per domain."""
+    client_key = (search_mod.search_user_key(), request.args.get("client") or request.remote_addr)
+    lines = search_suggest.stream(
+        request.args.get("q") or "",
+        client_key=client_key,
+        seq=request.args.get("seq", type=int) or 0,
+        limit=request.args.get("limit", type=int),
+    )
+    return Response(
+        stream_with_context(json.dumps(line) + "\n" for line in lines),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
 @app.route("/favicon.ico")
 def favicon_route():
     return send_from_directory(
@@ -649,6 +766,8 @@ if __name__ == "__main__":
     is_reloader_child = os.environ.get("WERKZEUG_RUN_MAIN") == "true"
     if not (auto_reload and is_reloader_child):
         _exit_if_server_already_running(mod_cfg.base_url, mod_cfg.port_num)
+    if is_reloader_child or not auto_reload:
+        notes_watcher.start(app)
 
     app.run(
         host=mod_cfg.base_url,
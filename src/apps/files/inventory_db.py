@@ -8,6 +8,7 @@ from datetime import datetime, timezone
 from typing import Iterable
 
 from common import config as cfg
+from common import sql_profile
 
 
 DDL = """
@@ -99,7 +100,7 @@ def connect(db_path: str | None = None) -> sqlite3.Connection:
     parent = os.path.dirname(db_path)
     if parent:
         os.makedirs(parent, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, factory=sql_profile.ProfiledConnection)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA busy_timeout = 5000")
@@ -194,8 +194,13 @@ class FileInventoryScanner:
         where = ["source_id = ?", "is_deleted = 0"]
         if scan_scope:
             prefix = scan_scope.replace("\\", "/").strip("/").lower()
-            where.append("(normalized_relative_path = ? OR normalized_relative_path LIKE ?)")
-            params.extend([prefix, prefix + "/%"])
+            # Range on the (source_id, normalized_relative_path) unique index;
+            # "0" is the character after "/" so this covers exactly prefix/...
+            where.append(
+                "(normalized_relative_path = ? OR "
+                "(normalized_relative_path >= ? AND normalized_relative_path < ?))"
+            )
+            params.extend([prefix, prefix + "/", prefix + "0"])
         rows = self.conn.execute(
             "SELECT file_id, normalized_relative_path FROM lp_file WHERE " + " AND ".join(where),
             params,
@@ -1,9 +1,12 @@
 import os
 import sqlite3
+import threading
 from datetime import datetime, timezone
 
 from common import data as db
 from common import config as cfg
+from common import record_area
+from common import schema_registry
 from common import user_paths
 
 AREAS_SCHEMA = """
@@ -56,9 +59,43 @@ ON lp_area_folders (owner_user_id, area_id, folder_role, sort_order);
 CREATE INDEX IF NOT EXISTS idx_lp_area_folders_path
 ON lp_area_folders (path_prefix);
 
+CREATE INDEX IF NOT EXISTS idx_lp_area_folders_path_key
+ON lp_area_folders (lower(rtrim(replace(path_prefix, '\\', '/'), '/ ')));
+
 CREATE UNIQUE INDEX IF NOT EXISTS ux_lp_area_default_folder
 ON lp_area_folders (owner_user_id, area_id)
 WHERE folder_role = 'default' AND is_enabled = 1;
+
+CREATE TABLE IF NOT EXISTS lp_area_folder_generation (
+    id          INTEGER PRIMARY KEY CHECK (id = 1),
+    generation  INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO lp_area_folder_generation (id, generation) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS lp_area_folders_gen_ins AFTER INSERT ON lp_area_folders BEGIN
+    UPDATE lp_area_folder_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS lp_area_folders_gen_upd AFTER UPDATE ON lp_area_folders BEGIN
+    UPDATE lp_area_folder_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS lp_area_folders_gen_del AFTER DELETE ON lp_area_folders BEGIN
+    UPDATE lp_area_folder_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS lp_areas_gen_ins AFTER INSERT ON lp_areas BEGIN
+    UPDATE lp_area_folder_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS lp_areas_gen_upd AFTER UPDATE OF area_id, area_name ON lp_areas BEGIN
+    UPDATE lp_area_folder_generation SET generation = generation + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS lp_areas_gen_del AFTER DELETE ON lp_areas BEGIN
+    UPDATE lp_area_folder_generation SET generation = generation + 1 WHERE id = 1;
+END;
 """
 
 
@@ -74,35 +111,20 @@ def _get_conn(conn=None):
     return conn
 
 
-_AREAS_SCHEMA_READY_CONN_IDS = set()
-
-
 def ensure_areas_schema(conn=None):
     conn = _get_conn(conn)
-    conn_id = id(conn)
-    if conn_id in _AREAS_SCHEMA_READY_CONN_IDS:
-        try:
-            if _areas_schema_is_current(conn):
-                return
-        except Exception:
-            pass
-        _AREAS_SCHEMA_READY_CONN_IDS.discard(conn_id)
+    if schema_registry.is_ready(conn, "areas"):
+        return
     _migrate_legacy_area_tables(conn)
     _migrate_areas_schema(conn)
     _migrate_area_folders_schema(conn)
     conn.executescript(AREAS_SCHEMA)
     _migrate_legacy_area_ids(conn)
     conn.commit()
-    _AREAS_SCHEMA_READY_CONN_IDS.add(conn_id)
+    schema_registry.mark_ready(conn, "areas")
 
 
-def _areas_schema_is_current(conn):
-    area_cols = {row["name"] for row in _table_columns(conn, "lp_areas")}
-    folder_cols = {row["name"] for row in _table_columns(conn, "lp_area_folders")}
-    return (
-        {"owner_user_id", "area_id", "status"}.issubset(area_cols)
-        and {"owner_user_id", "area_id", "path_prefix"}.issubset(folder_cols)
-    )
+schema_registry.register("areas", ensure_areas_schema, version=3)
 
 
 def _table_columns(conn, table_name):
@@ -417,6 +439,13 @@ def _int_value(value, default=0):
     return int(value)
 
 
+def _refresh_record_areas(conn):
+    try:
+        record_area.sync(conn)
+    except Exception as exc:
+        db._log_error(None, f"record area refresh failed: {exc}")
+
+
 def normalize_path_prefix(path_value):
     normalized = user_paths.normalize_path(path_value)
     if not normalized:
@@ -1092,6 +1121,8 @@ def area_folder_add(
     conn.commit()
     if wants_default and folder_id:
         area_folder_set_default(area_id, folder_id, conn=conn, owner_user_id=owner_user_id)
+    else:
+        _refresh_record_areas(conn)
     return folder_id
 
 
@@ -1120,6 +1151,7 @@ def area_folder_set_default(area_id, area_folder_id, conn=None, owner_user_id=No
         (now, area_folder_id, owner_user_id, area_id),
     )
     conn.commit()
+    _refresh_record_areas(conn)
     return True
 
 
@@ -1133,6 +1165,7 @@ def area_folder_disable(area_folder_id, conn=None, owner_user_id=None):
         (_utc_now(), area_folder_id, owner_user_id),
     )
     conn.commit()
+    _refresh_record_areas(conn)
 
 
 def area_folder_enable(area_folder_id, conn=None, owner_user_id=None):
@@ -1156,6 +1189,7 @@ def area_folder_enable(area_folder_id, conn=None, owner_user_id=None):
         (_utc_now(), area_folder_id, owner_user_id),
     )
     conn.commit()
+    _refresh_record_areas(conn)
 
 
 def area_folder_remove(area_folder_id, conn=None, owner_user_id=None):
@@ -1167,6 +1201,7 @@ def area_folder_remove(area_folder_id, conn=None, owner_user_id=None):
         (area_folder_id, owner_user_id),
     )
     conn.commit()
+    _refresh_record_areas(conn)
 
 
 def area_folder_get(area_folder_id, conn=None, owner_user_id=None):
@@ -1219,6 +1254,186 @@ def area_folder_scope(area_id, conn=None, owner_user_id=None):
     return [dict(row) for row in rows]
 
 
+_ROLE_RANK = {"default": 0, "include": 1, "output": 2, "archive": 3}
+_TRIE_CACHE = {}
+_TRIE_CACHE_MAX = 64
+_TRIE_LOCK = threading.Lock()
+
+
+def _path_segments(path_value):
+    return [part for part in user_paths.path_key(path_value).split("/") if part]
+
+
+class AreaFolderTrie:
+    """Enabled area folders of one owner, keyed on lower-case path segments.
+
+    ``resolve`` walks the segments of a path once, so finding the area of a
+    folder costs O(path depth) however many mappings the owner has.  Unlike a
+    plain ``startswith`` a prefix only matches whole segments (``C:\\Music``
+    does not claim ``C:\\Musical``).
+    """
+
+    __slots__ = ("generation", "_root", "_size")
+
+    def __init__(self, rows=(), generation=None):
+        self.generation = generation
+        self._root = {}
+        self._size = 0
+        for row in rows:
+            self.add(row)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, row):
+        path_prefix = user_paths.normalize_path(row.get("path_prefix"))
+        area_id = (row.get("area_id") or "").strip()
+        segments = _path_segments(path_prefix)
+        if not segments or not area_id:
+            return
+        node = self._root
+        for segment in segments:
+            node = node.setdefault(segment, {})
+        node.setdefault(None, []).append(
+            {
+                "area_id": area_id,
+                "path_prefix": path_prefix,
+                "folder_role": row.get("folder_role") or "",
+                "sort_order": row.get("sort_order") if row.get("sort_order") is not None else 100,
+                "area_name": row.get("area_name") or "",
+            }
+        )
+        self._size += 1
+
+    def matches(self, path_value):
+        """Folder entries whose prefix contains ``path_value``, deepest last."""
+        found = []
+        node = self._root
+        for segment in _path_segments(path_value):
+            node = node.get(segment)
+            if node is None:
+                break
+            found.extend(node.get(None, ()))
+        return found
+
+    def best(self, path_value, full_path=None):
+        """The winning entry for ``path_value`` (longest prefix), or None.
+
+        Ties go to a child area (``work/ue5``) whose name appears in
+        ``full_path``, then by folder role, sort order and the shallower area.
+        """
+        node = self._root
+        deepest = None
+        for segment in _path_segments(path_value):
+            node = node.get(segment)
+            if node is None:
+                break
+            deepest = node.get(None) or deepest
+        if not deepest:
+            return None
+        full_lower = (full_path or "").lower()
+
+        def _sort_key(entry):
+            area_id = entry["area_id"]
+            area_name = entry["area_name"].lower()
+            named_child = bool(full_lower and "/" in area_id and area_name and area_name in full_lower)
+            return (
+                not named_child,
+                _ROLE_RANK.get(entry["folder_role"], 9),
+                entry["sort_order"],
+                area_id.count("/"),
+                len(area_id),
+                area_id,
+                entry["path_prefix"],
+            )
+
+        return min(deepest, key=_sort_key)
+
+    def resolve(self, path_value, full_path=None):
+        """``(area_id, folder_role, path_prefix)`` for ``path_value`` or None."""
+        entry = self.best(path_value, full_path=full_path)
+        if entry is None:
+            return None
+        return entry["area_id"], entry["folder_role"], entry["path_prefix"]
+
+
+def _area_folder_generation(conn):
+    try:
+        row = conn.execute("SELECT generation FROM lp_area_folder_generation WHERE id = 1").fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def _area_folder_trie_rows(conn, owner_user_id):
+    # Reads whatever columns exist so callers on partial test/legacy schemas
+    # do not trigger the full areas migration.
+    folder_columns = {row["name"] for row in _table_columns(conn, "lp_area_folders")}
+    if not {"area_id", "path_prefix"} <= folder_columns:
+        return []
+    area_columns = {row["name"] for row in _table_columns(conn, "lp_areas")}
+    area_join = ""
+    area_name_expr = "'' AS area_name"
+    if {"owner_user_id", "area_id", "area_name"} <= area_columns:
+        area_join = "LEFT JOIN lp_areas p ON p.owner_user_id IS pf.owner_user_id AND p.area_id = pf.area_id "
+        area_name_expr = "COALESCE(p.area_name, '') AS area_name"
+    where = ["pf.owner_user_id IS ?" if "owner_user_id" in folder_columns else "? IS NULL"]
+    if "is_enabled" in folder_columns:
+        where.append("pf.is_enabled = 1")
+    if "folder_role" in folder_columns:
+        where.append("pf.folder_role IN ('default','include','archive','output')")
+    role_expr = "pf.folder_role" if "folder_role" in folder_columns else "'default'"
+    sort_expr = "pf.sort_order" if "sort_order" in folder_columns else "100"
+    rows = conn.execute(
+        f"SELECT pf.area_id, pf.path_prefix, {role_expr} AS folder_role, {sort_expr} AS sort_order, "
+        f"{area_name_expr} FROM lp_area_folders pf {area_join}"
+        f"WHERE {' AND '.join(where)}",
+        (owner_user_id,),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def area_folder_trie(owner_user_id=None, conn=None):
+    """Cached ``AreaFolderTrie`` of ``owner_user_id``'s folders (None = shared).
+
+    The owner is used as given.  The cache is checked against
+    ``lp_area_folder_generation``, which triggers bump on every write to
+    ``lp_area_folders`` or ``lp_areas``.
+    """
+    conn = _get_conn(conn)
+    if not _table_exists(conn, "lp_area_folders"):
+        return AreaFolderTrie()
+    generation = _area_folder_generation(conn)
+    key = (schema_registry.db_key(conn), owner_user_id)
+    if generation is not None:
+        with _TRIE_LOCK:
+            cached = _TRIE_CACHE.get(key)
+        if cached is not None and cached.generation == generation:
+            return cached
+    try:
+        trie = AreaFolderTrie(_area_folder_trie_rows(conn, owner_user_id), generation=generation)
+    except sqlite3.Error:
+        return AreaFolderTrie()
+    if generation is not None:
+        with _TRIE_LOCK:
+            _TRIE_CACHE[key] = trie
+            while len(_TRIE_CACHE) > _TRIE_CACHE_MAX:
+                _TRIE_CACHE.pop(next(iter(_TRIE_CACHE)))
+    return trie
+
+
+def resolve_area_folder(path_value, owner_user_id=None, full_path=None, conn=None, shared_fallback=False):
+    """``(area_id, folder_role, path_prefix)`` of the folder mapping ``path_value``.
+
+    With ``shared_fallback`` an owner without a match falls back to the
+    shared (owner-less) mappings.
+    """
+    match = area_folder_trie(owner_user_id, conn=conn).resolve(path_value, full_path=full_path)
+    if match is None and shared_fallback and owner_user_id is not None:
+        match = area_folder_trie(None, conn=conn).resolve(path_value, full_path=full_path)
+    return match
+
+
 def diagnose_areas(conn=None, owner_user_id=None):
     conn = _get_conn(conn)
     ensure_areas_schema(conn)
@@ -4,6 +4,7 @@ from datetime import datetime, timezone
 from common import data as db
 from common import areas as areas_mod
 from common import projects as projects_mod
+from common import schema_registry
 from common import utils as utils_mod
 
 
@@ -357,8 +358,6 @@ CREATE INDEX IF NOT EXISTS ix_lp_collection_project_project
 ON lp_collection_project (owner_user_id, project_id);
 """
 
-_COLLECTIONS_SCHEMA_READY_CONN_IDS = set()
-
 
 def _utc_now():
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -486,22 +485,15 @@ def _table_exists(conn, table_name):
 
 def ensure_collections_schema(conn=None):
     conn = _get_conn(conn)
-    conn_id = id(conn)
-    if conn_id in _COLLECTIONS_SCHEMA_READY_CONN_IDS and _collections_schema_is_current(conn):
+    if schema_registry.is_ready(conn, "collections"):
         return
     conn.executescript(COLLECTIONS_SCHEMA_SQL)
     _migrate_collections_schema(conn)
     conn.commit()
-    _COLLECTIONS_SCHEMA_READY_CONN_IDS.add(conn_id)
+    schema_registry.mark_ready(conn, "collections")
 
 
-def _collections_schema_is_current(conn):
-    return (
-        {"collection_id", "collection_name", "collection_type", "collection_domain", "status", "visibility", "book_cover_bg_colour", "book_cover_image", "book_cover_style", "book_cover_font"}.issubset(_table_columns(conn, "lp_collection"))
-        and {"collection_item_id", "collection_id", "entry_kind", "sort_order", "parent_collection_item_id"}.issubset(_table_columns(conn, "lp_collection_item"))
-        and {"collection_id", "area_id", "is_primary"}.issubset(_table_columns(conn, "lp_collection_area"))
-        and {"collection_id", "project_id", "comments"}.issubset(_table_columns(conn, "lp_collection_project"))
-    )
+schema_registry.register("collections", ensure_collections_schema)
 
 
 def _migrate_collections_schema(conn):
@@ -1060,9 +1052,18 @@ def get_collection_items(collection_id, conn=None, owner_user_id=None, include_h
         "ORDER BY COALESCE(parent_collection_item_id, 0), is_pinned DESC, sort_order, collection_item_id",
         (owner_user_id, collection_id),
     ).fetchall()
+    summaries = _record_summaries(
+        [(row["item_type"], row["item_id"]) for row in rows if row["entry_kind"] == "item"]
+    )
     items = []
     for row in rows:
-        item = _collection_item_row(row, conn=conn, owner_user_id=owner_user_id, include_hidden=include_hidden)
+        item = _collection_item_row(
+            row,
+            conn=conn,
+            owner_user_id=owner_user_id,
+            include_hidden=include_hidden,
+            summaries=summaries,
+        )
         if include_hidden or item.get("is_visible", True):
             items.append(item)
     return items
@@ -1384,13 +1385,16 @@ def _collection_row(row, conn=None, owner_user_id=None):
     return collection
 
 
-def _collection_item_row(row, conn=None, owner_user_id=None, include_hidden=False):
+def _collection_item_row(row, conn=None, owner_user_id=None, include_hidden=False, summaries=None):
     item = dict(row)
     item["display_title"] = item.get("title_override") or ""
     item["summary"] = None
     item["is_visible"] = True
     if item.get("entry_kind") == "item":
-        item["summary"] = _record_summary(item.get("item_type"), item.get("item_id"))
+        if summaries is None:
+            item["summary"] = _record_summary(item.get("item_type"), item.get("item_id"))
+        else:
+            item["summary"] = summaries.get((item.get("item_type"), str(item.get("item_id"))))
         item["is_visible"] = include_hidden or _can_view_source(item.get("item_type"), item.get("item_id"))
         if item["summary"] and not item["display_title"]:
             item["display_title"] = item["summary"].get("title") or ""
@@ -1413,6 +1417,15 @@ def _record_summary(item_type, item_id):
         return None
 
 
+def _record_summaries(refs):
+    try:
+        from common import links_records
+
+        return links_records.get_record_summaries(refs)
+    except Exception:
+        return {}
+
+
 def _can_view_source(item_type, item_id):
     try:
         from flask_login import current_user
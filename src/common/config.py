@@ -258,9 +258,75 @@ MONEY_QUOTE_DELAY_MINUTES = 15
 RECS_PER_PAGE = 200
 IMAGES_PER_PAGE = 50
 
+# Database connection pool: pooled connections leased per web request, and
+# how long a request waits for one before using the shared connection
+DB_POOL_SIZE = 8
+DB_POOL_WAIT_SECONDS = 5.0
+
+# Single-writer queue: record writes are grouped into one commit per tick of
+# DB_WRITE_BATCH_MS milliseconds or DB_WRITE_BATCH_MAX write units
+DB_WRITE_QUEUE = True
+DB_WRITE_BATCH_MS = 5
+DB_WRITE_BATCH_MAX = 200
+
+# Per-request SQL profiling (request_finish log and Admin > Performance).
+# A statement run SQL_PROFILE_REPEAT_THRESHOLD or more times with the same
+# text in one request is flagged as a likely N+1 query.
+SQL_PROFILE_ENABLED = True
+SQL_PROFILE_REPEAT_THRESHOLD = 5
+SQL_PROFILE_SAMPLES = 200
+
+# List pager counts are stored in lp_row_counts and kept current by triggers.
+ROW_COUNT_CACHE_ENABLED = True
+
+# Search results are cached per user and query until a table they were read
+# from changes (lp_table_generation); the cache holds at most
+# SEARCH_CACHE_MAX_ENTRIES results and about SEARCH_CACHE_MAX_MB megabytes.
+SEARCH_CACHE_ENABLED = True
+SEARCH_CACHE_MAX_ENTRIES = 256
+SEARCH_CACHE_MAX_MB = 32
+
+# Global search runs its sources (the search document index, apps, the content
+# catalog, other routes) on SEARCH_FANOUT_WORKERS threads (0 runs them in
+# turn).  A source still running after SEARCH_SOURCE_BUDGET_MS milliseconds,
+# or its entry in SEARCH_SOURCE_BUDGETS_MS, is shown as "still searching" and
+# its results are fetched by the page afterwards.
+SEARCH_FANOUT_WORKERS = 4
+SEARCH_SOURCE_BUDGET_MS = 800
+SEARCH_SOURCE_BUDGETS_MS = {}
+
+# Search box suggestions (/api/search/suggest): up to SEARCH_SUGGEST_LIMIT
+# title matches per domain (also the cap on the client's limit), answered once a keystroke has not been followed by
+# another for SEARCH_SUGGEST_DEBOUNCE_MS milliseconds
+SEARCH_SUGGEST_LIMIT = 5
+SEARCH_SUGGEST_DEBOUNCE_MS = 150
+
 # Search result snippet length for content matches
 SEARCH_CONTENT_SNIPPET_LEN = 400
 
+# Note content search index refresh: files are read on this many threads and
+# written in batches of NOTE_SEARCH_INDEX_WRITE_BATCH rows
+NOTE_SEARCH_INDEX_READ_WORKERS = 4
+NOTE_SEARCH_INDEX_WRITE_BATCH = 200
+
+# Rendered note HTML (views, popouts, previews, cards) is kept in
+# lp_note_render_cache, at most NOTE_RENDER_CACHE_MAX_ENTRIES renders
+NOTE_RENDER_CACHE_ENABLED = True
+NOTE_RENDER_CACHE_MAX_ENTRIES = 5000
+
+# Notes folder watcher (modules/notes/watcher.py): keeps notes rows, the search
+# index and note links current when files change outside LifePIM.
+# NOTES_WATCHER_BACKEND is "auto" (inotify on Linux, else polling), "inotify"
+# or "polling"; polling re-checks the notes folders every
+# NOTES_WATCHER_POLL_SECONDS.  Changes are applied once none has arrived for
+# NOTES_WATCHER_DEBOUNCE_MS milliseconds.
+NOTES_WATCHER_ENABLED = False
+NOTES_WATCHER_BACKEND = "auto"
+NOTES_WATCHER_POLL_SECONDS = 5
+NOTES_WATCHER_DEBOUNCE_MS = 1000
+# Seconds between re-reads of the watched notes roots (new users, changed roots)
+NOTES_WATCHER_ROOTS_SECONDS = 60
+
 # Audio player settings
 AUDIO_SHOW_FREQ_BAR = "Y"
 
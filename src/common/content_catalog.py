@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 
 from common import data as db
 from common import areas as areas_mod
+from common import schema_registry
 
 
 CODE_RE = re.compile(r"^[A-Z0-9_]+$")
@@ -157,8 +158,6 @@ CREATE INDEX IF NOT EXISTS ix_lp_content_kind_area_area ON lp_content_kind_area(
 CREATE INDEX IF NOT EXISTS ix_lp_content_pattern_kind ON lp_content_pattern(content_kind_id);
 """
 
-_READY_CONN_IDS = set()
-
 
 def _utc_now():
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -176,10 +175,7 @@ CONTENT_KIND_V2_COLUMNS = ["content_kind_id", "name", "area_id", "tab_code", "co
 
 def ensure_content_catalog_schema(conn=None, seed=True):
     conn = _get_conn(conn)
-    conn_id = id(conn)
-    if conn_id in _READY_CONN_IDS and not _content_catalog_schema_is_current(conn):
-        _READY_CONN_IDS.discard(conn_id)
-    if conn_id not in _READY_CONN_IDS:
+    if not schema_registry.is_ready(conn, "content_catalog"):
         areas_mod.ensure_areas_schema(conn)
         conn.executescript(CONTENT_CATALOG_SCHEMA_SQL)
         _migrate_content_kind_v2_if_needed(conn)
@@ -189,23 +185,10 @@ def ensure_content_catalog_schema(conn=None, seed=True):
         _migrate_canonical_table_names(conn)
         _create_default_link_indexes(conn)
         conn.commit()
-        _READY_CONN_IDS.add(conn_id)
+        schema_registry.mark_ready(conn, "content_catalog")
 
 
-def _content_catalog_schema_is_current(conn):
-    try:
-        rows = conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name IN "
-            "('lp_content_kind','lp_content_kind_area','lp_content_pattern','lp_template','lp_content_kind_template','lp_content_view','lp_content_kind_view','lp_content_catalog_meta')"
-        ).fetchall()
-    except Exception:
-        return False
-    if len(rows) != 8:
-        return False
-    try:
-        return _content_kind_schema_state(conn) == "new"
-    except Exception:
-        return False
+schema_registry.register("content_catalog", ensure_content_catalog_schema)
 
 
 def _table_columns(conn, table_name):
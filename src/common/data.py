@@ -2,15 +2,26 @@
 # coding: utf-8
 # data.py - common data access functions
 
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 import os
 import sqlite3
 import sys
+import threading
+import time
 
 import etl_folder_mapping as folder_etl
 
 from . import config as cfg
 from . import if_sqlite as mod_sql
+from . import keyset
+from . import record_area
+from . import row_counts
+from . import schema_registry
+from . import sql_profile
+from . import user_paths
 
 DB_FILE = os.getenv("LIFEPIM_DB_FILE") or getattr(cfg, "DB_FILE", getattr(cfg, "db_name", "lifepim.db"))
 if not os.path.isabs(DB_FILE):
@@ -33,25 +44,309 @@ def _set_row_factory(db_conn):
     db_conn.row_factory = sqlite3.Row
 
 
-def _get_conn():
-    global conn
+def _configure_conn(db_conn):
+    _set_row_factory(db_conn)
+    db_conn.execute("PRAGMA foreign_keys = ON")
+    db_conn.execute("PRAGMA busy_timeout = 5000")
+    try:
+        db_conn.execute("PRAGMA journal_mode = WAL")
+    except Exception:
+        pass
+
+
+def _open_conn():
+    db_conn = sqlite3.connect(DB_FILE, check_same_thread=False, factory=sql_profile.ProfiledConnection)
+    _configure_conn(db_conn)
+    return db_conn
+
+
+# ----------------------------------------------------------------------------
+# Connection management
+#
+# ``conn`` is the shared writer connection and stays available as ``db.conn``
+# for older callers.  Web requests run inside a request scope (see app.py);
+# the first ``_get_conn()`` call in a scope leases a connection from a bounded
+# pool so concurrent page loads do not queue on one sqlite3.Connection.  If a
+# caller swaps in its own ``data.conn`` (tests, scripts) that connection wins.
+
+_OWNED_WRITER_CONN = None
+_POOL_LOCK = threading.Condition()
+_POOL_IDLE = []
+_POOL_OPEN_COUNT = 0
+_POOL_STATS = {
+    "checkouts": 0,
+    "waits": 0,
+    "wait_ms_total": 0.0,
+    "wait_ms_max": 0.0,
+    "timeouts": 0,
+    "opened": 0,
+    "peak_in_use": 0,
+}
+_REQUEST_SCOPE = threading.local()
+
+
+def _get_write_conn():
+    global conn, _OWNED_WRITER_CONN
     if conn is None:
         _dbg(f"Opening sqlite connection to {DB_FILE}")
-        conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-        _set_row_factory(conn)
-        conn.execute("PRAGMA foreign_keys = ON")
-        conn.execute("PRAGMA busy_timeout = 5000")
+        conn = _open_conn()
+        _OWNED_WRITER_CONN = conn
+        _dbg("SQLite connection ready")
+    return conn
+
+
+def _get_conn():
+    writer = _get_write_conn()
+    if writer is not _OWNED_WRITER_CONN:
+        return writer
+    leased = getattr(_REQUEST_SCOPE, "conn", None)
+    if leased is not None:
+        return leased
+    if not getattr(_REQUEST_SCOPE, "active", False) or _pool_size() <= 0:
+        return writer
+    leased = _pool_checkout()
+    if leased is None:
+        return writer
+    _REQUEST_SCOPE.conn = leased
+    return leased
+
+
+def _pool_size():
+    if DB_FILE == ":memory:":
+        return 0
+    try:
+        return max(0, int(getattr(cfg, "DB_POOL_SIZE", 0) or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _pool_wait_seconds():
+    try:
+        return max(0.0, float(getattr(cfg, "DB_POOL_WAIT_SECONDS", 0) or 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _pool_checkout():
+    global _POOL_OPEN_COUNT
+    size = _pool_size()
+    deadline = None
+    started = time.perf_counter()
+    waited = False
+    with _POOL_LOCK:
+        while True:
+            if _POOL_IDLE:
+                leased = _POOL_IDLE.pop()
+                break
+            if _POOL_OPEN_COUNT < size:
+                _POOL_OPEN_COUNT += 1
+                leased = None
+                break
+            if deadline is None:
+                deadline = started + _pool_wait_seconds()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                _POOL_STATS["timeouts"] += 1
+                _dbg(f"connection pool exhausted ({size} in use); using shared connection")
+                return None
+            waited = True
+            _POOL_LOCK.wait(remaining)
+        _POOL_STATS["checkouts"] += 1
+        if waited:
+            wait_ms = (time.perf_counter() - started) * 1000
+            _POOL_STATS["waits"] += 1
+            _POOL_STATS["wait_ms_total"] += wait_ms
+            _POOL_STATS["wait_ms_max"] = max(_POOL_STATS["wait_ms_max"], wait_ms)
+        in_use = _POOL_OPEN_COUNT - len(_POOL_IDLE)
+        _POOL_STATS["peak_in_use"] = max(_POOL_STATS["peak_in_use"], in_use)
+    if leased is not None:
+        return leased
+    try:
+        leased = _open_conn()
+    except Exception:
+        with _POOL_LOCK:
+            _POOL_OPEN_COUNT -= 1
+            _POOL_LOCK.notify()
+        raise
+    with _POOL_LOCK:
+        _POOL_STATS["opened"] += 1
+    return leased
+
+
+def _pool_release(leased, discard=False):
+    global _POOL_OPEN_COUNT
+    with _POOL_LOCK:
+        if discard or len(_POOL_IDLE) >= _pool_size():
+            _POOL_OPEN_COUNT -= 1
+            try:
+                leased.close()
+            except Exception:
+                pass
+        else:
+            _POOL_IDLE.append(leased)
+        _POOL_LOCK.notify()
+
+
+def begin_request_scope():
+    """Allow ``_get_conn()`` to lease a pooled connection on this thread."""
+    _REQUEST_SCOPE.active = True
+    _REQUEST_SCOPE.conn = None
+
+
+def end_request_scope(exc=None):
+    """Return this thread's leased connection to the pool."""
+    leased = getattr(_REQUEST_SCOPE, "conn", None)
+    _REQUEST_SCOPE.active = False
+    _REQUEST_SCOPE.conn = None
+    if leased is None:
+        return
+    discard = False
+    try:
+        if leased.in_transaction:
+            # Matches the old shared-connection behaviour, where a pending
+            # write was committed by whoever committed next.
+            if exc is None:
+                leased.commit()
+            else:
+                leased.rollback()
+    except Exception:
+        discard = True
+    _pool_release(leased, discard=discard)
+
+
+def close_pool():
+    global _POOL_OPEN_COUNT
+    with _POOL_LOCK:
+        idle = list(_POOL_IDLE)
+        _POOL_IDLE.clear()
+        _POOL_OPEN_COUNT -= len(idle)
+        _POOL_LOCK.notify_all()
+    for idle_conn in idle:
         try:
-            conn.execute("PRAGMA journal_mode = WAL")
+            idle_conn.close()
         except Exception:
             pass
-        _dbg("SQLite connection ready")
-    return conn
+
+
+def pool_stats():
+    with _POOL_LOCK:
+        stats = dict(_POOL_STATS)
+        open_count = _POOL_OPEN_COUNT
+        idle_count = len(_POOL_IDLE)
+    waits = stats["waits"]
+    stats.update(
+        {
+            "db_file": DB_FILE,
+            "pool_size": _pool_size(),
+            "wait_seconds": _pool_wait_seconds(),
+            "open": open_count,
+            "idle": idle_count,
+            "in_use": open_count - idle_count,
+            "wait_ms_avg": round(stats["wait_ms_total"] / waits, 2) if waits else 0.0,
+            "wait_ms_total": round(stats["wait_ms_total"], 2),
+            "wait_ms_max": round(stats["wait_ms_max"], 2),
+            "writer_open": conn is not None,
+            "writer_is_shared_override": conn is not None and conn is not _OWNED_WRITER_CONN,
+        }
+    )
+    return stats
+
+
+# ----------------------------------------------------------------------------
+# Write paths
+#
+# ``run_write(unit, ...)`` runs ``unit(conn, ...)`` as one write.  When the
+# single-writer queue (common/db_writer.py) is usable the unit joins the next
+# group commit and the call returns once that group is durable; otherwise it
+# runs inline on the given connection.  ``deferred_commits()`` groups inline
+# writes into one transaction (bulk imports, Pocket push) and ``commit(conn)``
+# is the commit call that respects it.
+
+_COMMIT_DEFER = ContextVar("lp_commit_defer", default=None)
+
+
+def commit(db_conn):
+    pending = _COMMIT_DEFER.get()
+    if pending is None:
+        db_conn.commit()
+        return
+    if all(item is not db_conn for item in pending):
+        pending.append(db_conn)
+
+
+@contextmanager
+def deferred_commits(db_conn=None):
+    """Hold ``commit(conn)`` calls until the outermost block exits."""
+    pending = _COMMIT_DEFER.get()
+    if pending is not None:
+        if db_conn is not None and all(item is not db_conn for item in pending):
+            pending.append(db_conn)
+        yield
+        return
+    pending = [] if db_conn is None else [db_conn]
+    token = _COMMIT_DEFER.set(pending)
+    try:
+        yield
+    except BaseException:
+        for item in pending:
+            try:
+                item.rollback()
+            except Exception:
+                pass
+        raise
+    else:
+        for item in pending:
+            item.commit()
+    finally:
+        _COMMIT_DEFER.reset(token)
+
+
+def _use_write_queue(db_conn):
+    leased = getattr(_REQUEST_SCOPE, "conn", None)
+    if db_conn is not None and db_conn is not _OWNED_WRITER_CONN and db_conn is not leased:
+        return False
+    if _COMMIT_DEFER.get() is not None:
+        return False
+    from common import db_writer
+
+    if db_writer.on_writer_thread() or not db_writer.is_enabled():
+        return False
+    # A write still open on this thread's connection would block the writer.
+    for open_conn in (_OWNED_WRITER_CONN, leased):
+        if open_conn is not None and open_conn.in_transaction:
+            return False
+    return True
+
+
+def run_write(unit, *args, conn=None, **kwargs):
+    """Run ``unit(conn, *args, **kwargs)`` as one write and return its result."""
+    if _use_write_queue(conn):
+        from common import db_writer
+
+        return db_writer.run(unit, *args, **kwargs)
+    target = _get_conn() if conn is None else conn
+    result = unit(target, *args, **kwargs)
+    commit(target)
+    return result
+
+
+def submit_write(unit, *args, conn=None, **kwargs):
+    """Queue a write unit and return a Future (completed inline if no queue)."""
+    if _use_write_queue(conn):
+        from common import db_writer
+
+        return db_writer.submit(unit, *args, **kwargs)
+    future = Future()
+    try:
+        future.set_result(run_write(unit, *args, conn=conn, **kwargs))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
 
 
 def _log_error(conn, message):
     try:
-        mod_sql.lg(conn, mod_sql.LOG_ERROR, message)
+        run_write(mod_sql.lg, mod_sql.LOG_ERROR, message, conn=conn)
     except Exception:
         pass
 
@@ -155,13 +450,17 @@ def _normalize_area_values(conn, tbl_name):
 
 def ensure_area_columns(conn=None, table_names=None):
     conn = _get_conn() if conn is None else conn
-    if table_names is None:
+    all_tables = table_names is None
+    if all_tables:
         rows = conn.execute(
             "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
         ).fetchall()
         table_names = [row["name"] if isinstance(row, sqlite3.Row) else row[0] for row in rows]
     for tbl_name in table_names:
-        if not tbl_name or not _table_exists(conn, tbl_name):
+        if not tbl_name:
+            continue
+        migration_name = f"area_columns:{tbl_name}"
+        if schema_registry.is_ready(conn, migration_name) or not _table_exists(conn, tbl_name):
             continue
         cols = _table_column_names(conn, tbl_name)
         col_set = set(cols)
@@ -188,7 +487,13 @@ def ensure_area_columns(conn=None, table_names=None):
                 pass
         if "area" in col_set:
             _normalize_area_values(conn, tbl_name)
-    conn.commit()
+        schema_registry.mark_ready(conn, migration_name)
+    if all_tables:
+        schema_registry.mark_ready(conn, "area_columns")
+    commit(conn)
+
+
+schema_registry.register("area_columns", ensure_area_columns)
 
 
 def _normalize_area_write_columns(conn, tbl_name, cols, vals):
@@ -238,27 +543,11 @@ PLACE_SCHEMA_COLUMNS = {
     "area": "TEXT",
 }
 
-_NOTES_SCHEMA_READY_CONN_IDS = set()
-_PLACES_SCHEMA_READY_CONN_IDS = set()
-
 
 def ensure_notes_schema(conn=None):
     conn = _get_conn() if conn is None else conn
-    conn_id = id(conn)
-    if conn_id in _NOTES_SCHEMA_READY_CONN_IDS:
-        try:
-            table_row = conn.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='lp_notes'"
-            ).fetchone()
-            if table_row:
-                rows = conn.execute("PRAGMA table_info(lp_notes)").fetchall()
-                existing = {row[1].lower() for row in rows}
-                expected = {col.lower() for col in NOTE_SCHEMA_COLUMNS}
-                if expected.issubset(existing):
-                    return
-        except Exception:
-            pass
-        _NOTES_SCHEMA_READY_CONN_IDS.discard(conn_id)
+    if schema_registry.is_ready(conn, "notes"):
+        return
     table_row = conn.execute(
         "SELECT name FROM sqlite_master WHERE type='table' AND name='lp_notes'"
     ).fetchone()
@@ -277,22 +566,16 @@ def ensure_notes_schema(conn=None):
     conn.execute("CREATE INDEX IF NOT EXISTS ix_lp_notes_date_modified ON lp_notes(date_modified)")
     conn.execute("CREATE INDEX IF NOT EXISTS ix_lp_notes_rec_extract_date ON lp_notes(rec_extract_date)")
     conn.commit()
-    _NOTES_SCHEMA_READY_CONN_IDS.add(conn_id)
+    schema_registry.mark_ready(conn, "notes")
+
+
+schema_registry.register("notes", ensure_notes_schema)
 
 
 def ensure_places_schema(conn=None):
     conn = _get_conn() if conn is None else conn
-    conn_id = id(conn)
-    if conn_id in _PLACES_SCHEMA_READY_CONN_IDS:
-        try:
-            rows = conn.execute("PRAGMA table_info(lp_places)").fetchall()
-            existing = {row[1].lower() for row in rows}
-            expected = {col.lower() for col in PLACE_SCHEMA_COLUMNS}
-            if expected.issubset(existing):
-                return
-        except Exception:
-            pass
-        _PLACES_SCHEMA_READY_CONN_IDS.discard(conn_id)
+    if schema_registry.is_ready(conn, "places"):
+        return
     table_row = conn.execute(
         "SELECT name FROM sqlite_master WHERE type='table' AND name='lp_places'"
     ).fetchone()
@@ -326,7 +609,10 @@ def ensure_places_schema(conn=None):
     )
     conn.execute("CREATE INDEX IF NOT EXISTS ix_lp_places_area ON lp_places(area)")
     conn.commit()
-    _PLACES_SCHEMA_READY_CONN_IDS.add(conn_id)
+    schema_registry.mark_ready(conn, "places")
+
+
+schema_registry.register("places", ensure_places_schema)
 
 
 def _infer_place_type(values_map):
@@ -370,22 +656,111 @@ def ensure_folder_schema(conn=None):
     for tbl_name in folder_tables:
         add_column_if_missing(conn, tbl_name, "folder_id", "INTEGER")
         conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{tbl_name}_folder_id ON {tbl_name}(folder_id)")
+    ensure_folder_closure(conn)
     ensure_notes_schema(conn)
+    ensure_path_indexes(conn, ["dim_folder"] + folder_tables)
+    row_counts.ensure_row_counts_schema(conn, folder_tables)
     conn.commit()
 
 
-def upsert_dim_folder(conn, folder_path):
+# Expression indexes matching user_paths.path_key_sql(<col>) and lower(area),
+# so case-insensitive path prefix and area filters become index range scans.
+PATH_KEY_INDEX_COLUMNS = {
+    "lp_notes": ("path",),
+    "lp_audio": ("path",),
+    "lp_3d": ("path",),
+    "lp_files": ("path",),
+    "dim_folder": ("folder_path",),
+}
+AREA_KEY_INDEX_TABLES = ("lp_notes", "lp_audio", "lp_3d", "lp_files")
+
+
+def ensure_path_indexes(conn=None, table_names=None):
     conn = _get_conn() if conn is None else conn
-    fp = folder_etl.norm_path(folder_path)
-    if not fp:
-        return None
+    all_tables = table_names is None
+    if all_tables:
+        table_names = sorted(set(PATH_KEY_INDEX_COLUMNS) | set(AREA_KEY_INDEX_TABLES))
+    complete = True
+    for tbl_name in table_names:
+        migration_name = f"path_indexes:{tbl_name}"
+        if schema_registry.is_ready(conn, migration_name):
+            continue
+        if not _table_exists(conn, tbl_name):
+            complete = False
+            continue
+        cols = set(_table_column_names(conn, tbl_name))
+        for col_name in PATH_KEY_INDEX_COLUMNS.get(tbl_name, ()):
+            if col_name in cols:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS ix_{tbl_name}_{col_name}_key "
+                    f"ON {tbl_name}({user_paths.path_key_sql(col_name)})"
+                )
+        if tbl_name in AREA_KEY_INDEX_TABLES and "area" in cols:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{tbl_name}_area_key ON {tbl_name}(lower(area))")
+        schema_registry.mark_ready(conn, migration_name)
+    if all_tables and complete:
+        schema_registry.mark_ready(conn, "path_indexes")
+    commit(conn)
+
+
+schema_registry.register("path_indexes", ensure_path_indexes)
+
+
+def ensure_folder_closure(conn=None):
+    """Add dim_folder.parent_folder_id and dim_folder_closure to an existing cache.
+
+    Returns False when the database has no dim_folder table yet. Folders cached
+    before the closure existed are linked on the first run.
+    """
+    conn = _get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "folder_closure"):
+        return True
+    if not _table_exists(conn, "dim_folder"):
+        return False
+    add_column_if_missing(conn, "dim_folder", "parent_folder_id", "INTEGER")
+    for stmt in folder_etl.DDL_FOLDER_CLOSURE:
+        conn.execute(stmt)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_dim_folder_parent ON dim_folder(parent_folder_id)")
+    folder_etl.link_unlinked_folders(conn)
+    conn.commit()
+    schema_registry.mark_ready(conn, "folder_closure")
+    return True
+
+
+schema_registry.register("folder_closure", ensure_folder_closure)
+
+
+def folder_subtree_sql(folder_col, param_count=1):
+    """SQL testing ``folder_col`` against the subtrees of the folders named by
+    ``param_count`` path parameters (matched case-insensitively)."""
+    placeholders = ", ".join("?" for _ in range(param_count))
+    return (
+        f"{folder_col} IN (SELECT c.descendant_id FROM dim_folder_closure c "
+        "JOIN dim_folder f ON f.folder_id = c.ancestor_id "
+        f"WHERE f.folder_path COLLATE NOCASE IN ({placeholders}))"
+    )
+
+
+def _upsert_folder_row(conn, fp):
     conn.execute("INSERT OR IGNORE INTO dim_folder(folder_path) VALUES (?)", (fp,))
     conn.execute(
         "UPDATE dim_folder SET last_seen_at=strftime('%Y-%m-%dT%H:%M:%fZ','now'), is_active=1 WHERE folder_path=?",
         (fp,),
     )
     row = conn.execute("SELECT folder_id FROM dim_folder WHERE folder_path = ?", (fp,)).fetchone()
-    return row["folder_id"] if row else None
+    if not row:
+        return None
+    if ensure_folder_closure(conn):
+        folder_etl.link_dim_folder(conn, row["folder_id"], fp)
+    return row["folder_id"]
+
+
+def upsert_dim_folder(conn, folder_path):
+    conn = _get_conn() if conn is None else conn
+    fp = folder_etl.norm_path(folder_path)
+    if not fp:
+        return None
+    return _upsert_folder_row(conn, fp)
 
 
 def upsert_note_dim_folder(conn, folder_path):
@@ -393,13 +768,7 @@ def upsert_note_dim_folder(conn, folder_path):
     fp = _normalize_note_folder_path(folder_path)
     if not fp:
         return None
-    conn.execute("INSERT OR IGNORE INTO dim_folder(folder_path) VALUES (?)", (fp,))
-    conn.execute(
-        "UPDATE dim_folder SET last_seen_at=strftime('%Y-%m-%dT%H:%M:%fZ','now'), is_active=1 WHERE folder_path=?",
-        (fp,),
-    )
-    row = conn.execute("SELECT folder_id FROM dim_folder WHERE folder_path = ?", (fp,)).fetchone()
-    return row["folder_id"] if row else None
+    return _upsert_folder_row(conn, fp)
 
 
 def _normalize_folder_path(path_value):
@@ -407,8 +776,6 @@ def _normalize_folder_path(path_value):
 
 
 def _normalize_note_folder_path(path_value):
-    from common import user_paths
-
     return user_paths.normalize_path(path_value)
 
 
@@ -455,7 +822,7 @@ def update_folder_id_for_record(conn, tbl_name, route_name, record_id, values_ma
     if not folder_id:
         return
     conn.execute(f"UPDATE {tbl_name} SET folder_id = ? WHERE id = ?", (folder_id, record_id))
-    conn.commit()
+    commit(conn)
 
 
 def _qualify_cols(col_list, table_alias="t"):
@@ -512,67 +879,43 @@ def _current_owner_user_id():
     return None
 
 
-def _area_folder_owner_sql(alias="pf"):
-    owner_user_id = _current_owner_user_id()
-    if owner_user_id is None:
-        return f"{alias}.owner_user_id IS NULL"
-    return f"{alias}.owner_user_id = {int(owner_user_id)}"
-
-
-def get_mapped_rows(conn, tbl_name, col_list, tab=None, limit=None, offset=None, order_by=None):
-    conn = _get_conn() if conn is None else conn
-    cols = _qualify_cols(col_list, "t")
+def _mapped_rows_source(conn, tbl_name, col_list, tab=None):
+    """FROM and WHERE parts (plus params) for the mapped rows of ``tbl_name``."""
     params = []
-    order_clause = order_by or "t.id DESC"
     route_name = _route_for_table(tbl_name)
     if route_name in {"notes", "media", "audio", "3d", "files"}:
         from common import areas as areas_mod
 
         areas_mod.ensure_areas_schema(conn)
+        owner_user_id = _current_owner_user_id()
+        if tab:
+            record_area.ensure_current(conn, route_name)
         if tab and tab.lower() == "unmapped":
-            sql = (
-                f"SELECT {cols} FROM {tbl_name} t "
-                "LEFT JOIN dim_folder df ON df.folder_id = t.folder_id "
-                "WHERE NOT EXISTS ("
-                "  SELECT 1 FROM lp_area_folders pf "
-                f"  WHERE {_area_folder_owner_sql('pf')} "
-                "    AND pf.is_enabled = 1 "
-                "    AND pf.folder_role IN ('default','include','archive','output') "
-                "    AND df.folder_path IS NOT NULL "
-                "    AND lower(df.folder_path) LIKE lower(pf.path_prefix) || '%'"
-                ") "
-                f"ORDER BY {order_clause}"
-            )
+            from_sql = f"{tbl_name} t"
+            where_sql = record_area.unmapped_sql(route_name, owner_user_id)
         elif tab:
-            sql = (
-                f"SELECT {cols} FROM {tbl_name} t "
-                "LEFT JOIN dim_folder df ON df.folder_id = t.folder_id "
-                "WHERE EXISTS ("
-                "  SELECT 1 FROM lp_area_folders pf "
-                f"  WHERE {_area_folder_owner_sql('pf')} "
-                "    AND pf.area_id = ? AND pf.is_enabled = 1 "
-                "    AND pf.folder_role IN ('default','include','archive','output') "
-                "    AND df.folder_path IS NOT NULL "
-                "    AND lower(df.folder_path) LIKE lower(pf.path_prefix) || '%'"
-                ") "
-                f"ORDER BY {order_clause}"
-            )
+            from_sql = f"{tbl_name} t {record_area.area_join_sql(route_name, owner_user_id)}"
+            where_sql = "ra.area_id = ?"
             params.append(tab)
         else:
-            sql = f"SELECT {cols} FROM {tbl_name} t ORDER BY {order_clause}"
+            from_sql, where_sql = f"{tbl_name} t", ""
     else:
-        if tab:
-            if _has_area_col(col_list):
-                sql = (
-                    f"SELECT {cols} FROM {tbl_name} t "
-                    "WHERE lower(t.area) = lower(?) "
-                    f"ORDER BY {order_clause}"
-                )
-                params.append(tab)
-            else:
-                sql = f"SELECT {cols} FROM {tbl_name} t ORDER BY {order_clause}"
-        else:
-            sql = f"SELECT {cols} FROM {tbl_name} t ORDER BY {order_clause}"
+        from_sql, where_sql = f"{tbl_name} t", ""
+        if tab and _has_area_col(col_list):
+            where_sql = "lower(t.area) = lower(?)"
+            params.append(tab)
+    return from_sql, where_sql, params
+
+
+def get_mapped_rows(conn, tbl_name, col_list, tab=None, limit=None, offset=None, order_by=None):
+    conn = _get_conn() if conn is None else conn
+    cols = _qualify_cols(col_list, "t")
+    order_clause = order_by or "t.id DESC"
+    from_sql, where_sql, params = _mapped_rows_source(conn, tbl_name, col_list, tab)
+    sql = f"SELECT {cols} FROM {from_sql} "
+    if where_sql:
+        sql += f"WHERE {where_sql} "
+    sql += f"ORDER BY {order_clause}"
     if limit is not None:
         sql += " LIMIT ?"
         params.append(int(limit))
@@ -583,7 +926,30 @@ def get_mapped_rows(conn, tbl_name, col_list, tab=None, limit=None, offset=None,
     return conn.execute(sql, params).fetchall()
 
 
+def get_mapped_page(conn, tbl_name, col_list, tab=None, limit=None, order_by=None, cursor=None, offset=None):
+    """Keyset-paged ``get_mapped_rows``; returns a ``keyset.Page`` of row dicts.
+
+    ``cursor`` comes from the previous page's ``next_cursor``/``prev_cursor``;
+    without one the page starts at ``offset``.
+    """
+    conn = _get_conn() if conn is None else conn
+    from_sql, where_sql, params = _mapped_rows_source(conn, tbl_name, col_list, tab)
+    _dbg(f"SELECT {tbl_name} tab={tab} limit={limit} offset={offset} cursor={bool(cursor)}")
+    return keyset.fetch_page(
+        conn,
+        _qualify_cols(col_list, "t"),
+        from_sql,
+        where_sql,
+        params,
+        order_by or "t.id DESC",
+        limit or cfg.RECS_PER_PAGE,
+        cursor=cursor,
+        offset=offset,
+    )
+
+
 def count_mapped_rows(conn, tbl_name, tab=None):
+    """Row count for ``get_mapped_rows``; served from ``lp_row_counts``."""
     conn = _get_conn() if conn is None else conn
     params = []
     route_name = _route_for_table(tbl_name)
@@ -591,46 +957,31 @@ def count_mapped_rows(conn, tbl_name, tab=None):
         from common import areas as areas_mod
 
         areas_mod.ensure_areas_schema(conn)
+        owner_user_id = _current_owner_user_id()
+        if tab:
+            record_area.ensure_current(conn, route_name)
         if tab and tab.lower() == "unmapped":
             sql = (
                 f"SELECT COUNT(1) as cnt FROM {tbl_name} t "
-                "LEFT JOIN dim_folder df ON df.folder_id = t.folder_id "
-                "WHERE NOT EXISTS ("
-                "  SELECT 1 FROM lp_area_folders pf "
-                f"  WHERE {_area_folder_owner_sql('pf')} "
-                "    AND pf.is_enabled = 1 "
-                "    AND pf.folder_role IN ('default','include','archive','output') "
-                "    AND df.folder_path IS NOT NULL "
-                "    AND lower(df.folder_path) LIKE lower(pf.path_prefix) || '%'"
-                ")"
+                f"WHERE {record_area.unmapped_sql(route_name, owner_user_id)}"
             )
-        elif tab:
+            return row_counts.query_count(conn, tbl_name, sql, params)
+        if tab:
             sql = (
                 f"SELECT COUNT(1) as cnt FROM {tbl_name} t "
-                "LEFT JOIN dim_folder df ON df.folder_id = t.folder_id "
-                "WHERE EXISTS ("
-                "  SELECT 1 FROM lp_area_folders pf "
-                f"  WHERE {_area_folder_owner_sql('pf')} "
-                "    AND pf.area_id = ? AND pf.is_enabled = 1 "
-                "    AND pf.folder_role IN ('default','include','archive','output') "
-                "    AND df.folder_path IS NOT NULL "
-                "    AND lower(df.folder_path) LIKE lower(pf.path_prefix) || '%'"
-                ")"
+                f"{record_area.area_join_sql(route_name, owner_user_id)} "
+                "WHERE ra.area_id = ?"
             )
             params.append(tab)
-        else:
-            sql = f"SELECT COUNT(1) as cnt FROM {tbl_name} t"
+            return row_counts.query_count(conn, tbl_name, sql, params)
+        sql = f"SELECT COUNT(1) as cnt FROM {tbl_name} t"
+        return row_counts.folder_count(conn, tbl_name, sql, params)
+    if tab and _table_has_area(conn, tbl_name):
+        sql = f"SELECT COUNT(1) as cnt FROM {tbl_name} t WHERE lower(t.area) = lower(?)"
+        params.append(tab)
     else:
-        if tab:
-            if _table_has_area(conn, tbl_name):
-                sql = f"SELECT COUNT(1) as cnt FROM {tbl_name} t WHERE lower(t.area) = lower(?)"
-                params.append(tab)
-            else:
-                sql = f"SELECT COUNT(1) as cnt FROM {tbl_name} t"
-        else:
-            sql = f"SELECT COUNT(1) as cnt FROM {tbl_name} t"
-    row = conn.execute(sql, params).fetchone()
-    return row["cnt"] if row else 0
+        sql = f"SELECT COUNT(1) as cnt FROM {tbl_name} t"
+    return row_counts.query_count(conn, tbl_name, sql, params)
 
 
 def add_record(conn, tbl_name, col_list, value_list):
@@ -643,9 +994,17 @@ def add_record(conn, tbl_name, col_list, value_list):
     :param value_list: list of values to populate
     returns inserted row id or None for failure
     """
+    owner_user_id = _current_owner_user_id()
+    try:
+        return run_write(_add_record_unit, tbl_name, col_list, value_list, owner_user_id, conn=conn)
+    except Exception as exc:
+        _log_error(None, f"add_record failed: {exc}")
+        return None
+
+
+def _add_record_unit(conn, tbl_name, col_list, value_list, owner_user_id=None):
     cols = list(col_list)
     vals = list(value_list)
-    conn = _get_conn() if conn is None else conn
     table_cols = None
     try:
         ensure_area_columns(conn, [tbl_name])
@@ -653,12 +1012,9 @@ def add_record(conn, tbl_name, col_list, value_list):
         cols = [col for col, _ in normalized]
         vals = [val for _, val in normalized]
         cols, vals = _normalize_place_write_values(tbl_name, table_cols, cols, vals)
-        if "owner_user_id" in table_cols and "owner_user_id" not in cols:
-            from flask_login import current_user
-
-            if getattr(current_user, "is_authenticated", False):
-                cols.append("owner_user_id")
-                vals.append(current_user.user_id)
+        if "owner_user_id" in table_cols and "owner_user_id" not in cols and owner_user_id is not None:
+            cols.append("owner_user_id")
+            vals.append(owner_user_id)
     except Exception:
         pass
     if table_cols:
@@ -676,7 +1032,7 @@ def add_record(conn, tbl_name, col_list, value_list):
     try:
         #_dbg(f"INSERT {tbl_name} cols={cols}")
         cur = conn.execute(sql, vals)
-        conn.commit()
+        commit(conn)
         record_id = cur.lastrowid
         try:
             _update_folder_id_from_values(conn, tbl_name, col_list, value_list, record_id)
@@ -700,10 +1056,17 @@ def update_record(conn, tbl_name, record_id, col_list, value_list):
     :param value_list: list of values to update
     returns True for success or False for failure
     """
+    try:
+        return run_write(_update_record_unit, tbl_name, record_id, col_list, value_list, conn=conn)
+    except Exception as exc:
+        _log_error(None, f"update_record failed: {exc}")
+        return False
+
+
+def _update_record_unit(conn, tbl_name, record_id, col_list, value_list):
     cols = list(col_list)
     vals = list(value_list)
     try:
-        conn = _get_conn() if conn is None else conn
         ensure_area_columns(conn, [tbl_name])
         normalized, table_cols = _normalize_area_write_columns(conn, tbl_name, cols, vals)
         cols = [col for col, _ in normalized]
@@ -723,7 +1086,7 @@ def update_record(conn, tbl_name, record_id, col_list, value_list):
         before = _fetch_row_by_id(conn, tbl_name, record_id)
         _dbg(f"UPDATE {tbl_name} id={record_id} cols={col_list}")
         conn.execute(sql, vals)
-        conn.commit()
+        commit(conn)
         _update_folder_id_from_values(conn, tbl_name, col_list, value_list, record_id)
         after = _fetch_row_by_id(conn, tbl_name, record_id)
         _log_user_change(conn, "update", tbl_name, record_id, before=before, after=after)
@@ -742,13 +1105,20 @@ def delete_record(conn, tbl_name, record_id):
     :param record_id: the id of the record to delete
     returns True for success or False for failure
     """
+    try:
+        return run_write(_delete_record_unit, tbl_name, record_id, conn=conn)
+    except Exception as exc:
+        _log_error(None, f"delete_record failed: {exc}")
+        return False
+
+
+def _delete_record_unit(conn, tbl_name, record_id):
     sql = f"DELETE FROM {tbl_name} WHERE id = ?"
     try:
-        conn = _get_conn() if conn is None else conn
         before = _fetch_row_by_id(conn, tbl_name, record_id)
         _dbg(f"DELETE {tbl_name} id={record_id}")
         conn.execute(sql, [record_id])
-        conn.commit()
+        commit(conn)
         if before is not None:
             _log_user_change(conn, "delete", tbl_name, record_id, before=before, after=None)
         return True
@@ -0,0 +1,302 @@
+"""Single-writer queue that groups SQLite writes into one commit per tick.
+
+Write units are plain callables ``unit(conn, *args, **kwargs)``.  Any thread
+can submit them; one background thread runs them on a dedicated writer
+connection, each inside its own savepoint, and commits the whole group once.
+``data.run_write`` / ``data.submit_write`` are the normal entry points and
+fall back to running the unit inline when the queue is not usable (for
+example when tests swap in an in-memory ``data.conn``).
+"""
+
+from __future__ import annotations
+
+import atexit
+from concurrent.futures import Future
+import queue
+import sqlite3
+import threading
+import time
+
+from common import config as cfg
+from common import data
+from common import sql_profile
+
+
+_UNIT_SAVEPOINT = "lp_write_unit"
+
+
+class GroupCommitConnection(sql_profile.ProfiledConnection):
+    """Writer connection whose commit/rollback are scoped to the current unit.
+
+    Existing data helpers call ``conn.commit()`` themselves.  While a unit is
+    running those calls are absorbed so the group commit happens once, and
+    ``rollback()`` only undoes the unit's own savepoint.
+    """
+
+    unit_active = False
+
+    def commit(self):
+        if self.unit_active:
+            return
+        super().commit()
+
+    def rollback(self):
+        if self.unit_active:
+            self.execute(f"ROLLBACK TO SAVEPOINT {_UNIT_SAVEPOINT}")
+            return
+        super().rollback()
+
+    def executescript(self, sql_script):
+        if not self.unit_active:
+            return super().executescript(sql_script)
+        # sqlite3.executescript() commits first, which would end the group
+        # transaction; run the statements one at a time instead.
+        cur = None
+        buffer = ""
+        for piece in sql_script.split(";"):
+            buffer += piece + ";"
+            if sqlite3.complete_statement(buffer):
+                if buffer.strip(" \t\r\n;"):
+                    cur = self.execute(buffer)
+                buffer = ""
+        return cur if cur is not None else self.cursor()
+
+
+class _WriteUnit:
+    __slots__ = ("fn", "args", "kwargs", "future", "profile")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        # SQL run for this unit is charged to the submitting request.
+        self.profile = sql_profile.current()
+
+
+_STOP = object()
+_QUEUE = queue.Queue()
+_LOCK = threading.Lock()
+_THREAD = None
+_WRITER_CONN = None
+_WRITER_DB_FILE = None
+# Guards _STATS: submitters and the writer thread both update it.
+_STATS_LOCK = threading.Lock()
+_STATS = {
+    "units": 0,
+    "unit_errors": 0,
+    "batches": 0,
+    "batch_failures": 0,
+    "max_batch_size": 0,
+    "max_queue_depth": 0,
+    "commit_ms_total": 0.0,
+}
+
+
+def _batch_ms():
+    try:
+        return max(0.0, float(getattr(cfg, "DB_WRITE_BATCH_MS", 0) or 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _batch_max():
+    try:
+        return max(1, int(getattr(cfg, "DB_WRITE_BATCH_MAX", 1) or 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def is_enabled():
+    if not getattr(cfg, "DB_WRITE_QUEUE", False):
+        return False
+    if data.DB_FILE == ":memory:":
+        return False
+    return data.conn is None or data.conn is data._OWNED_WRITER_CONN
+
+
+def on_writer_thread():
+    return _THREAD is not None and threading.current_thread() is _THREAD
+
+
+def _open_writer_conn():
+    global _WRITER_CONN, _WRITER_DB_FILE
+    if _WRITER_CONN is not None and _WRITER_DB_FILE == data.DB_FILE:
+        return _WRITER_CONN
+    if _WRITER_CONN is not None:
+        try:
+            _WRITER_CONN.close()
+        except Exception:
+            pass
+    writer = sqlite3.connect(
+        data.DB_FILE,
+        check_same_thread=False,
+        isolation_level=None,
+        factory=GroupCommitConnection,
+    )
+    data._configure_conn(writer)
+    _WRITER_CONN = writer
+    _WRITER_DB_FILE = data.DB_FILE
+    return writer
+
+
+def _ensure_thread():
+    global _THREAD
+    with _LOCK:
+        if _THREAD is not None and _THREAD.is_alive():
+            return
+        _THREAD = threading.Thread(target=_writer_loop, name="lifepim-db-writer", daemon=True)
+        _THREAD.start()
+
+
+def submit(fn, *args, **kwargs):
+    """Queue ``fn(conn, *args, **kwargs)`` and return a Future for its result."""
+    unit = _WriteUnit(fn, args, kwargs)
+    if on_writer_thread():
+        # Nested write from inside a unit: it is already in the open group.
+        try:
+            unit.future.set_result(fn(_WRITER_CONN, *args, **kwargs))
+        except Exception as exc:
+            unit.future.set_exception(exc)
+        return unit.future
+    _ensure_thread()
+    _QUEUE.put(unit)
+    depth = _QUEUE.qsize()
+    with _STATS_LOCK:
+        _STATS["max_queue_depth"] = max(_STATS["max_queue_depth"], depth)
+    return unit.future
+
+
+def run(fn, *args, timeout=None, **kwargs):
+    """Run a write unit and wait until its group has been committed."""
+    return submit(fn, *args, **kwargs).result(timeout=timeout)
+
+
+def _collect_batch(first):
+    batch = [first]
+    stop = False
+    limit = _batch_max()
+    deadline = time.perf_counter() + _batch_ms() / 1000.0
+    while len(batch) < limit:
+        try:
+            remaining = deadline - time.perf_counter()
+            unit = _QUEUE.get(timeout=remaining) if remaining > 0 else _QUEUE.get_nowait()
+        except queue.Empty:
+            break
+        if unit is _STOP:
+            stop = True
+            break
+        batch.append(unit)
+    return batch, stop
+
+
+def _run_batch(batch):
+    units = [unit for unit in batch if unit.future.set_running_or_notify_cancel()]
+    if not units:
+        return
+    outcomes = []
+    try:
+        writer = _open_writer_conn()
+        writer.execute("BEGIN IMMEDIATE")
+    except Exception as exc:
+        with _STATS_LOCK:
+            _STATS["batch_failures"] += 1
+        for unit in units:
+            unit.future.set_exception(exc)
+        return
+    for unit in units:
+        writer.execute(f"SAVEPOINT {_UNIT_SAVEPOINT}")
+        writer.unit_active = True
+        sql_profile.activate(unit.profile)
+        try:
+            result = unit.fn(writer, *unit.args, **unit.kwargs)
+        except Exception as exc:
+            writer.unit_active = False
+            writer.execute(f"ROLLBACK TO SAVEPOINT {_UNIT_SAVEPOINT}")
+            writer.execute(f"RELEASE SAVEPOINT {_UNIT_SAVEPOINT}")
+            outcomes.append((unit, None, exc))
+            continue
+        finally:
+            sql_profile.activate(None)
+        writer.unit_active = False
+        writer.execute(f"RELEASE SAVEPOINT {_UNIT_SAVEPOINT}")
+        outcomes.append((unit, result, None))
+    started = time.perf_counter()
+    try:
+        writer.execute("COMMIT")
+    except Exception as exc:
+        try:
+            writer.execute("ROLLBACK")
+        except Exception:
+            pass
+        with _STATS_LOCK:
+            _STATS["batch_failures"] += 1
+        for unit, _, _ in outcomes:
+            unit.future.set_exception(exc)
+        return
+    with _STATS_LOCK:
+        _STATS["commit_ms_total"] += (time.perf_counter() - started) * 1000
+        _STATS["batches"] += 1
+        _STATS["units"] += len(outcomes)
+        _STATS["max_batch_size"] = max(_STATS["max_batch_size"], len(outcomes))
+        _STATS["unit_errors"] += sum(1 for _, _, exc in outcomes if exc is not None)
+    for unit, result, exc in outcomes:
+        if exc is None:
+            unit.future.set_result(result)
+        else:
+            unit.future.set_exception(exc)
+
+
+def _writer_loop():
+    while True:
+        unit = _QUEUE.get()
+        if unit is _STOP:
+            return
+        batch, stop = _collect_batch(unit)
+        try:
+            _run_batch(batch)
+        except Exception as exc:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+        if stop:
+            return
+
+
+def shutdown(timeout=5.0):
+    """Flush queued units and stop the writer thread."""
+    global _THREAD, _WRITER_CONN, _WRITER_DB_FILE
+    thread = _THREAD
+    if thread is not None and thread.is_alive():
+        _QUEUE.put(_STOP)
+        thread.join(timeout)
+    _THREAD = None
+    if _WRITER_CONN is not None:
+        try:
+            _WRITER_CONN.close()
+        except Exception:
+            pass
+    _WRITER_CONN = None
+    _WRITER_DB_FILE = None
+
+
+def stats():
+    with _STATS_LOCK:
+        result = dict(_STATS)
+    batches = result["batches"]
+    result.update(
+        {
+            "enabled": is_enabled(),
+            "running": _THREAD is not None and _THREAD.is_alive(),
+            "queue_depth": _QUEUE.qsize(),
+            "batch_ms": _batch_ms(),
+            "batch_max": _batch_max(),
+            "avg_batch_size": round(result["units"] / batches, 2) if batches else 0.0,
+            "avg_commit_ms": round(result["commit_ms_total"] / batches, 2) if batches else 0.0,
+            "commit_ms_total": round(result["commit_ms_total"], 2),
+        }
+    )
+    return result
+
+
+atexit.register(shutdown)
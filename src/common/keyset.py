@@ -0,0 +1,236 @@
+"""Keyset ("seek") pagination for list views.
+
+``LIMIT n OFFSET k`` makes SQLite build and throw away the first k rows of
+the ordered result - including any per-row EXISTS filter - before it returns
+anything, so late pages of a big table get slower the further you go.  A
+keyset page instead continues from the sort key of the last row already
+shown:
+
+    WHERE (t.file_name, t.id) > (?, ?) ORDER BY t.file_name, t.id LIMIT n
+
+The position is passed to the browser as an opaque cursor (see
+``encode_cursor``).  ``fetch_page`` returns a ``Page`` - a plain list of row
+dicts that also carries ``next_cursor`` / ``prev_cursor`` - and falls back to
+OFFSET when there is no usable cursor, which is how the numbered page links
+still jump straight to page N.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+
+
+NEXT = "n"
+PREV = "p"
+
+_KEY_PREFIX = "_seek_"
+
+
+class Page(list):
+    """Rows of one page plus the cursors for the neighbouring pages."""
+
+    def __init__(self, rows=(), next_cursor=None, prev_cursor=None):
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def derive(self, rows):
+        """Same cursors, different row objects (after decorating the rows)."""
+        return Page(rows, self.next_cursor, self.prev_cursor)
+
+
+def split_order(order_by):
+    """Split an ORDER BY list into ``[(expr, descending), ...]``.
+
+    Commas inside function calls are respected; a missing direction is ASC.
+    """
+    text = (order_by or "").strip()
+    if text[:9].upper() == "ORDER BY ":
+        text = text[9:]
+    parts = []
+    depth = 0
+    quote = ""
+    start = 0
+    for index, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = ""
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    terms = []
+    for part in parts:
+        expr = part.strip()
+        if not expr:
+            continue
+        descending = False
+        upper = expr.upper()
+        if upper.endswith(" DESC"):
+            expr, descending = expr[:-5].strip(), True
+        elif upper.endswith(" ASC"):
+            expr = expr[:-4].strip()
+        terms.append((expr, descending))
+    return terms
+
+
+def seek_terms(order_by, id_expr):
+    """Order terms with ``id_expr`` appended as the unique tie-breaker."""
+    terms = split_order(order_by)
+    normalized_id = _normalize_expr(id_expr)
+    if not any(_normalize_expr(expr) == normalized_id for expr, _ in terms):
+        descending = terms[-1][1] if terms else False
+        terms.append((id_expr, descending))
+    return terms
+
+
+def _normalize_expr(expr):
+    return " ".join(str(expr or "").lower().split())
+
+
+def order_clause(terms, backward=False):
+    return ", ".join(
+        f"{expr} {'DESC' if descending != backward else 'ASC'}" for expr, descending in terms
+    )
+
+
+def signature(terms):
+    text = "|".join(f"{_normalize_expr(expr)}:{int(descending)}" for expr, descending in terms)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+
+
+def encode_cursor(values, direction, sig):
+    try:
+        payload = json.dumps({"k": list(values), "d": direction, "s": sig}, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, sig):
+    """Return ``(values, direction)``, or None for a missing/stale cursor."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(str(token) + "=" * (-len(str(token)) % 4))
+        payload = json.loads(raw.decode("utf-8"))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if not isinstance(payload, dict) or payload.get("s") != sig:
+        return None
+    values = payload.get("k")
+    direction = payload.get("d")
+    if not isinstance(values, list) or direction not in (NEXT, PREV):
+        return None
+    return values, direction
+
+
+def seek_predicate(terms, values, backward=False):
+    """SQL matching the rows that sort strictly after ``values``.
+
+    NULL keys follow SQLite ordering: first when ascending, last when
+    descending.  ``backward`` walks the order in reverse (rows before the key).
+    """
+    directions = [descending != backward for _, descending in terms]
+    has_null = any(value is None for value in values)
+    if not has_null and len(set(directions)) == 1:
+        columns = ", ".join(expr for expr, _ in terms)
+        marks = ", ".join("?" for _ in terms)
+        if not directions[0]:
+            return f"({columns}) > ({marks})", list(values)
+        if len(terms) == 2:
+            return f"(({columns}) < ({marks}) OR {terms[0][0]} IS NULL)", list(values)
+    clauses = []
+    params = []
+    for index, ((expr, _), descending, value) in enumerate(zip(terms, directions, values)):
+        parts = []
+        part_params = []
+        for prev_expr, prev_value in zip((t[0] for t in terms[:index]), values[:index]):
+            if prev_value is None:
+                parts.append(f"{prev_expr} IS NULL")
+            else:
+                parts.append(f"{prev_expr} = ?")
+                part_params.append(prev_value)
+        if value is None:
+            if descending:
+                continue
+            parts.append(f"{expr} IS NOT NULL")
+        elif descending:
+            parts.append(f"({expr} < ? OR {expr} IS NULL)")
+            part_params.append(value)
+        else:
+            parts.append(f"{expr} > ?")
+            part_params.append(value)
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params.extend(part_params)
+    if not clauses:
+        return "0", []
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def fetch_page(
+    conn,
+    select_sql,
+    from_sql,
+    where_sql,
+    params,
+    order_by,
+    limit,
+    cursor=None,
+    offset=None,
+    id_expr="t.id",
+):
+    """Fetch one page of ``SELECT select_sql FROM from_sql WHERE where_sql``.
+
+    ``cursor`` (from a previous page) seeks past the key it holds; without a
+    valid cursor ``offset`` is used.  Returns a ``Page`` of row dicts.
+    """
+    terms = seek_terms(order_by, id_expr)
+    sig = signature(terms)
+    limit = max(1, int(limit))
+    decoded = decode_cursor(cursor, sig)
+    if decoded and len(decoded[0]) != len(terms):
+        decoded = None
+    backward = bool(decoded) and decoded[1] == PREV
+    key_cols = ", ".join(f"{expr} AS {_KEY_PREFIX}{index}" for index, (expr, _) in enumerate(terms))
+    where = [f"({where_sql})"] if where_sql else []
+    sql_params = list(params or [])
+    if decoded:
+        predicate, predicate_params = seek_predicate(terms, decoded[0], backward=backward)
+        where.append(predicate)
+        sql_params.extend(predicate_params)
+    sql = f"SELECT {select_sql}, {key_cols} FROM {from_sql}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order_clause(terms, backward=backward)} LIMIT ?"
+    sql_params.append(limit + 1)
+    offset = 0 if decoded else max(0, int(offset or 0))
+    if offset:
+        sql += " OFFSET ?"
+        sql_params.append(offset)
+    rows = conn.execute(sql, sql_params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+    items = []
+    keys = []
+    for row in rows:
+        item = dict(row)
+        keys.append([item.pop(f"{_KEY_PREFIX}{index}") for index in range(len(terms))])
+        items.append(item)
+    if backward:
+        has_next, has_prev = bool(decoded), has_more
+    else:
+        has_next, has_prev = has_more, bool(decoded) or offset > 0
+    next_cursor = encode_cursor(keys[-1], NEXT, sig) if items and has_next else None
+    prev_cursor = encode_cursor(keys[0], PREV, sig) if items and has_prev else None
+    return Page(items, next_cursor, prev_cursor)
@@ -1,6 +1,8 @@
 from datetime import datetime
 import sqlite3
 
+from common import schema_registry
+
 
 LINK_TYPE_VOCAB = [
     "related",
@@ -283,7 +285,13 @@ def build_open_route(type_id, record_id):
 
 
 def ensure_links_schema(conn):
+    if schema_registry.is_ready(conn, "links"):
+        return
     conn.executescript(LINKS_SCHEMA_SQL)
+    schema_registry.mark_ready(conn, "links")
+
+
+schema_registry.register("links", ensure_links_schema)
 
 
 def allowed_link_types(src_type, dst_type):
@@ -2,7 +2,6 @@ from common import data
 from common import links as link_model
 from common.search import parse_search_terms
 from common.utils import get_table_def
-from modules.contacts import dao as contacts_dao
 
 
 def search_records(query, types=None, limit=20):
@@ -54,33 +53,103 @@ def search_records(query, types=None, limit=20):
 
 
 def get_record_summary(type_id, record_id):
-    type_id = link_model._norm_type_id(type_id)
-    record_id = str(record_id)
+    return get_record_summaries([(type_id, record_id)]).get((type_id, str(record_id)))
+
+
+# SQLite's bound-parameter limit is at least 999; stay well below it.
+_SUMMARY_CHUNK = 500
+
+
+def _request_memo():
+    """Summaries resolved earlier in this request, keyed ``(type, id)``.
+
+    Only GET and HEAD requests keep them: other requests may edit a record
+    and then render its links, which must show the new title.
+    """
+    try:
+        from flask import g, has_request_context, request
+
+        if has_request_context() and request.method in ("GET", "HEAD"):
+            memo = getattr(g, "lp_record_summaries", None)
+            if memo is None:
+                memo = g.lp_record_summaries = {}
+            return memo
+    except Exception:
+        pass
+    return {}
+
+
+def get_record_summaries(refs):
+    """Summaries of ``refs`` (``(type, id)`` pairs), keyed ``(type, str(id))``.
+
+    Records are read with one ``IN (...)`` query per table - per money
+    section, per contacts table - instead of one query each; missing records
+    map to None.  Results are remembered for the rest of a GET request.
+    """
+    memo = _request_memo()
+    wanted = {}
+    for type_id, record_id in refs:
+        if record_id is None:
+            continue
+        key = (link_model._norm_type_id(type_id), str(record_id))
+        if key not in memo:
+            wanted.setdefault(key[0], set()).add(key[1])
+    for type_id, record_ids in wanted.items():
+        found = _fetch_summaries(type_id, sorted(record_ids))
+        for record_id in record_ids:
+            memo[(type_id, record_id)] = found.get(record_id)
+    result = {}
+    for type_id, record_id in refs:
+        if record_id is None:
+            continue
+        summary = memo.get((link_model._norm_type_id(type_id), str(record_id)))
+        result[(type_id, str(record_id))] = dict(summary) if summary else None
+    return result
+
+
+def _chunks(values):
+    for offset in range(0, len(values), _SUMMARY_CHUNK):
+        yield values[offset:offset + _SUMMARY_CHUNK]
+
+
+def _fetch_summaries(type_id, record_ids):
+    """``{record_id: summary}`` for the records of one type that exist."""
+    conn = data._get_conn()
+    found = {}
     if type_id in {"person", "contact"}:
-        try:
-            contact_id = int(record_id)
-        except (TypeError, ValueError):
-            contact_id = record_id
-        contact = contacts_dao.get_contact(contact_id)
-        if not contact:
-            return None
-        return _summary_from_values(
-            type_id,
-            record_id,
-            contact.get("display_name"),
-            contact.get("normalized_name"),
-        )
+        if not _table_exists(conn, "lp_contacts"):
+            return found
+        for chunk in _chunks(record_ids):
+            rows = conn.execute(
+                "SELECT contact_id, display_name, normalized_name FROM lp_contacts "
+                f"WHERE contact_id IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+            for row in rows:
+                record_id = str(row["contact_id"])
+                found[record_id] = _summary_from_values(
+                    type_id, record_id, row["display_name"], row["normalized_name"]
+                )
+        return found
     if type_id == "money":
-        return _money_summary(record_id)
+        return _money_summaries(record_ids)
     tbl = _table_for_type(type_id)
     if not tbl:
-        return None
+        return found
     id_col = tbl.get("pk") or "id"
-    sql = f"SELECT * FROM {tbl['name']} WHERE {id_col} = ?"
-    row = data._get_conn().execute(sql, [record_id]).fetchone()
-    if not row:
-        return None
-    values = dict(row)
+    for chunk in _chunks(record_ids):
+        rows = conn.execute(
+            f"SELECT * FROM {tbl['name']} WHERE {id_col} IN ({', '.join('?' for _ in chunk)})",
+            chunk,
+        ).fetchall()
+        for row in rows:
+            values = dict(row)
+            record_id = str(values[id_col])
+            found[record_id] = _summary_from_row(type_id, record_id, values)
+    return found
+
+
+def _summary_from_row(type_id, record_id, values):
     title, subtitle = _summary_fields(type_id, values)
     if not title:
         desc = link_model.get_record_type(type_id) or {}
@@ -449,20 +518,34 @@ def _money_title_column(section):
     return columns[0] if columns else section.get("pk")
 
 
-def _money_summary(record_id):
-    if ":" not in str(record_id):
-        return None
-    section_id, raw_id = str(record_id).split(":", 1)
+def _money_summaries(record_ids):
     from modules.money import dao as money_dao
 
-    section = money_dao.section(section_id)
-    record = money_dao.get_record(section_id, raw_id)
-    if not record:
-        return None
-    title_col = _money_title_column(section)
-    return _summary_from_values(
-        "money",
-        record_id,
-        record.get(title_col) or section.get("label"),
-        section.get("label"),
-    )
+    by_section = {}
+    for record_id in record_ids:
+        if ":" in record_id:
+            section_id, raw_id = record_id.split(":", 1)
+            by_section.setdefault(section_id, []).append(raw_id)
+    if not by_section:
+        return {}
+    money_dao.ensure_money_schema()
+    conn = data._get_conn()
+    found = {}
+    for section_id, raw_ids in by_section.items():
+        section = money_dao.section(section_id)
+        pk = section["pk"]
+        title_col = _money_title_column(section)
+        for chunk in _chunks(raw_ids):
+            rows = conn.execute(
+                f"SELECT {pk}, {title_col} FROM {section['table']} WHERE {pk} IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+            for row in rows:
+                record_id = f"{section_id}:{row[pk]}"
+                found[record_id] = _summary_from_values(
+                    "money",
+                    record_id,
+                    row[title_col] or section.get("label"),
+                    section.get("label"),
+                )
+    return found
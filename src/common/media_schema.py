@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import sqlite3
 
+from common import schema_registry
+
 
 MEDIA_SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS lp_media (
@@ -21,6 +23,7 @@ CREATE TABLE IF NOT EXISTS lp_media (
 CREATE INDEX IF NOT EXISTS idx_lp_media_type ON lp_media (media_type);
 CREATE INDEX IF NOT EXISTS idx_lp_media_mtime ON lp_media (mtime_utc);
 CREATE INDEX IF NOT EXISTS idx_lp_media_filename ON lp_media (filename);
+CREATE INDEX IF NOT EXISTS idx_lp_media_path_key ON lp_media (lower(rtrim(replace(path, '\\', '/'), '/ ')));
 
 CREATE TABLE IF NOT EXISTS lp_media_meta (
     media_id INTEGER PRIMARY KEY,
@@ -126,5 +129,15 @@ CREATE INDEX IF NOT EXISTS idx_lp_event_items_media ON lp_event_items (media_id)
 
 def ensure_media_schema(conn: sqlite3.Connection) -> None:
     """Ensure the Media Explorer tables exist."""
+    if schema_registry.is_ready(conn, "media"):
+        return
     conn.executescript(MEDIA_SCHEMA_SQL)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(lp_media)").fetchall()}
+    if "folder_id" not in columns:
+        conn.execute("ALTER TABLE lp_media ADD COLUMN folder_id INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_lp_media_folder_id ON lp_media (folder_id)")
     conn.commit()
+    schema_registry.mark_ready(conn, "media")
+
+
+schema_registry.register("media", ensure_media_schema, version=3)
@@ -0,0 +1,231 @@
+"""Cached YAML front matter of markdown notes.
+
+The Pocket sync manifest and the notes pages read title, area, color,
+template/important flags and created dates from each note's front matter,
+which meant opening every file.  ``lp_note_front_matter`` keeps the parsed
+front matter of each note with the file's ``st_mtime_ns`` and size, so a
+reader can use it without touching the disk (``lookup_many``) or with a
+single ``stat`` (``get``).
+
+Rows are written wherever the note search index is: the note save, create
+and sync paths (``note_search_index.upsert_note``) and the incremental stat
+sweep ``note_search_index.refresh_index``, which re-reads only notes whose
+mtime or size changed.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import json
+import os
+import sqlite3
+
+from common import data
+from common import schema_registry
+
+
+READ_LIMIT = 128 * 1024
+
+TITLE_KEYS = ("title", "name")
+AREA_KEYS = ("area", "area_id", "folder", "sidebar_tab", "project", "project_id", "proj")
+COLOR_KEYS = ("color", "colour")
+TEMPLATE_KEYS = ("is_template", "template")
+IMPORTANT_KEYS = ("is_important", "important")
+CREATED_KEYS = ("date_created", "created", "created_at", "created_utc", "file_created_at", "birthtime")
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS lp_note_front_matter (
+    note_id INTEGER PRIMARY KEY,
+    file_mtime_ns INTEGER NOT NULL,
+    file_size INTEGER NOT NULL,
+    title TEXT,
+    area TEXT,
+    color TEXT,
+    is_template TEXT,
+    is_important TEXT,
+    date_created TEXT,
+    front_matter_json TEXT NOT NULL,
+    updated_utc TEXT NOT NULL
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO lp_note_front_matter
+(note_id, file_mtime_ns, file_size, title, area, color, is_template, is_important,
+ date_created, front_matter_json, updated_utc)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(note_id) DO UPDATE SET
+    file_mtime_ns = excluded.file_mtime_ns,
+    file_size = excluded.file_size,
+    title = excluded.title,
+    area = excluded.area,
+    color = excluded.color,
+    is_template = excluded.is_template,
+    is_important = excluded.is_important,
+    date_created = excluded.date_created,
+    front_matter_json = excluded.front_matter_json,
+    updated_utc = excluded.updated_utc
+"""
+
+
+def ensure_schema(conn: sqlite3.Connection | None = None) -> sqlite3.Connection:
+    conn = data._get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "note_front_matter"):
+        return conn
+    conn.executescript(SCHEMA_SQL)
+    conn.commit()
+    schema_registry.mark_ready(conn, "note_front_matter")
+    return conn
+
+
+schema_registry.register("note_front_matter", ensure_schema, version=1)
+
+
+def strip_scalar(value: str) -> str:
+    value = (value or "").strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"'):
+        return value[1:-1]
+    if " #" in value:
+        value = value.split(" #", 1)[0].rstrip()
+    return value
+
+
+def parse_text(text: str) -> dict:
+    """Front matter of ``text`` as ``{lower_snake_key: scalar}``."""
+    lines = (text or "").splitlines()
+    if not lines or lines[0].strip() != "---":
+        return {}
+    values = {}
+    for line in lines[1:]:
+        stripped = line.strip()
+        if stripped in ("---", "..."):
+            break
+        if not stripped or stripped.startswith("#") or ":" not in line:
+            continue
+        key, raw_value = line.split(":", 1)
+        key = key.strip().lower().replace(" ", "_")
+        if key:
+            values[key] = strip_scalar(raw_value)
+    return values
+
+
+def read_file(note_path: str) -> dict | None:
+    """Front matter read from ``note_path``; None when it cannot be opened."""
+    if not note_path:
+        return None
+    try:
+        with open(note_path, "r", encoding="utf-8-sig", errors="replace") as handle:
+            text = handle.read(READ_LIMIT)
+    except OSError:
+        return None
+    return parse_text(text)
+
+
+def first_value(front_matter: dict, keys) -> str:
+    for key in keys:
+        value = front_matter.get(key)
+        if value not in (None, ""):
+            return value
+    return ""
+
+
+def row_values(note_id: int, stat, front_matter: dict) -> tuple:
+    """``UPSERT_SQL`` parameters for ``front_matter`` read at ``stat``."""
+    return (
+        note_id,
+        stat.st_mtime_ns,
+        stat.st_size,
+        first_value(front_matter, TITLE_KEYS),
+        first_value(front_matter, AREA_KEYS),
+        first_value(front_matter, COLOR_KEYS),
+        first_value(front_matter, TEMPLATE_KEYS),
+        first_value(front_matter, IMPORTANT_KEYS),
+        first_value(front_matter, CREATED_KEYS),
+        json.dumps(front_matter, ensure_ascii=False, sort_keys=True),
+        datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    )
+
+
+def _entry(row) -> dict:
+    try:
+        front_matter = json.loads(row["front_matter_json"] or "{}")
+    except ValueError:
+        front_matter = {}
+    return {
+        "front_matter": front_matter if isinstance(front_matter, dict) else {},
+        "mtime_ns": row["file_mtime_ns"],
+        "size": row["file_size"],
+    }
+
+
+def lookup_many(conn: sqlite3.Connection | None, note_ids) -> dict:
+    """Cached entries of ``note_ids`` as ``{note_id: entry}`` without touching the disk.
+
+    An entry holds ``front_matter``, ``mtime_ns`` and ``size``; it is as
+    fresh as the last save or sweep.
+    """
+    conn = ensure_schema(conn)
+    note_ids = [int(note_id) for note_id in note_ids if note_id is not None]
+    found = {}
+    for offset in range(0, len(note_ids), 500):
+        chunk = note_ids[offset:offset + 500]
+        rows = conn.execute(
+            "SELECT note_id, file_mtime_ns, file_size, front_matter_json "
+            f"FROM lp_note_front_matter WHERE note_id IN ({', '.join('?' for _ in chunk)})",
+            chunk,
+        ).fetchall()
+        for row in rows:
+            found[row["note_id"]] = _entry(row)
+    return found
+
+
+def store(
+    note_id: int,
+    note_path: str,
+    text: str | None = None,
+    stat=None,
+    conn: sqlite3.Connection | None = None,
+    commit: bool = True,
+) -> dict | None:
+    """Parse and cache the front matter of ``note_path``; returns it (None if unreadable).
+
+    ``text`` is the note content when the caller already has it.
+    """
+    conn = ensure_schema(conn)
+    if not note_id or not note_path:
+        return None
+    try:
+        stat = stat or os.stat(note_path)
+    except OSError:
+        return None
+    front_matter = parse_text(text[:READ_LIMIT].lstrip("\ufeff")) if text is not None else read_file(note_path)
+    if front_matter is None:
+        return None
+    conn.execute(UPSERT_SQL, row_values(note_id, stat, front_matter))
+    if commit:
+        conn.commit()
+    return front_matter
+
+
+def get(note_id: int, note_path: str, conn: sqlite3.Connection | None = None) -> dict | None:
+    """Front matter of a note, from the cache when the file's mtime and size match.
+
+    Returns None when the file cannot be read.
+    """
+    conn = ensure_schema(conn)
+    try:
+        stat = os.stat(note_path)
+    except (OSError, TypeError, ValueError):
+        return None
+    row = conn.execute(
+        "SELECT note_id, file_mtime_ns, file_size, front_matter_json "
+        "FROM lp_note_front_matter WHERE note_id = ?",
+        (note_id,),
+    ).fetchone()
+    if row is not None and (row["file_mtime_ns"], row["file_size"]) == (stat.st_mtime_ns, stat.st_size):
+        return _entry(row)["front_matter"]
+    front_matter = read_file(note_path)
+    if front_matter is None:
+        return None
+    data.run_write(lambda write_conn: write_conn.execute(UPSERT_SQL, row_values(note_id, stat, front_matter)), conn=conn)
+    return front_matter
@@ -0,0 +1,343 @@
+"""Bulk import of a folder of markdown notes.
+
+Importing note by note through ``data.add_record`` costs a commit, a re-read
+of the row and a ``lg_usr`` entry per note.  ``run_import`` streams instead:
+
+* ``walk_notes`` lists the folder with ``os.scandir``, skipping notes whose
+  full path is already in ``lp_notes``;
+* batches of ``NOTE_SEARCH_INDEX_WRITE_BATCH`` files are stat'ed, read and
+  parsed (front matter, title, links) on ``NOTE_SEARCH_INDEX_READ_WORKERS``
+  threads;
+* each batch is written in one transaction through ``data.submit_write``:
+  the ``lp_notes`` rows (one ``executemany``), their folder ids, search index
+  and front matter cache rows, and the run's progress, while the next batch
+  is read;
+* once every note is in, their links are resolved in one pass
+  (``note_link_graph.add_notes``), so links between notes of different
+  batches resolve too, and one ``lg_usr`` entry records the import.
+
+Progress is kept in ``lp_note_import_run``, which the import page polls.  A
+dry run only walks the folder and counts new and already imported notes.
+The run records who asked for it (``user_name``); the background thread
+stamps the new rows and the ``lg_usr`` entry with that name.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import os
+import time
+
+from common import data
+from common import note_front_matter
+from common import note_link_graph
+from common import note_search_index
+from common import note_title_index
+from common import schema_registry
+from common import user_paths
+from common import utils as common_utils
+
+
+RUNS_TABLE = "lp_note_import_run"
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner_user_id INTEGER,
+    user_name TEXT,
+    folder_path TEXT NOT NULL,
+    area TEXT,
+    dry_run INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    files_found INTEGER NOT NULL DEFAULT 0,
+    notes_new INTEGER NOT NULL DEFAULT 0,
+    notes_existing INTEGER NOT NULL DEFAULT 0,
+    notes_imported INTEGER NOT NULL DEFAULT 0,
+    files_failed INTEGER NOT NULL DEFAULT 0,
+    links INTEGER NOT NULL DEFAULT 0,
+    elapsed_ms INTEGER,
+    error_message TEXT,
+    started_utc TEXT NOT NULL,
+    updated_utc TEXT NOT NULL,
+    finished_utc TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_lp_note_import_run_owner ON {RUNS_TABLE}(owner_user_id, run_id);
+"""
+
+RUN_COUNTERS = ("files_found", "notes_new", "notes_existing", "notes_imported", "files_failed", "links")
+
+
+def ensure_schema(conn=None):
+    conn = data._get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "note_import_run"):
+        return conn
+    conn.executescript(_SCHEMA_SQL)
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({RUNS_TABLE})").fetchall()}
+    if "user_name" not in columns:
+        conn.execute(f"ALTER TABLE {RUNS_TABLE} ADD COLUMN user_name TEXT")
+    conn.commit()
+    schema_registry.mark_ready(conn, "note_import_run")
+    return conn
+
+
+schema_registry.register("note_import_run", ensure_schema, version=2)
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _elapsed_ms(started):
+    return int((time.perf_counter() - started) * 1000)
+
+
+def walk_notes(folder_path):
+    """Full paths of the markdown files in ``folder_path`` and its subfolders."""
+    pending = [folder_path]
+    while pending:
+        folder = pending.pop()
+        try:
+            with os.scandir(folder) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subfolders = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.path)
+                elif entry.name.lower().endswith(".md") and entry.is_file():
+                    yield entry.path
+            except OSError:
+                continue
+        pending.extend(reversed(subfolders))
+
+
+def create_run(conn, folder_path, area="", owner_user_id=None, dry_run=False, user_name=None):
+    """Record a new import of ``folder_path`` asked for by ``user_name``; returns its ``run_id``."""
+    conn = ensure_schema(conn)
+    now = _utc_now()
+    user_name = user_name or data._current_user()
+
+    def insert(write_conn):
+        return write_conn.execute(
+            f"INSERT INTO {RUNS_TABLE} "
+            "(owner_user_id, user_name, folder_path, area, dry_run, status, started_utc, updated_utc) "
+            "VALUES (?, ?, ?, ?, ?, 'running', ?, ?)",
+            (owner_user_id, user_name, folder_path, area or "", 1 if dry_run else 0, now, now),
+        ).lastrowid
+
+    return data.run_write(insert, conn=conn)
+
+
+def get_run(conn, run_id):
+    conn = ensure_schema(conn)
+    row = conn.execute(f"SELECT * FROM {RUNS_TABLE} WHERE run_id = ?", (run_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def _update_run(write_conn, run_id, counts=None, **values):
+    values = {**(counts or {}), **values, "updated_utc": _utc_now()}
+    assignments = ", ".join(f"{column} = ?" for column in values)
+    write_conn.execute(
+        f"UPDATE {RUNS_TABLE} SET {assignments} WHERE run_id = ?",
+        [*values.values(), run_id],
+    )
+
+
+def _existing_keys(conn, table, owner_user_id=None):
+    """Full path keys of the notes the run's owner already has in ``table``.
+
+    Scoped like ``notes.routes._note_owner_filter``: another owner's note of
+    the same file does not stop this owner from importing it.
+    """
+    sql = f"SELECT t.path, t.file_name FROM {table} t"
+    params = []
+    table_cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    if "owner_user_id" in table_cols:
+        if owner_user_id is None:
+            sql += " WHERE t.owner_user_id IS NULL"
+        else:
+            sql += " WHERE t.owner_user_id = ?"
+            params.append(owner_user_id)
+    return {
+        user_paths.path_key(note_search_index.note_full_path(dict(row)))
+        for row in conn.execute(sql, params).fetchall()
+    }
+
+
+def _new_paths(folder_path, existing, counts):
+    for full_path in walk_notes(folder_path):
+        counts["files_found"] += 1
+        if user_paths.path_key(full_path) in existing:
+            counts["notes_existing"] += 1
+            continue
+        counts["notes_new"] += 1
+        yield full_path
+
+
+def _batches(values, size):
+    batch = []
+    for value in values:
+        batch.append(value)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _parse_note(full_path, build_row, area, notes_root):
+    """Stat, read and parse one note file; None when it cannot be read."""
+    try:
+        stat = os.stat(full_path)
+        with open(full_path, "r", encoding="utf-8", errors="replace") as handle:
+            text = handle.read()
+    except OSError:
+        return None
+    front_matter = note_front_matter.parse_text(text[:note_front_matter.READ_LIMIT].lstrip("\ufeff"))
+    row = build_row(full_path, stat, front_matter, area)
+    return {
+        "row": row,
+        "stat": stat,
+        "text": text,
+        "front_matter": front_matter,
+        "refs": note_link_graph.link_refs(text, row, notes_root),
+    }
+
+
+def _write_batch(write_conn, run_id, table, col_list, parsed, owner_user_id, user_name, counts):
+    """Insert one batch of parsed notes with their index rows; returns ``{note_id: refs}``."""
+    table_cols = {row[1] for row in write_conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    columns = [col for col in col_list if col in table_cols]
+    extra_cols = []
+    extra_vals = []
+    if owner_user_id is not None and "owner_user_id" in table_cols and "owner_user_id" not in columns:
+        extra_cols.append("owner_user_id")
+        extra_vals.append(owner_user_id)
+    for col, value in (("user_name", user_name), ("rec_extract_date", data._now_str())):
+        if col in table_cols:
+            extra_cols.append(col)
+            extra_vals.append(value)
+    last_id = write_conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+    write_conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns + extra_cols)}) "
+        f"VALUES ({', '.join('?' for _ in columns + extra_cols)})",
+        [
+            [
+                data._normalize_area_value(item["row"].get(col, "")) if col == "area" else item["row"].get(col, "")
+                for col in columns
+            ] + extra_vals
+            for item in parsed
+        ],
+    )
+    ids = {
+        (row[1], row[2]): row[0]
+        for row in write_conn.execute(
+            f"SELECT id, path, file_name FROM {table} WHERE id > ?", (last_id,)
+        ).fetchall()
+    }
+    by_folder = {}
+    index_rows = []
+    front_matter_rows = []
+    refs = {}
+    indexed_at = _utc_now()
+    for item in parsed:
+        row = item["row"]
+        note_id = ids.get((row.get("path"), row.get("file_name")))
+        if note_id is None:
+            continue
+        stat = item["stat"]
+        by_folder.setdefault(row.get("path") or "", []).append(note_id)
+        index_rows.append(note_search_index.index_row(
+            note_id,
+            note_search_index.note_full_path(row),
+            stat,
+            row.get("title") or row.get("file_name"),
+            item["text"],
+            indexed_at,
+        ))
+        front_matter_rows.append(note_front_matter.row_values(note_id, stat, item["front_matter"]))
+        refs[note_id] = item["refs"]
+    if "folder_id" in table_cols:
+        for folder_path, note_ids in by_folder.items():
+            folder_id = data.upsert_note_dim_folder(write_conn, folder_path)
+            if folder_id:
+                write_conn.execute(
+                    f"UPDATE {table} SET folder_id = ? WHERE id IN ({', '.join('?' for _ in note_ids)})",
+                    [folder_id, *note_ids],
+                )
+    note_search_index._write_index_rows(write_conn, index_rows, [], front_matter_rows)
+    write_conn.execute(
+        f"UPDATE {RUNS_TABLE} SET notes_imported = notes_imported + ? WHERE run_id = ?",
+        (len(refs), run_id),
+    )
+    _update_run(write_conn, run_id, counts)
+    return refs
+
+
+def run_import(conn, run_id, build_row, col_list, table="lp_notes", notes_root=""):
+    """Import the folder of run ``run_id``; returns the finished run record.
+
+    ``build_row(full_path, stat, front_matter, area)`` returns the
+    ``col_list`` values of one note; it runs on the reader threads.
+    ``notes_root`` is where root-relative wiki links start.
+    """
+    started = time.perf_counter()
+    conn = ensure_schema(conn)
+    run = get_run(conn, run_id)
+    if run is None:
+        return None
+    counts = {name: 0 for name in ("files_found", "notes_new", "notes_existing", "files_failed")}
+    try:
+        note_search_index.ensure_schema(conn)
+        note_front_matter.ensure_schema(conn)
+        generation = None if run["dry_run"] else note_title_index.link_generation(conn)
+        paths = _new_paths(run["folder_path"], _existing_keys(conn, table, run["owner_user_id"]), counts)
+        refs = {}
+        futures = []
+        with ThreadPoolExecutor(max_workers=note_search_index._read_workers()) as pool:
+            for batch in _batches(paths, note_search_index._write_batch_size()):
+                if run["dry_run"]:
+                    futures.append(data.submit_write(_update_run, run_id, dict(counts), conn=conn))
+                    continue
+                parsed = [
+                    item
+                    for item in pool.map(
+                        lambda full_path: _parse_note(full_path, build_row, run["area"], notes_root), batch
+                    )
+                    if item is not None
+                ]
+                counts["files_failed"] += len(batch) - len(parsed)
+                futures.append(data.submit_write(
+                    _write_batch, run_id, table, col_list, parsed,
+                    run["owner_user_id"], run["user_name"], dict(counts), conn=conn,
+                ))
+        for future in futures:
+            refs.update(future.result() or {})
+        links = note_link_graph.add_notes(conn, refs, generation) if refs else 0
+        data.run_write(
+            _update_run, run_id, counts,
+            links=links, status="done", finished_utc=_utc_now(), elapsed_ms=_elapsed_ms(started), conn=conn,
+        )
+    except Exception as exc:
+        data._log_error(None, f"note import {run_id} failed: {exc}")
+        data.run_write(
+            _update_run, run_id, counts,
+            status="failed", error_message=str(exc), finished_utc=_utc_now(),
+            elapsed_ms=_elapsed_ms(started), conn=conn,
+        )
+    run = get_run(conn, run_id)
+    if not run["dry_run"] and run["notes_imported"]:
+        common_utils.lg_usr(
+            action="notes_import_folder",
+            entity_type=table,
+            after={key: run[key] for key in RUN_COUNTERS},
+            context_type="notes_import_folder",
+            context_id=run["folder_path"],
+            extra={"run_id": run_id, "area": run["area"], "elapsed_ms": run["elapsed_ms"]},
+            conn=conn,
+            user_name=run["user_name"],
+        )
+    return run
@@ -0,0 +1,699 @@
+"""Link graph of wiki and markdown links between notes.
+
+``lp_note_links`` holds one row per resolved link (source note, target note,
+link text) and ``lp_note_unresolved_links`` one row per key a broken or
+ambiguous link is waiting for: ``t:<title>``, ``p:<full path>`` or
+``i:<note id>``.  Both are indexed on each end, so backlinks, outgoing links
+and orphans are single indexed queries.
+
+Links are resolved against a ``NoteMap`` of note ids, titles and full paths
+as the source note's owner sees them (``security.visible_record_condition``):
+
+* ``sync_note`` re-resolves one saved note, loading only its candidate rows;
+* ``rebuild`` reads every note file on ``NOTE_SEARCH_INDEX_READ_WORKERS``
+  threads and resolves all links against one map of every note;
+* ``catch_up`` follows ``lp_note_title_changes`` (notes created, renamed,
+  moved, re-shared or deleted, see ``note_title_index``) and re-resolves the
+  notes linking to a changed note and those whose unresolved links name its
+  title, path or id, so creating a note under a broken link's title gives it
+  the backlink.  Write paths run it (notes POST requests, the notes watcher);
+  the queries only read, so links changed elsewhere may lag until the next
+  write.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+from urllib.parse import unquote
+
+from common import data
+from common import note_search_index
+from common import note_title_index
+from common import schema_registry
+from common import user_paths
+
+
+NOTES_TABLE = "lp_notes"
+LINKS_TABLE = "lp_note_links"
+UNRESOLVED_TABLE = "lp_note_unresolved_links"
+STATE_TABLE = "lp_note_link_state"
+
+WIKI_LINK_RE = re.compile(r"(?<!!)\[\[([^\]\n]+)\]\]")
+WIKI_TARGET_ID_RE = re.compile(r"(?i)^note:(\d+)$")
+MARKDOWN_LINK_RE = re.compile(r"(?<!!)\[([^\]]+)\]\(([^)]+)\)")
+_SCHEME_RE = re.compile(r"^[a-z][a-z0-9+.-]*:", re.IGNORECASE)
+_PATH_SPLIT_RE = re.compile(r"[\\/]+")
+
+# Same as notes.routes._note_title_match_expr: the title a wiki link matches.
+TITLE_EXPR = (
+    "CASE WHEN COALESCE(t.title, '') != '' THEN t.title "
+    "WHEN lower(COALESCE(t.file_name, '')) LIKE '%.md' "
+    "THEN substr(t.file_name, 1, length(t.file_name) - 3) "
+    "ELSE COALESCE(t.file_name, '') END"
+)
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {LINKS_TABLE} (
+    link_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    src_note_id INTEGER NOT NULL,
+    target_note_id INTEGER NOT NULL,
+    link_text TEXT NOT NULL,
+    link_title TEXT,
+    created_utc TEXT NOT NULL,
+    updated_utc TEXT NOT NULL,
+    UNIQUE (src_note_id, target_note_id, link_text)
+);
+CREATE INDEX IF NOT EXISTS ix_lp_note_links_src ON {LINKS_TABLE}(src_note_id);
+CREATE INDEX IF NOT EXISTS ix_lp_note_links_target ON {LINKS_TABLE}(target_note_id);
+
+CREATE TABLE IF NOT EXISTS {UNRESOLVED_TABLE} (
+    src_note_id INTEGER NOT NULL,
+    link_text TEXT NOT NULL,
+    link_title TEXT,
+    target_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (src_note_id, link_text, target_key)
+);
+CREATE INDEX IF NOT EXISTS ix_lp_note_unresolved_links_key ON {UNRESOLVED_TABLE}(target_key);
+
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    name TEXT PRIMARY KEY,
+    value INTEGER
+);
+"""
+
+_CHUNK = 500
+_CATCH_UP_LOCK = threading.Lock()
+
+
+def ensure_schema(conn=None):
+    conn = data._get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "note_links"):
+        return conn
+    conn.executescript(_SCHEMA_SQL)
+    conn.commit()
+    schema_registry.mark_ready(conn, "note_links")
+    return conn
+
+
+schema_registry.register("note_links", ensure_schema, version=2)
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _chunks(values):
+    values = list(values)
+    for offset in range(0, len(values), _CHUNK):
+        yield values[offset:offset + _CHUNK]
+
+
+def _marks(values):
+    return ", ".join("?" for _ in values)
+
+
+def parse_wiki_value(value):
+    """``(title, target_note_id)`` of the text inside ``[[...]]``."""
+    parts = [part.strip() for part in (value or "").split("|")]
+    title = parts[0] if parts else ""
+    target_note_id = None
+    for part in parts[1:]:
+        match = WIKI_TARGET_ID_RE.match(part or "")
+        if match:
+            target_note_id = int(match.group(1))
+            break
+    if not title:
+        for part in parts:
+            if not WIKI_TARGET_ID_RE.match(part or ""):
+                title = part
+                break
+    return title, target_note_id
+
+
+def _lower(text):
+    # SQLite's lower() folds ASCII only; keys must compare equal to its output.
+    return user_paths.sql_lower(text)
+
+
+def path_key(path_value):
+    """Case-folded ``\\``-separated form of a note path with ``.``/``..`` applied."""
+    value = (path_value or "").strip()
+    if not value:
+        return ""
+    parts = []
+    for part in _PATH_SPLIT_RE.split(value):
+        if part == "..":
+            if parts and parts[-1] not in ("", ".."):
+                parts.pop()
+            continue
+        if part == "." or (part == "" and parts):
+            continue
+        parts.append(part)
+    return _lower("\\".join(parts))
+
+
+def title_key(title):
+    return _lower(title)
+
+
+def note_title(row):
+    """The title a wiki link names the note by (``TITLE_EXPR`` in Python)."""
+    title = row.get("title") or ""
+    if title:
+        return title
+    file_name = row.get("file_name") or ""
+    return file_name[:-3] if _lower(file_name).endswith(".md") else file_name
+
+
+def note_path_key(row):
+    return path_key(note_search_index.note_full_path(row))
+
+
+class LinkRef(NamedTuple):
+    link_text: str
+    title: str
+    target_note_id: int | None
+    path_keys: tuple
+    title_key: str
+
+
+def _path_keys(target, bases, with_md):
+    candidates = [target]
+    if with_md and not _lower(target).endswith(".md"):
+        candidates.append(target + ".md")
+    keys = []
+    for candidate in candidates:
+        if user_paths.is_absolute_path(candidate):
+            keys.append(path_key(candidate))
+            continue
+        keys.extend(path_key(base + "\\" + candidate) for base in bases if base)
+    return tuple(dict.fromkeys(key for key in keys if key))
+
+
+def _markdown_target(target):
+    target = unquote((target or "").strip())
+    if target.startswith("<") and target.endswith(">"):
+        target = target[1:-1].strip()
+    if not target or "\x00" in target:
+        return ""
+    if _SCHEME_RE.match(target) and not user_paths.is_absolute_path(target):
+        return ""
+    path_part = target.split("#", 1)[0].split("?", 1)[0].strip().strip("/\\")
+    if not path_part or _lower(os.path.splitext(path_part)[1]) != ".md":
+        return ""
+    return path_part
+
+
+def link_refs(content, note, notes_root=""):
+    """Wiki and markdown note links of ``content`` written in ``note``.
+
+    Relative targets are looked up from the note's folder, then from the notes
+    root (``notes_root``, or the ``data\\notes`` folder in the note's path).
+    Wiki links fall back to the title; markdown links match paths only.
+    """
+    note_path = note_search_index.note_full_path(note)
+    folder = os.path.dirname(note_path) if note.get("file_name") else note.get("path") or ""
+    root = user_paths._notes_root_from_path(note_path)
+    refs = []
+    for match in WIKI_LINK_RE.finditer(content or ""):
+        title, target_note_id = parse_wiki_value(match.group(1))
+        if not title:
+            continue
+        path_keys = ()
+        target = title.strip("/\\")
+        if "/" in target or "\\" in target:
+            path_keys = _path_keys(target, (folder, notes_root or root), with_md=True)
+        refs.append(LinkRef(match.group(0), title, target_note_id, path_keys, title_key(title)))
+    for match in MARKDOWN_LINK_RE.finditer(content or ""):
+        label = (match.group(1) or "").strip()
+        target = _markdown_target(match.group(2))
+        if label and target:
+            refs.append(LinkRef(match.group(0), label, None, _path_keys(target, (folder, root), False), ""))
+    return refs
+
+
+def _note_columns(conn):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({NOTES_TABLE})").fetchall()}
+
+
+def _load_notes(conn, column=None, values=()):
+    """``(rows, secured)``: every note, or those whose ``column`` is in ``values``.
+
+    ``secured`` mirrors ``security.visible_record_condition``: visibility only
+    applies once there is a users table and notes carry the sharing columns.
+    """
+    columns = _note_columns(conn)
+    shared = [col for col in ("owner_user_id", "visibility", "is_public") if col in columns]
+    secured = len(shared) == 3 and conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+    ).fetchone() is not None
+    sql = f"SELECT {', '.join(['t.id', 't.file_name', 't.title', 't.path'] + ['t.' + col for col in shared])} FROM {NOTES_TABLE} t"
+    if column is None:
+        return [dict(row) for row in conn.execute(sql).fetchall()], secured
+    rows = []
+    for chunk in _chunks(sorted(set(values))):
+        rows.extend(dict(row) for row in conn.execute(f"{sql} WHERE {column} IN ({_marks(chunk)})", chunk).fetchall())
+    return rows, secured
+
+
+class NoteMap:
+    """Note ids, titles and full paths, and which owner may link to which note."""
+
+    def __init__(self, rows=(), secured=False):
+        self.secured = secured
+        self.rows = {}
+        self.by_title = {}
+        self.by_path = {}
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        note_id = row["id"]
+        if note_id in self.rows:
+            return
+        self.rows[note_id] = row
+        self.by_title.setdefault(title_key(note_title(row)), []).append(note_id)
+        key = note_path_key(row)
+        if key:
+            self.by_path.setdefault(key, []).append(note_id)
+
+    @classmethod
+    def load(cls, conn, refs=None):
+        """Map of every note, or only of the notes ``refs`` could resolve to."""
+        if refs is None:
+            return cls(*_load_notes(conn))
+        refs = list(refs)
+        note_map = cls()
+        lookups = (
+            ("t.id", {ref.target_note_id for ref in refs if ref.target_note_id}),
+            (f"lower({TITLE_EXPR})", {ref.title_key for ref in refs if ref.title_key}),
+            ("lower(t.file_name)", {key.rsplit("\\", 1)[-1] for ref in refs for key in ref.path_keys}),
+        )
+        for column, values in lookups:
+            rows, note_map.secured = _load_notes(conn, column, values)
+            for row in rows:
+                note_map.add(row)
+        return note_map
+
+    def visible(self, note_id, owner_user_id):
+        row = self.rows.get(note_id)
+        if row is None:
+            return False
+        if not self.secured or str(row.get("is_public") or "") == "1":
+            return True
+        if owner_user_id in (None, ""):
+            return False
+        return str(row.get("owner_user_id")) == str(owner_user_id) or row.get("visibility") == "family"
+
+    def _matches(self, note_ids, owner_user_id):
+        matches = [note_id for note_id in note_ids if self.visible(note_id, owner_user_id)]
+        if not matches:
+            return "broken", []
+        return ("resolved" if len(matches) == 1 else "ambiguous"), matches
+
+    def resolve(self, ref, owner_user_id):
+        """``(status, note_ids)``: ``"resolved"`` with the target's id,
+        ``"ambiguous"`` with every match, or ``"broken"`` with none.
+
+        A ``note:<id>`` target is authoritative; otherwise the first path
+        candidate with a match wins, then the title.
+        """
+        if ref.target_note_id:
+            return self._matches([ref.target_note_id], owner_user_id)
+        for key in ref.path_keys:
+            status, matches = self._matches(self.by_path.get(key, ()), owner_user_id)
+            if matches:
+                return status, matches
+        if not ref.title_key:
+            return "broken", []
+        return self._matches(self.by_title.get(ref.title_key, ()), owner_user_id)
+
+
+def _ref_keys(ref, matches=()):
+    """Keys under which a note created, renamed or re-shared later could
+    resolve ``ref``; an ambiguous link also waits on each of its ``matches``."""
+    if ref.target_note_id:
+        return [f"i:{ref.target_note_id}"]
+    keys = [f"p:{key}" for key in ref.path_keys]
+    if ref.title_key:
+        keys.append(f"t:{ref.title_key}")
+    return keys + [f"i:{note_id}" for note_id in matches]
+
+
+def _note_keys(row):
+    keys = [f"i:{row['id']}", f"t:{title_key(note_title(row))}"]
+    path_value = note_path_key(row)
+    if path_value:
+        keys.append(f"p:{path_value}")
+    return keys
+
+
+def resolve_note(note, refs, note_map, now=None):
+    """``(link_rows, unresolved_rows)`` of the links ``note`` makes."""
+    now = now or _utc_now()
+    src = int(note["id"])
+    owner = note.get("owner_user_id")
+    links = {}
+    unresolved = {}
+    for ref in refs:
+        status, matches = note_map.resolve(ref, owner)
+        if status == "resolved":
+            target = matches[0]
+            if target == src:
+                continue
+            link_title = ref.title if ref.title_key else (note_title(note_map.rows[target]) or ref.title)
+            links[(target, ref.link_text)] = (src, target, ref.link_text, link_title, now, now)
+            continue
+        for key in _ref_keys(ref, matches):
+            unresolved[(ref.link_text, key)] = (src, ref.link_text, ref.title, key, status)
+    return list(links.values()), list(unresolved.values())
+
+
+def _write_links(conn, results):
+    """Replace the rows of each source in ``results`` (``{src: (links, unresolved)}``)."""
+    for chunk in _chunks(results):
+        conn.execute(f"DELETE FROM {LINKS_TABLE} WHERE src_note_id IN ({_marks(chunk)})", chunk)
+        conn.execute(f"DELETE FROM {UNRESOLVED_TABLE} WHERE src_note_id IN ({_marks(chunk)})", chunk)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {LINKS_TABLE} "
+        "(src_note_id, target_note_id, link_text, link_title, created_utc, updated_utc) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [row for links, _unresolved in results.values() for row in links],
+    )
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {UNRESOLVED_TABLE} "
+        "(src_note_id, link_text, link_title, target_key, status) VALUES (?, ?, ?, ?, ?)",
+        [row for _links, unresolved in results.values() for row in unresolved],
+    )
+    return sum(len(links) for links, _unresolved in results.values())
+
+
+def sync_note(conn, note_id, content, notes_root=""):
+    """Re-resolve the links of one saved note; returns the resolved count.
+
+    Targets are the notes the note's owner can see, loaded by the ids, titles
+    and file names the links name rather than the whole table.
+    """
+    conn = ensure_schema(conn)
+    rows, _secured = _load_notes(conn, "t.id", [int(note_id)])
+    if not rows:
+        forget(conn, [note_id])
+        return 0
+    note = rows[0]
+    refs = link_refs(content, note, notes_root)
+    result = resolve_note(note, refs, NoteMap.load(conn, refs))
+    return data.run_write(_write_links, {int(note_id): result}, conn=conn)
+
+
+def _forget_rows(conn, note_ids):
+    for chunk in _chunks(note_ids):
+        marks = _marks(chunk)
+        # Incoming links wait under the target's id until catch_up re-resolves them.
+        conn.execute(
+            f"INSERT OR REPLACE INTO {UNRESOLVED_TABLE} "
+            "(src_note_id, link_text, link_title, target_key, status) "
+            f"SELECT src_note_id, link_text, link_title, 'i:' || target_note_id, 'broken' "
+            f"FROM {LINKS_TABLE} WHERE target_note_id IN ({marks}) AND src_note_id NOT IN ({marks})",
+            chunk + chunk,
+        )
+        conn.execute(
+            f"DELETE FROM {LINKS_TABLE} WHERE target_note_id IN ({marks}) OR src_note_id IN ({marks})",
+            chunk + chunk,
+        )
+        conn.execute(f"DELETE FROM {UNRESOLVED_TABLE} WHERE src_note_id IN ({marks})", chunk)
+
+
+def forget(conn, note_ids):
+    """Drop the link rows of deleted ``note_ids``.
+
+    Links to them are parked as unresolved; the next ``catch_up`` sees the
+    deletion in the change log and re-resolves their sources.
+    """
+    conn = ensure_schema(conn)
+    note_ids = sorted({int(note_id) for note_id in note_ids if note_id})
+    if note_ids:
+        data.run_write(_forget_rows, note_ids, conn=conn)
+
+
+def _get_state(conn):
+    row = conn.execute(f"SELECT value FROM {STATE_TABLE} WHERE name = 'generation'").fetchone()
+    return row[0] if row else None
+
+
+def _set_state(write_conn, generation):
+    write_conn.execute(
+        f"INSERT INTO {STATE_TABLE} (name, value) VALUES ('generation', ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+        (generation,),
+    )
+
+
+def _elapsed_ms(started):
+    return int((time.perf_counter() - started) * 1000)
+
+
+def _owner_notes_roots(conn, notes):
+    """Configured notes root of each owner in ``notes`` (wiki path links start there)."""
+    owners = {note.get("owner_user_id") for note in notes} - {None, ""}
+    roots = {}
+    if not owners or conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+    ).fetchone() is None:
+        return roots
+    for owner in owners:
+        try:
+            roots[owner] = user_paths.get_user_paths(conn, owner).get("notes_root_path") or ""
+        except sqlite3.Error:
+            roots[owner] = ""
+    return roots
+
+
+def _read_refs(pool, notes, roots):
+    """``{note_id: refs}`` of ``notes``, reading their files on ``pool``."""
+    paths = [note_search_index.note_full_path(note) for note in notes]
+    return {
+        note["id"]: link_refs(content, note, roots.get(note.get("owner_user_id"), ""))
+        for note, content in zip(notes, pool.map(note_search_index.read_note_text, paths))
+    }
+
+
+def rebuild(conn=None):
+    """Re-resolve the links of every note in one pass.
+
+    One ``NoteMap`` of every note replaces the per-link queries of
+    ``sync_note``.  Files are read on ``NOTE_SEARCH_INDEX_READ_WORKERS``
+    threads and each batch is written through ``data.submit_write`` while the
+    next one is read.  Returns counts and timings in milliseconds.
+    """
+    started = time.perf_counter()
+    conn = ensure_schema(conn)
+    # Read first: notes changed while rebuilding are caught up afterwards.
+    generation = note_title_index.link_generation(conn)
+    note_map = NoteMap.load(conn)
+    notes = [
+        note for note in note_map.rows.values()
+        if _lower(note_search_index.note_full_path(note)).endswith(".md")
+    ]
+    roots = _owner_notes_roots(conn, notes)
+    map_ms = _elapsed_ms(started)
+    batch_size = note_search_index._write_batch_size()
+    now = _utc_now()
+    futures = []
+    unresolved = 0
+    with ThreadPoolExecutor(max_workers=note_search_index._read_workers()) as pool:
+        for offset in range(0, len(notes), batch_size):
+            batch = notes[offset:offset + batch_size]
+            refs = _read_refs(pool, batch, roots)
+            results = {int(note["id"]): resolve_note(note, refs[note["id"]], note_map, now) for note in batch}
+            unresolved += sum(len(rows) for _links, rows in results.values())
+            futures.append(data.submit_write(_write_links, results, conn=conn))
+    links = sum(future.result() for future in futures)
+    keep = {int(note["id"]) for note in notes}
+
+    def prune(write_conn):
+        stale = {
+            row[0]
+            for table in (LINKS_TABLE, UNRESOLVED_TABLE)
+            for row in write_conn.execute(f"SELECT DISTINCT src_note_id FROM {table}").fetchall()
+        } - keep
+        _write_links(write_conn, {note_id: ([], []) for note_id in stale})
+        if generation is not None:
+            _set_state(write_conn, generation)
+        return len(stale)
+
+    removed = data.run_write(prune, conn=conn)
+    return {
+        "notes": len(notes),
+        "links": links,
+        "unresolved": unresolved,
+        "removed": removed,
+        "map_ms": map_ms,
+        "elapsed_ms": _elapsed_ms(started),
+    }
+
+
+def _affected_sources(conn, changed_ids):
+    """Notes whose links may resolve differently now ``changed_ids`` changed.
+
+    Those linking to a changed note, the changed notes that make links
+    themselves, and those with unresolved links naming a changed note's id,
+    title or path.
+    """
+    sources = set()
+    keys = {f"i:{note_id}" for note_id in changed_ids}
+    for chunk in _chunks(changed_ids):
+        marks = _marks(chunk)
+        sources.update(
+            row[0]
+            for row in conn.execute(
+                f"SELECT src_note_id FROM {LINKS_TABLE} WHERE target_note_id IN ({marks}) "
+                f"UNION SELECT src_note_id FROM {LINKS_TABLE} WHERE src_note_id IN ({marks}) "
+                f"UNION SELECT src_note_id FROM {UNRESOLVED_TABLE} WHERE src_note_id IN ({marks})",
+                chunk * 3,
+            ).fetchall()
+        )
+    rows, _secured = _load_notes(conn, "t.id", changed_ids)
+    for row in rows:
+        keys.update(_note_keys(row))
+    for chunk in _chunks(keys):
+        sources.update(
+            row[0]
+            for row in conn.execute(
+                f"SELECT src_note_id FROM {UNRESOLVED_TABLE} WHERE target_key IN ({_marks(chunk)})",
+                chunk,
+            ).fetchall()
+        )
+    return sorted(sources)
+
+
+def catch_up(conn=None):
+    """Re-resolve the links affected by notes changed since the last call.
+
+    Returns the number of source notes re-read.  When the change log no
+    longer reaches back to the last call (or to the first change, on a graph
+    never caught up) this is a full ``rebuild``.
+    """
+    conn = ensure_schema(conn)
+    with _CATCH_UP_LOCK:
+        generation = note_title_index.link_generation(conn)
+        if generation is None:
+            return 0
+        done = _get_state(conn) or 0
+        if done == generation:
+            return 0
+        changed = note_title_index.changed_since(conn, done)
+        if changed is None:
+            return rebuild(conn)["notes"]
+        sources = _affected_sources(conn, changed)
+        _resync(conn, sources)
+        data.run_write(_set_state, generation, conn=conn)
+        return len(sources)
+
+
+def _resync(conn, note_ids, refs=None):
+    """Re-resolve the links of ``note_ids`` against the notes their links name.
+
+    ``refs`` holds already parsed links by note id; other notes are read from
+    disk.  Returns the resolved link count.
+    """
+    refs = dict(refs or {})
+    notes, _secured = _load_notes(conn, "t.id", note_ids)
+    forget(conn, set(note_ids) - {note["id"] for note in notes})
+    unread = [note for note in notes if note["id"] not in refs]
+    if unread:
+        with ThreadPoolExecutor(max_workers=note_search_index._read_workers()) as pool:
+            refs.update(_read_refs(pool, unread, _owner_notes_roots(conn, unread)))
+    if not notes:
+        return 0
+    note_map = NoteMap.load(conn, (ref for note in notes for ref in refs[note["id"]]))
+    now = _utc_now()
+    results = {int(note["id"]): resolve_note(note, refs[note["id"]], note_map, now) for note in notes}
+    return data.run_write(_write_links, results, conn=conn)
+
+
+def add_notes(conn, refs, generation):
+    """Resolve the links of notes just inserted in bulk.
+
+    ``refs`` maps each new note id to its ``link_refs``; ``generation`` is the
+    ``link_generation`` read before the inserts.  Existing notes with
+    unresolved links naming a new note are re-resolved too, and when nothing
+    but the new notes changed since ``generation`` the graph is marked
+    current, so ``catch_up`` does not read them all again.  Returns the
+    resolved link count.
+    """
+    conn = ensure_schema(conn)
+    new_ids = set(refs)
+    with _CATCH_UP_LOCK:
+        latest = note_title_index.link_generation(conn)
+        changed = None
+        if generation is not None and (_get_state(conn) or 0) == generation:
+            changed = note_title_index.changed_since(conn, generation)
+        sources = sorted(new_ids | set(_affected_sources(conn, sorted(new_ids))))
+        links = _resync(conn, sources, refs)
+        if changed is not None and set(changed) <= new_ids:
+            data.run_write(_set_state, latest, conn=conn)
+        return links
+
+
+def backlinks(conn, note_id, condition="1=1", params=()):
+    """Notes matching ``condition`` (alias ``t``) that link to ``note_id``."""
+    conn = ensure_schema(conn)
+    rows = conn.execute(
+        f"SELECT t.id, t.title, t.file_name, t.path, COUNT(*) AS link_count "
+        f"FROM {LINKS_TABLE} l JOIN {NOTES_TABLE} t ON t.id = l.src_note_id "
+        f"WHERE l.target_note_id = ? AND {condition} "
+        f"GROUP BY t.id ORDER BY lower({TITLE_EXPR}), t.id",
+        [note_id, *params],
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def outlinks(conn, note_id, condition="1=1", params=()):
+    """Notes matching ``condition`` that ``note_id`` links to."""
+    conn = ensure_schema(conn)
+    rows = conn.execute(
+        f"SELECT t.id, t.title, t.file_name, t.path, COUNT(*) AS link_count "
+        f"FROM {LINKS_TABLE} l JOIN {NOTES_TABLE} t ON t.id = l.target_note_id "
+        f"WHERE l.src_note_id = ? AND {condition} "
+        f"GROUP BY t.id ORDER BY lower({TITLE_EXPR}), t.id",
+        [note_id, *params],
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def unresolved(conn, note_id):
+    """Broken and ambiguous links written in ``note_id``: ``[{link_text, link_title, status}]``."""
+    conn = ensure_schema(conn)
+    rows = conn.execute(
+        f"SELECT link_text, MIN(link_title) AS link_title, MIN(status) AS status "
+        f"FROM {UNRESOLVED_TABLE} WHERE src_note_id = ? GROUP BY link_text ORDER BY link_text",
+        (note_id,),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def orphans(conn, condition="1=1", params=(), limit=200):
+    """Notes matching ``condition`` with no links in or out."""
+    conn = ensure_schema(conn)
+    rows = conn.execute(
+        f"SELECT t.id, t.title, t.file_name, t.path FROM {NOTES_TABLE} t "
+        f"WHERE {condition} "
+        f"AND NOT EXISTS (SELECT 1 FROM {LINKS_TABLE} l WHERE l.target_note_id = t.id) "
+        f"AND NOT EXISTS (SELECT 1 FROM {LINKS_TABLE} l WHERE l.src_note_id = t.id) "
+        f"ORDER BY lower({TITLE_EXPR}), t.id LIMIT ?",
+        [*params, int(limit)],
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def link_count(conn=None):
+    conn = ensure_schema(conn)
+    return conn.execute(f"SELECT COUNT(1) FROM {LINKS_TABLE}").fetchone()[0]
@@ -0,0 +1,248 @@
+"""Rendered-markdown cache for note views, popouts, editor previews and cards.
+
+``markdown_utils.render_markdown`` runs the image, wiki-link and
+markdown-link passes and the markdown library on every call, and each wiki or
+``.md`` link costs a resolution query.  ``lp_note_render_cache`` keeps the
+HTML of the last render of each note per variant (``view``, ``preview``,
+``card:<chars>``) and viewer, stored with
+
+* the source key - a digest of the file's mtime and size, or of the text
+  rendered, plus anything else the caller's output depends on,
+* the renderer version (``markdown_utils.renderer_version()``),
+* the link-target generation (``note_title_index.link_generation``) when the
+  render resolved at least one link; renders without links do not depend on
+  it.
+
+A lookup whose source key, renderer version or link generation differs is a
+miss, and the next render replaces the row.  Creating, renaming, moving,
+re-sharing or deleting any note moves the link generation, so every cached
+render that resolved links is redone while link-free renders (card grids)
+stay cached.  The table is bounded to ``NOTE_RENDER_CACHE_MAX_ENTRIES`` rows,
+evicting the least recently used; hits refresh ``last_used`` at most every
+``_TOUCH_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import time
+
+from common import config as cfg
+from common import data
+from common import note_title_index
+from common import schema_registry
+from utils import markdown_utils
+
+
+CACHE_TABLE = "lp_note_render_cache"
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {CACHE_TABLE} (
+    note_id           INTEGER NOT NULL,
+    variant           TEXT NOT NULL,
+    viewer            TEXT NOT NULL,
+    source_key        TEXT NOT NULL,
+    renderer_version  TEXT NOT NULL,
+    link_generation   INTEGER,
+    html              TEXT NOT NULL,
+    last_used         REAL NOT NULL,
+    PRIMARY KEY (note_id, variant, viewer)
+);
+
+CREATE INDEX IF NOT EXISTS idx_{CACHE_TABLE}_last_used ON {CACHE_TABLE}(last_used);
+"""
+
+_TOUCH_SECONDS = 300
+_CHUNK = 500
+
+
+def enabled():
+    return bool(getattr(cfg, "NOTE_RENDER_CACHE_ENABLED", True))
+
+
+def _max_entries():
+    try:
+        return max(1, int(getattr(cfg, "NOTE_RENDER_CACHE_MAX_ENTRIES", 5000) or 1))
+    except (TypeError, ValueError):
+        return 5000
+
+
+def ensure_note_render_cache_schema(conn):
+    if schema_registry.is_ready(conn, "note_render_cache"):
+        return
+    conn.executescript(_SCHEMA_SQL)
+    schema_registry.mark_ready(conn, "note_render_cache")
+
+
+schema_registry.register("note_render_cache", ensure_note_render_cache_schema, version=1)
+
+
+def source_key(*parts):
+    """Digest of everything a render's output depends on besides links."""
+    return hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8", "replace")).hexdigest()
+
+
+def _chunks(values):
+    for offset in range(0, len(values), _CHUNK):
+        yield values[offset:offset + _CHUNK]
+
+
+def lookup(conn, sources, variant, viewer=""):
+    """``{note_id: html}`` of the cached renders still valid for ``sources``.
+
+    ``sources`` maps note ids to their current source key.
+    """
+    ensure_note_render_cache_schema(conn)
+    version = markdown_utils.renderer_version()
+    note_ids = list(sources)
+    rows = []
+    for chunk in _chunks(note_ids):
+        rows.extend(
+            conn.execute(
+                f"SELECT note_id, source_key, renderer_version, link_generation, html, last_used "
+                f"FROM {CACHE_TABLE} WHERE variant = ? AND viewer = ? "
+                f"AND note_id IN ({', '.join('?' for _ in chunk)})",
+                [variant, viewer, *chunk],
+            ).fetchall()
+        )
+    generation = None
+    if any(row["link_generation"] is not None for row in rows):
+        generation = note_title_index.link_generation(conn)
+    found = {}
+    stale_touch = []
+    now = time.time()
+    for row in rows:
+        if row["source_key"] != sources.get(row["note_id"]) or row["renderer_version"] != version:
+            continue
+        if row["link_generation"] is not None and row["link_generation"] != generation:
+            continue
+        found[row["note_id"]] = row["html"]
+        if now - (row["last_used"] or 0) > _TOUCH_SECONDS:
+            stale_touch.append(row["note_id"])
+    if stale_touch:
+        _touch(conn, stale_touch, variant, viewer, now)
+    return found
+
+
+def _touch(conn, note_ids, variant, viewer, now):
+    def touch(write_conn):
+        for chunk in _chunks(note_ids):
+            write_conn.execute(
+                f"UPDATE {CACHE_TABLE} SET last_used = ? WHERE variant = ? AND viewer = ? "
+                f"AND note_id IN ({', '.join('?' for _ in chunk)})",
+                [now, variant, viewer, *chunk],
+            )
+
+    data.run_write(touch, conn=conn)
+
+
+def store(conn, renders, variant, viewer=""):
+    """Save ``renders`` (``(note_id, source_key, link_generation, html)``)."""
+    if not renders:
+        return
+    ensure_note_render_cache_schema(conn)
+    version = markdown_utils.renderer_version()
+    now = time.time()
+    max_entries = _max_entries()
+
+    def write(write_conn):
+        write_conn.executemany(
+            f"INSERT INTO {CACHE_TABLE} "
+            "(note_id, variant, viewer, source_key, renderer_version, link_generation, html, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(note_id, variant, viewer) DO UPDATE SET "
+            "source_key = excluded.source_key, renderer_version = excluded.renderer_version, "
+            "link_generation = excluded.link_generation, html = excluded.html, last_used = excluded.last_used",
+            [
+                (note_id, variant, viewer, key, version, generation, html, now)
+                for note_id, key, generation, html in renders
+            ],
+        )
+        write_conn.execute(
+            f"DELETE FROM {CACHE_TABLE} WHERE rowid IN ("
+            f"SELECT rowid FROM {CACHE_TABLE} ORDER BY last_used, rowid "
+            f"LIMIT MAX(0, (SELECT COUNT(*) FROM {CACHE_TABLE}) - ?))",
+            (max_entries,),
+        )
+
+    data.run_write(write, conn=conn)
+
+
+def forget(conn, note_ids):
+    """Drop every cached render of ``note_ids`` (deleted notes)."""
+    note_ids = list(note_ids)
+    if not note_ids:
+        return
+    ensure_note_render_cache_schema(conn)
+
+    def write(write_conn):
+        for chunk in _chunks(note_ids):
+            write_conn.execute(
+                f"DELETE FROM {CACHE_TABLE} WHERE note_id IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            )
+
+    data.run_write(write, conn=conn)
+
+
+def _tracked(resolver, used):
+    if resolver is None:
+        return None
+
+    def resolve(*args, **kwargs):
+        used.append(True)
+        return resolver(*args, **kwargs)
+
+    return resolve
+
+
+def render_many(items, variant, viewer="", conn=None):
+    """Render ``items`` through the cache; returns ``{note_id: html}``.
+
+    Each item is ``(note_id, source_key, text, render_kwargs)`` where
+    ``render_kwargs`` are passed to ``markdown_utils.render_markdown``.
+    """
+    items = list(items)
+    if not enabled() or not items:
+        return {
+            note_id: markdown_utils.render_markdown(text, **kwargs)
+            for note_id, _key, text, kwargs in items
+        }
+    conn = data._get_conn() if conn is None else conn
+    try:
+        found = lookup(conn, {note_id: key for note_id, key, _text, _kwargs in items}, variant, viewer)
+    except sqlite3.Error:
+        found = {}
+    missing = [item for item in items if item[0] not in found]
+    if not missing:
+        return found
+    generation = None
+    if any(kwargs.get("wiki_link_resolver") or kwargs.get("link_resolver") for *_rest, kwargs in missing):
+        try:
+            # Read before rendering so a rename racing the render makes the
+            # next lookup miss.
+            generation = note_title_index.link_generation(conn)
+        except sqlite3.Error:
+            generation = None
+    renders = []
+    for note_id, key, text, kwargs in missing:
+        used = []
+        kwargs = dict(kwargs)
+        for name in ("wiki_link_resolver", "link_resolver"):
+            kwargs[name] = _tracked(kwargs.get(name), used)
+        html = markdown_utils.render_markdown(text, **kwargs)
+        found[note_id] = html
+        if used and generation is None:
+            continue
+        renders.append((note_id, key, generation if used else None, html))
+    try:
+        store(conn, renders, variant, viewer)
+    except sqlite3.Error as exc:
+        data._log_error(None, f"note render cache store failed: {exc}")
+    return found
+
+
+def render(note_id, key, text, variant, viewer="", conn=None, **render_kwargs):
+    """Cached ``markdown_utils.render_markdown(text, **render_kwargs)`` for one note."""
+    return render_many([(note_id, key, text, render_kwargs)], variant, viewer=viewer, conn=conn)[note_id]
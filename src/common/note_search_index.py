@@ -1,12 +1,23 @@
-"""Cached markdown note content search index."""
+"""Cached markdown note content search index.
+
+Besides the full text, each row keeps ``preview_text``: the note body
+without its front matter, cut to ``PREVIEW_CHARS``.  Note cards read that
+column (only as much of it as the card shows) instead of the whole body.
+"""
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 import os
 import sqlite3
+import time
 
+from common import config as cfg
 from common import data
+from common import note_front_matter
+from common import schema_registry
+from common import settings
 
 
 SCHEMA_SQL = """
@@ -17,21 +28,114 @@ CREATE TABLE IF NOT EXISTS lp_note_search_index (
     file_size INTEGER,
     title TEXT,
     content_text TEXT,
-    indexed_at TEXT NOT NULL
+    indexed_at TEXT NOT NULL,
+    preview_text TEXT
 );
 
 CREATE INDEX IF NOT EXISTS idx_lp_note_search_index_title
 ON lp_note_search_index(title);
 """
 
+FTS_TABLE = "lp_note_search_fts"
+
+# External-content FTS5 index over lp_note_search_index, kept in step by
+# triggers so every writer of the base table updates it.
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content_text,
+        content='lp_note_search_index', content_rowid='note_id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON lp_note_search_index BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content_text)
+        VALUES (NEW.note_id, NEW.title, NEW.content_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON lp_note_search_index BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content_text)
+        VALUES ('delete', OLD.note_id, OLD.title, OLD.content_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON lp_note_search_index BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content_text)
+        VALUES ('delete', OLD.note_id, OLD.title, OLD.content_text);
+        INSERT INTO {FTS_TABLE}(rowid, title, content_text)
+        VALUES (NEW.note_id, NEW.title, NEW.content_text);
+    END
+    """,
+]
+
+# INSERT OR REPLACE would delete the old row without firing the delete
+# trigger, leaving stale terms in the FTS index; update in place instead.
+UPSERT_SQL = """
+INSERT INTO lp_note_search_index
+(note_id, file_path, file_mtime, file_size, title, content_text, indexed_at, preview_text)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(note_id) DO UPDATE SET
+    file_path = excluded.file_path,
+    file_mtime = excluded.file_mtime,
+    file_size = excluded.file_size,
+    title = excluded.title,
+    content_text = excluded.content_text,
+    indexed_at = excluded.indexed_at,
+    preview_text = excluded.preview_text
+"""
+
+# Longest preview a user can ask for (``notes.display.preview_chars``).
+PREVIEW_CHARS = settings.NOTE_PREVIEW_CHARS_MAX
+
+
+def _ensure_fts(conn: sqlite3.Connection) -> bool:
+    existed = fts_available(conn)
+    try:
+        for statement in FTS_SCHEMA:
+            conn.execute(statement)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5; searches use the LIKE scan instead.
+        return False
+    if not existed:
+        rebuild_fts(conn)
+    return True
+
 
 def ensure_schema(conn: sqlite3.Connection | None = None) -> sqlite3.Connection:
     conn = data._get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "note_search_index"):
+        return conn
     conn.executescript(SCHEMA_SQL)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(lp_note_search_index)").fetchall()}
+    if "preview_text" not in columns:
+        # Older rows keep a NULL preview until refresh_index re-reads them.
+        conn.execute("ALTER TABLE lp_note_search_index ADD COLUMN preview_text TEXT")
+    _ensure_fts(conn)
     conn.commit()
+    schema_registry.mark_ready(conn, "note_search_index")
     return conn
 
 
+schema_registry.register("note_search_index", ensure_schema, version=3)
+
+
+def fts_available(conn: sqlite3.Connection | None = None) -> bool:
+    conn = data._get_conn() if conn is None else conn
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (FTS_TABLE,),
+    ).fetchone()
+    return row is not None
+
+
+def rebuild_fts(conn: sqlite3.Connection | None = None) -> None:
+    """Re-tokenize every row of lp_note_search_index into the FTS index."""
+    conn = data._get_conn() if conn is None else conn
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
 def note_full_path(note: dict) -> str:
     file_name = (note.get("file_name") or "").strip()
     folder_path = (note.get("path") or "").strip()
@@ -50,6 +154,36 @@ def read_note_text(path: str) -> str:
         return ""
 
 
+def note_body(text: str) -> str:
+    """``text`` without a leading ``---`` front matter block."""
+    text = text or ""
+    lines = text.splitlines(keepends=True)
+    if lines and lines[0].strip() == "---":
+        for idx, line in enumerate(lines[1:], 1):
+            if line.strip() in ("---", "..."):
+                return "".join(lines[idx + 1 :])
+    return text
+
+
+def preview_text(text: str) -> str:
+    return note_body(text)[:PREVIEW_CHARS]
+
+
+def index_row(note_id: int, note_path: str, stat, title: str, content: str, indexed_at: str) -> tuple:
+    """Values of one ``UPSERT_SQL`` row."""
+    content = content or ""
+    return (
+        note_id,
+        note_path,
+        stat.st_mtime,
+        stat.st_size,
+        title,
+        content,
+        indexed_at,
+        preview_text(content),
+    )
+
+
 def upsert_note(
     note_id: int,
     note_path: str,
@@ -69,74 +203,195 @@ def upsert_note(
         content = read_note_text(note_path)
     indexed_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     conn.execute(
-        """
-        INSERT OR REPLACE INTO lp_note_search_index
-        (note_id, file_path, file_mtime, file_size, title, content_text, indexed_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            note_id,
-            note_path,
-            stat.st_mtime,
-            stat.st_size,
-            title or os.path.basename(note_path),
-            content or "",
-            indexed_at,
-        ),
+        UPSERT_SQL,
+        index_row(note_id, note_path, stat, title or os.path.basename(note_path), content, indexed_at),
     )
+    note_front_matter.store(note_id, note_path, text=content or "", stat=stat, conn=conn, commit=False)
     if commit:
         conn.commit()
     return True
 
 
-def rebuild_index(conn: sqlite3.Connection | None = None) -> dict:
+def remove_notes(
+    note_ids,
+    conn: sqlite3.Connection | None = None,
+    commit: bool = True,
+) -> int:
+    """Drop the index and cached front matter rows of ``note_ids``."""
+    conn = ensure_schema(conn)
+    note_ids = [int(note_id) for note_id in note_ids if note_id]
+    if not note_ids:
+        return 0
+    note_front_matter.ensure_schema(conn)
+    _write_index_rows(conn, [], note_ids)
+    if commit:
+        conn.commit()
+    return len(note_ids)
+
+
+def _read_workers() -> int:
+    try:
+        return max(1, int(getattr(cfg, "NOTE_SEARCH_INDEX_READ_WORKERS", 4) or 1))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _write_batch_size() -> int:
+    try:
+        return max(1, int(getattr(cfg, "NOTE_SEARCH_INDEX_WRITE_BATCH", 200) or 1))
+    except (TypeError, ValueError):
+        return 200
+
+
+def _stat_note_files(paths: list[str]) -> dict:
+    """Stat note files with one ``os.scandir`` per folder.
+
+    Returns ``{path: stat_result}`` for the paths that are regular files.
+    Names are matched exactly first and then case-insensitively, as the
+    Windows file system does.
+    """
+    wanted: dict[str, dict[str, str]] = {}
+    for path in paths:
+        folder, name = os.path.split(path)
+        wanted.setdefault(folder, {})[name] = path
+    found = {}
+    for folder, names in wanted.items():
+        folded = {name.lower(): path for name, path in names.items()}
+        try:
+            with os.scandir(folder or ".") as entries:
+                for entry in entries:
+                    path = names.get(entry.name) or folded.get(entry.name.lower())
+                    if path is None or path in found:
+                        continue
+                    try:
+                        if entry.is_file():
+                            found[path] = entry.stat()
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return found
+
+
+def _write_index_rows(
+    conn: sqlite3.Connection,
+    rows: list[tuple],
+    removed_ids: list[int],
+    front_matter_rows: list[tuple] = (),
+) -> int:
+    if rows:
+        conn.executemany(UPSERT_SQL, rows)
+    if front_matter_rows:
+        conn.executemany(note_front_matter.UPSERT_SQL, front_matter_rows)
+    if removed_ids:
+        removed = [(note_id,) for note_id in removed_ids]
+        conn.executemany("DELETE FROM lp_note_search_index WHERE note_id = ?", removed)
+        conn.executemany("DELETE FROM lp_note_front_matter WHERE note_id = ?", removed)
+    return len(rows)
+
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.perf_counter() - started) * 1000)
+
+
+def refresh_index(conn: sqlite3.Connection | None = None, full: bool = False) -> dict:
+    """Bring lp_note_search_index in line with the markdown notes on disk.
+
+    Every note is stat'ed (one ``os.scandir`` per folder); by default only
+    notes whose path, mtime or size differ from the indexed row (or from
+    their cached front matter, ``lp_note_front_matter``), or whose row has
+    no ``preview_text`` yet, are re-read, while
+    ``full=True`` re-reads them all.  Rows for deleted notes and missing
+    files are removed.  Files are read on a small thread pool and the rows are
+    written in batches through ``data.submit_write``, so reading overlaps the
+    commits.  Returns counts and phase timings in milliseconds.
+    """
+    started = time.perf_counter()
     conn = ensure_schema(conn)
     rows = conn.execute(
         """
-        SELECT id, file_name, path, size, date_modified, area
+        SELECT id, file_name, path
         FROM lp_notes
         WHERE COALESCE(file_name, '') != ''
         """
     ).fetchall()
-    indexed = missing = skipped = 0
-    conn.execute("DELETE FROM lp_note_search_index")
-    indexed_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    indexed_rows = {
+        row[0]: (row[1], row[2], row[3]) if row[4] else None
+        for row in conn.execute(
+            "SELECT note_id, file_path, file_mtime, file_size, preview_text IS NOT NULL FROM lp_note_search_index"
+        ).fetchall()
+    }
+    note_front_matter.ensure_schema(conn)
+    front_matter_rows = {
+        row[0]: (row[1], row[2])
+        for row in conn.execute("SELECT note_id, file_mtime_ns, file_size FROM lp_note_front_matter").fetchall()
+    }
+    notes = []
+    skipped = 0
     for row in rows:
         note = dict(row)
         note_path = note_full_path(note)
         if not note_path or not note_path.lower().endswith(".md"):
             skipped += 1
             continue
-        if not os.path.isfile(note_path):
+        notes.append((note["id"], note_path, note.get("file_name") or ""))
+    stats = _stat_note_files([note_path for _, note_path, _ in notes])
+    stat_ms = _elapsed_ms(started)
+
+    keep_ids = set()
+    to_read = []
+    missing = unchanged = 0
+    for note_id, note_path, title in notes:
+        stat = stats.get(note_path)
+        if stat is None:
             missing += 1
             continue
-        try:
-            stat = os.stat(note_path)
-        except OSError:
-            missing += 1
+        keep_ids.add(note_id)
+        if (
+            not full
+            and indexed_rows.get(note_id) == (note_path, stat.st_mtime, stat.st_size)
+            and front_matter_rows.get(note_id) == (stat.st_mtime_ns, stat.st_size)
+        ):
+            unchanged += 1
             continue
-        content = read_note_text(note_path)
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO lp_note_search_index
-            (note_id, file_path, file_mtime, file_size, title, content_text, indexed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                note["id"],
-                note_path,
-                stat.st_mtime,
-                stat.st_size,
-                note.get("file_name") or "",
-                content,
-                indexed_at,
-            ),
-        )
-        indexed += 1
-    conn.commit()
+        to_read.append((note_id, note_path, title, stat))
+    removed_ids = [note_id for note_id in set(indexed_rows) | set(front_matter_rows) if note_id not in keep_ids]
+
+    read_started = time.perf_counter()
+    indexed_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    batch_size = _write_batch_size()
+    futures = []
+    with ThreadPoolExecutor(max_workers=_read_workers()) as pool:
+        for offset in range(0, len(to_read), batch_size):
+            chunk = to_read[offset:offset + batch_size]
+            contents = pool.map(read_note_text, [note_path for _, note_path, _, _ in chunk])
+            batch = []
+            front_matter_batch = []
+            for (note_id, note_path, title, stat), content in zip(chunk, contents):
+                batch.append(index_row(note_id, note_path, stat, title, content, indexed_at))
+                front_matter = note_front_matter.parse_text(content[:note_front_matter.READ_LIMIT].lstrip("\ufeff"))
+                front_matter_batch.append(note_front_matter.row_values(note_id, stat, front_matter))
+            futures.append(data.submit_write(_write_index_rows, batch, [], front_matter_batch, conn=conn))
+    read_ms = _elapsed_ms(read_started)
+    write_started = time.perf_counter()
+    if removed_ids:
+        futures.append(data.submit_write(_write_index_rows, [], removed_ids, conn=conn))
+    indexed = sum(future.result() for future in futures)
     return {
         "scanned": len(rows),
         "indexed": indexed,
+        "unchanged": unchanged,
+        "removed": len(removed_ids),
         "missing": missing,
         "skipped": skipped,
+        "full": bool(full),
+        "stat_ms": stat_ms,
+        "read_ms": read_ms,
+        "write_ms": _elapsed_ms(write_started),
+        "elapsed_ms": _elapsed_ms(started),
     }
+
+
+def rebuild_index(conn: sqlite3.Connection | None = None) -> dict:
+    """Re-read every note into the index (``refresh_index(full=True)``)."""
+    return refresh_index(conn, full=True)
@@ -0,0 +1,264 @@
+"""In-memory trigram index of note titles for wiki-link autocomplete.
+
+``/notes/api/wiki-search`` runs on every keystroke.  Scoring every visible
+note with ``difflib`` made each call O(notes x title length); instead each
+viewer gets a ``NoteTitleIndex`` mapping the trigrams of every note's title,
+file name and path to note ids.  A query's trigrams select the notes sharing
+the most of them and only those few hundred candidates are scored.
+
+Indexes are cached per database and visibility condition.  Triggers on
+``lp_notes`` append the id of every created, renamed, moved, re-shared or
+deleted note to ``lp_note_title_changes``; its newest ``seq`` is the
+generation a cached index is checked against, and a stale index re-reads only
+the notes changed since its generation.  The log keeps the last
+``CHANGE_LOG_KEEP`` entries - an index older than that is rebuilt.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+import heapq
+import sqlite3
+import threading
+
+from common import schema_registry
+
+
+CHANGES_TABLE = "lp_note_title_changes"
+CHANGE_LOG_KEEP = 5000
+CANDIDATE_LIMIT = 300
+
+# Columns whose change can add, drop or retitle a note in someone's index.
+WATCHED_COLUMNS = ("title", "file_name", "path", "owner_user_id", "visibility", "is_public")
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} (
+    seq      INTEGER PRIMARY KEY AUTOINCREMENT,
+    note_id  INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS {CHANGES_TABLE}_prune AFTER INSERT ON {CHANGES_TABLE} BEGIN
+    DELETE FROM {CHANGES_TABLE} WHERE seq <= NEW.seq - {CHANGE_LOG_KEEP};
+END;
+"""
+
+_INDEX_CACHE = {}
+_INDEX_CACHE_MAX = 32
+_INDEX_LOCK = threading.Lock()
+
+
+def ensure_note_title_index_schema(conn):
+    if schema_registry.is_ready(conn, "note_title_index"):
+        return
+    conn.executescript(_SCHEMA_SQL)
+    schema_registry.mark_ready(conn, "note_title_index")
+
+
+schema_registry.register("note_title_index", ensure_note_title_index_schema, version=1)
+
+
+def _trigger_names():
+    return [f"lp_nt_lp_notes_{event}" for event in ("ins", "upd", "del")]
+
+
+def _ensure_triggers(conn):
+    """Create the change-log triggers on lp_notes; False when it is missing."""
+    marks = ", ".join("?" for _ in _trigger_names())
+    existing = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({marks})",
+        _trigger_names(),
+    ).fetchone()[0]
+    if existing == len(_trigger_names()):
+        return True
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(lp_notes)").fetchall()}
+    if "id" not in columns:
+        return False
+    watched = ", ".join(col for col in WATCHED_COLUMNS if col in columns) or "id"
+    ins_name, upd_name, del_name = _trigger_names()
+
+    def create(write_conn):
+        write_conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {ins_name} AFTER INSERT ON lp_notes BEGIN "
+            f"INSERT INTO {CHANGES_TABLE} (note_id) VALUES (NEW.id); END"
+        )
+        write_conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {upd_name} AFTER UPDATE OF {watched} ON lp_notes BEGIN "
+            f"INSERT INTO {CHANGES_TABLE} (note_id) VALUES (NEW.id); END"
+        )
+        write_conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {del_name} AFTER DELETE ON lp_notes BEGIN "
+            f"INSERT INTO {CHANGES_TABLE} (note_id) VALUES (OLD.id); END"
+        )
+
+    from common import data as db
+
+    db.run_write(create, conn=conn)
+    return True
+
+
+def trigrams(text):
+    """Lower-case trigrams of ``text``, padded so word starts get their own."""
+    text = " ".join((text or "").lower().split())
+    if not text:
+        return set()
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _note_trigrams(row):
+    grams = set()
+    for col in ("title", "file_name", "path"):
+        grams |= trigrams(row.get(col))
+    return grams
+
+
+class NoteTitleIndex:
+    """Trigram postings over the notes one viewer can see."""
+
+    __slots__ = ("generation", "rows", "_postings", "_grams")
+
+    def __init__(self, rows=(), generation=None):
+        self.generation = generation
+        self.rows = {}
+        self._postings = {}
+        self._grams = {}
+        for row in rows:
+            self.add(row)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, row):
+        note_id = row["id"]
+        self.discard(note_id)
+        grams = _note_trigrams(row)
+        self.rows[note_id] = row
+        self._grams[note_id] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(note_id)
+
+    def discard(self, note_id):
+        self.rows.pop(note_id, None)
+        for gram in self._grams.pop(note_id, ()):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(note_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def candidates(self, query, limit=CANDIDATE_LIMIT):
+        """Rows sharing the most trigrams with ``query`` (at most ``limit``).
+
+        Queries too short to share a full trigram fall back to a substring
+        check of the indexed text, which is still cheap per note.
+        """
+        query = " ".join((query or "").lower().split())
+        if not query:
+            return list(self.rows.values())
+        if len(query) < 3:
+            found = [
+                row
+                for row in self.rows.values()
+                if query in (row.get("title") or "").lower()
+                or query in (row.get("file_name") or "").lower()
+                or query in (row.get("path") or "").lower()
+            ]
+            return found[:limit]
+        counts = Counter()
+        for gram in trigrams(query):
+            ids = self._postings.get(gram)
+            if ids:
+                counts.update(ids)
+        best = heapq.nlargest(limit, counts.items(), key=lambda item: item[1])
+        return [self.rows[note_id] for note_id, _count in best]
+
+
+def _current_generation(conn):
+    row = conn.execute(f"SELECT MIN(seq), MAX(seq) FROM {CHANGES_TABLE}").fetchone()
+    return row[0], row[1]
+
+
+def _changed_between(conn, since, oldest, generation):
+    if since is None or oldest is None or since < oldest - 1:
+        return None
+    return [
+        row[0]
+        for row in conn.execute(
+            f"SELECT DISTINCT note_id FROM {CHANGES_TABLE} WHERE seq > ? AND seq <= ?",
+            (since, generation),
+        ).fetchall()
+    ]
+
+
+def _load_rows(conn, table, condition, params, note_ids=None):
+    sql = f"SELECT t.id, t.file_name, t.title, t.path, t.area FROM {table} t WHERE {condition}"
+    params = list(params)
+    if note_ids is not None:
+        sql += f" AND t.id IN ({', '.join('?' for _ in note_ids)})"
+        params.extend(note_ids)
+    return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+
+def _cached_index(conn, condition, params, table):
+    """Cached ``NoteTitleIndex`` of the notes matching ``condition`` (alias ``t``).
+
+    Call with ``_INDEX_LOCK`` held: a stale index is patched in place.
+    """
+    oldest, generation = _current_generation(conn)
+    key = (schema_registry.db_key(conn), table, condition, tuple(params))
+    cached = _INDEX_CACHE.get(key)
+    if cached is not None and cached.generation == generation:
+        return cached
+    changed = None if cached is None else _changed_between(conn, cached.generation, oldest, generation)
+    if changed is not None:
+        for offset in range(0, len(changed), 500):
+            chunk = changed[offset:offset + 500]
+            visible = {row["id"]: row for row in _load_rows(conn, table, condition, params, chunk)}
+            for note_id in chunk:
+                if note_id in visible:
+                    cached.add(visible[note_id])
+                else:
+                    cached.discard(note_id)
+        cached.generation = generation
+        return cached
+    index = NoteTitleIndex(_load_rows(conn, table, condition, params), generation=generation)
+    _INDEX_CACHE[key] = index
+    while len(_INDEX_CACHE) > _INDEX_CACHE_MAX:
+        _INDEX_CACHE.pop(next(iter(_INDEX_CACHE)))
+    return index
+
+
+def candidates(conn, query, condition="1=1", params=(), table="lp_notes", limit=CANDIDATE_LIMIT):
+    """Note rows worth scoring for ``query`` among those matching ``condition``.
+
+    Returns None when ``lp_notes`` cannot be indexed, so callers can fall back
+    to scoring every row.
+    """
+    try:
+        ensure_note_title_index_schema(conn)
+        if not _ensure_triggers(conn):
+            return None
+        with _INDEX_LOCK:
+            return _cached_index(conn, condition, params, table).candidates(query, limit=limit)
+    except sqlite3.Error:
+        return None
+
+
+def link_generation(conn):
+    """Newest change-log ``seq``: moves whenever a note is created, renamed,
+    moved, re-shared or deleted (0 before the first change, None when
+    ``lp_notes`` cannot be tracked)."""
+    ensure_note_title_index_schema(conn)
+    if not _ensure_triggers(conn):
+        return None
+    return _current_generation(conn)[1] or 0
+
+
+def changed_since(conn, generation):
+    """Ids of the notes changed after ``generation`` (a ``link_generation``
+    value), or None once the log no longer reaches back that far."""
+    ensure_note_title_index_schema(conn)
+    oldest, newest = _current_generation(conn)
+    if newest is None:
+        return []
+    return _changed_between(conn, generation, oldest, newest)
@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 
 from common import data as db
 from common import areas as areas_mod
+from common import schema_registry
 from common import utils as utils_mod
 
 
@@ -80,9 +81,6 @@ ON lp_project_items (owner_user_id, item_type, item_id, is_primary);
 """
 
 
-_PROJECTS_SCHEMA_READY_CONN_IDS = set()
-
-
 def _utc_now():
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
@@ -125,21 +123,15 @@ def _table_exists(conn, table_name):
 
 def ensure_projects_schema(conn=None):
     conn = _get_conn(conn)
-    conn_id = id(conn)
-    if conn_id in _PROJECTS_SCHEMA_READY_CONN_IDS and _projects_schema_is_current(conn):
+    if schema_registry.is_ready(conn, "projects"):
         return
     conn.executescript(PROJECTS_SCHEMA_SQL)
     _migrate_projects_schema(conn)
     conn.commit()
-    _PROJECTS_SCHEMA_READY_CONN_IDS.add(conn_id)
+    schema_registry.mark_ready(conn, "projects")
 
 
-def _projects_schema_is_current(conn):
-    return (
-        {"project_id", "name", "status", "comments"}.issubset(_table_columns(conn, "lp_project_workspaces"))
-        and {"project_id", "area_id"}.issubset(_table_columns(conn, "lp_project_areas"))
-        and {"project_id", "item_type", "item_id", "is_primary"}.issubset(_table_columns(conn, "lp_project_items"))
-    )
+schema_registry.register("projects", ensure_projects_schema)
 
 
 def _migrate_projects_schema(conn):
@@ -580,10 +572,11 @@ def list_project_items(project_id, conn=None, owner_user_id=None):
         "ORDER BY pinned DESC, COALESCE(section, ''), item_type, sort_order, project_item_id",
         (owner_user_id, project_id),
     ).fetchall()
+    summaries = _record_summaries([(row["item_type"], row["item_id"]) for row in rows])
     items = []
     for row in rows:
         item = dict(row)
-        summary = _record_summary(item["item_type"], item["item_id"])
+        summary = summaries.get((item["item_type"], str(item["item_id"])))
         if summary:
             item["summary"] = summary
             if not item.get("item_title"):
@@ -791,6 +784,15 @@ def _record_summary(item_type, item_id):
         return None
 
 
+def _record_summaries(refs):
+    try:
+        from common import links_records
+
+        return links_records.get_record_summaries(refs)
+    except Exception:
+        return {}
+
+
 def _type_label(item_type):
     labels = {
         "note": "Notes",
@@ -0,0 +1,386 @@
+"""Materialized record-to-area assignments.
+
+Which area a note, media item, audio file, 3D model or file list belongs to
+depends on its folder: the longest enabled ``lp_area_folders`` prefix of that
+folder wins (ties broken by folder role, sort order and the shallower area).
+Resolving that per row meant a correlated ``lower(folder) LIKE
+lower(path_prefix) || '%'`` subquery against every mapping, several times per
+listed row, which no index can help with.
+
+``lp_record_area`` stores the answer - one row per record and owner that has a
+matching folder - so list queries join it on its primary key or on
+``(record_type, owner_key, area_id)``.  Records without a row are unmapped.
+
+The table is kept current without a full rebuild:
+
+* Triggers on the record tables re-resolve a single record when it is
+  inserted, deleted or moved to another folder.
+* Triggers on ``lp_area_folders`` (and area name changes in ``lp_areas``,
+  which feed the named child-area rule for notes) queue the changed prefix in
+  ``lp_record_area_pending``.  ``sync`` re-resolves only the records under
+  each queued prefix; the ``area_folder_*`` functions call it straight away
+  and list queries call it via ``ensure_current`` before reading.
+
+``owner_key`` is the mapping owner's user id, with ``0`` for the shared
+(owner-less) mappings.
+"""
+
+from __future__ import annotations
+
+from common import schema_registry
+from common import user_paths
+
+
+RECORD_AREA_TABLE = "lp_record_area"
+PENDING_TABLE = "lp_record_area_pending"
+
+RECORD_TABLES = {
+    "notes": "lp_notes",
+    "media": "lp_media",
+    "audio": "lp_audio",
+    "3d": "lp_3d",
+    "files": "lp_files",
+}
+
+MAPPING_TABLES = ("dim_folder", "lp_area_folders", "lp_areas")
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {RECORD_AREA_TABLE} (
+    record_type     TEXT NOT NULL,
+    record_id       INTEGER NOT NULL,
+    owner_key       INTEGER NOT NULL,
+    area_id         TEXT NOT NULL,
+    area_folder_id  INTEGER,
+    path_prefix     TEXT,
+    match_rule      TEXT NOT NULL,
+    PRIMARY KEY (record_type, record_id, owner_key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS ix_lp_record_area_area
+ON {RECORD_AREA_TABLE} (record_type, owner_key, area_id, record_id);
+
+CREATE TABLE IF NOT EXISTS {PENDING_TABLE} (
+    record_type  TEXT NOT NULL,
+    owner_key    INTEGER NOT NULL,
+    path_prefix  TEXT NOT NULL,
+    PRIMARY KEY (record_type, owner_key, path_prefix)
+) WITHOUT ROWID;
+"""
+
+_ROLE_RANK_SQL = (
+    "CASE pf.folder_role WHEN 'default' THEN 0 WHEN 'include' THEN 1 "
+    "WHEN 'output' THEN 2 WHEN 'archive' THEN 3 ELSE 9 END"
+)
+
+# A note whose path mentions the name of a child area (``area/UE5``) mapped at
+# the same prefix length goes to that child rather than its parent.
+_NAMED_CHILD_SQL = (
+    "(instr(pf.area_id, '/') > 0 AND COALESCE(a.area_name, '') <> '' "
+    "AND lower(rtrim(replace(t.path, '/', '\\'))) LIKE '%' || lower(COALESCE(a.area_name, '')) || '%')"
+)
+
+
+def _folder_expr(record_type):
+    if record_type == "notes":
+        return "COALESCE(NULLIF(rtrim(replace(t.path, '/', '\\')), ''), df.folder_path)"
+    return "df.folder_path"
+
+
+def ensure_record_area_schema(conn):
+    if schema_registry.is_ready(conn, "record_area"):
+        return
+    conn.executescript(_SCHEMA_SQL)
+    # Triggers from an older resolver are dropped; the next sync recreates
+    # them and rebuilds the assignments.
+    for table in RECORD_TABLES.values():
+        for name in _record_trigger_names(table):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for name in _mapping_trigger_names():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    schema_registry.mark_ready(conn, "record_area")
+
+
+schema_registry.register("record_area", ensure_record_area_schema, version=2)
+
+
+def owner_key(owner_user_id):
+    return 0 if owner_user_id is None else int(owner_user_id)
+
+
+def area_lookup_sql(record_type, owner_user_id, alias="t"):
+    """Scalar subquery returning the area of ``alias``'s row (NULL if unmapped)."""
+    return (
+        f"SELECT ra.area_id FROM {RECORD_AREA_TABLE} ra "
+        f"WHERE ra.record_type = '{record_type}' AND ra.owner_key = {owner_key(owner_user_id)} "
+        f"AND ra.record_id = {alias}.rowid"
+    )
+
+
+def area_join_sql(record_type, owner_user_id, alias="t", ra_alias="ra"):
+    """``JOIN`` clause restricting ``alias`` to records mapped for the owner."""
+    return (
+        f"JOIN {RECORD_AREA_TABLE} {ra_alias} ON {ra_alias}.record_type = '{record_type}' "
+        f"AND {ra_alias}.owner_key = {owner_key(owner_user_id)} AND {ra_alias}.record_id = {alias}.rowid"
+    )
+
+
+def unmapped_sql(record_type, owner_user_id, alias="t"):
+    return f"NOT EXISTS ({area_lookup_sql(record_type, owner_user_id, alias)})"
+
+
+def _under_sql(key, prefix_key):
+    return f"({key} = {prefix_key} OR ({key} >= {prefix_key} || '/' AND {key} < {prefix_key} || '0'))"
+
+
+def _resolve_sql(record_type, table, where_sql):
+    """``INSERT ... SELECT`` storing the best mapping per record and owner."""
+    folder = _folder_expr(record_type)
+    if record_type == "notes":
+        named = _NAMED_CHILD_SQL
+        areas_join = "LEFT JOIN lp_areas a ON a.owner_user_id IS pf.owner_user_id AND a.area_id = pf.area_id "
+    else:
+        named = "0"
+        areas_join = ""
+    return (
+        f"INSERT OR REPLACE INTO {RECORD_AREA_TABLE} "
+        "(record_type, record_id, owner_key, area_id, area_folder_id, path_prefix, match_rule) "
+        f"SELECT '{record_type}', record_id, owner_key, area_id, area_folder_id, path_prefix, match_rule FROM ("
+        "SELECT t.rowid AS record_id, COALESCE(pf.owner_user_id, 0) AS owner_key, pf.area_id, "
+        "pf.area_folder_id, pf.path_prefix, "
+        f"CASE WHEN {named} THEN 'named_child' ELSE 'prefix' END AS match_rule, "
+        "ROW_NUMBER() OVER ("
+        "PARTITION BY t.rowid, COALESCE(pf.owner_user_id, 0) "
+        f"ORDER BY LENGTH(pf.path_prefix) DESC, ({named}) DESC, {_ROLE_RANK_SQL}, pf.sort_order, "
+        "(LENGTH(pf.area_id) - LENGTH(REPLACE(pf.area_id, '/', ''))) ASC, "
+        "LENGTH(pf.area_id) ASC, pf.area_id, pf.path_prefix"
+        ") AS rn "
+        f"FROM {table} t "
+        "LEFT JOIN dim_folder df ON df.folder_id = t.folder_id "
+        "JOIN lp_area_folders pf ON pf.is_enabled = 1 "
+        "AND pf.folder_role IN ('default','include','archive','output') "
+        f"AND {_under_sql(user_paths.path_key_sql(folder), user_paths.path_key_sql('pf.path_prefix'))} "
+        f"{areas_join}"
+        f"WHERE {where_sql}"
+        ") WHERE rn = 1"
+    )
+
+
+def _record_trigger_names(table):
+    return [f"lp_ra_{table}_{event}" for event in ("ins", "upd", "del")]
+
+
+def _mapping_trigger_names():
+    names = []
+    for table in ("lp_area_folders", "lp_areas"):
+        names.extend(f"lp_ra_{table}_{event}" for event in ("ins", "upd", "del"))
+    return names
+
+
+def _existing_triggers(conn, names):
+    marks = ", ".join("?" for _ in names)
+    rows = conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({marks})",
+        list(names),
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _table_columns(conn, table):
+    try:
+        return {row[1].lower() for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    except Exception:
+        return set()
+
+
+def _can_track(conn, record_type):
+    """True when the record table and every table the resolver joins exist."""
+    table = RECORD_TABLES[record_type]
+    required = {"folder_id", "path"} if record_type == "notes" else {"folder_id"}
+    if not required <= _table_columns(conn, table):
+        return False
+    return all(_table_columns(conn, name) for name in MAPPING_TABLES)
+
+
+def _create_record_triggers(conn, record_type):
+    table = RECORD_TABLES[record_type]
+    ins_name, upd_name, del_name = _record_trigger_names(table)
+    moved = "folder_id, path" if record_type == "notes" else "folder_id"
+    delete_old = f"DELETE FROM {RECORD_AREA_TABLE} WHERE record_type = '{record_type}' AND record_id = OLD.rowid; "
+    resolve_new = _resolve_sql(record_type, table, "t.rowid = NEW.rowid") + "; "
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {ins_name} AFTER INSERT ON {table} BEGIN {resolve_new}END")
+    conn.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {upd_name} AFTER UPDATE OF {moved} ON {table} BEGIN "
+        f"{delete_old}{resolve_new}END"
+    )
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {del_name} AFTER DELETE ON {table} BEGIN {delete_old}END")
+
+
+def _queue_sql(record_type, row, prefix):
+    return (
+        f"INSERT OR IGNORE INTO {PENDING_TABLE} (record_type, owner_key, path_prefix) "
+        f"VALUES ('{record_type}', COALESCE({row}.owner_user_id, 0), {prefix}); "
+    )
+
+
+def _create_mapping_triggers(conn):
+    changed = " OR ".join(
+        f"OLD.{col} IS NOT NEW.{col}"
+        for col in ("owner_user_id", "area_id", "path_prefix", "folder_role", "sort_order", "is_enabled")
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS lp_ra_lp_area_folders_ins AFTER INSERT ON lp_area_folders BEGIN "
+        + _queue_sql("", "NEW", "NEW.path_prefix")
+        + "END"
+    )
+    conn.execute(
+        f"CREATE TRIGGER IF NOT EXISTS lp_ra_lp_area_folders_upd AFTER UPDATE ON lp_area_folders WHEN {changed} BEGIN "
+        + _queue_sql("", "OLD", "OLD.path_prefix")
+        + _queue_sql("", "NEW", "NEW.path_prefix")
+        + "END"
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS lp_ra_lp_area_folders_del AFTER DELETE ON lp_area_folders BEGIN "
+        + _queue_sql("", "OLD", "OLD.path_prefix")
+        + "END"
+    )
+    # Area names only matter to the named child-area rule used for notes.
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS lp_ra_lp_areas_ins AFTER INSERT ON lp_areas "
+        "WHEN instr(NEW.area_id, '/') > 0 BEGIN " + _queue_sql("notes", "NEW", "''") + "END"
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS lp_ra_lp_areas_upd AFTER UPDATE OF area_id, area_name ON lp_areas "
+        "WHEN instr(OLD.area_id, '/') > 0 OR instr(NEW.area_id, '/') > 0 BEGIN "
+        + _queue_sql("notes", "OLD", "''")
+        + _queue_sql("notes", "NEW", "''")
+        + "END"
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS lp_ra_lp_areas_del AFTER DELETE ON lp_areas "
+        "WHEN instr(OLD.area_id, '/') > 0 BEGIN " + _queue_sql("notes", "OLD", "''") + "END"
+    )
+
+
+def _rebuild_type(conn, record_type):
+    conn.execute(f"DELETE FROM {RECORD_AREA_TABLE} WHERE record_type = ?", (record_type,))
+    conn.execute(_resolve_sql(record_type, RECORD_TABLES[record_type], "1 = 1"))
+
+
+def _tracked_types(conn):
+    existing = _existing_triggers(
+        conn, [name for table in RECORD_TABLES.values() for name in _record_trigger_names(table)]
+    )
+    return [
+        record_type
+        for record_type, table in RECORD_TABLES.items()
+        if set(_record_trigger_names(table)) <= existing
+    ]
+
+
+def _apply_pending(conn):
+    rows = conn.execute(
+        f"SELECT record_type, owner_key, path_prefix FROM {PENDING_TABLE} ORDER BY owner_key, path_prefix"
+    ).fetchall()
+    if not rows:
+        return 0
+    tracked = _tracked_types(conn)
+    for pending_type, pending_owner, prefix in rows:
+        for record_type in tracked:
+            if pending_type and pending_type != record_type:
+                continue
+            table = RECORD_TABLES[record_type]
+            if prefix:
+                under_prefix = user_paths.path_under_sql(_folder_expr(record_type))
+                prefix_params = user_paths.path_under_params(prefix)
+            else:
+                under_prefix = f"{_folder_expr(record_type)} IS NOT NULL"
+                prefix_params = []
+            conn.execute(
+                f"DELETE FROM {RECORD_AREA_TABLE} WHERE record_type = ? AND owner_key = ? "
+                f"AND record_id IN (SELECT t.rowid FROM {table} t "
+                f"LEFT JOIN dim_folder df ON df.folder_id = t.folder_id WHERE {under_prefix})",
+                [record_type, pending_owner, *prefix_params],
+            )
+            conn.execute(
+                _resolve_sql(record_type, table, f"{under_prefix} AND COALESCE(pf.owner_user_id, 0) = ?"),
+                [*prefix_params, pending_owner],
+            )
+    conn.execute(f"DELETE FROM {PENDING_TABLE}")
+    return len(rows)
+
+
+def _sync_unit(conn, record_types):
+    ensure_record_area_schema(conn)
+    if len(_existing_triggers(conn, _mapping_trigger_names())) != len(_mapping_trigger_names()):
+        _create_mapping_triggers(conn)
+        conn.execute(f"DELETE FROM {PENDING_TABLE}")
+        for record_type in _tracked_types(conn):
+            _rebuild_type(conn, record_type)
+    for record_type in record_types:
+        table = RECORD_TABLES[record_type]
+        names = _record_trigger_names(table)
+        if len(_existing_triggers(conn, names)) != len(names):
+            _create_record_triggers(conn, record_type)
+            _rebuild_type(conn, record_type)
+    return _apply_pending(conn)
+
+
+def _is_current(conn, record_types):
+    names = _mapping_trigger_names()
+    for record_type in record_types:
+        names.extend(_record_trigger_names(RECORD_TABLES[record_type]))
+    try:
+        if len(_existing_triggers(conn, names)) != len(names):
+            return False
+        return conn.execute(f"SELECT 1 FROM {PENDING_TABLE} LIMIT 1").fetchone() is None
+    except Exception:
+        return False
+
+
+def ensure_current(conn, record_type):
+    """Bring ``lp_record_area`` up to date for ``record_type``.
+
+    Returns False when the record or mapping tables are missing (every record
+    then reads as unmapped).  Cheap when nothing is queued: one
+    ``sqlite_master`` lookup and one probe of the pending table.
+    """
+    ensure_record_area_schema(conn)
+    if record_type not in RECORD_TABLES or not _can_track(conn, record_type):
+        return False
+    if _is_current(conn, [record_type]):
+        return True
+    from common import data as db
+
+    try:
+        db.run_write(_sync_unit, [record_type], conn=conn)
+    except Exception as exc:
+        db._log_error(None, f"record area refresh failed for {record_type}: {exc}")
+        return False
+    return True
+
+
+def sync(conn):
+    """Apply queued area-folder changes to every tracked record type."""
+    ensure_record_area_schema(conn)
+    if not all(_table_columns(conn, name) for name in MAPPING_TABLES) or _is_current(conn, []):
+        return 0
+    from common import data as db
+
+    return db.run_write(_sync_unit, [], conn=conn)
+
+
+def rebuild(conn, record_types=None):
+    """Recompute the assignments from scratch (all trackable types by default).
+
+    A write unit: run it through ``data.run_write``.
+    """
+    ensure_record_area_schema(conn)
+    record_types = [
+        record_type
+        for record_type in (record_types or RECORD_TABLES)
+        if record_type in RECORD_TABLES and _can_track(conn, record_type)
+    ]
+    _sync_unit(conn, record_types)
+    for record_type in record_types:
+        _rebuild_type(conn, record_type)
+    return record_types
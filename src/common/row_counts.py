@@ -0,0 +1,339 @@
+"""Stored row counts for list pagers.
+
+List pages used to run a full ``COUNT(1)`` on every request just to draw the
+pager.  Counts are now kept in ``lp_row_counts`` and read back in one
+primary-key lookup.
+
+Two kinds of counter are stored:
+
+* The ``all`` counter of each folder-mapped table, kept current by triggers
+  on the record table that add or subtract one as rows are inserted or
+  deleted.
+* Query counters (``q:<hash>``) for any other count statement - area and
+  unmapped tabs included.  ``lp_row_count_deps`` lists the tables each one
+  reads from, and triggers on those tables drop it through that index
+  whenever one of them changes.
+
+The triggers are installed by the ``row_counts`` migration, never from a
+count call; a counter whose triggers are missing is simply not stored.  A
+missing counter is computed and stored in one ``INSERT ... SELECT`` so a
+concurrent write cannot slip in between the count and the store.  Every row
+keeps its count statement, so ``recount`` can verify the whole table (Admin >
+Performance).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import hashlib
+import json
+import re
+
+from common import config as cfg
+from common import schema_registry
+
+
+COUNTS_TABLE = "lp_row_counts"
+DEPENDS_TABLE = "lp_row_count_deps"
+
+# Tables with an ``all`` counter (the folder-mapped record tables).
+COUNTED_TABLES = ("lp_notes", "lp_media", "lp_audio", "lp_3d", "lp_files")
+
+# Tables read by query counters besides the ``cfg.table_def`` tables.
+QUERY_COUNT_TABLES = ("lp_record_area", "lp_media_meta", "lp_media_tags", "lp_tags")
+
+_QUERY_COUNTERS_MAX = 500
+
+_TABLE_REF_RE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {COUNTS_TABLE} (
+    tbl_name     TEXT NOT NULL,
+    scope_key    TEXT NOT NULL,
+    owner_id     INTEGER,
+    area_key     TEXT,
+    cnt          INTEGER NOT NULL,
+    depends      TEXT NOT NULL DEFAULT '',
+    count_sql    TEXT NOT NULL,
+    params_json  TEXT NOT NULL DEFAULT '[]',
+    updated_utc  TEXT NOT NULL,
+    PRIMARY KEY (tbl_name, scope_key)
+)
+"""
+
+_DEPENDS_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {DEPENDS_TABLE} (
+    dep_table  TEXT NOT NULL,
+    tbl_name   TEXT NOT NULL,
+    scope_key  TEXT NOT NULL,
+    PRIMARY KEY (dep_table, tbl_name, scope_key)
+) WITHOUT ROWID
+"""
+
+
+def enabled():
+    return bool(getattr(cfg, "ROW_COUNT_CACHE_ENABLED", True))
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def tracked_tables():
+    names = {tbl.get("name") for tbl in getattr(cfg, "table_def", []) if tbl.get("name")}
+    return sorted(names | set(COUNTED_TABLES) | set(QUERY_COUNT_TABLES))
+
+
+def ensure_row_counts_schema(conn, table_names=None):
+    """Create the counter tables and the triggers on ``table_names``.
+
+    With no ``table_names`` every tracked table that exists is covered; the
+    migration stays pending until all of them do, so tables created later
+    (a first import) are picked up on the next run.
+    """
+    all_tables = table_names is None
+    if all_tables and schema_registry.is_ready(conn, "row_counts"):
+        return
+    conn.execute(_SCHEMA_SQL)
+    conn.execute(_DEPENDS_SCHEMA_SQL)
+    if all_tables:
+        table_names = tracked_tables()
+    complete = True
+    for table in table_names:
+        migration_name = f"row_counts:{table}"
+        if schema_registry.is_ready(conn, migration_name):
+            continue
+        if not _table_exists(conn, table):
+            complete = False
+            continue
+        _create_triggers(conn, table)
+        schema_registry.mark_ready(conn, migration_name)
+    if all_tables and complete:
+        schema_registry.mark_ready(conn, "row_counts")
+    conn.commit()
+
+
+schema_registry.register("row_counts", ensure_row_counts_schema, version=2)
+
+
+def _depends_text(tables):
+    names = sorted({str(name) for name in tables if name})
+    return "|" + "|".join(names) + "|" if names else ""
+
+
+def _depends_list(text):
+    return [name for name in str(text or "").split("|") if name]
+
+
+def query_tables(sql):
+    """Table names referenced after FROM/JOIN in ``sql`` (CTE names included)."""
+    return sorted({name.lower() for name in _TABLE_REF_RE.findall(sql or "")})
+
+
+def _invalidate_trigger_names(table):
+    return [f"lp_rc_inv_{table}_{event}" for event in ("ins", "upd", "del")]
+
+
+def _count_trigger_names(table):
+    return [f"lp_rc_cnt_{table}_{event}" for event in ("ins", "del")]
+
+
+def _existing_triggers(conn, names):
+    if not names:
+        return set()
+    marks = ", ".join("?" for _ in names)
+    rows = conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({marks})",
+        list(names),
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _table_exists(conn, table):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (table,),
+    ).fetchone()
+    return row is not None
+
+
+def _create_triggers(conn, table):
+    # Replace rather than keep: earlier versions had other trigger bodies.
+    for name in _invalidate_trigger_names(table) + _count_trigger_names(table) + [f"lp_rc_cnt_{table}_mv"]:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    invalidate = (
+        f"DELETE FROM {COUNTS_TABLE} WHERE (tbl_name, scope_key) IN ("
+        f"SELECT tbl_name, scope_key FROM {DEPENDS_TABLE} WHERE dep_table = '{table}'); "
+        f"DELETE FROM {DEPENDS_TABLE} WHERE dep_table = '{table}'; "
+    )
+    for event, name in zip(("INSERT", "UPDATE", "DELETE"), _invalidate_trigger_names(table)):
+        conn.execute(f"CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN {invalidate}END")
+    if table in COUNTED_TABLES:
+        ins_name, del_name = _count_trigger_names(table)
+        conn.execute(
+            f"CREATE TRIGGER {ins_name} AFTER INSERT ON {table} BEGIN "
+            f"UPDATE {COUNTS_TABLE} SET cnt = cnt + 1 WHERE tbl_name = '{table}' AND scope_key = 'all'; "
+            "END"
+        )
+        conn.execute(
+            f"CREATE TRIGGER {del_name} AFTER DELETE ON {table} BEGIN "
+            f"UPDATE {COUNTS_TABLE} SET cnt = cnt - 1 WHERE tbl_name = '{table}' AND scope_key = 'all'; "
+            "END"
+        )
+    # Counters stored before these triggers existed are unverifiable.
+    conn.execute(
+        f"DELETE FROM {COUNTS_TABLE} WHERE tbl_name = ? OR instr(depends, ?) > 0",
+        (table, f"|{table}|"),
+    )
+
+
+def _required_triggers(tbl_name, depends, folder_counter):
+    names = []
+    for table in depends:
+        names.extend(_invalidate_trigger_names(table))
+    if folder_counter:
+        names.extend(_count_trigger_names(tbl_name))
+    return names
+
+
+def _lookup(conn, tbl_name, scope_key):
+    try:
+        row = conn.execute(
+            f"SELECT cnt, depends FROM {COUNTS_TABLE} WHERE tbl_name = ? AND scope_key = ?",
+            (tbl_name, scope_key),
+        ).fetchone()
+    except Exception:
+        return None
+    if row is None:
+        return None
+    folder_counter = not scope_key.startswith("q:")
+    required = _required_triggers(tbl_name, _depends_list(row[1]), folder_counter)
+    if len(_existing_triggers(conn, required)) != len(required):
+        return None
+    return row[0]
+
+
+def _covered_depends(conn, tbl_name, depends, folder_counter):
+    """Existing tables among ``depends``, or None when a trigger is missing."""
+    depends = [table for table in depends if _table_exists(conn, table)]
+    required = _required_triggers(tbl_name, depends, folder_counter)
+    if len(_existing_triggers(conn, required)) != len(required):
+        return None
+    return depends
+
+
+def _store_unit(conn, tbl_name, scope_key, owner_id, area_key, depends, count_sql, params, folder_counter):
+    depends = _covered_depends(conn, tbl_name, depends, folder_counter)
+    if depends is None:
+        return _count(conn, count_sql, params)
+    conn.execute(
+        f"INSERT OR REPLACE INTO {COUNTS_TABLE} "
+        "(tbl_name, scope_key, owner_id, area_key, cnt, depends, count_sql, params_json, updated_utc) "
+        f"SELECT ?, ?, ?, ?, ({count_sql}), ?, ?, ?, ?",
+        [tbl_name, scope_key, owner_id, area_key, *params, _depends_text(depends), count_sql, json.dumps(list(params)), _utc_now()],
+    )
+    conn.executemany(
+        f"INSERT OR IGNORE INTO {DEPENDS_TABLE} (dep_table, tbl_name, scope_key) VALUES (?, ?, ?)",
+        [(table, tbl_name, scope_key) for table in depends],
+    )
+    if not folder_counter:
+        conn.execute(
+            f"DELETE FROM {COUNTS_TABLE} WHERE scope_key LIKE 'q:%' AND rowid NOT IN ("
+            f"  SELECT rowid FROM {COUNTS_TABLE} WHERE scope_key LIKE 'q:%' "
+            "  ORDER BY updated_utc DESC LIMIT ?"
+            ")",
+            (_QUERY_COUNTERS_MAX,),
+        )
+        conn.execute(
+            f"DELETE FROM {DEPENDS_TABLE} WHERE (tbl_name, scope_key) NOT IN ("
+            f"SELECT tbl_name, scope_key FROM {COUNTS_TABLE})"
+        )
+    row = conn.execute(
+        f"SELECT cnt FROM {COUNTS_TABLE} WHERE tbl_name = ? AND scope_key = ?",
+        (tbl_name, scope_key),
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def _count(conn, count_sql, params):
+    row = conn.execute(f"SELECT ({count_sql})", list(params)).fetchone()
+    return row[0] if row else 0
+
+
+def _cached(conn, tbl_name, scope_key, owner_id, area_key, depends, count_sql, params, folder_counter):
+    if not enabled():
+        return _count(conn, count_sql, params)
+    cached = _lookup(conn, tbl_name, scope_key)
+    if cached is not None:
+        return cached
+    if _covered_depends(conn, tbl_name, depends, folder_counter) is None:
+        # Not covered by the row_counts migration yet; a stored count would go stale.
+        return _count(conn, count_sql, params)
+    from common import data as db
+
+    try:
+        return db.run_write(
+            _store_unit,
+            tbl_name,
+            scope_key,
+            owner_id,
+            area_key,
+            list(depends),
+            count_sql,
+            list(params),
+            folder_counter,
+            conn=conn,
+        )
+    except Exception as exc:
+        db._log_error(None, f"row count cache store failed for {tbl_name}: {exc}")
+        return _count(conn, count_sql, params)
+
+
+def folder_count(conn, tbl_name, count_sql, params=()):
+    """``all`` counter of a folder-mapped table (see ``COUNTED_TABLES``)."""
+    return _cached(conn, tbl_name, "all", None, None, (), count_sql, list(params or []), True)
+
+
+def query_count(conn, tbl_name, count_sql, params=()):
+    """Counter for an arbitrary ``SELECT COUNT(...)`` statement."""
+    params = list(params or [])
+    digest = hashlib.sha1(
+        (count_sql + "\x00" + json.dumps(params, default=str)).encode("utf-8")
+    ).hexdigest()[:20]
+    return _cached(conn, tbl_name, f"q:{digest}", None, None, query_tables(count_sql), count_sql, params, False)
+
+
+def counter_stats(conn):
+    try:
+        row = conn.execute(
+            f"SELECT COUNT(1) AS counters, COUNT(DISTINCT tbl_name) AS tables FROM {COUNTS_TABLE}"
+        ).fetchone()
+    except Exception:
+        return {"counters": 0, "tables": 0}
+    return {"counters": row[0] or 0, "tables": row[1] or 0}
+
+
+def recount(conn):
+    """Recount every stored counter; fix and return the ones that were off."""
+    ensure_row_counts_schema(conn)
+    rows = conn.execute(
+        f"SELECT tbl_name, scope_key, cnt, count_sql, params_json FROM {COUNTS_TABLE} ORDER BY tbl_name, scope_key"
+    ).fetchall()
+    mismatches = []
+    for tbl_name, scope_key, stored, count_sql, params_json in rows:
+        try:
+            actual = _count(conn, count_sql, json.loads(params_json or "[]"))
+        except Exception as exc:
+            conn.execute(
+                f"DELETE FROM {COUNTS_TABLE} WHERE tbl_name = ? AND scope_key = ?",
+                (tbl_name, scope_key),
+            )
+            mismatches.append({"tbl_name": tbl_name, "scope_key": scope_key, "stored": stored, "actual": None, "error": str(exc)})
+            continue
+        if actual != stored:
+            conn.execute(
+                f"UPDATE {COUNTS_TABLE} SET cnt = ?, updated_utc = ? WHERE tbl_name = ? AND scope_key = ?",
+                (actual, _utc_now(), tbl_name, scope_key),
+            )
+            mismatches.append({"tbl_name": tbl_name, "scope_key": scope_key, "stored": stored, "actual": actual, "error": ""})
+    return {"checked": len(rows), "mismatches": mismatches}
@@ -0,0 +1,262 @@
+"""Process-wide registry of schema migrations.
+
+Each module registers its ``ensure_*`` function once with a name and a
+version.  The function itself starts with ``is_ready(conn, name)`` and ends
+with ``mark_ready(conn, name)``; after the first run against a database the
+check is a dictionary lookup, so callers on the request path no longer pay
+for ``PRAGMA table_info`` / ``executescript`` on every call.
+
+Applied versions are stored in ``sys_schema_migrations`` inside the database
+itself.  All connections to the same database file share one readiness map,
+and a new connection re-reads the table once so a replaced or restored file
+is never trusted from stale memory.  In-memory databases are tracked per
+connection.
+
+Change a migration's ``version`` whenever its ensure function changes so
+that existing databases run it again; any recorded version that differs from
+the registered one counts as not applied.
+
+Run all registered migrations ahead of time with::
+
+    python -m common.schema_registry
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+import importlib
+import itertools
+import os
+import sqlite3
+import sys
+import threading
+
+
+MIGRATIONS_TABLE = "sys_schema_migrations"
+
+MIGRATIONS_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+    name TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    applied_utc TEXT NOT NULL
+)
+"""
+
+# Modules that register migrations for the main database.  Importing them is
+# enough to populate the registry for the CLI.
+MIGRATION_MODULES = [
+    "common.data",
+    "common.areas",
+    "common.projects",
+    "common.collections",
+    "common.settings",
+    "common.content_catalog",
+    "common.media_schema",
+    "common.links",
+    "common.note_front_matter",
+    "common.note_search_index",
+    "common.search_doc",
+    "common.note_title_index",
+    "common.note_render_cache",
+    "common.search_cache",
+    "common.utils",
+    "modules.how.schema",
+    "modules.tasks.schema",
+    "modules.apps.schema",
+    "modules.money.dao",
+    "modules.calendar.services.calendar_index",
+    "modules.pocket_api.routes",
+    "modules.logger_api.routes",
+    "modules.audio.routes",
+    "modules.notes.routes",
+]
+
+_CONN_CACHE_MAX = 256
+
+
+class Migration:
+    __slots__ = ("name", "version", "ensure_fn", "startup")
+
+    def __init__(self, name, version, ensure_fn, startup):
+        self.name = name
+        self.version = version
+        self.ensure_fn = ensure_fn
+        self.startup = startup
+
+
+_LOCK = threading.RLock()
+_MIGRATIONS = OrderedDict()
+_APPLIED = {}
+_CONN_KEYS = OrderedDict()
+_MEMORY_IDS = itertools.count(1)
+
+
+def register(name, ensure_fn, version=1, startup=True):
+    """Register ``ensure_fn(conn)`` as migration ``name`` at ``version``.
+
+    ``startup=False`` keeps a migration out of ``run_all`` (for example one
+    that only applies to a table created later by an import).
+    """
+    with _LOCK:
+        _MIGRATIONS[name] = Migration(name, str(version), ensure_fn, startup)
+    return ensure_fn
+
+
+def registered():
+    with _LOCK:
+        return list(_MIGRATIONS.values())
+
+
+def _version(name):
+    migration = _MIGRATIONS.get(name.split(":", 1)[0])
+    return migration.version if migration else "1"
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _main_file(conn):
+    for row in conn.execute("PRAGMA database_list").fetchall():
+        if row[1] == "main":
+            return row[2] or ""
+    return ""
+
+
+def _load_applied(conn):
+    try:
+        rows = conn.execute(f"SELECT name, version FROM {MIGRATIONS_TABLE}").fetchall()
+    except sqlite3.Error:
+        return {}
+    return {row[0]: str(row[1]) for row in rows}
+
+
+def db_key(conn):
+    """Return the identity used to share readiness between connections."""
+    conn_id = id(conn)
+    with _LOCK:
+        cached = _CONN_KEYS.get(conn_id)
+        if cached is not None and cached[0] is conn:
+            return cached[1]
+    path = _main_file(conn)
+    if path:
+        key = "file:" + os.path.normcase(os.path.abspath(path))
+    else:
+        key = f"memory:{next(_MEMORY_IDS)}"
+    applied = _load_applied(conn)
+    with _LOCK:
+        # Holding the connection keeps its id from being reused while cached.
+        _CONN_KEYS[conn_id] = (conn, key)
+        while len(_CONN_KEYS) > _CONN_CACHE_MAX:
+            _CONN_KEYS.popitem(last=False)
+        _APPLIED[key] = applied
+    return key
+
+
+def is_ready(conn, name):
+    """True when migration ``name`` has been applied to ``conn``'s database."""
+    key = db_key(conn)
+    return _APPLIED.get(key, {}).get(name) == _version(name)
+
+
+def mark_ready(conn, name):
+    """Record that migration ``name`` is applied to ``conn``'s database."""
+    from common import data as db
+
+    key = db_key(conn)
+    version = _version(name)
+    conn.execute(MIGRATIONS_SCHEMA_SQL)
+    conn.execute(
+        f"INSERT OR REPLACE INTO {MIGRATIONS_TABLE} (name, version, applied_utc) VALUES (?, ?, ?)",
+        (name, version, _utc_now()),
+    )
+    db.commit(conn)
+    with _LOCK:
+        _APPLIED.setdefault(key, {})[name] = version
+
+
+def forget(conn=None):
+    """Drop cached readiness (all databases, or just ``conn``'s)."""
+    with _LOCK:
+        if conn is None:
+            _APPLIED.clear()
+            _CONN_KEYS.clear()
+            return
+        cached = _CONN_KEYS.pop(id(conn), None)
+        if cached is not None:
+            _APPLIED.pop(cached[1], None)
+
+
+def run_all(conn, force=False):
+    """Run every startup migration that is not yet applied to ``conn``.
+
+    Returns a list of ``(name, status)`` where status is ``"ran"``,
+    ``"ready"`` or ``"failed: <error>"``.
+    """
+    results = []
+    for migration in registered():
+        if not migration.startup:
+            continue
+        if force:
+            with _LOCK:
+                _APPLIED.get(db_key(conn), {}).pop(migration.name, None)
+        elif is_ready(conn, migration.name):
+            results.append((migration.name, "ready"))
+            continue
+        try:
+            migration.ensure_fn(conn)
+            results.append((migration.name, "ran"))
+        except Exception as exc:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            results.append((migration.name, f"failed: {exc}"))
+    return results
+
+
+def load_all_migrations():
+    for module_name in MIGRATION_MODULES:
+        importlib.import_module(module_name)
+
+
+def applied_versions(conn):
+    return _load_applied(conn)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply LifePIM schema migrations.")
+    parser.add_argument("--db", help="database file (defaults to config.DB_FILE)")
+    parser.add_argument("--force", action="store_true", help="re-run migrations already recorded as applied")
+    parser.add_argument("--list", action="store_true", help="show applied versions and exit")
+    args = parser.parse_args(argv)
+
+    from common import data as db
+
+    if args.db:
+        db.DB_FILE = args.db
+    load_all_migrations()
+    conn = db._get_write_conn()
+    if args.list:
+        applied = applied_versions(conn)
+        for migration in registered():
+            print(f"{migration.name:32} v{migration.version}  applied {applied.get(migration.name, '-')}")
+        return 0
+    failed = 0
+    for name, status in run_all(conn, force=args.force):
+        print(f"{name:32} {status}")
+        if status.startswith("failed"):
+            failed += 1
+    print(f"Migrated {db.DB_FILE}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # Run through the importable module so migrations registered by other
+    # modules land in the same registry as the one main() reads.
+    from common import schema_registry as _registry
+
+    sys.exit(_registry.main())
@@ -1,7 +1,17 @@
+import contextvars
+import json
+import re
+import sqlite3
+
+from markupsafe import Markup, escape
+
 from common import config as cfg
 from common import content_catalog
 from common import data
 from common import note_search_index
+from common import search_cache
+from common import search_doc
+from common import search_fanout
 from common.utils import get_table_def, get_tabs
 
 
@@ -19,7 +29,16 @@ def _table_columns(conn, table_name):
     return cols
 
 
+# Set by search_all around its fan-out so worker threads, which have no
+# request context, search as the requesting user.
+_NO_SEARCH_USER = object()
+_SEARCH_USER = contextvars.ContextVar("lp_search_user", default=_NO_SEARCH_USER)
+
+
 def _current_search_user():
+    user = _SEARCH_USER.get()
+    if user is not _NO_SEARCH_USER:
+        return user
     try:
         from flask_login import current_user
 
@@ -110,6 +129,20 @@ SEARCH_SPECS = {
 
 DEFAULT_SEARCH_ORDER = ["notes", "audio", "media", "how", "calendar", "apps"]
 
+# Routes answered from the lp_search_doc index (see common.search_doc).  Apps
+# keep their own query: it joins app actions and areas and skips disabled apps.
+SEARCH_DOC_SOURCES = {
+    "notes": {"id_col": "id", "title_col": "file_name", "area_col": "area"},
+    "audio": {"id_col": "id", "title_col": None, "area_col": "area"},
+    "calendar": {"id_col": "id", "title_col": "title", "area_col": "area"},
+    "media": {"table": "lp_media", "id_col": "media_id", "title_col": "filename", "area_col": None},
+    "how": {"table": "lp_howto", "id_col": "howto_id", "title_col": "title", "area_col": "area_id"},
+}
+
+# Trigram FTS cannot match terms shorter than three characters; those are
+# checked with LIKE against the indexed body instead.
+_TRIGRAM_MIN_TERM = 3
+
 CONTENT_CATALOG_SEARCH_SPECS = [
     {
         "table": "lp_content_kind",
@@ -173,6 +206,51 @@ def parse_search_terms(query):
     return [term for term in terms if term]
 
 
+_FTS_TOKEN_RE = re.compile(r'NEAR\([^)]*\)|"[^"]*"?|\S+')
+_SNIPPET_START = "\x02"
+_SNIPPET_END = "\x03"
+
+
+def _fts_phrase(text):
+    prefix = text.endswith("*")
+    text = text.rstrip("*").strip()
+    if not text:
+        return ""
+    phrase = '"' + text.replace('"', '""') + '"'
+    return phrase + "*" if prefix else phrase
+
+
+def fts_match_query(query):
+    """Translate a search box query into an FTS5 MATCH expression.
+
+    Words and quoted phrases become quoted FTS phrases (so punctuation never
+    reaches the FTS parser), a trailing ``*`` keeps prefix matching and
+    ``NEAR(a b, 5)`` groups pass through with their terms quoted.
+    """
+    parts = []
+    for token in _FTS_TOKEN_RE.findall(query or ""):
+        if token.startswith("NEAR(") and token.endswith(")"):
+            words, _, distance = token[5:-1].partition(",")
+            phrases = [phrase for phrase in (_fts_phrase(word) for word in parse_search_terms(words)) if phrase]
+            if not phrases:
+                continue
+            distance = distance.strip()
+            suffix = f", {int(distance)}" if distance.isdigit() else ""
+            parts.append(f"NEAR({' '.join(phrases)}{suffix})")
+        else:
+            phrase = _fts_phrase(token.strip('"') if token.startswith('"') else token)
+            if phrase:
+                parts.append(phrase)
+    return " ".join(parts)
+
+
+def _fts_snippet_text(value):
+    value = value or ""
+    plain = value.replace(_SNIPPET_START, "").replace(_SNIPPET_END, "")
+    html = str(escape(value)).replace(_SNIPPET_START, "<mark>").replace(_SNIPPET_END, "</mark>")
+    return plain, Markup(html)
+
+
 def _build_snippet(value, terms, max_len=80):
     text = value or ""
     text_lower = text.lower()
@@ -387,6 +465,62 @@ def _search_media(terms, limit=None):
     return results, has_more
 
 
+def _note_content_result(item, snippet, snippet_html=None):
+    return {
+        "table": "Notes",
+        "route": "notes",
+        "id": item.get("note_id"),
+        "area": item.get("area") or "",
+        "match_field": "content",
+        "match_value": snippet,
+        "match_snippet": snippet,
+        "match_html": snippet_html,
+        "view_route": "notes.view_note_route",
+        "id_param": "note_id",
+        "record_type": ROUTE_RECORD_TYPE.get("notes", ""),
+        "title": item.get("title") or "",
+    }
+
+
+def _search_note_content_fts(match_query, limit=None):
+    """bm25-ranked FTS5 search; None when FTS is unavailable or the query is
+    rejected, so the caller can fall back to the LIKE scan."""
+    conn = note_search_index.ensure_schema()
+    if not match_query or not note_search_index.fts_available(conn):
+        return None
+    fts = note_search_index.FTS_TABLE
+    snippet_len = getattr(cfg, "SEARCH_CONTENT_SNIPPET_LEN", 200)
+    snippet_tokens = max(4, min(64, int(snippet_len) // 6))
+    visibility_clause, visibility_params = _visible_table_condition(conn, "lp_notes", "n")
+    fetch_limit = int(limit) + 1 if limit else None
+    sql = (
+        "SELECT idx.note_id, idx.title, idx.file_path, n.area, "
+        f"snippet({fts}, -1, '{_SNIPPET_START}', '{_SNIPPET_END}', '...', {snippet_tokens}) AS snippet "
+        f"FROM {fts} "
+        f"JOIN lp_note_search_index idx ON idx.note_id = {fts}.rowid "
+        "LEFT JOIN lp_notes n ON n.id = idx.note_id "
+        f"WHERE {fts} MATCH ? AND ({visibility_clause}) "
+        f"ORDER BY bm25({fts}, 5.0, 1.0), idx.title"
+    )
+    params = [match_query, *visibility_params]
+    if fetch_limit:
+        sql += " LIMIT ?"
+        params.append(fetch_limit)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    has_more = bool(fetch_limit and len(rows) > limit)
+    if has_more:
+        rows = rows[:limit]
+    results = []
+    for row in rows:
+        item = dict(row)
+        snippet, snippet_html = _fts_snippet_text(item.get("snippet"))
+        results.append(_note_content_result(item, snippet, snippet_html))
+    return results, has_more
+
+
 def _search_note_content_index(terms, area=None, route=None, limit=None):
     note_search_index.ensure_schema()
     conn = data._get_conn()
@@ -419,33 +553,31 @@ def _search_note_content_index(terms, area=None, route=None, limit=None):
         item = dict(row)
         snippet_len = getattr(cfg, "SEARCH_CONTENT_SNIPPET_LEN", 200)
         snippet = _build_snippet(item.get("content_text") or "", terms, max_len=snippet_len)
-        results.append(
-            {
-                "table": "Notes",
-                "route": "notes",
-                "id": item.get("note_id"),
-                "area": item.get("area") or "",
-                "match_field": "content",
-                "match_value": snippet,
-                "match_snippet": snippet,
-                "view_route": "notes.view_note_route",
-                "id_param": "note_id",
-                "record_type": ROUTE_RECORD_TYPE.get("notes", ""),
-                "title": item.get("title") or "",
-            }
-        )
+        results.append(_note_content_result(item, snippet))
     return results, has_more
 
 
+def _note_content_matches(query, terms, area, route, limit):
+    found = _search_note_content_fts(fts_match_query(query), limit=limit)
+    if found is None:
+        terms = [term.lower().rstrip("*") for term in terms if term.rstrip("*")]
+        found = _search_note_content_index(terms, area=area, route=route, limit=limit)
+    return found
+
+
 def search_note_content(query, area=None, route=None, limit=100):
     terms = parse_search_terms(query)
     if not terms:
         return {"primary": [], "secondary": [], "more": []}
-    terms = [term.lower() for term in terms]
-    results, has_more = _search_note_content_index(terms, area=area, route=route, limit=limit)
+    results, has_more = search_cache.cached(
+        ("note_content", search_user_key(), query, area, route, limit),
+        ["lp_note_search_index", "lp_notes"],
+        lambda: _note_content_matches(query, terms, area, route, limit),
+    )
     primary = []
     secondary = []
     for result in results:
+        result = dict(result)
         matches_area = bool(area) and result.get("area") == area
         matches_route = bool(route) and result.get("route") == route
         if matches_area or matches_route:
@@ -609,46 +741,296 @@ def _search_apps(terms, limit=None):
     return results, has_more
 
 
-def search_all(query, area=None, route=None, primary_limit=100, secondary_limit=20):
-    terms = parse_search_terms(query)
-    if not terms:
-        return {"primary": [], "secondary": [], "more": []}
-    terms = [term.lower() for term in terms]
-    primary = []
-    secondary = []
-    more = []
-    visible_routes = _visible_search_routes()
-    search_order = [route_name for route_name in DEFAULT_SEARCH_ORDER if not visible_routes or route_name in visible_routes]
-    current_route = route if route in SEARCH_SPECS else ""
-    catalog_results, catalog_has_more = _search_content_catalog(terms, limit=secondary_limit)
-    primary.extend(catalog_results)
-    if catalog_has_more:
-        more.append(
+
+def _search_doc_sources():
+    sources = {}
+    for route_name, source in SEARCH_DOC_SOURCES.items():
+        source = dict(source, columns=SEARCH_SPECS[route_name]["columns"])
+        if "table" not in source:
+            tbl = get_table_def(route_name)
+            if not tbl:
+                continue
+            source["table"] = tbl["name"]
+            source["columns"] = [col for col in source["columns"] if col in tbl["col_list"]]
+        sources[route_name] = source
+    return sources
+
+
+def _doc_match_query(terms):
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def doc_match_condition(conn, route_name, terms, id_expr):
+    """SQL keeping the ``route_name`` records whose search document has every term.
+
+    ``id_expr`` is the record id column of the caller's query.  Returns
+    ``(sql, params)``, or None when the route is not in lp_search_doc (no
+    FTS5, missing table) and the caller has to match terms itself.
+    """
+    sources = {name: source for name, source in _search_doc_sources().items() if name == route_name}
+    if route_name not in search_doc.ensure_current(conn, sources):
+        return None
+    match_terms = [term for term in terms if len(term) >= _TRIGRAM_MIN_TERM]
+    short_terms = [term for term in terms if len(term) < _TRIGRAM_MIN_TERM]
+    if match_terms:
+        sql = (
+            f"{id_expr} IN (SELECT d.record_id FROM {search_doc.FTS_TABLE} f "
+            f"JOIN {search_doc.DOC_TABLE} d ON d.doc_id = f.rowid "
+            f"WHERE {search_doc.FTS_TABLE} MATCH ? AND d.route = ?"
+        )
+        params = [_doc_match_query(match_terms), route_name]
+    else:
+        sql = f"{id_expr} IN (SELECT d.record_id FROM {search_doc.DOC_TABLE} d WHERE d.route = ?"
+        params = [route_name]
+    for term in short_terms:
+        sql += " AND d.body LIKE ?"
+        params.append(f"%{term}%")
+    return sql + ")", params
+
+
+def _search_docs(conn, terms, route_limits, sources):
+    """Search the indexed routes in ``route_limits`` with one ranked query.
+
+    Returns ``{route: (results, has_more)}`` shaped like ``_search_route``.
+    """
+    match_terms = [term for term in terms if len(term) >= _TRIGRAM_MIN_TERM]
+    short_terms = [term for term in terms if len(term) < _TRIGRAM_MIN_TERM]
+    params = []
+    if match_terms:
+        source_sql = (
+            f"SELECT d.*, bm25({search_doc.FTS_TABLE}, 2.0, 1.0) AS score "
+            f"FROM {search_doc.FTS_TABLE} f JOIN {search_doc.DOC_TABLE} d ON d.doc_id = f.rowid "
+            f"WHERE {search_doc.FTS_TABLE} MATCH ?"
+        )
+        params.append(_doc_match_query(match_terms))
+    else:
+        source_sql = f"SELECT d.*, 0.0 AS score FROM {search_doc.DOC_TABLE} d WHERE 1=1"
+    for term in short_terms:
+        source_sql += " AND d.body LIKE ?"
+        params.append(f"%{term}%")
+    route_clauses = []
+    for route_name in route_limits:
+        if route_name == "how":
+            visibility_clause, visibility_params = "1=1", []
+        else:
+            visibility_clause, visibility_params = _visible_table_condition(conn, sources[route_name]["table"], "d")
+        route_clauses.append(f"(d.route = ? AND {visibility_clause})")
+        params.append(route_name)
+        params.extend(visibility_params)
+    source_sql += " AND (" + " OR ".join(route_clauses) + ")"
+    limit_cases = []
+    limit_params = []
+    for route_name, limit in route_limits.items():
+        limit_cases.append("WHEN ? THEN ?")
+        limit_params.extend([route_name, int(limit) + 1 if limit else None])
+    sql = (
+        "SELECT route, record_id, area, title, fields_json FROM ("
+        "SELECT s.*, ROW_NUMBER() OVER (PARTITION BY s.route ORDER BY s.score, lower(s.title), s.record_id) AS rn, "
+        f"CASE s.route {' '.join(limit_cases)} END AS route_limit "
+        f"FROM ({source_sql}) s) "
+        "WHERE route_limit IS NULL OR rn <= route_limit "
+        "ORDER BY route, rn"
+    )
+    rows = conn.execute(sql, limit_params + params).fetchall()
+    found = {route_name: ([], False) for route_name in route_limits}
+    for row in rows:
+        route_name = row["route"]
+        limit = route_limits[route_name]
+        results, has_more = found[route_name]
+        if limit and len(results) >= limit:
+            found[route_name] = (results, True)
+            continue
+        item = json.loads(row["fields_json"] or "{}")
+        columns = [col for col in SEARCH_SPECS[route_name]["columns"] if col in item]
+        match_field = _find_match_field(item, terms, columns)
+        match_value = item.get(match_field) or ""
+        spec = SEARCH_SPECS[route_name]
+        if route_name == "how":
+            label = "How"
+        else:
+            tbl = get_table_def(route_name)
+            label = (tbl.get("display_name") if tbl else None) or route_name.title()
+        results.append(
             {
-                "route": "home",
-                "table": "Content Catalog",
-                "view_route": "admin.content_catalog_route",
+                "table": label,
+                "route": route_name,
+                "id": row["record_id"],
+                "area": row["area"] or "",
+                "match_field": match_field,
+                "match_value": match_value,
+                "match_snippet": _build_snippet(match_value, terms),
+                "view_route": spec["view_route"],
+                "id_param": spec["id_param"],
+                "record_type": "howto" if route_name == "how" else ROUTE_RECORD_TYPE.get(route_name, ""),
+                "title": row["title"] or "",
             }
         )
-    if current_route and current_route in search_order:
-        search_order.remove(current_route)
-        search_order.insert(0, current_route)
-    elif current_route:
-        search_order.insert(0, current_route)
+    return found
+
+
+
+def _prepare_indexed_routes(search_order):
+    """Bring lp_search_doc up to date; return its sources and the indexed routes."""
+    conn = data._get_conn()
+    if "how" in search_order:
+        try:
+            from modules.how.schema import ensure_how_schema
+
+            ensure_how_schema(conn)
+        except Exception:
+            pass
+    sources = {route_name: source for route_name, source in _search_doc_sources().items() if route_name in search_order}
+    return sources, search_doc.ensure_current(conn, sources)
+
+
+def _search_indexed_routes(terms, route_names, limit, sources):
+    """Answer ``route_names`` from lp_search_doc, per route when the index fails."""
+    try:
+        return _search_docs(data._get_conn(), terms, {route_name: limit for route_name in route_names}, sources)
+    except sqlite3.Error as exc:
+        data._log_error(None, f"search document query failed: {exc}")
+        return {route_name: _search_route(route_name, terms, limit) for route_name in route_names}
+
+
+def _search_cache_tables(route_names):
+    tables = []
+    for route_name in route_names:
+        if route_name == "how":
+            tables.append("lp_howto")
+        elif route_name == "apps":
+            tables.extend(["lp_app", "lp_app_action", "lp_app_area"])
+        elif route_name == "media":
+            tables.append("lp_media")
+        else:
+            tbl = get_table_def(route_name)
+            if tbl:
+                tables.append(tbl["name"])
+    return tables
+
+
+def search_user_key():
+    """The signed-in user's id (None when anonymous), for search cache keys."""
+    user = _current_search_user()
+    return getattr(user, "user_id", None) if user is not None else None
+
+
+def _search_sources(terms, search_order, limit, catalog_limit):
+    """Fan-out jobs for ``terms``: ``(jobs, routes answered by each source)``.
+
+    The indexed routes share one source, every other route and the content
+    catalog get their own.  Each job returns ``{route: (results, has_more)}``
+    (``"catalog"`` for the catalog) and caches it against the tables it reads,
+    independent of the current route and area, so switching the route tab on
+    the search page reuses the same lists.
+    """
+    user_key = search_user_key()
+    term_key = tuple(terms)
+    doc_sources, indexed = _prepare_indexed_routes(search_order)
+    indexed_routes = [route_name for route_name in search_order if route_name in indexed]
+    jobs = []
+    source_routes = {}
+
+    def add(name, routes, key, tables, compute):
+        source_routes[name] = routes
+        jobs.append((name, lambda: search_cache.cached(key, tables, compute)))
+
+    if indexed_routes:
+        add(
+            "index",
+            indexed_routes,
+            ("search_docs", user_key, term_key, tuple(indexed_routes), limit),
+            _search_cache_tables(indexed_routes),
+            lambda: _search_indexed_routes(terms, indexed_routes, limit, doc_sources),
+        )
+    for route_name in search_order:
+        if route_name in indexed:
+            continue
+        add(
+            route_name,
+            [route_name],
+            ("route", user_key, route_name, term_key, limit),
+            _search_cache_tables([route_name]),
+            lambda route_name=route_name: {route_name: _search_route(route_name, terms, limit)},
+        )
+    add(
+        "catalog",
+        ["catalog"],
+        ("catalog", user_key, term_key, catalog_limit),
+        [spec["table"] for spec in CONTENT_CATALOG_SEARCH_SPECS],
+        lambda: {"catalog": _search_content_catalog(terms, limit=catalog_limit)},
+    )
+    return jobs, source_routes
+
+
+def _route_display_name(route_name):
+    if route_name == "catalog":
+        return "Content Catalog"
+    tbl = get_table_def(route_name)
+    return (tbl.get("display_name") if tbl else None) or route_name.title()
+
+
+def _pending_markers(names, source_routes):
+    markers = []
+    for name in names:
+        routes = source_routes.get(name) or [name]
+        markers.append(
+            {
+                "source": name,
+                "routes": list(routes),
+                "table": ", ".join(_route_display_name(route_name) for route_name in routes),
+            }
+        )
+    return markers
+
+
+def _merge_source_results(finished):
+    merged = {}
+    for value in finished.values():
+        # A failed source (None) simply contributes no results.
+        merged.update(value or {})
+    return merged
+
+
+def _assemble_results(merged, search_order, area, route, primary_limit, secondary_limit):
+    """Split per-route results into primary/secondary lists and "more" links.
+
+    ``search_order`` starts with the current route, which gets
+    ``primary_limit`` rows; routes missing from ``merged`` are skipped.
+    """
+    current_route = route if route in SEARCH_SPECS else ""
+    primary = []
+    secondary = []
+    more = []
+    if "catalog" in merged:
+        catalog_results, catalog_has_more = merged["catalog"]
+        primary.extend(dict(result) for result in catalog_results)
+        if catalog_has_more:
+            more.append(
+                {
+                    "route": "home",
+                    "table": "Content Catalog",
+                    "view_route": "admin.content_catalog_route",
+                }
+            )
     for route_name in search_order:
+        if route_name not in merged:
+            continue
         limit = primary_limit if route_name == current_route else secondary_limit
-        route_results, has_more = _search_route(route_name, terms, limit)
+        route_results, has_more = merged[route_name]
+        if limit and len(route_results) > limit:
+            route_results = route_results[:limit]
+            has_more = True
         if has_more:
             spec = SEARCH_SPECS[route_name]
-            tbl = get_table_def(route_name)
             more.append(
                 {
                     "route": route_name,
-                    "table": (tbl.get("display_name") if tbl else None) or route_name.title(),
+                    "table": _route_display_name(route_name),
                     "view_route": spec["view_route"],
                 }
             )
         for result in route_results:
+            result = dict(result)
             matches_area = bool(area) and result.get("area") == area
             matches_route = bool(route) and (result.get("route") == route)
             if matches_area or matches_route:
@@ -662,3 +1044,78 @@ def search_all(query, area=None, route=None, primary_limit=100, secondary_limit=
         "secondary": secondary,
         "more": more,
     }
+
+
+def search_all(query, area=None, route=None, primary_limit=100, secondary_limit=20):
+    """Search every visible route for ``query``.
+
+    Sources run through ``common.search_fanout``; any still running when their
+    budget is spent are listed under ``"pending"`` and can be fetched with
+    ``collect_pending_results(result["pending_token"])``.
+    """
+    terms = parse_search_terms(query)
+    if not terms:
+        return {"primary": [], "secondary": [], "more": [], "pending": [], "pending_token": ""}
+    terms = [term.lower() for term in terms]
+    visible_routes = _visible_search_routes()
+    search_order = [route_name for route_name in DEFAULT_SEARCH_ORDER if not visible_routes or route_name in visible_routes]
+    current_route = route if route in SEARCH_SPECS else ""
+    if current_route and current_route not in search_order:
+        search_order.insert(0, current_route)
+    fetch_limit = max(primary_limit, secondary_limit) if primary_limit and secondary_limit else None
+    jobs, source_routes = _search_sources(terms, search_order, fetch_limit, secondary_limit)
+    # Worker threads have no request context; hand them the resolved user.
+    user = _current_search_user()
+    user_token = _SEARCH_USER.set(getattr(user, "_get_current_object", lambda: user)())
+    try:
+        finished, pending = search_fanout.run(jobs)
+    finally:
+        _SEARCH_USER.reset(user_token)
+    if current_route:
+        search_order.remove(current_route)
+        search_order.insert(0, current_route)
+    results = _assemble_results(
+        _merge_source_results(finished), search_order, area, route, primary_limit, secondary_limit
+    )
+    results["pending"] = _pending_markers(pending, source_routes)
+    results["pending_token"] = ""
+    if pending:
+        results["pending_token"] = search_fanout.register_pending(
+            search_user_key(),
+            pending,
+            {
+                "search_order": search_order,
+                "source_routes": source_routes,
+                "area": area,
+                "route": route,
+                "primary_limit": primary_limit,
+                "secondary_limit": secondary_limit,
+            },
+        )
+    return results
+
+
+def collect_pending_results(token, timeout=None):
+    """Results of the sources ``search_all`` left running under ``token``.
+
+    Waits up to ``timeout`` seconds (``search_fanout.POLL_WAIT_SECONDS`` by
+    default) and returns the ``search_all`` shape for the sources that
+    finished - ``"pending"`` lists those still running - or None when the
+    token is unknown, expired or belongs to another user.
+    """
+    if timeout is None:
+        timeout = search_fanout.POLL_WAIT_SECONDS
+    collected = search_fanout.collect_pending(token, search_user_key(), timeout=timeout)
+    if collected is None:
+        return None
+    finished, still_pending, context = collected
+    results = _assemble_results(
+        _merge_source_results(finished),
+        context["search_order"],
+        context["area"],
+        context["route"],
+        context["primary_limit"],
+        context["secondary_limit"],
+    )
+    results["pending"] = _pending_markers(still_pending, context["source_routes"])
+    return results
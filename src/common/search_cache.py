@@ -0,0 +1,239 @@
+"""Search result cache checked against per-table generation counters.
+
+Paging, sorting and switching the route tab on ``/search`` repeat the same
+searches.  Results are kept in a process-wide LRU (bounded by entry count and
+an approximate memory size) keyed on the caller's key - user, query, area,
+route, scope - and stored with the generation of every table they were read
+from.
+
+``lp_table_generation`` holds one counter per table, bumped by triggers on
+every insert, update and delete, so every write path invalidates the entries
+that depend on the table without knowing about the cache.  A lookup reads the
+counters of the entry's tables in one query and treats any difference as a
+miss.
+
+Cached values are shared between requests: treat them as read-only.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import sqlite3
+import sys
+import threading
+
+from common import config as cfg
+from common import schema_registry
+
+
+GENERATION_TABLE = "lp_table_generation"
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {GENERATION_TABLE} (
+    tbl_name    TEXT PRIMARY KEY,
+    generation  INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+_MISSING = object()
+
+
+def enabled():
+    return bool(getattr(cfg, "SEARCH_CACHE_ENABLED", True))
+
+
+def _max_entries():
+    try:
+        return max(1, int(getattr(cfg, "SEARCH_CACHE_MAX_ENTRIES", 256) or 1))
+    except (TypeError, ValueError):
+        return 256
+
+
+def _max_bytes():
+    try:
+        return max(1, int(float(getattr(cfg, "SEARCH_CACHE_MAX_MB", 32) or 1) * 1024 * 1024))
+    except (TypeError, ValueError):
+        return 32 * 1024 * 1024
+
+
+def ensure_table_generation_schema(conn):
+    if schema_registry.is_ready(conn, "table_generation"):
+        return
+    conn.execute(_SCHEMA_SQL)
+    schema_registry.mark_ready(conn, "table_generation")
+
+
+schema_registry.register("table_generation", ensure_table_generation_schema, version=1)
+
+
+def _trigger_names(table):
+    return [f"lp_gen_{table}_{event}" for event in ("ins", "upd", "del")]
+
+
+def _create_generation_triggers(conn, tables):
+    for table in tables:
+        bump = (
+            f"INSERT INTO {GENERATION_TABLE} (tbl_name, generation) VALUES ('{table}', 1) "
+            "ON CONFLICT(tbl_name) DO UPDATE SET generation = generation + 1;"
+        )
+        ins_name, upd_name, del_name = _trigger_names(table)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {ins_name} AFTER INSERT ON {table} BEGIN {bump} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {upd_name} AFTER UPDATE ON {table} BEGIN {bump} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {del_name} AFTER DELETE ON {table} BEGIN {bump} END")
+        # Anything cached before the triggers existed is unverifiable.
+        conn.execute(bump.rstrip(";"))
+
+
+def table_generations(conn, tables):
+    """Generation of each table in ``tables`` (0 for missing tables).
+
+    Creates the counting triggers on first use of an existing table.
+    """
+    ensure_table_generation_schema(conn)
+    tables = sorted(set(tables))
+    marks = ", ".join("?" for _ in tables)
+    names = [name for table in tables for name in _trigger_names(table)]
+    rows = conn.execute(
+        "SELECT tbl_name, name FROM sqlite_master "
+        f"WHERE (type = 'trigger' AND name IN ({', '.join('?' for _ in names)})) "
+        f"OR (type = 'table' AND name IN ({marks}))",
+        [*names, *tables],
+    ).fetchall()
+    existing_tables = {row[1] for row in rows if row[0] == row[1]}
+    triggered = {}
+    for row in rows:
+        if row[0] != row[1]:
+            triggered[row[0]] = triggered.get(row[0], 0) + 1
+    untracked = [table for table in tables if table in existing_tables and triggered.get(table, 0) < 3]
+    if untracked:
+        from common import data as db
+
+        db.run_write(_create_generation_triggers, untracked, conn=conn)
+    counters = {
+        row[0]: row[1]
+        for row in conn.execute(
+            f"SELECT tbl_name, generation FROM {GENERATION_TABLE} WHERE tbl_name IN ({marks})",
+            tables,
+        ).fetchall()
+    }
+    return tuple((table, counters.get(table, 0) if table in existing_tables else None) for table in tables)
+
+
+def _approx_size(value, depth=0):
+    size = sys.getsizeof(value)
+    if depth > 6:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += _approx_size(key, depth + 1) + _approx_size(item, depth + 1)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            size += _approx_size(item, depth + 1)
+    return size
+
+
+class SearchResultCache:
+    """LRU of search results bounded by entry count and approximate bytes."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key, generations):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            if entry[0] != generations:
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, generations, value):
+        size = _approx_size(value)
+        max_bytes = _max_bytes()
+        if size > max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (generations, value, size)
+            self._bytes += size
+            max_entries = _max_entries()
+            while self._entries and (len(self._entries) > max_entries or self._bytes > max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.stale = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": enabled(),
+                "entries": len(self._entries),
+                "max_entries": _max_entries(),
+                "bytes": self._bytes,
+                "max_bytes": _max_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits * 100.0 / lookups, 1) if lookups else 0.0,
+            }
+
+
+_CACHE = SearchResultCache()
+
+
+def cached(key, tables, compute, conn=None):
+    """Return ``compute()``, reusing the value cached under ``key``.
+
+    ``tables`` lists every table the computation reads; a write to any of
+    them invalidates the entry.
+    """
+    if not enabled():
+        return compute()
+    from common import data as db
+
+    conn = db._get_conn() if conn is None else conn
+    try:
+        generations = table_generations(conn, tables)
+    except sqlite3.Error:
+        return compute()
+    full_key = (schema_registry.db_key(conn), key)
+    value = _CACHE.get(full_key, generations)
+    if value is not _MISSING:
+        return value
+    # Generations are read before computing, so a write racing the search
+    # makes the next lookup miss rather than serve stale results.
+    value = compute()
+    _CACHE.put(full_key, generations, value)
+    return value
+
+
+def stats():
+    return _CACHE.stats()
+
+
+def clear():
+    _CACHE.clear()
@@ -0,0 +1,280 @@
+"""Unified search documents for global search.
+
+Global search used to run one ``lower(col) LIKE '%term%'`` query per route,
+each ORing every searchable column, so a single search scanned every record
+table in full.  ``lp_search_doc`` holds one row per searchable record - route,
+record id, owner/visibility columns, area, title and the searched text - and
+``lp_search_doc_fts`` indexes its title and body so ``search.search_all`` can
+answer every route with one ranked query.
+
+The documents are maintained by triggers on the source tables, so every
+writer (``data.add_record``/``update_record``, the scanners, module DAOs and
+imports) keeps them current without hooks.  A source is described by a dict::
+
+    {"table": "lp_notes", "id_col": "id", "title_col": "file_name",
+     "area_col": "area", "columns": ["file_name", "path"]}
+
+``ensure_current`` creates the triggers and backfills a route the first time
+it is seen, and again whenever the indexed columns of its table change (a
+migration adding ``owner_user_id`` must reach the stored visibility).
+
+The FTS table uses the ``trigram`` tokenizer so that a term matches anywhere
+inside a word, as the old ``LIKE '%term%'`` scans did.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+from common import schema_registry
+
+
+DOC_TABLE = "lp_search_doc"
+FTS_TABLE = "lp_search_doc_fts"
+SOURCE_TABLE = "lp_search_doc_source"
+
+# Copied from the source row when present so visibility can be checked on the
+# document itself.
+VISIBILITY_COLUMNS = ("owner_user_id", "visibility", "is_public")
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {DOC_TABLE} (
+    doc_id         INTEGER PRIMARY KEY,
+    route          TEXT NOT NULL,
+    record_id      INTEGER NOT NULL,
+    owner_user_id  INTEGER,
+    visibility     TEXT,
+    is_public      INTEGER,
+    area           TEXT,
+    title          TEXT,
+    body           TEXT,
+    fields_json    TEXT,
+    UNIQUE (route, record_id)
+);
+
+CREATE TABLE IF NOT EXISTS {SOURCE_TABLE} (
+    route          TEXT PRIMARY KEY,
+    source_table   TEXT NOT NULL,
+    signature      TEXT NOT NULL
+);
+"""
+
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, body,
+        content='{DOC_TABLE}', content_rowid='doc_id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (NEW.doc_id, NEW.title, NEW.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', OLD.doc_id, OLD.title, OLD.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', OLD.doc_id, OLD.title, OLD.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (NEW.doc_id, NEW.title, NEW.body);
+    END
+    """,
+]
+
+
+def ensure_search_doc_schema(conn):
+    """Create the document tables; False when FTS5/trigram is unavailable."""
+    if schema_registry.is_ready(conn, "search_doc"):
+        return True
+    conn.executescript(_SCHEMA_SQL)
+    try:
+        for statement in FTS_SCHEMA:
+            conn.execute(statement)
+    except sqlite3.OperationalError:
+        # SQLite without FTS5 or the trigram tokenizer (3.34+); global search
+        # keeps its per-route LIKE queries.
+        return False
+    schema_registry.mark_ready(conn, "search_doc")
+    return True
+
+
+schema_registry.register("search_doc", ensure_search_doc_schema, version=1)
+
+
+def _trigger_names(table):
+    return [f"lp_sd_{table}_{event}" for event in ("ins", "upd", "del")]
+
+
+def _existing_triggers(conn, names):
+    if not names:
+        return set()
+    marks = ", ".join("?" for _ in names)
+    rows = conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({marks})",
+        list(names),
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _table_columns(conn, table):
+    try:
+        return {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    except Exception:
+        return set()
+
+
+def _plan(conn, route, source):
+    """Resolve a source against its table; None when it cannot be indexed."""
+    table = source.get("table")
+    table_cols = _table_columns(conn, table) if table else set()
+    if source.get("id_col") not in table_cols:
+        return None
+    columns = [col for col in source.get("columns") or [] if col in table_cols]
+    if not columns:
+        return None
+    title_col = source.get("title_col") if source.get("title_col") in table_cols else None
+    area_col = source.get("area_col") if source.get("area_col") in table_cols else None
+    visibility_cols = [col for col in VISIBILITY_COLUMNS if col in table_cols]
+    plan = {
+        "route": route,
+        "table": table,
+        "id_col": source["id_col"],
+        "title_col": title_col,
+        "area_col": area_col,
+        "columns": columns,
+        "visibility_cols": visibility_cols,
+    }
+    plan["signature"] = "|".join(
+        [table, plan["id_col"], title_col or "", area_col or "", ",".join(columns), ",".join(visibility_cols)]
+    )
+    return plan
+
+
+def _doc_values(plan, ref):
+    """Column list and value expressions for a document built from ``ref``."""
+    route = plan["route"].replace("'", "''")
+    exprs = {
+        "route": f"'{route}'",
+        "record_id": f"{ref}.{plan['id_col']}",
+        "area": f"{ref}.{plan['area_col']}" if plan["area_col"] else "NULL",
+        "title": f"{ref}.{plan['title_col']}" if plan["title_col"] else "NULL",
+        "body": " || char(10) || ".join(f"COALESCE({ref}.{col}, '')" for col in plan["columns"]),
+        "fields_json": "json_object(" + ", ".join(f"'{col}', {ref}.{col}" for col in plan["columns"]) + ")",
+    }
+    for col in VISIBILITY_COLUMNS:
+        exprs[col] = f"{ref}.{col}" if col in plan["visibility_cols"] else "NULL"
+    names = list(exprs)
+    return names, [exprs[name] for name in names]
+
+
+def _upsert_sql(plan, ref):
+    names, values = _doc_values(plan, ref)
+    updates = ", ".join(f"{name} = excluded.{name}" for name in names if name not in ("route", "record_id"))
+    return (
+        f"INSERT INTO {DOC_TABLE} ({', '.join(names)}) VALUES ({', '.join(values)}) "
+        f"ON CONFLICT(route, record_id) DO UPDATE SET {updates}"
+    )
+
+
+def _drop_triggers(conn, table):
+    for name in _trigger_names(table):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def _create_triggers(conn, plan):
+    table = plan["table"]
+    route = plan["route"].replace("'", "''")
+    ins_name, upd_name, del_name = _trigger_names(table)
+    watched = list(
+        dict.fromkeys(
+            [plan["id_col"]]
+            + plan["columns"]
+            + [col for col in (plan["title_col"], plan["area_col"]) if col]
+            + plan["visibility_cols"]
+        )
+    )
+    delete_old = f"DELETE FROM {DOC_TABLE} WHERE route = '{route}' AND record_id = OLD.{plan['id_col']}"
+    upsert_new = _upsert_sql(plan, "NEW")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {ins_name} AFTER INSERT ON {table} BEGIN {upsert_new}; END")
+    conn.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {upd_name} AFTER UPDATE OF {', '.join(watched)} ON {table} BEGIN "
+        f"{delete_old} AND OLD.{plan['id_col']} IS NOT NEW.{plan['id_col']}; {upsert_new}; END"
+    )
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS {del_name} AFTER DELETE ON {table} BEGIN {delete_old}; END")
+
+
+def _rebuild_route(conn, plan):
+    names, values = _doc_values(plan, "t")
+    conn.execute(f"DELETE FROM {DOC_TABLE} WHERE route = ?", (plan["route"],))
+    conn.execute(
+        f"INSERT INTO {DOC_TABLE} ({', '.join(names)}) "
+        f"SELECT {', '.join(values)} FROM {plan['table']} t WHERE t.{plan['id_col']} IS NOT NULL"
+    )
+
+
+def _sync_unit(conn, plans):
+    for plan in plans:
+        old = conn.execute(
+            f"SELECT source_table FROM {SOURCE_TABLE} WHERE route = ?",
+            (plan["route"],),
+        ).fetchone()
+        if old is not None:
+            _drop_triggers(conn, old[0])
+        _drop_triggers(conn, plan["table"])
+        _create_triggers(conn, plan)
+        _rebuild_route(conn, plan)
+        conn.execute(
+            f"INSERT INTO {SOURCE_TABLE} (route, source_table, signature) VALUES (?, ?, ?) "
+            "ON CONFLICT(route) DO UPDATE SET source_table = excluded.source_table, signature = excluded.signature",
+            (plan["route"], plan["table"], plan["signature"]),
+        )
+    return len(plans)
+
+
+def _stale_plans(conn, plans):
+    names = []
+    for plan in plans:
+        names.extend(_trigger_names(plan["table"]))
+    existing = _existing_triggers(conn, names)
+    signatures = {
+        row[0]: row[1]
+        for row in conn.execute(f"SELECT route, signature FROM {SOURCE_TABLE}").fetchall()
+    }
+    return [
+        plan
+        for plan in plans
+        if signatures.get(plan["route"]) != plan["signature"]
+        or not set(_trigger_names(plan["table"])) <= existing
+    ]
+
+
+def ensure_current(conn, sources):
+    """Make sure every route in ``sources`` is indexed; return the indexed routes.
+
+    Routes whose table is missing (or lacks the id and searched columns) are
+    left out, as is everything when FTS5 is unavailable - callers search those
+    routes the old way.  Cheap once the triggers exist: one ``sqlite_master``
+    lookup and a read of ``lp_search_doc_source``.
+    """
+    if not ensure_search_doc_schema(conn):
+        return set()
+    plans = [plan for plan in (_plan(conn, route, source) for route, source in sources.items()) if plan]
+    if not plans:
+        return set()
+    from common import data as db
+
+    try:
+        stale = _stale_plans(conn, plans)
+        if stale:
+            db.run_write(_sync_unit, stale, conn=conn)
+    except Exception as exc:
+        db._log_error(None, f"search document refresh failed: {exc}")
+        return set()
+    return {plan["route"] for plan in plans}
+
@@ -0,0 +1,175 @@
+"""Run independent search sources in parallel under a time budget.
+
+``search.search_all`` splits a global search into sources (the unified
+document index, apps, the content catalog and any route searched on its
+own).  Run one after another, the slowest source set the latency of the
+whole page.  ``run`` hands them to a small thread pool - each job leases its
+own read connection from the ``data`` pool - and waits for each source up to
+its budget.  Sources still running are returned as futures; ``search_all``
+registers them with ``register_pending`` and the page fetches them later
+through ``collect_pending``.
+
+Without pooled connections (an in-memory database, ``DB_POOL_SIZE = 0``, a
+connection swapped into ``data.conn``) or with ``SEARCH_FANOUT_WORKERS = 0``
+the sources run inline on the calling
+thread, as before.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import contextvars
+import threading
+import time
+import uuid
+
+from common import config as cfg
+from common import data
+from common import sql_profile
+
+
+# How long a follow-up request waits for pending sources before answering.
+POLL_WAIT_SECONDS = 5.0
+
+_PENDING_MAX = 200
+_PENDING_TTL_SECONDS = 120
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+_PENDING = OrderedDict()
+_PENDING_LOCK = threading.Lock()
+
+
+def _workers():
+    try:
+        return max(0, int(getattr(cfg, "SEARCH_FANOUT_WORKERS", 4) or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def source_budget_seconds(name):
+    """Budget of source ``name``: ``SEARCH_SOURCE_BUDGETS_MS[name]`` or the default."""
+    budgets = getattr(cfg, "SEARCH_SOURCE_BUDGETS_MS", None) or {}
+    value = budgets.get(name) if isinstance(budgets, dict) else None
+    if value is None:
+        value = getattr(cfg, "SEARCH_SOURCE_BUDGET_MS", 800)
+    try:
+        return max(0.0, float(value) / 1000.0)
+    except (TypeError, ValueError):
+        return 0.8
+
+
+def parallel_enabled():
+    if _workers() <= 0 or data._pool_size() <= 0:
+        return False
+    # A connection swapped into ``data.conn`` (tests, scripts) is not pooled.
+    return data._get_write_conn() is data._OWNED_WRITER_CONN
+
+
+def _executor():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="lp-search")
+        return _POOL
+
+
+def _run_job(name, fn, profile=None):
+    # Lease a pooled read connection for this job rather than sharing the
+    # request thread's connection; its SQL is charged to the request.
+    data.begin_request_scope()
+    previous = sql_profile.activate(profile)
+    try:
+        return fn()
+    except Exception as exc:
+        data._log_error(None, f"search source {name} failed: {exc}")
+        return None
+    finally:
+        sql_profile.activate(previous)
+        data.end_request_scope()
+
+
+def run(jobs):
+    """Run ``jobs`` (``(name, fn)`` pairs) and wait for each up to its budget.
+
+    Returns ``(results, pending)``: ``{name: value}`` for finished jobs
+    (``None`` when a job failed) and ``{name: future}`` for jobs still running.
+    Jobs run with a copy of the caller's context variables, and their SQL
+    is recorded in the caller's ``sql_profile`` request profile.
+    """
+    if not parallel_enabled():
+        results = {}
+        for name, fn in jobs:
+            try:
+                results[name] = fn()
+            except Exception as exc:
+                data._log_error(None, f"search source {name} failed: {exc}")
+                results[name] = None
+        return results, {}
+    pool = _executor()
+    started = time.perf_counter()
+    profile = sql_profile.current()
+    futures = {
+        name: pool.submit(contextvars.copy_context().run, _run_job, name, fn, profile)
+        for name, fn in jobs
+    }
+    results = {}
+    pending = {}
+    for name in sorted(futures, key=source_budget_seconds):
+        remaining = started + source_budget_seconds(name) - time.perf_counter()
+        try:
+            results[name] = futures[name].result(timeout=max(0.0, remaining))
+        except FutureTimeout:
+            pending[name] = futures[name]
+    return results, pending
+
+
+def _expire_pending(now):
+    while _PENDING:
+        token, entry = next(iter(_PENDING.items()))
+        if len(_PENDING) <= _PENDING_MAX and now - entry["created"] < _PENDING_TTL_SECONDS:
+            break
+        _PENDING.pop(token)
+
+
+def register_pending(owner_key, futures, context=None):
+    """Keep ``futures`` for a follow-up request by ``owner_key``; return its token."""
+    token = uuid.uuid4().hex
+    now = time.monotonic()
+    with _PENDING_LOCK:
+        _expire_pending(now)
+        _PENDING[token] = {"owner": owner_key, "futures": dict(futures), "context": context or {}, "created": now}
+    return token
+
+
+def collect_pending(token, owner_key, timeout=0.0):
+    """Wait up to ``timeout`` seconds for the sources registered under ``token``.
+
+    Returns ``(results, still_pending, context)`` or None when the token is
+    unknown, expired or belongs to another user.  Collected sources are
+    forgotten; the token is dropped once nothing is left.
+    """
+    with _PENDING_LOCK:
+        _expire_pending(time.monotonic())
+        entry = _PENDING.get(token)
+        if entry is None or entry["owner"] != owner_key:
+            return None
+        futures = dict(entry["futures"])
+        context = entry["context"]
+    deadline = time.perf_counter() + max(0.0, timeout)
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+        except FutureTimeout:
+            continue
+    still_pending = [name for name in futures if name not in results]
+    with _PENDING_LOCK:
+        entry = _PENDING.get(token)
+        if entry is not None:
+            for name in results:
+                entry["futures"].pop(name, None)
+            if not entry["futures"]:
+                _PENDING.pop(token, None)
+    return results, still_pending, context
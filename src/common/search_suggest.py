@@ -0,0 +1,259 @@
+"""Search-as-you-type suggestions for the global search box.
+
+``/api/search/suggest`` answers keystrokes with the first few records per
+domain (notes, tasks, apps, media) whose title starts with the typed text.
+Each domain is one range lookup on a ``NOCASE`` index of its title column(s),
+created on first use, filtered with the visibility rules of ``/search`` or,
+for domains listed per owner (``owner_col``), to the current user's rows.
+Tables without a per-user visibility rule (contacts, places) are not
+suggested.  Results are streamed as NDJSON, one line per domain as soon as it
+is answered.
+
+The search box numbers its requests.  ``stream`` records the newest sequence
+number per client and waits out the debounce interval; a request overtaken
+while waiting returns at once without querying, and one overtaken
+mid-stream stops before its next domain.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import sqlite3
+import threading
+
+from common import config as cfg
+from common import data
+from common import links as link_model
+from common import search
+from common.utils import get_table_def
+
+
+SUGGEST_DOMAINS = [
+    {
+        "domain": "notes",
+        "label": "Notes",
+        "type": "note",
+        "route": "notes",
+        "id_col": "id",
+        "title_cols": ["title", "file_name"],
+        "subtitle_col": "path",
+    },
+    {
+        "domain": "tasks",
+        "label": "Tasks",
+        "type": "task",
+        "route": "tasks",
+        "id_col": "id",
+        "title_cols": ["title"],
+        "subtitle_col": "due_date",
+        "owner_col": "owner_user_id",
+    },
+    {
+        "domain": "apps",
+        "label": "Apps",
+        "type": "app",
+        "route": "apps",
+        "table": "lp_app",
+        "id_col": "app_id",
+        "title_cols": ["title"],
+        "subtitle_col": "kind",
+        "owner_col": "owner_user_id",
+    },
+    {
+        "domain": "media",
+        "label": "Media",
+        "type": "media",
+        "route": "media",
+        "table": "lp_media",
+        "id_col": "media_id",
+        "title_cols": ["filename"],
+        "subtitle_col": "media_type",
+    },
+]
+
+# Sorts after every character a title can continue with, so
+# ``col >= prefix AND col < prefix || _PREFIX_END`` is a prefix range.
+_PREFIX_END = "\U0010ffff"
+
+_CLIENTS_MAX = 1000
+
+_CLIENT_SEQ = OrderedDict()
+_CLIENT_LOCK = threading.Lock()
+# Wakes requests waiting out the debounce when a newer one arrives.
+_CLIENT_NEWER = threading.Condition(_CLIENT_LOCK)
+_INDEXED = set()
+_INDEXED_LOCK = threading.Lock()
+
+
+def _limit():
+    try:
+        return max(1, int(getattr(cfg, "SEARCH_SUGGEST_LIMIT", 5) or 1))
+    except (TypeError, ValueError):
+        return 5
+
+
+def _debounce_seconds():
+    try:
+        return max(0.0, float(getattr(cfg, "SEARCH_SUGGEST_DEBOUNCE_MS", 150) or 0) / 1000.0)
+    except (TypeError, ValueError):
+        return 0.15
+
+
+def _request_limit(limit):
+    """``limit`` from the client, capped at ``SEARCH_SUGGEST_LIMIT``."""
+    if limit is None:
+        return _limit()
+    try:
+        return min(_limit(), max(1, int(limit)))
+    except (TypeError, ValueError):
+        return _limit()
+
+
+def _visibility(conn, spec, table, columns):
+    owner_col = spec.get("owner_col")
+    if not owner_col:
+        return search._visible_table_condition(conn, table, "t")
+    if owner_col not in columns:
+        return "1=0", []
+    # The same owner filter as the domain's own list page.
+    user = search._current_search_user()
+    return f"t.{owner_col} IS ?", [getattr(user, "user_id", None)]
+
+
+def _domain_table(spec):
+    if spec.get("table"):
+        return spec["table"]
+    tbl = get_table_def(spec["route"])
+    return tbl["name"] if tbl else None
+
+
+def _index_name(table, col):
+    return f"ix_lp_suggest_{table}_{col}"
+
+
+def _ensure_prefix_indexes(conn, table, cols):
+    """Create the NOCASE title indexes the prefix lookups range over."""
+    from common import schema_registry
+
+    key = (schema_registry.db_key(conn), table, tuple(cols))
+    with _INDEXED_LOCK:
+        if key in _INDEXED:
+            return
+    names = [_index_name(table, col) for col in cols]
+    existing = {
+        row[0]
+        for row in conn.execute(
+            f"SELECT name FROM sqlite_master WHERE type = 'index' AND name IN ({', '.join('?' for _ in names)})",
+            names,
+        ).fetchall()
+    }
+    missing = [col for col in cols if _index_name(table, col) not in existing]
+    if missing:
+
+        def create(write_conn):
+            for col in missing:
+                write_conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_index_name(table, col)} ON {table} ({col} COLLATE NOCASE)"
+                )
+
+        data.run_write(create, conn=conn)
+    with _INDEXED_LOCK:
+        _INDEXED.add(key)
+
+
+def suggest_domain(conn, spec, prefix, limit):
+    """Records of ``spec``'s domain whose title starts with ``prefix``."""
+    table = _domain_table(spec)
+    if not table:
+        return []
+    columns = search._table_columns(conn, table)
+    title_cols = [col for col in spec["title_cols"] if col in columns]
+    if spec["id_col"] not in columns or not title_cols:
+        return []
+    _ensure_prefix_indexes(conn, table, title_cols)
+    ranges = []
+    params = []
+    for col in title_cols:
+        ranges.append(f"(t.{col} >= ? COLLATE NOCASE AND t.{col} < ? COLLATE NOCASE)")
+        params.extend([prefix, prefix + _PREFIX_END])
+    visibility, visibility_params = _visibility(conn, spec, table, columns)
+    params.extend(visibility_params)
+    if len(title_cols) > 1:
+        title_expr = "COALESCE(" + ", ".join(f"NULLIF(t.{col}, '')" for col in title_cols) + ")"
+    else:
+        title_expr = f"t.{title_cols[0]}"
+    subtitle_col = spec.get("subtitle_col")
+    subtitle_expr = f"t.{subtitle_col}" if subtitle_col in columns else "NULL"
+    rows = conn.execute(
+        f"SELECT t.{spec['id_col']} AS id, {title_expr} AS title, {subtitle_expr} AS subtitle "
+        f"FROM {table} t WHERE ({' OR '.join(ranges)}) AND {visibility} "
+        f"ORDER BY {title_expr} COLLATE NOCASE, t.{spec['id_col']} LIMIT ?",
+        params + [int(limit)],
+    ).fetchall()
+    return [
+        {
+            "type": spec["type"],
+            "id": str(row["id"]),
+            "title": row["title"] or "",
+            "subtitle": "" if row["subtitle"] is None else str(row["subtitle"]),
+            "url": link_model.build_open_route(spec["type"], row["id"]),
+        }
+        for row in rows
+    ]
+
+
+def _register_seq(client_key, seq):
+    with _CLIENT_LOCK:
+        if seq >= _CLIENT_SEQ.get(client_key, seq):
+            _CLIENT_SEQ[client_key] = seq
+        _CLIENT_SEQ.move_to_end(client_key)
+        while len(_CLIENT_SEQ) > _CLIENTS_MAX:
+            _CLIENT_SEQ.popitem(last=False)
+        _CLIENT_NEWER.notify_all()
+
+
+def superseded(client_key, seq):
+    """True once ``client_key`` has sent a request numbered after ``seq``."""
+    with _CLIENT_LOCK:
+        return _CLIENT_SEQ.get(client_key, seq) > seq
+
+
+def _wait_superseded(client_key, seq, timeout):
+    """Wait up to ``timeout`` seconds; True as soon as a newer request arrives."""
+    with _CLIENT_NEWER:
+        return _CLIENT_NEWER.wait_for(lambda: _CLIENT_SEQ.get(client_key, seq) > seq, timeout)
+
+
+def _domains():
+    visible_routes = search._visible_search_routes()
+    return [spec for spec in SUGGEST_DOMAINS if not visible_routes or spec["route"] in visible_routes]
+
+
+def stream(query, client_key=None, seq=0, limit=None):
+    """Yield one line (a dict) per domain for ``query``, then a ``done`` line.
+
+    Stops with a ``cancelled`` line as soon as ``client_key`` sends a newer
+    ``seq``.
+    """
+    limit = _request_limit(limit)
+    _register_seq(client_key, seq)
+    debounce = _debounce_seconds()
+    if debounce and _wait_superseded(client_key, seq, debounce):
+        yield {"seq": seq, "cancelled": True}
+        return
+    prefix = " ".join((query or "").split())
+    if not prefix:
+        yield {"seq": seq, "done": True}
+        return
+    conn = data._get_conn()
+    for spec in _domains():
+        if superseded(client_key, seq):
+            yield {"seq": seq, "cancelled": True}
+            return
+        try:
+            items = suggest_domain(conn, spec, prefix, limit)
+        except sqlite3.Error as exc:
+            data._log_error(None, f"search suggest {spec['domain']} failed: {exc}")
+            items = []
+        yield {"seq": seq, "domain": spec["domain"], "label": spec["label"], "items": items}
+    yield {"seq": seq, "done": True}
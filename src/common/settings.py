@@ -4,6 +4,7 @@ import os
 import sqlite3
 
 from common import data as db
+from common import schema_registry
 from common import user_paths
 
 
@@ -133,37 +134,30 @@ NOTE_NOTES_PER_PAGE_DEFAULT = 50
 NOTE_NOTES_PER_PAGE_MIN = 5
 NOTE_NOTES_PER_PAGE_MAX = 200
 
-_SCHEMA_READY_CONN_IDS = set()
+
+def _seed_defaults():
+    return {
+        **CALENDAR_VIEW_DEFAULTS,
+        **GENERAL_DEFAULTS,
+        **AUDIO_DEFAULTS,
+        **MEDIA_DEFAULTS,
+        **NOTE_DISPLAY_DEFAULTS,
+        **PLACES_DEFAULTS,
+        **LOGGER_DEFAULTS,
+    }
 
 
 def ensure_settings_schema(conn=None):
     conn = db._get_conn() if conn is None else conn
     if not isinstance(conn, sqlite3.Connection):
         raise TypeError("settings schema requires a sqlite3.Connection")
-    conn_id = id(conn)
-    if conn_id in _SCHEMA_READY_CONN_IDS:
-        try:
-            row = conn.execute(
-                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sys_settings'"
-            ).fetchone()
-            if row:
-                return
-        except Exception:
-            pass
-        _SCHEMA_READY_CONN_IDS.discard(conn_id)
+    if schema_registry.is_ready(conn, "settings"):
+        return
 
     conn.executescript(SETTINGS_SCHEMA_SQL)
     _ensure_settings_columns(conn)
     now = _utc_now()
-    for key, (value, category, label) in {
-        **CALENDAR_VIEW_DEFAULTS,
-        **GENERAL_DEFAULTS,
-        **AUDIO_DEFAULTS,
-        **MEDIA_DEFAULTS,
-        **NOTE_DISPLAY_DEFAULTS,
-        **PLACES_DEFAULTS,
-        **LOGGER_DEFAULTS,
-    }.items():
+    for key, (value, category, label) in _seed_defaults().items():
         conn.execute(
             "INSERT OR IGNORE INTO sys_settings "
             "(setting_key, setting_value, category, label, updated_utc) "
@@ -171,7 +165,15 @@ def ensure_settings_schema(conn=None):
             (key, value, category, label, now),
         )
     conn.commit()
-    _SCHEMA_READY_CONN_IDS.add(conn_id)
+    schema_registry.mark_ready(conn, "settings")
+
+
+# Seeded defaults are part of the migration, so new default keys re-run it.
+schema_registry.register(
+    "settings",
+    ensure_settings_schema,
+    version=f"1.{len(_seed_defaults())}",
+)
 
 
 def _ensure_settings_columns(conn):
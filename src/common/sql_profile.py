@@ -0,0 +1,295 @@
+"""Per-request SQL instrumentation.
+
+Connections opened with ``factory=ProfiledConnection`` time every statement
+and count the rows fetched from it.  While a request profile is active on the
+current thread (see ``begin_request`` / ``end_request``, wired up in app.py)
+the numbers are collected per statement text; outside a request the wrapper
+only adds a thread-local lookup.
+
+Statements that run many times with identical SQL inside one request are
+reported as ``repeated`` - usually an N+1 loop that should be a single query.
+Finished requests are aggregated per Flask endpoint for the Admin >
+Performance page.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+import math
+import sqlite3
+import threading
+import time
+
+from common import config as cfg
+
+
+_LOCAL = threading.local()
+_STATS_LOCK = threading.Lock()
+_ENDPOINTS = {}
+
+_TRANSACTION_PREFIXES = ("BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+def _setting(name, default):
+    return getattr(cfg, name, default)
+
+
+def enabled():
+    return bool(_setting("SQL_PROFILE_ENABLED", True))
+
+
+class RequestProfile:
+    """SQL totals for one request, keyed by statement text."""
+
+    def __init__(self, endpoint=None):
+        self.endpoint = endpoint or ""
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_ms = 0.0
+        self.rows = 0
+        self.by_sql = {}
+        self.lock = threading.Lock()
+
+    def entry(self, sql):
+        with self.lock:
+            item = self.by_sql.get(sql)
+            if item is None:
+                item = self.by_sql[sql] = {"count": 0, "ms": 0.0, "max_ms": 0.0, "rows": 0}
+            item["count"] += 1
+            self.statements += 1
+            return item
+
+    # Search fan-out threads add to the request's profile concurrently.
+    def add_time(self, item, elapsed_ms, exec_ms):
+        with self.lock:
+            item["ms"] += elapsed_ms
+            if exec_ms > item["max_ms"]:
+                item["max_ms"] = exec_ms
+            self.sql_ms += elapsed_ms
+
+    def add_rows(self, item, count):
+        with self.lock:
+            item["rows"] += count
+            self.rows += count
+
+    def summary(self, slowest=3, repeated=5):
+        threshold = max(2, int(_setting("SQL_PROFILE_REPEAT_THRESHOLD", 5) or 5))
+        with self.lock:
+            items = [(_display_sql(sql), dict(item)) for sql, item in self.by_sql.items()]
+            totals = {
+                "sql_statements": self.statements,
+                "sql_ms": round(self.sql_ms, 2),
+                "sql_rows": self.rows,
+            }
+        slow_items = sorted(items, key=lambda pair: pair[1]["max_ms"], reverse=True)[:slowest]
+        repeat_items = sorted(
+            (
+                pair
+                for pair in items
+                if pair[1]["count"] >= threshold
+                and not pair[0].upper().startswith(_TRANSACTION_PREFIXES)
+            ),
+            key=lambda pair: pair[1]["count"],
+            reverse=True,
+        )[:repeated]
+        totals["sql_slowest"] = [
+            {"sql": sql, "ms": round(item["max_ms"], 2), "count": item["count"], "rows": item["rows"]}
+            for sql, item in slow_items
+        ]
+        totals["sql_repeated"] = [
+            {"sql": sql, "count": item["count"], "ms": round(item["ms"], 2)}
+            for sql, item in repeat_items
+        ]
+        return totals
+
+
+def _display_sql(sql, limit=300):
+    text = " ".join(str(sql or "").split())
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def current():
+    return getattr(_LOCAL, "profile", None)
+
+
+def activate(profile):
+    """Make ``profile`` the collector for this thread; returns the previous one."""
+    previous = getattr(_LOCAL, "profile", None)
+    _LOCAL.profile = profile
+    return previous
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    _lp_profile = None
+    _lp_item = None
+    _lp_exec_ms = 0.0
+
+    def _lp_run(self, method, sql, *args):
+        profile = current()
+        if profile is None:
+            self._lp_profile = None
+            return method(sql, *args)
+        item = profile.entry(sql)
+        started = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self._lp_profile = profile
+            self._lp_item = item
+            self._lp_exec_ms = elapsed
+            profile.add_time(item, elapsed, elapsed)
+
+    def execute(self, sql, parameters=()):
+        return self._lp_run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._lp_run(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._lp_run(super().executescript, sql_script)
+
+    def _lp_fetch(self, method, *args):
+        profile = self._lp_profile
+        if profile is None:
+            return method(*args)
+        started = time.perf_counter()
+        result = method(*args)
+        elapsed = (time.perf_counter() - started) * 1000
+        self._lp_exec_ms += elapsed
+        profile.add_time(self._lp_item, elapsed, self._lp_exec_ms)
+        if isinstance(result, list):
+            profile.add_rows(self._lp_item, len(result))
+        elif result is not None:
+            profile.add_rows(self._lp_item, 1)
+        return result
+
+    def fetchone(self):
+        return self._lp_fetch(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._lp_fetch(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._lp_fetch(super().fetchall)
+
+    def __next__(self):
+        if self._lp_profile is None:
+            return super().__next__()
+        return self._lp_fetch(super().__next__)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3 connection whose statements are recorded in the request profile."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def connect(database, **kwargs):
+    """``sqlite3.connect`` returning a ProfiledConnection."""
+    kwargs.setdefault("factory", ProfiledConnection)
+    return sqlite3.connect(database, **kwargs)
+
+
+def begin_request(endpoint=None):
+    if not enabled():
+        activate(None)
+        return None
+    profile = RequestProfile(endpoint)
+    activate(profile)
+    return profile
+
+
+def end_request(endpoint=None, duration_ms=None):
+    """Stop collecting for this thread and return the request summary.
+
+    The summary is also folded into the per-endpoint aggregates.
+    """
+    profile = activate(None)
+    if profile is None:
+        return None
+    if duration_ms is None:
+        duration_ms = (time.perf_counter() - profile.started) * 1000
+    summary = profile.summary()
+    _record_endpoint(endpoint or profile.endpoint or "(unknown)", duration_ms, summary)
+    return summary
+
+
+def discard_request():
+    activate(None)
+
+
+def _record_endpoint(endpoint, duration_ms, summary):
+    sample_size = max(10, int(_setting("SQL_PROFILE_SAMPLES", 200) or 200))
+    with _STATS_LOCK:
+        stats = _ENDPOINTS.get(endpoint)
+        if stats is None or stats["samples"].maxlen != sample_size:
+            previous = stats["samples"] if stats else ()
+            stats = _ENDPOINTS[endpoint] = {
+                "requests": stats["requests"] if stats else 0,
+                "repeated_requests": stats["repeated_requests"] if stats else 0,
+                "samples": deque(previous, maxlen=sample_size),
+                "last_repeated": stats["last_repeated"] if stats else [],
+            }
+        stats["requests"] += 1
+        stats["samples"].append(
+            (float(duration_ms or 0), summary["sql_ms"], summary["sql_statements"], summary["sql_rows"])
+        )
+        if summary["sql_repeated"]:
+            stats["repeated_requests"] += 1
+            stats["last_repeated"] = summary["sql_repeated"]
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return round(ordered[index], 2)
+
+
+def endpoint_stats():
+    """Per-endpoint p50/p95 of request time, SQL time and statement count."""
+    with _STATS_LOCK:
+        snapshot = {
+            endpoint: (stats["requests"], stats["repeated_requests"], list(stats["samples"]), list(stats["last_repeated"]))
+            for endpoint, stats in _ENDPOINTS.items()
+        }
+    rows = []
+    for endpoint, (requests, repeated_requests, samples, last_repeated) in snapshot.items():
+        durations = [sample[0] for sample in samples]
+        sql_ms = [sample[1] for sample in samples]
+        statements = [sample[2] for sample in samples]
+        rows.append(
+            {
+                "endpoint": endpoint,
+                "requests": requests,
+                "samples": len(samples),
+                "p50_ms": _percentile(durations, 50),
+                "p95_ms": _percentile(durations, 95),
+                "sql_p50_ms": _percentile(sql_ms, 50),
+                "sql_p95_ms": _percentile(sql_ms, 95),
+                "statements_p50": _percentile(statements, 50),
+                "statements_p95": _percentile(statements, 95),
+                "rows_max": max((sample[3] for sample in samples), default=0),
+                "repeated_requests": repeated_requests,
+                "last_repeated": last_repeated,
+            }
+        )
+    rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+    return rows
+
+
+def reset_stats():
+    with _STATS_LOCK:
+        _ENDPOINTS.clear()
@@ -1,5 +1,6 @@
 import os
 import re
+import string
 
 from common import config as cfg
 
@@ -13,6 +14,7 @@ USER_PATH_COLUMNS = {
 
 _INVALID_SEGMENT_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]+')
 _PATH_SPLIT_RE = re.compile(r"[\\/]+")
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
 
 
 def normalize_path(path_value):
@@ -97,6 +99,41 @@ def path_key(path_value):
     return normalize_path(path_value).replace("\\", "/").rstrip("/").lower()
 
 
+def sql_lower(text):
+    """``text`` lowercased the way SQLite's ``lower()`` does: ASCII letters only."""
+    return (text or "").translate(_ASCII_LOWER)
+
+
+def path_key_param(path_value):
+    """``path_key`` of a parameter compared against ``path_key_sql`` of a column.
+
+    Unlike ``path_key`` it keeps non-ASCII capitals, as SQLite's ``lower()``
+    does, so folders such as ``Ärzte`` match their stored rows.
+    """
+    return sql_lower(normalize_path(path_value).replace("\\", "/").rstrip("/ "))
+
+
+def path_key_sql(expr):
+    """SQL form of ``path_key`` for a path column.
+
+    Expression indexes are declared with this exact text, so queries that
+    compare ``path_key_sql(col)`` against a ``path_key_param`` value can use them.
+    """
+    return f"lower(rtrim(replace({expr}, '\\', '/'), '/ '))"
+
+
+def path_under_sql(expr):
+    """Condition: ``expr`` is the folder given by ``path_under_params`` or below it."""
+    key = path_key_sql(expr)
+    return f"({key} = ? OR ({key} >= ? AND {key} < ?))"
+
+
+def path_under_params(prefix):
+    # "0" sorts directly after "/", so the range holds exactly "<key>/...".
+    key = path_key_param(prefix)
+    return [key, key + "/", key + "0"]
+
+
 def path_startswith(path_value, prefix):
     path = path_key(path_value)
     base = path_key(prefix)
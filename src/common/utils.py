@@ -4,6 +4,7 @@ import math
 import common.config as mod_cfg
 from common import localtime
 from common import data as db
+from common import schema_registry
 
 
 NORMAL_USER_HIDDEN_TABS = {
@@ -206,7 +207,13 @@ def paginate_total(total, page, per_page):
     }
 
 
-def build_pagination(url_for_fn, route_name, base_args, page, total_pages):
+def build_pagination(url_for_fn, route_name, base_args, page, total_pages, rows=None):
+    """Page links for a list view.
+
+    Numbered links jump with ``page`` (OFFSET).  When ``rows`` is a
+    ``keyset.Page`` the prev/next links carry its cursors so stepping through
+    the list seeks instead of counting rows.
+    """
     pages = []
     for num in range(1, total_pages + 1):
         args = dict(base_args)
@@ -220,9 +227,24 @@ def build_pagination(url_for_fn, route_name, base_args, page, total_pages):
         "pages": pages,
         "first_url": url_for_fn(route_name, **first_args),
         "last_url": url_for_fn(route_name, **last_args),
+        "prev_url": _step_url(url_for_fn, route_name, base_args, page - 1, total_pages, rows, "prev_cursor"),
+        "next_url": _step_url(url_for_fn, route_name, base_args, page + 1, total_pages, rows, "next_cursor"),
     }
 
 
+def _step_url(url_for_fn, route_name, base_args, page, total_pages, rows, cursor_attr):
+    if page < 1 or page > total_pages:
+        return ""
+    cursor = getattr(rows, cursor_attr, None)
+    if hasattr(rows, cursor_attr) and not cursor:
+        return ""
+    args = dict(base_args)
+    args["page"] = page
+    if cursor:
+        args["cursor"] = cursor
+    return url_for_fn(route_name, **args)
+
+
 _USER_LOG_SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS sys_user_log (
     id INTEGER PRIMARY KEY,
@@ -241,11 +263,14 @@ CREATE TABLE IF NOT EXISTS sys_user_log (
 
 
 def _ensure_user_log_schema(conn):
+    if schema_registry.is_ready(conn, "user_log"):
+        return
     conn.execute(_USER_LOG_SCHEMA_SQL)
     conn.execute(
         "CREATE INDEX IF NOT EXISTS ix_sys_user_log_entity "
         "ON sys_user_log(entity_type, entity_id)"
     )
+    schema_registry.mark_ready(conn, "user_log")
 
 
 def ensure_user_log_schema(conn=None):
@@ -253,6 +278,9 @@ def ensure_user_log_schema(conn=None):
     _ensure_user_log_schema(conn)
 
 
+schema_registry.register("user_log", ensure_user_log_schema)
+
+
 def _json_blob(value):
     if value is None:
         return None
@@ -274,9 +302,23 @@ def lg_usr(
     conn=None,
     user_name=None,
 ):
-    conn = db._get_conn() if conn is None else conn
+    params = (
+        localtime.now_log_iso(),
+        user_name or db._current_user(),
+        (action or "").strip(),
+        (entity_type or "").strip(),
+        None if entity_id is None else str(entity_id),
+        _json_blob(before),
+        _json_blob(after),
+        context_type,
+        context_id,
+        _json_blob(extra),
+    )
+    db.run_write(_insert_user_log, params, conn=conn)
+
+
+def _insert_user_log(conn, params):
     _ensure_user_log_schema(conn)
-    payload = _json_blob(extra)
     conn.execute(
         (
             "INSERT INTO sys_user_log "
@@ -284,18 +326,6 @@ def lg_usr(
             "context_type, context_id, details) "
             "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
         ),
-        (
-            localtime.now_log_iso(),
-            user_name or db._current_user(),
-            (action or "").strip(),
-            (entity_type or "").strip(),
-            None if entity_id is None else str(entity_id),
-            _json_blob(before),
-            _json_blob(after),
-            context_type,
-            context_id,
-            payload,
-        ),
+        params,
     )
-    conn.commit()
 
@@ -64,11 +64,13 @@ def _strip_drop_tables(ddl_text: str) -> str:
 
 DDL_RESET = """PRAGMA foreign_keys = ON;
 
+DROP TABLE IF EXISTS dim_folder_closure;
 DROP TABLE IF EXISTS dim_folder;
 
 CREATE TABLE IF NOT EXISTS dim_folder (
   folder_id       INTEGER PRIMARY KEY AUTOINCREMENT,
   folder_path     TEXT NOT NULL UNIQUE,
+  parent_folder_id INTEGER NULL,
   is_active       INTEGER NOT NULL DEFAULT 1 CHECK (is_active IN (0,1)),
   first_seen_at   TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
   last_seen_at    TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
@@ -77,10 +79,118 @@ CREATE TABLE IF NOT EXISTS dim_folder (
 );
 
 """
+
+# One row per (ancestor, descendant) pair including depth 0 for the folder
+# itself, so "everything under X" is an index range on ancestor_id.
+DDL_FOLDER_CLOSURE = [
+    """CREATE TABLE IF NOT EXISTS dim_folder_closure (
+  ancestor_id     INTEGER NOT NULL,
+  descendant_id   INTEGER NOT NULL,
+  depth           INTEGER NOT NULL,
+  PRIMARY KEY (ancestor_id, descendant_id)
+) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS ix_dim_folder_closure_descendant ON dim_folder_closure(descendant_id, depth)",
+    "CREATE INDEX IF NOT EXISTS ix_dim_folder_path_nocase ON dim_folder(folder_path COLLATE NOCASE)",
+]
+DDL_RESET += "".join(stmt + ";\n\n" for stmt in DDL_FOLDER_CLOSURE)
 DDL_CREATE = _strip_drop_tables(DDL_RESET)
 DDL_RESET_NO_FK = DDL_RESET.replace("PRAGMA foreign_keys = ON;\n\n", "")
 DDL_CREATE_NO_FK = DDL_CREATE.replace("PRAGMA foreign_keys = ON;\n\n", "")
 
+# ----------------------------
+# Folder hierarchy
+# ----------------------------
+def parent_folder_path(folder_path: str) -> str:
+    """Return the parent of ``folder_path`` or "" at a drive, share or "/" root.
+
+    The separator already used by the path is kept so the parent matches the
+    way sibling rows were written to dim_folder.
+    """
+    path = (folder_path or "").rstrip("\\/")
+    if not path:
+        return ""
+    if len(path) == 2 and path[1] == ":":
+        return ""
+    if path.startswith(("\\\\", "//")):
+        if len([part for part in path[2:].replace("/", "\\").split("\\") if part]) <= 2:
+            return ""
+    cut = max(path.rfind("\\"), path.rfind("/"))
+    if cut < 0:
+        return ""
+    parent = path[:cut]
+    if cut == 0:
+        return path[0]
+    if len(parent) == 2 and parent[1] == ":":
+        return parent + path[cut]
+    return parent
+
+
+def _folder_id_for_path(conn: sqlite3.Connection, folder_path: str) -> Optional[int]:
+    row = conn.execute(
+        "SELECT folder_id FROM dim_folder WHERE folder_path = ? COLLATE NOCASE ORDER BY folder_id LIMIT 1",
+        (folder_path,),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def link_dim_folder(conn: sqlite3.Connection, folder_id: int, folder_path: str) -> None:
+    """Attach ``folder_id`` to its parent and fill its dim_folder_closure rows.
+
+    Missing ancestors are added to dim_folder on the way up. A folder that
+    already has its depth-0 closure row is treated as linked.
+    """
+    if not folder_id:
+        return
+    linked = conn.execute(
+        "SELECT 1 FROM dim_folder_closure WHERE ancestor_id = ? AND descendant_id = ?",
+        (folder_id, folder_id),
+    ).fetchone()
+    if linked:
+        return
+    parent_path = parent_folder_path(folder_path)
+    parent_id = None
+    if parent_path:
+        parent_id = _folder_id_for_path(conn, parent_path)
+        if parent_id is None:
+            conn.execute("INSERT OR IGNORE INTO dim_folder(folder_path) VALUES (?)", (parent_path,))
+            parent_id = _folder_id_for_path(conn, parent_path)
+        if parent_id == folder_id:
+            parent_id = None
+        elif parent_id:
+            link_dim_folder(conn, parent_id, parent_path)
+    conn.execute("UPDATE dim_folder SET parent_folder_id = ? WHERE folder_id = ?", (parent_id, folder_id))
+    conn.execute(
+        "INSERT OR IGNORE INTO dim_folder_closure(ancestor_id, descendant_id, depth) VALUES (?, ?, 0)",
+        (folder_id, folder_id),
+    )
+    if parent_id:
+        conn.execute(
+            "INSERT OR IGNORE INTO dim_folder_closure(ancestor_id, descendant_id, depth) "
+            "SELECT ancestor_id, ?, depth + 1 FROM dim_folder_closure WHERE descendant_id = ?",
+            (folder_id, parent_id),
+        )
+
+
+def link_unlinked_folders(conn: sqlite3.Connection) -> int:
+    """Link every dim_folder row that has no closure rows yet."""
+    rows = conn.execute(
+        "SELECT folder_id, folder_path FROM dim_folder f "
+        "WHERE NOT EXISTS (SELECT 1 FROM dim_folder_closure c "
+        "WHERE c.ancestor_id = f.folder_id AND c.descendant_id = f.folder_id) "
+        "ORDER BY length(folder_path), folder_id"
+    ).fetchall()
+    for row in rows:
+        link_dim_folder(conn, row[0], row[1])
+    return len(rows)
+
+
+def rebuild_folder_closure(conn: sqlite3.Connection) -> int:
+    """Drop and recompute parent pointers and the closure for all folders."""
+    conn.execute("DELETE FROM dim_folder_closure")
+    conn.execute("UPDATE dim_folder SET parent_folder_id = NULL")
+    return link_unlinked_folders(conn)
+
+
 # ----------------------------
 # ETL Steps
 # ----------------------------
@@ -93,6 +203,9 @@ def upsert_dim_folder(conn: sqlite3.Connection, folder_path: str) -> None:
         "UPDATE dim_folder SET last_seen_at=strftime('%Y-%m-%dT%H:%M:%fZ','now'), is_active=1 WHERE folder_path=?",
         (fp,),
     )
+    row = conn.execute("SELECT folder_id FROM dim_folder WHERE folder_path = ?", (fp,)).fetchone()
+    if row:
+        link_dim_folder(conn, row[0], fp)
 
 
 def load_folder_list_csv(conn: sqlite3.Connection, folder_list_csv: str, col: str = "folder_path") -> int:
@@ -134,6 +247,8 @@ def _derive_folder_path(route_name: str, row: sqlite3.Row) -> str:
         if file_name and os.path.isabs(file_name):
             return os.path.dirname(file_name)
         return os.path.dirname(os.path.join(path_value, file_name)) if file_name else ""
+    if route_name == "media_file":
+        return (row["path"] or "").strip().replace("/", "\\").rpartition("\\")[0]
     if route_name == "files":
         return (row["path"] or "").strip()
     return ""
@@ -142,13 +257,17 @@ def _derive_folder_path(route_name: str, row: sqlite3.Row) -> str:
 def backfill_folder_ids(conn: sqlite3.Connection) -> int:
     conn.row_factory = sqlite3.Row
     file_tables = [
-        ("lp_notes", "notes", ["id", "folder_id", "path", "file_name"]),
-        ("lp_media", "media", ["id", "folder_id", "path", "file_name"]),
-        ("lp_audio", "audio", ["id", "folder_id", "path", "file_name"]),
-        ("lp_3d", "3d", ["id", "folder_id", "path", "file_name"]),
-        ("lp_files", "files", ["id", "folder_id", "path"]),
+        ("lp_notes", "notes", ["rowid AS id", "folder_id", "path", "file_name"]),
+        ("lp_media", "media", ["rowid AS id", "folder_id", "path", "file_name"]),
+        ("lp_audio", "audio", ["rowid AS id", "folder_id", "path", "file_name"]),
+        ("lp_3d", "3d", ["rowid AS id", "folder_id", "path", "file_name"]),
+        ("lp_files", "files", ["rowid AS id", "folder_id", "path"]),
     ]
+    if _table_has_column(conn, "lp_media", "filename"):
+        # Media Explorer rows store the full file path in ``path``.
+        file_tables[1] = ("lp_media", "media_file", ["rowid AS id", "folder_id", "path"])
     updated = 0
+    link_unlinked_folders(conn)
     path_to_id = {}
     id_to_path = {}
     for row in conn.execute("SELECT folder_id, folder_path FROM dim_folder").fetchall():
@@ -216,7 +335,7 @@ def backfill_folder_ids(conn: sqlite3.Connection) -> int:
                     needs_update = True
             if needs_update and current_id_int != folder_id:
                 conn.execute(
-                    f"UPDATE {tbl_name} SET folder_id = ? WHERE id = ?",
+                    f"UPDATE {tbl_name} SET folder_id = ? WHERE rowid = ?",
                     (folder_id, row["id"]),
                 )
                 updated += 1
@@ -7,12 +7,17 @@ from flask import Blueprint, abort, jsonify, render_template, request, redirect,
 from flask_login import current_user
 
 from common import data as db
+from common import db_writer
 from common import config as cfg
 from common import media_migration
 from common import localtime
 from common import network_log
+from common import note_link_graph
 from common import note_search_index
+from common import row_counts
+from common import search_cache
 from common import settings as settings_mod
+from common import sql_profile
 from common import content_catalog as catalog_mod
 from common import user_paths
 from common.utils import get_tabs, get_side_tabs, ensure_user_log_schema, lg_usr
@@ -568,14 +573,29 @@ def settings_route():
                     message = f"Note color refresh failed: {exc}"
             elif action == "rebuild_note_search_index":
                 try:
-                    result = note_search_index.rebuild_index(conn)
+                    full = request.form.get("note_index_mode") == "full"
+                    result = note_search_index.refresh_index(conn, full=full)
                     message = (
-                        "Rebuilt note search index: "
-                        f"{result['indexed']} indexed, {result['missing']} missing, "
-                        f"{result['skipped']} skipped."
+                        f"{'Rebuilt' if full else 'Refreshed'} note search index: "
+                        f"{result['indexed']} indexed, {result['unchanged']} unchanged, "
+                        f"{result['removed']} removed, {result['missing']} missing, "
+                        f"{result['skipped']} skipped in {result['elapsed_ms']} ms "
+                        f"(stat {result['stat_ms']} ms, read {result['read_ms']} ms, "
+                        f"write {result['write_ms']} ms)."
                     )
                 except Exception as exc:
-                    message = f"Note search index rebuild failed: {exc}"
+                    message = f"Note search index refresh failed: {exc}"
+            elif action == "rebuild_note_links":
+                try:
+                    result = note_link_graph.rebuild(conn)
+                    message = (
+                        f"Rebuilt note links: {result['links']} links and "
+                        f"{result['unresolved']} unresolved from {result['notes']} notes, "
+                        f"{result['removed']} removed notes dropped in {result['elapsed_ms']} ms "
+                        f"(map {result['map_ms']} ms)."
+                    )
+                except Exception as exc:
+                    message = f"Note link rebuild failed: {exc}"
         elif active_settings_tab == "places":
             settings_mod.save_places_settings(
                 {
@@ -680,6 +700,10 @@ def settings_route():
         note_index_count = conn.execute("SELECT COUNT(1) FROM lp_note_search_index").fetchone()[0]
     except Exception:
         note_index_count = 0
+    try:
+        note_link_count = note_link_graph.link_count(conn)
+    except Exception:
+        note_link_count = 0
 
     return render_template(
         "admin_settings.html",
@@ -701,6 +725,7 @@ def settings_route():
         config_settings=config_settings,
         all_settings=all_settings,
         note_index_count=note_index_count,
+        note_link_count=note_link_count,
         notes_sync_root=_notes_live_root(conn),
         now=datetime.now(),
     )
@@ -1175,6 +1200,49 @@ def logger_file_open_route():
     return redirect(url_for("admin.logger_file_view_route", device_folder=device_folder, relative_path=relative_path))
 
 
+@admin_bp.route("/db/pool-stats")
+def db_pool_stats_route():
+    security.require_role("admin")
+    return jsonify({"ok": True, "pool": db.pool_stats(), "writer": db_writer.stats()})
+
+
+@admin_bp.route("/performance", methods=["GET", "POST"])
+def performance_route():
+    security.require_role("admin")
+    message = ""
+    recount_result = None
+    action = request.form.get("action") if request.method == "POST" else ""
+    if action == "reset":
+        sql_profile.reset_stats()
+        message = "Performance statistics cleared."
+    elif action == "clear_search_cache":
+        search_cache.clear()
+        message = "Search result cache cleared."
+    elif action == "recount":
+        recount_result = db.run_write(row_counts.recount)
+        message = (
+            f"Row counters checked: {recount_result['checked']}, "
+            f"corrected: {len(recount_result['mismatches'])}."
+        )
+    endpoints = sql_profile.endpoint_stats()
+    return render_template(
+        "admin_performance.html",
+        active_tab="admin",
+        tabs=get_tabs(),
+        side_tabs=get_side_tabs(),
+        content_title="Admin - Performance",
+        content_html="",
+        message=message,
+        endpoints=endpoints,
+        profiling_enabled=sql_profile.enabled(),
+        repeat_threshold=getattr(cfg, "SQL_PROFILE_REPEAT_THRESHOLD", 5),
+        sample_size=getattr(cfg, "SQL_PROFILE_SAMPLES", 200),
+        counter_stats=row_counts.counter_stats(db._get_conn()),
+        recount_result=recount_result,
+        search_cache_stats=search_cache.stats(),
+    )
+
+
 @admin_bp.route("/users")
 def users_route():
     security.require_role("admin")
@@ -11,6 +11,7 @@ from datetime import datetime, timezone
 from common import areas as areas_mod
 from common import collections as collections_mod
 from common import data as db
+from common import schema_registry
 from common import utils as utils_mod
 
 
@@ -158,8 +159,6 @@ CREATE INDEX IF NOT EXISTS ix_lp_app_run_status
 ON lp_app_run (status, requested_at DESC);
 """
 
-_APPS_SCHEMA_READY_CONN_IDS = set()
-
 
 def _utc_now():
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -233,8 +232,7 @@ def _table_exists(conn, table_name):
 
 def ensure_apps_schema(conn=None):
     conn = _get_conn(conn)
-    conn_id = id(conn)
-    if conn_id in _APPS_SCHEMA_READY_CONN_IDS and _apps_schema_is_current(conn):
+    if schema_registry.is_ready(conn, "apps"):
         ensure_file_inventory_app(conn)
         return
     areas_mod.ensure_areas_schema(conn)
@@ -243,17 +241,10 @@ def ensure_apps_schema(conn=None):
     _migrate_apps_schema(conn)
     ensure_file_inventory_app(conn)
     conn.commit()
-    _APPS_SCHEMA_READY_CONN_IDS.add(conn_id)
+    schema_registry.mark_ready(conn, "apps")
 
 
-def _apps_schema_is_current(conn):
-    return (
-        {"app_id", "app_key", "title", "kind", "favorite", "last_used_date", "import_source", "import_source_path", "imported_date", "import_metadata"}.issubset(_table_columns(conn, "lp_app"))
-        and {"app_id", "area_id"}.issubset(_table_columns(conn, "lp_app_area"))
-        and {"app_id", "action_name", "action_type", "is_default", "parameter_schema_json", "agent_allowed", "requires_confirmation"}.issubset(_table_columns(conn, "lp_app_action"))
-        and {"app_run_id", "app_id", "status", "requested_at", "started_at", "finished_at", "stdout_log", "stderr_log"}.issubset(_table_columns(conn, "lp_app_run"))
-        and not _table_exists(conn, "lp_apps")
-    )
+schema_registry.register("apps", ensure_apps_schema)
 
 
 def _migrate_apps_schema(conn):
@@ -8,6 +8,10 @@ from flask import Blueprint, render_template, request, url_for, send_file, abort
 from common import data as db
 from common import collections as collections_mod
 from common import projects as projects_mod
+from common import schema_registry
+from common import search as search_mod
+from common import search_cache
+from common.search import search_user_key
 from common.utils import get_side_tabs, get_table_def, get_tabs, paginate_total, build_pagination, request_area_param
 from common import config as cfg
 from common import settings as settings_mod
@@ -57,8 +61,13 @@ AUDIO_TABLE_COLUMNS = ["artist", "album", "song", "duration", "size", "date_modi
 
 def _ensure_audio_table_schema(conn=None):
     conn = db._get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "audio"):
+        return conn
+    if not db._table_exists(conn, "lp_audio"):
+        return conn
     db.add_column_if_missing(conn, "lp_audio", "duration", "TEXT")
     conn.commit()
+    schema_registry.mark_ready(conn, "audio")
     return conn
 
 
@@ -68,12 +77,19 @@ def _utc_now():
 
 def _ensure_playlist_schema(conn=None):
     conn = db._get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "audio_playlists"):
+        return conn
     conn.executescript(AUDIO_PLAYLIST_SCHEMA)
     collections_mod.ensure_collections_schema(conn)
     conn.commit()
+    schema_registry.mark_ready(conn, "audio_playlists")
     return conn
 
 
+schema_registry.register("audio", _ensure_audio_table_schema)
+schema_registry.register("audio_playlists", _ensure_playlist_schema)
+
+
 def _get_playlist(conn, playlist_id):
     if not playlist_id:
         return None
@@ -211,34 +227,50 @@ def _get_tbl():
     return get_table_def("audio")
 
 
-def _fetch_audio(area=None, sort_col=None, sort_dir=None, limit=None, offset=None):
+AUDIO_ORDER_MAP = {
+    "file_name": "t.file_name",
+    "path": "t.path",
+    "file_type": "t.file_type",
+    "size": "t.size",
+    "date_modified": "t.date_modified",
+    "duration": "t.duration",
+    "artist": "t.artist",
+    "album": "t.album",
+    "song": "t.song",
+    "area": "t.area",
+}
+AUDIO_SEARCH_COLUMNS = ["file_name", "path", "artist", "album", "song"]
+
+
+def _audio_order_by(sort_col=None, sort_dir=None):
+    sort_key = AUDIO_ORDER_MAP.get(sort_col or "file_name", "t.file_name")
+    sort_dir = "desc" if (sort_dir or "").lower() == "desc" else "asc"
+    return f"{sort_key} {sort_dir}"
+
+
+def _fetch_audio(area=None, sort_col=None, sort_dir=None, limit=None, offset=None, cursor=None):
     _ensure_audio_table_schema()
     tbl = _get_tbl()
     if not tbl:
         return []
     cols = ["id"] + tbl["col_list"]
-    order_map = {
-        "file_name": "t.file_name",
-        "path": "t.path",
-        "file_type": "t.file_type",
-        "size": "t.size",
-        "date_modified": "t.date_modified",
-        "duration": "t.duration",
-        "artist": "t.artist",
-        "album": "t.album",
-        "song": "t.song",
-        "area": "t.area",
-    }
-    sort_key = order_map.get(sort_col or "file_name", "t.file_name")
-    sort_dir = sort_dir or "asc"
-    order_by = f"{sort_key} {sort_dir}"
+    order_by = _audio_order_by(sort_col, sort_dir)
+    if limit is not None:
+        return db.get_mapped_page(
+            db.conn,
+            tbl["name"],
+            cols,
+            tab=area,
+            limit=limit,
+            order_by=order_by,
+            cursor=cursor,
+            offset=offset,
+        )
     rows = db.get_mapped_rows(
         db.conn,
         tbl["name"],
         cols,
         tab=area,
-        limit=limit,
-        offset=offset,
         order_by=order_by,
     )
     return [dict(row) for row in rows]
@@ -277,23 +309,91 @@ def _fetch_audio_by_ids(audio_ids):
     return [by_id[audio_id] for audio_id in audio_ids if audio_id in by_id]
 
 
-def _audio_item_matches_terms(item, terms):
-    if not terms:
-        return True
-    search_cols = ["file_name", "path", "artist", "album", "song"]
-    values = ["{}".format(item.get(col) or "").lower() for col in search_cols]
-    return all(any(term in value for value in values) for term in terms)
+def _audio_search_terms(query):
+    return [term.lower() for term in (query or "").strip().split() if term]
+
+
+def _audio_search_source(conn, tbl, cols, area, terms):
+    """FROM, WHERE and params for the audio rows in ``area`` matching every term.
+
+    Terms are matched through the lp_search_doc trigram index; without FTS5
+    each term becomes a LIKE over the searched columns.
+    """
+    from_sql, where_sql, params = db._mapped_rows_source(conn, tbl["name"], cols, tab=area)
+    where = [where_sql] if where_sql else []
+    if terms:
+        condition = search_mod.doc_match_condition(conn, "audio", terms, "t.id")
+        if condition is not None:
+            where.append(condition[0])
+            params.extend(condition[1])
+        else:
+            search_cols = [col for col in AUDIO_SEARCH_COLUMNS if col in tbl["col_list"]]
+            for term in terms:
+                where.append(
+                    "(" + " OR ".join(f"lower(COALESCE(t.{col}, '')) LIKE ?" for col in search_cols) + ")"
+                )
+                params.extend([f"%{term}%"] * len(search_cols))
+    return from_sql, " AND ".join(where) or "1=1", params
 
 
 def _fetch_audio_search(area=None, query=None, sort_col=None, sort_dir=None, limit=None, offset=None):
-    terms = [term.lower() for term in (query or "").strip().split() if term]
-    items = _fetch_audio(area, sort_col, sort_dir, limit=None, offset=None)
-    filtered = [item for item in items if _audio_item_matches_terms(item, terms)]
-    if offset:
-        filtered = filtered[int(offset):]
+    """One page of audio rows matching ``query``; ``_count_audio_search`` counts them."""
+    conn = _ensure_audio_table_schema()
+    tbl = _get_tbl()
+    if not tbl:
+        return []
+    cols = ["id"] + tbl["col_list"]
+    from_sql, where_sql, params = _audio_search_source(conn, tbl, cols, area, _audio_search_terms(query))
+    sql = (
+        f"SELECT {db._qualify_cols(cols, 't')} FROM {from_sql} WHERE {where_sql} "
+        f"ORDER BY {_audio_order_by(sort_col, sort_dir)}, t.id"
+    )
     if limit is not None:
-        filtered = filtered[: int(limit)]
-    return filtered
+        sql += " LIMIT ?"
+        params.append(int(limit))
+        if offset:
+            sql += " OFFSET ?"
+            params.append(int(offset))
+    return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+
+def _count_audio_search(area=None, query=None):
+    conn = _ensure_audio_table_schema()
+    tbl = _get_tbl()
+    if not tbl:
+        return 0
+    cols = ["id"] + tbl["col_list"]
+    from_sql, where_sql, params = _audio_search_source(conn, tbl, cols, area, _audio_search_terms(query))
+    return conn.execute(f"SELECT COUNT(1) FROM {from_sql} WHERE {where_sql}", params).fetchone()[0]
+
+
+def _audio_search_page(area=None, query=None, sort_col=None, sort_dir=None, page=1):
+    total = _count_audio_search(area, query)
+    page_data = paginate_total(total, page, cfg.RECS_PER_PAGE)
+    page = page_data["page"]
+    return {
+        "items": _fetch_audio_search(
+            area,
+            query,
+            sort_col=sort_col,
+            sort_dir=sort_dir,
+            limit=cfg.RECS_PER_PAGE,
+            offset=(page - 1) * cfg.RECS_PER_PAGE,
+        ),
+        "total": total,
+        "page": page,
+        "total_pages": page_data["total_pages"],
+    }
+
+
+def _cached_audio_search(area=None, query=None, sort_col=None, sort_dir=None, page=1):
+    tbl = _get_tbl()
+    tables = [tbl["name"] if tbl else "lp_audio", "lp_record_area", "lp_area_folders", "lp_areas", "dim_folder"]
+    return search_cache.cached(
+        ("audio_search", search_user_key(), area, query, sort_col, sort_dir, page),
+        tables,
+        lambda: _audio_search_page(area, query, sort_col=sort_col, sort_dir=sort_dir, page=page),
+    )
 
 
 def _sort_items(items, sort_col, sort_dir):
@@ -386,17 +486,18 @@ def list_audio_table_route():
     page = request.args.get("page", type=int) or 1
     per_page = cfg.RECS_PER_PAGE
     total = db.count_mapped_rows(db.conn, _get_tbl()["name"], tab=area)
-    offset = (page - 1) * per_page
-    items = _fetch_audio(area, sort_col, sort_dir, limit=per_page, offset=offset)
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
+    offset = (page - 1) * per_page
+    items = _fetch_audio(area, sort_col, sort_dir, limit=per_page, offset=offset, cursor=request.args.get("cursor"))
     pagination = build_pagination(
         url_for,
         "audio.list_audio_table_route",
         {"area": area, "sort": sort_col, "dir": sort_dir},
         page,
         total_pages,
+        rows=items,
     )
     tbl = _get_tbl()
     col_list = [col for col in AUDIO_TABLE_COLUMNS if tbl and col in tbl["col_list"]]
@@ -421,6 +522,8 @@ def list_audio_table_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
     )
 
 
@@ -430,17 +533,18 @@ def list_audio_list_route():
     page = request.args.get("page", type=int) or 1
     per_page = cfg.RECS_PER_PAGE
     total = db.count_mapped_rows(db.conn, _get_tbl()["name"], tab=area)
-    offset = (page - 1) * per_page
-    items = _fetch_audio(area, limit=per_page, offset=offset)
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
+    offset = (page - 1) * per_page
+    items = _fetch_audio(area, limit=per_page, offset=offset, cursor=request.args.get("cursor"))
     pagination = build_pagination(
         url_for,
         "audio.list_audio_list_route",
         {"area": area},
         page,
         total_pages,
+        rows=items,
     )
     conn = _ensure_playlist_schema()
     _ensure_default_playlist(conn)
@@ -460,6 +564,8 @@ def list_audio_list_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
     )
 
 
@@ -8,6 +8,7 @@ import sqlite3
 from typing import Iterable
 
 from common import data as db
+from common import schema_registry
 
 
 EVENT_COLUMNS = {
@@ -78,7 +79,7 @@ def ensure_calendar_schema(conn: sqlite3.Connection | None = None, force: bool =
     conn = db._get_conn() if conn is None else conn
     if conn.row_factory is None:
         conn.row_factory = sqlite3.Row
-    if not force and _schema_ready(conn):
+    if not force and schema_registry.is_ready(conn, "calendar"):
         return
     conn.execute("PRAGMA foreign_keys = ON")
     conn.executescript(
@@ -214,8 +215,11 @@ def ensure_calendar_schema(conn: sqlite3.Connection | None = None, force: bool =
     )
     seed_calendar_sources(conn)
     migrate_existing_calendar_events(conn)
-    conn.commit()
-    _mark_schema_ready(conn)
+    db.commit(conn)
+    schema_registry.mark_ready(conn, "calendar")
+
+
+schema_registry.register("calendar", ensure_calendar_schema)
 
 
 def seed_calendar_sources(conn: sqlite3.Connection | None = None) -> None:
@@ -283,7 +287,7 @@ def run_calendar_migration(conn: sqlite3.Connection | None = None) -> None:
     refresh_calendar_source("holidays_au", conn=conn, full_rebuild=True)
     refresh_calendar_source("holidays_sa", conn=conn, full_rebuild=True)
     rebuild_calendar_day_stats(conn=conn)
-    conn.commit()
+    db.commit(conn)
 
 
 def project_manual_event(event_id: int, conn: sqlite3.Connection | None = None) -> None:
@@ -304,7 +308,7 @@ def project_manual_event(event_id: int, conn: sqlite3.Connection | None = None)
     occurrence_key = f"manual:{event_id}"
     _upsert_item(conn, source_id, "manual", event, occurrence_key, "event", recurrence_parent_id=None)
     _touch_source(conn, "manual", "current", 1, "Projected manual event.")
-    conn.commit()
+    db.commit(conn)
 
 
 def project_all_manual_events(conn: sqlite3.Connection | None = None) -> int:
@@ -314,8 +318,9 @@ def project_all_manual_events(conn: sqlite3.Connection | None = None) -> int:
         "SELECT id FROM lp_calendar_events "
         "WHERE COALESCE(source, 'manual') = 'manual' AND COALESCE(recurrence_rule, '') = ''"
     ).fetchall()
-    for row in rows:
-        project_manual_event(row["id"], conn)
+    with db.deferred_commits(conn):
+        for row in rows:
+            project_manual_event(row["id"], conn)
     return len(rows)
 
 
@@ -326,7 +331,7 @@ def delete_projected_event(event_id: int, conn: sqlite3.Connection | None = None
         "DELETE FROM lp_calendar_items WHERE source_key IN ('manual', 'recurring') AND source_record_id = ?",
         [str(event_id)],
     )
-    conn.commit()
+    db.commit(conn)
 
 
 def rebuild_calendar_item_days(calendar_item_id: int | None = None, conn: sqlite3.Connection | None = None) -> None:
@@ -344,7 +349,7 @@ def rebuild_calendar_item_days(calendar_item_id: int | None = None, conn: sqlite
         conn.execute("DELETE FROM lp_calendar_item_days WHERE calendar_item_id = ?", [calendar_item_id])
     for row in rows:
         _insert_item_days(conn, row["id"], row["start_date"], row["end_date"])
-    conn.commit()
+    db.commit(conn)
 
 
 def refresh_all_calendar_sources(enabled_only: bool = True, conn: sqlite3.Connection | None = None) -> list[RefreshResult]:
@@ -390,7 +395,7 @@ def refresh_calendar_source(
         result.message = str(exc)
     result.completed_at = _now()
     _touch_source(conn, source_key, result.status, result.rows_inserted + result.rows_updated, result.message)
-    conn.commit()
+    db.commit(conn)
     return result
 
 
@@ -413,7 +418,7 @@ def rebuild_calendar_day_stats(
             inserted += _stats_audio(conn, from_date, to_date)
         elif key == "usage":
             _touch_source(conn, "usage", "current", 0, "No usage adapter available.")
-    conn.commit()
+    db.commit(conn)
     return inserted
 
 
@@ -487,7 +492,7 @@ def missing_calendar_day_stat_baselines(
             }
         )
     if updated_config:
-        conn.commit()
+        db.commit(conn)
     return missing
 
 
@@ -602,7 +607,7 @@ def save_calendar_sources(form, conn: sqlite3.Connection | None = None) -> None:
                 key,
             ),
         )
-    conn.commit()
+    db.commit(conn)
 
 
 def create_calendar_event(values: dict, conn: sqlite3.Connection | None = None) -> int:
@@ -614,16 +619,16 @@ def create_calendar_event(values: dict, conn: sqlite3.Connection | None = None)
     normalized.setdefault("created_at", now)
     normalized["updated_at"] = now
     cols = [col for col in EVENT_COLUMNS if col in normalized and col != "id"]
-    cur = conn.execute(
-        f"INSERT INTO lp_calendar_events ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})",
-        [normalized.get(col) for col in cols],
-    )
-    event_id = cur.lastrowid
-    if normalized.get("recurrence_rule"):
-        refresh_calendar_source("recurring", conn=conn, full_rebuild=True)
-    else:
-        project_manual_event(event_id, conn)
-    conn.commit()
+    with db.deferred_commits(conn):
+        cur = conn.execute(
+            f"INSERT INTO lp_calendar_events ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})",
+            [normalized.get(col) for col in cols],
+        )
+        event_id = cur.lastrowid
+        if normalized.get("recurrence_rule"):
+            refresh_calendar_source("recurring", conn=conn, full_rebuild=True)
+        else:
+            project_manual_event(event_id, conn)
     return event_id
 
 
@@ -633,16 +638,16 @@ def update_calendar_event(event_id: int, values: dict, conn: sqlite3.Connection
     normalized = normalize_event_values(values)
     normalized["updated_at"] = _now()
     cols = [col for col in EVENT_COLUMNS if col in normalized and col != "id"]
-    conn.execute(
-        f"UPDATE lp_calendar_events SET {', '.join([f'{col} = ?' for col in cols])} WHERE id = ?",
-        [normalized.get(col) for col in cols] + [event_id],
-    )
-    delete_projected_event(event_id, conn)
-    if normalized.get("recurrence_rule"):
-        refresh_calendar_source("recurring", conn=conn, full_rebuild=True)
-    else:
-        project_manual_event(event_id, conn)
-    conn.commit()
+    with db.deferred_commits(conn):
+        conn.execute(
+            f"UPDATE lp_calendar_events SET {', '.join([f'{col} = ?' for col in cols])} WHERE id = ?",
+            [normalized.get(col) for col in cols] + [event_id],
+        )
+        delete_projected_event(event_id, conn)
+        if normalized.get("recurrence_rule"):
+            refresh_calendar_source("recurring", conn=conn, full_rebuild=True)
+        else:
+            project_manual_event(event_id, conn)
 
 
 def normalize_event_values(values: dict) -> dict:
@@ -1377,16 +1382,6 @@ def _table_has_cols(conn, table, cols):
     return set(cols).issubset(existing)
 
 
-def _schema_ready(conn):
-    return conn.execute(
-        "SELECT 1 FROM sqlite_temp_master WHERE type = 'table' AND name = 'lp_calendar_schema_ready'"
-    ).fetchone() is not None
-
-
-def _mark_schema_ready(conn):
-    conn.execute("CREATE TEMP TABLE IF NOT EXISTS lp_calendar_schema_ready (ready INTEGER)")
-
-
 def _int(value, default=0):
     try:
         return int(value)
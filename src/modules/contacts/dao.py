@@ -2,6 +2,7 @@ import csv
 import re
 
 from common import data as db
+from common import keyset
 
 FACT_TYPES = ("email", "phone", "address", "url", "org", "note", "other")
 
@@ -12,31 +13,36 @@ def normalize_name(value):
     return " ".join(text.split())
 
 
-def list_contacts(sort_key=None, sort_dir=None, limit=None, offset=None):
+def list_contacts(sort_key=None, sort_dir=None, limit=None, offset=None, cursor=None):
     conn = db._get_conn()
+    fact_count_sql = "(SELECT COUNT(1) FROM lp_contact_facts f WHERE f.contact_id = c.contact_id)"
     order_map = {
         "display_name": "c.display_name",
         "normalized_name": "c.normalized_name",
         "created_utc": "c.created_utc",
         "updated_utc": "c.updated_utc",
-        "fact_count": "fact_count",
+        "fact_count": fact_count_sql,
     }
     sort_key = order_map.get(sort_key or "display_name", "c.display_name")
     sort_dir = "desc" if (sort_dir or "").lower() == "desc" else "asc"
-    sql = (
-        "SELECT c.contact_id, c.display_name, c.normalized_name, c.created_utc, c.updated_utc, "
-        "(SELECT COUNT(1) FROM lp_contact_facts f WHERE f.contact_id = c.contact_id) AS fact_count "
-        "FROM lp_contacts c "
-        f"ORDER BY {sort_key} {sort_dir}"
+    select_sql = (
+        "c.contact_id, c.display_name, c.normalized_name, c.created_utc, c.updated_utc, "
+        f"{fact_count_sql} AS fact_count"
     )
-    params = []
     if limit is not None:
-        sql += " LIMIT ?"
-        params.append(int(limit))
-        if offset:
-            sql += " OFFSET ?"
-            params.append(int(offset))
-    rows = conn.execute(sql, params).fetchall()
+        return keyset.fetch_page(
+            conn,
+            select_sql,
+            "lp_contacts c",
+            "",
+            [],
+            f"{sort_key} {sort_dir}",
+            limit,
+            cursor=cursor,
+            offset=offset,
+            id_expr="c.contact_id",
+        )
+    rows = conn.execute(f"SELECT {select_sql} FROM lp_contacts c ORDER BY {sort_key} {sort_dir}").fetchall()
     return [dict(row) for row in rows]
 
 
@@ -60,7 +60,7 @@ def list_contacts_table_route():
     per_page = cfg.RECS_PER_PAGE
     total = dao.count_contacts()
     offset = (page - 1) * per_page
-    items = dao.list_contacts(sort_col, sort_dir, limit=per_page, offset=offset)
+    items = dao.list_contacts(sort_col, sort_dir, limit=per_page, offset=offset, cursor=request.args.get("cursor"))
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
@@ -70,6 +70,7 @@ def list_contacts_table_route():
         {"sort": sort_col, "dir": sort_dir},
         page,
         total_pages,
+        rows=items,
     )
     col_list = ["display_name", "normalized_name", "updated_utc", "fact_count"]
     return render_template(
@@ -88,6 +89,8 @@ def list_contacts_table_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
     )
 
 
@@ -97,7 +100,7 @@ def list_contacts_list_route():
     per_page = cfg.RECS_PER_PAGE
     total = dao.count_contacts()
     offset = (page - 1) * per_page
-    items = dao.list_contacts("display_name", "asc", limit=per_page, offset=offset)
+    items = dao.list_contacts("display_name", "asc", limit=per_page, offset=offset, cursor=request.args.get("cursor"))
     contact_ids = [item["contact_id"] for item in items]
     summaries = _fetch_contact_summaries(contact_ids)
     for item in items:
@@ -111,6 +114,7 @@ def list_contacts_list_route():
         {},
         page,
         total_pages,
+        rows=items,
     )
     return render_template(
         "contacts_list_list.html",
@@ -125,6 +129,8 @@ def list_contacts_list_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
     )
 
 
@@ -134,7 +140,7 @@ def list_contacts_cards_route():
     per_page = cfg.RECS_PER_PAGE
     total = dao.count_contacts()
     offset = (page - 1) * per_page
-    items = dao.list_contacts("display_name", "asc", limit=per_page, offset=offset)
+    items = dao.list_contacts("display_name", "asc", limit=per_page, offset=offset, cursor=request.args.get("cursor"))
     contact_ids = [item["contact_id"] for item in items]
     summaries = _fetch_contact_summaries(contact_ids)
     card_values = [
@@ -154,6 +160,7 @@ def list_contacts_cards_route():
         {},
         page,
         total_pages,
+        rows=items,
     )
     return render_template(
         "contacts_list_cards.html",
@@ -168,6 +175,8 @@ def list_contacts_cards_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
     )
 
 
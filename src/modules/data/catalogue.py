@@ -622,9 +622,13 @@ def object_related_records(object_id):
         link_model.ensure_links_schema(common_data._get_conn())
         outgoing = link_model.list_outgoing(common_data._get_conn(), "data_table", object_id)
         incoming = link_model.list_incoming(common_data._get_conn(), "data_table", object_id)
+        summaries = links_records.get_record_summaries(
+            [(link.get("dst_type"), link.get("dst_id")) for link in outgoing]
+            + [(link.get("src_type"), link.get("src_id")) for link in incoming]
+        )
         related = []
         for link in outgoing:
-            summary = links_records.get_record_summary(link.get("dst_type"), link.get("dst_id"))
+            summary = summaries.get((link.get("dst_type"), str(link.get("dst_id"))))
             related.append(
                 {
                     "direction": "outgoing",
@@ -636,7 +640,7 @@ def object_related_records(object_id):
                 }
             )
         for link in incoming:
-            summary = links_records.get_record_summary(link.get("src_type"), link.get("src_id"))
+            summary = summaries.get((link.get("src_type"), str(link.get("src_id"))))
             related.append(
                 {
                     "direction": "incoming",
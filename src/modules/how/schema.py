@@ -1,5 +1,7 @@
 from datetime import datetime, timezone
 
+from common import schema_registry
+
 
 HOW_SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS lp_howto (
@@ -198,9 +200,15 @@ def _migrate_how_area_columns(conn):
                     )
 
 
-def ensure_how_schema(conn):
+def ensure_how_schema(conn, force=False):
     conn.execute("PRAGMA foreign_keys = ON")
+    if not force and schema_registry.is_ready(conn, "how"):
+        return
     _migrate_how_area_columns(conn)
     conn.executescript(HOW_SCHEMA_SQL)
     _migrate_how_area_columns(conn)
     conn.commit()
+    schema_registry.mark_ready(conn, "how")
+
+
+schema_registry.register("how", ensure_how_schema)
@@ -23,16 +23,19 @@ def _ensure_schema():
 def _attach_other_summary(links, perspective):
     if not links:
         return links
+    prefix = "src" if perspective == "incoming" else "dst"
+    refs = [
+        (link.get(f"{prefix}_type"), link.get(f"{prefix}_id"))
+        for link in links
+        if link.get(f"{prefix}_type") and link.get(f"{prefix}_id")
+    ]
+    summaries = links_records.get_record_summaries(refs)
     for link in links:
-        if perspective == "incoming":
-            other_type = link.get("src_type")
-            other_id = link.get("src_id")
-        else:
-            other_type = link.get("dst_type")
-            other_id = link.get("dst_id")
+        other_type = link.get(f"{prefix}_type")
+        other_id = link.get(f"{prefix}_id")
         if not other_type or not other_id:
             continue
-        summary = links_records.get_record_summary(other_type, other_id)
+        summary = summaries.get((other_type, str(other_id)))
         if summary:
             link["other_summary"] = summary
     return links
@@ -12,6 +12,7 @@ from flask import Blueprint, current_app, jsonify, request
 
 from common import config as cfg
 from common import data
+from common import schema_registry
 from common import settings as settings_mod
 from common.network_log import log_network
 
@@ -41,6 +42,8 @@ def _json_error(error, status_code=400, relative_path=""):
 
 def ensure_logger_schema(conn=None):
     conn = data._get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "logger_api"):
+        return
     conn.executescript(
         """
         CREATE TABLE IF NOT EXISTS lp_logger_device (
@@ -93,6 +96,10 @@ def ensure_logger_schema(conn=None):
         """
     )
     conn.commit()
+    schema_registry.mark_ready(conn, "logger_api")
+
+
+schema_registry.register("logger_api", ensure_logger_schema)
 
 
 def _settings(conn=None, user_id=None, username=None):
@@ -274,7 +281,7 @@ def _update_run(logger_sync_run_id, status, message="", bytes_received=0, succee
         "UPDATE lp_logger_sync_run SET status = ? WHERE logger_sync_run_id = ?",
         (status, logger_sync_run_id),
     )
-    conn.commit()
+    data.commit(conn)
 
 
 def _write_uploaded_file(upload, destination, expected_size=None):
@@ -330,7 +337,7 @@ def _record_file(run, device, relative_path, log_type, file_date, destination, f
             "UPDATE lp_logger_device SET last_sync_at = ?, updated_at = ? WHERE logger_device_id = ?",
             (now, now, device["logger_device_id"]),
         )
-    conn.commit()
+    data.commit(conn)
 
 
 @logger_api_bp.route("/status", methods=["GET"])
@@ -375,19 +382,24 @@ def upload_route():
             raise ValueError("Invalid log path")
         file_size = int(request.form.get("file_size") or 0)
         bytes_received, file_status = _write_uploaded_file(uploaded_file, destination, file_size if file_size else None)
-        _record_file(
-            run,
-            device,
-            relative_path,
-            log_type,
-            file_date,
-            destination,
-            bytes_received,
-            request.form.get("last_modified") or "",
-            file_status,
-            conn=conn,
-        )
-        _update_run(run["logger_sync_run_id"], "success", "File stored.", bytes_received, succeeded=True, conn=conn)
+        last_modified = request.form.get("last_modified") or ""
+
+        def record_upload(write_conn):
+            _record_file(
+                run,
+                device,
+                relative_path,
+                log_type,
+                file_date,
+                destination,
+                bytes_received,
+                last_modified,
+                file_status,
+                conn=write_conn,
+            )
+            _update_run(run["logger_sync_run_id"], "success", "File stored.", bytes_received, succeeded=True, conn=write_conn)
+
+        data.run_write(record_upload, conn=conn)
         log_network(
             "logger_upload_success",
             device_id=device["device_uuid"],
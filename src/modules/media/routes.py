@@ -9,13 +9,18 @@ from datetime import datetime, timedelta, timezone
 from flask import Blueprint, render_template, request, url_for, send_file, abort, redirect
 from flask_login import current_user
 
+import etl_folder_mapping as folder_etl
 from common import data as db
 from common import config as cfg
 from common import collections as collections_mod
+from common import keyset
+from common import row_counts
+from common import search_cache
 from common import projects as projects_mod
 from common import settings as settings_mod
+from common import user_paths
 from common.media_schema import ensure_media_schema
-from common.search import parse_search_terms
+from common.search import parse_search_terms, search_user_key
 from common.utils import get_side_tabs, get_tabs, paginate_total, build_pagination, request_area_param
 from core import security
 
@@ -244,23 +249,37 @@ def _build_media_filters(
         where.append("substr(COALESCE(meta.taken_utc, m.mtime_utc), 1, 4) = ?")
         params.append(str(year_filter))
     if folder_filter:
-        folder_value = os.path.normpath(folder_filter).rstrip("\\/")
-        where.append(
-            "(lower(replace(m.path, '/', '\\')) = lower(?) "
-            "OR lower(replace(m.path, '/', '\\')) LIKE lower(?))"
-        )
-        params.extend([folder_value, folder_value + "\\%"])
+        folder_sql, folder_params = _media_folder_condition(os.path.normpath(folder_filter).rstrip("\\/"))
+        where.append(folder_sql)
+        params.extend(folder_params)
     _build_search_conditions(base_terms, where, params)
     _build_search_conditions(extra_terms, where, params)
     return joins, where, params
 
 
+def _media_folder_condition(folder_value):
+    path_params = user_paths.path_under_params(folder_value)
+    if not db.ensure_folder_closure(db._get_conn()):
+        return user_paths.path_under_sql("m.path"), path_params
+    # Rows linked to dim_folder are found through the folder closure; only
+    # rows imported without a folder_id fall back to the path prefix scan.
+    sql = (
+        "m.media_id IN ("
+        "SELECT fm.media_id FROM lp_media fm WHERE "
+        + db.folder_subtree_sql("fm.folder_id", 2)
+        + " UNION ALL SELECT fm.media_id FROM lp_media fm WHERE fm.folder_id IS NULL AND "
+        + user_paths.path_under_sql("fm.path")
+        + ")"
+    )
+    return sql, [folder_value, folder_etl.norm_path(folder_value)] + path_params
+
+
 def _media_order_clause(sort_key):
     if sort_key == "mtime_desc":
         return "m.mtime_utc DESC"
     if sort_key == "filename":
         return "m.filename ASC"
-    return "sort_utc DESC"
+    return "COALESCE(meta.taken_utc, m.mtime_utc) DESC"
 
 
 def _tags_join_sql():
@@ -278,7 +297,7 @@ def _needs_tags_join(where):
     return any("tags." in clause for clause in where)
 
 
-def _fetch_media(conn, joins, where, params, sort_key, limit=None, offset=None):
+def _fetch_media(conn, joins, where, params, sort_key, limit=None, offset=None, cursor=None):
     needs_tags = _needs_tags_join(where)
     select_cols = [
         "m.media_id",
@@ -301,26 +320,36 @@ def _fetch_media(conn, joins, where, params, sort_key, limit=None, offset=None):
         "tags.tags_text" if needs_tags else "NULL AS tags_text",
         "COALESCE(meta.taken_utc, m.mtime_utc) AS sort_utc",
     ]
-    sql = (
-        "SELECT "
-        + ", ".join(select_cols)
-        + " FROM lp_media m "
+    from_sql = (
+        "lp_media m "
         + "LEFT JOIN lp_media_meta meta ON meta.media_id = m.media_id "
         + (_tags_join_sql() if needs_tags else "")
         + (" ".join(joins) + " " if joins else "")
+    )
+    if limit is not None:
+        return keyset.fetch_page(
+            conn,
+            ", ".join(select_cols),
+            from_sql,
+            " AND ".join(where),
+            params,
+            _media_order_clause(sort_key),
+            limit,
+            cursor=cursor,
+            offset=offset,
+            id_expr="m.media_id",
+        )
+    sql = (
+        "SELECT "
+        + ", ".join(select_cols)
+        + " FROM "
+        + from_sql
         + "WHERE "
         + " AND ".join(where)
         + " ORDER BY "
         + _media_order_clause(sort_key)
     )
-    sql_params = list(params)
-    if limit is not None:
-        sql += " LIMIT ?"
-        sql_params.append(int(limit))
-        if offset:
-            sql += " OFFSET ?"
-            sql_params.append(int(offset))
-    rows = conn.execute(sql, sql_params).fetchall()
+    rows = conn.execute(sql, list(params)).fetchall()
     return [dict(row) for row in rows]
 
 
@@ -336,6 +365,27 @@ def _fetch_media_by_id(conn, media_id):
     return items[0] if items else None
 
 
+# Tables read by build_media_search_context; a write to any of them
+# invalidates cached media search results.
+MEDIA_SEARCH_TABLES = (
+    "lp_media",
+    "lp_media_meta",
+    "lp_media_tags",
+    "lp_tags",
+    "lp_albums",
+    "lp_album_items",
+    "lp_event_items",
+)
+
+
+def cached_media_search_context(query, args=None):
+    args = args or {}
+    key = ("media_search", search_user_key(), query) + tuple(
+        args.get(name) or "" for name in ("view_mode", "sort", "group", "media_type")
+    )
+    return search_cache.cached(key, MEDIA_SEARCH_TABLES, lambda: build_media_search_context(query, args))
+
+
 def build_media_search_context(query, args=None):
     _ensure_schema()
     args = args or {}
@@ -387,7 +437,7 @@ def build_media_search_context(query, args=None):
     }
 
 
-def _count_media(conn, joins, where, params):
+def _count_media(conn, joins, where, params, cache=False):
     sql = (
         "SELECT COUNT(1) AS cnt FROM lp_media m "
         "LEFT JOIN lp_media_meta meta ON meta.media_id = m.media_id "
@@ -396,6 +446,8 @@ def _count_media(conn, joins, where, params):
         + "WHERE "
         + " AND ".join(where)
     )
+    if cache:
+        return row_counts.query_count(conn, "lp_media", sql, params)
     row = conn.execute(sql, params).fetchone()
     return row["cnt"] if row else 0
 
@@ -1091,13 +1143,25 @@ def media_explorer_route():
         pages = []
         first_url = ""
         last_url = ""
+        prev_url = ""
+        next_url = ""
     else:
-        total = _count_media(conn, joins, where, list(params))
+        # Free-text searches are one-off; only browse views keep a counter.
+        total = _count_media(conn, joins, where, list(params), cache=not q)
         page_data = paginate_total(total, page, per_page)
         page = page_data["page"]
         total_pages = page_data["total_pages"]
         offset = (page - 1) * per_page
-        items = _fetch_media(conn, joins, where, list(params), sort_key, limit=per_page, offset=offset)
+        items = _fetch_media(
+            conn,
+            joins,
+            where,
+            list(params),
+            sort_key,
+            limit=per_page,
+            offset=offset,
+            cursor=request.args.get("cursor"),
+        )
         groups = _group_media(items, group_by) if view == "timeline" else []
         pagination = build_pagination(
             url_for,
@@ -1105,10 +1169,13 @@ def media_explorer_route():
             base_args_clean,
             page,
             total_pages,
+            rows=items,
         )
         pages = pagination["pages"]
         first_url = pagination["first_url"]
         last_url = pagination["last_url"]
+        prev_url = pagination["prev_url"]
+        next_url = pagination["next_url"]
 
     if page > 1:
         focus_args["page"] = page
@@ -1179,6 +1246,8 @@ def media_explorer_route():
         item_pages=pages,
         item_first_url=first_url,
         item_last_url=last_url,
+        item_prev_url=prev_url,
+        item_next_url=next_url,
         event_page=event_page,
         event_total_pages=event_total_pages,
         event_pages=event_pages,
@@ -7,6 +7,7 @@ from urllib.request import Request, urlopen
 
 from common import data as db
 from common import config as cfg
+from common import schema_registry
 
 
 STATUS_VALUES = tuple(cfg.MONEY_PLAN_STATUSES)
@@ -26,6 +27,8 @@ MANUAL_MARKET = "Manual / Yahoo symbol"
 
 def ensure_money_schema(conn=None):
     conn = db._get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "money"):
+        return conn
     schema_path = os.path.abspath(
         os.path.join(os.path.dirname(__file__), "..", "..", "schema_money.sql")
     )
@@ -33,9 +36,13 @@ def ensure_money_schema(conn=None):
         conn.executescript(handle.read())
     db.add_column_if_missing(conn, "lp_money_share_trades", "market", "TEXT")
     conn.commit()
+    schema_registry.mark_ready(conn, "money")
     return conn
 
 
+schema_registry.register("money", ensure_money_schema)
+
+
 def sections():
     return cfg.MONEY_SECTIONS
 
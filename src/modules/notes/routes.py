@@ -5,6 +5,7 @@ import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 from difflib import SequenceMatcher
 from datetime import datetime, timezone
 from urllib.parse import urlencode, unquote
@@ -14,10 +15,16 @@ from flask_login import current_user
 from werkzeug.utils import secure_filename
 
 from common import data
+from common import keyset
+from common import note_link_graph
+from common import note_front_matter
+from common import note_import
+from common import note_render_cache
 from common import note_search_index
+from common import note_title_index
+from common import record_area
 from common import settings as settings_mod
 from utils import importer
-from utils import markdown_utils
 from utils import hex_utils
 from utils import note_inspect
 from common.utils import (
@@ -44,12 +51,14 @@ notes_bp = Blueprint("notes", __name__, url_prefix="/notes",
 INVALID_TITLE_CHARS = re.compile(r'[<>:"/\\|?*]')
 WHITESPACE_RE = re.compile(r"\s+")
 NOTE_TITLE_MAX_LEN = 80
-NOTE_FRONT_MATTER_READ_LIMIT = 128 * 1024
 DEFAULT_NOTE_COLOR = "#FFF7CC"
 NOTES_PER_PAGE = 50
 NOTE_CARD_MAX_CHARS = 50
 NOTE_CARD_TITLE_FONT_SIZE = 18
 NOTE_CARD_PREVIEW_CHARS = 300
+# Extra indexed preview characters fetched per card, so dropping a duplicate
+# title heading still leaves the requested number of body characters.
+NOTE_CARD_PREVIEW_HEADING_CHARS = 256
 NOTE_CARD_DEFAULT_MODE = "grid"
 NOTE_COLOR_HEX_RE = re.compile(r"^#(?:[0-9A-Fa-f]{3}|[0-9A-Fa-f]{6}|[0-9A-Fa-f]{8})$")
 NOTE_COLOR_NAMES = {
@@ -81,9 +90,6 @@ NOTE_COLOR_OPTIONS = [
 ]
 NOTEBOOK_COVER_UPLOAD_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
 NOTE_VIEW_MODES = {"text", "markdown", "inspect", "hex", "sample", "metadata"}
-NOTE_WIKI_LINK_RE = re.compile(r"(?<!!)\[\[([^\]\n]+)\]\]")
-NOTE_WIKI_TARGET_ID_RE = re.compile(r"(?i)^note:(\d+)$")
-NOTE_MARKDOWN_LINK_RE = re.compile(r"(?<!!)\[([^\]]+)\]\(([^)]+)\)")
 NOTE_LIST_SORT_OPTIONS = [
     ("title", "Title"),
     ("size", "Size"),
@@ -138,24 +144,7 @@ def _ensure_notes_schema(conn=None):
 
 
 def _ensure_note_links_schema(conn=None):
-    conn = data._get_conn() if conn is None else conn
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS lp_note_links (
-            link_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            src_note_id INTEGER NOT NULL,
-            target_note_id INTEGER NOT NULL,
-            link_text TEXT NOT NULL,
-            link_title TEXT,
-            created_utc TEXT NOT NULL,
-            updated_utc TEXT NOT NULL,
-            UNIQUE (src_note_id, target_note_id, link_text)
-        )
-        """
-    )
-    conn.execute("CREATE INDEX IF NOT EXISTS ix_lp_note_links_src ON lp_note_links(src_note_id)")
-    conn.execute("CREATE INDEX IF NOT EXISTS ix_lp_note_links_target ON lp_note_links(target_note_id)")
-    conn.commit()
+    note_link_graph.ensure_schema(conn)
 
 
 def _file_created_at(stat):
@@ -167,24 +156,8 @@ def _file_created_at(stat):
     return datetime.fromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S")
 
 
-def _strip_front_matter_scalar(value):
-    value = (value or "").strip()
-    if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"'):
-        return value[1:-1]
-    if " #" in value:
-        value = value.split(" #", 1)[0].rstrip()
-    return value
-
-
 def _try_read_note_front_matter(note_path):
-    if not note_path:
-        return None
-    try:
-        with open(note_path, "r", encoding="utf-8-sig", errors="replace") as handle:
-            text = handle.read(NOTE_FRONT_MATTER_READ_LIMIT)
-    except OSError:
-        return None
-    return _parse_note_front_matter_text(text)
+    return note_front_matter.read_file(note_path)
 
 
 def _read_note_front_matter(note_path):
@@ -192,21 +165,7 @@ def _read_note_front_matter(note_path):
 
 
 def _parse_note_front_matter_text(text):
-    lines = (text or "").splitlines()
-    if not lines or lines[0].strip() != "---":
-        return {}
-    values = {}
-    for line in lines[1:]:
-        stripped = line.strip()
-        if stripped in ("---", "..."):
-            break
-        if not stripped or stripped.startswith("#") or ":" not in line:
-            continue
-        key, raw_value = line.split(":", 1)
-        key = key.strip().lower().replace(" ", "_")
-        if key:
-            values[key] = _strip_front_matter_scalar(raw_value)
-    return values
+    return note_front_matter.parse_text(text)
 
 
 def _front_matter_block_text(text):
@@ -427,10 +386,11 @@ def _note_metadata_rows(note, note_path, file_exists):
     ]
 
 
-def _note_metadata_from_file(note_path, stat=None, fallback_area=""):
+def _note_metadata_from_file(note_path, stat=None, fallback_area="", front_matter=None):
     file_name = os.path.basename(note_path or "")
     title_from_file, _ = os.path.splitext(file_name)
-    front_matter = _read_note_front_matter(note_path)
+    if front_matter is None:
+        front_matter = _read_note_front_matter(note_path)
     if stat is None and note_path:
         try:
             stat = os.stat(note_path)
@@ -441,28 +401,22 @@ def _note_metadata_from_file(note_path, stat=None, fallback_area=""):
         if stat is not None
         else ""
     )
-    date_created = _front_matter_value(
-        front_matter,
-        ("date_created", "created", "created_at", "created_utc", "file_created_at", "birthtime"),
-    )
+    date_created = _front_matter_value(front_matter, note_front_matter.CREATED_KEYS)
     if not date_created and stat is not None:
         date_created = _file_created_at(stat)
-    area = _front_matter_value(
-        front_matter,
-        ("area", "area_id", "folder", "sidebar_tab", "project", "project_id", "proj"),
-    ) or fallback_area
+    area = _front_matter_value(front_matter, note_front_matter.AREA_KEYS) or fallback_area
     area = utils_normalize_area_param(area)
     if area.lower() in {"all", "all notes", "all areas", "all projects", "untitled"}:
         area = ""
     return {
-        "title": _front_matter_value(front_matter, ("title", "name")) or title_from_file,
-        "color": _front_matter_value(front_matter, ("color", "colour")),
+        "title": _front_matter_value(front_matter, note_front_matter.TITLE_KEYS) or title_from_file,
+        "color": _front_matter_value(front_matter, note_front_matter.COLOR_KEYS),
         "date_created": date_created,
         "date_modified": date_modified,
         "area": area,
         "important": _front_matter_bool_text(_front_matter_value(front_matter, ("important", "is_important"))),
-        "is_template": _note_bool_text(_front_matter_value(front_matter, ("is_template", "template"))),
-        "is_important": _note_bool_text(_front_matter_value(front_matter, ("is_important", "important"))),
+        "is_template": _note_bool_text(_front_matter_value(front_matter, note_front_matter.TEMPLATE_KEYS)),
+        "is_important": _note_bool_text(_front_matter_value(front_matter, note_front_matter.IMPORTANT_KEYS)),
         "source_note_id": _front_matter_value(front_matter, ("source_note_id", "lifepim_com_note_id", "note_id")),
     }
 
@@ -734,14 +688,6 @@ def _normalize_folder_filter(folder_path):
     return _normalize_note_path(folder_path) or folder_path
 
 
-def _note_folder_match_expr():
-    return "COALESCE(NULLIF(rtrim(replace(t.path, '/', '\\')), ''), df.folder_path)"
-
-
-def _note_path_expr():
-    return "rtrim(replace(t.path, '/', '\\'))"
-
-
 def _current_owner_user_id():
     try:
         if getattr(current_user, "is_authenticated", False):
@@ -775,64 +721,10 @@ def _area_folder_owner_sql(alias):
 
 
 def _derived_area_expr():
-    folder_expr = _note_folder_match_expr()
-    path_expr = _note_path_expr()
-    best_prefix_len_expr = (
-        "("
-        "SELECT MAX(LENGTH(pf_len.path_prefix)) "
-        "FROM lp_area_folders pf_len "
-        f"WHERE {_area_folder_owner_sql('pf_len')} "
-        "  AND pf_len.is_enabled = 1 "
-        "  AND pf_len.folder_role IN ('default','include','archive','output') "
-        f"  AND {folder_expr} IS NOT NULL "
-        f"  AND lower({folder_expr}) LIKE lower(pf_len.path_prefix) || '%'"
-        ")"
-    )
-    named_child_expr = (
-        "("
-        "SELECT pf.area_id "
-        "FROM lp_area_folders pf "
-        "LEFT JOIN lp_areas p ON p.owner_user_id IS pf.owner_user_id AND p.area_id = pf.area_id "
-        f"WHERE {_area_folder_owner_sql('pf')} "
-        "  AND pf.is_enabled = 1 "
-        "  AND pf.folder_role IN ('default','include','archive','output') "
-        f"  AND {folder_expr} IS NOT NULL "
-        f"  AND lower({folder_expr}) LIKE lower(pf.path_prefix) || '%' "
-        "  AND instr(pf.area_id, '/') > 0 "
-        f"  AND lower({path_expr}) LIKE '%' || lower(COALESCE(p.area_name, '')) || '%' "
-        f"  AND LENGTH(pf.path_prefix) = {best_prefix_len_expr} "
-        "ORDER BY LENGTH(pf.path_prefix) DESC, CASE pf.folder_role "
-        "  WHEN 'default' THEN 0 "
-        "  WHEN 'include' THEN 1 "
-        "  WHEN 'output' THEN 2 "
-        "  WHEN 'archive' THEN 3 "
-        "  ELSE 9 END, pf.sort_order, "
-        "  (LENGTH(pf.area_id) - LENGTH(REPLACE(pf.area_id, '/', ''))) ASC, "
-        "  LENGTH(pf.area_id) ASC, pf.area_id, pf.path_prefix "
-        "LIMIT 1"
-        ")"
-    )
-    normal_expr = (
-        "("
-        "SELECT pf.area_id "
-        "FROM lp_area_folders pf "
-        f"WHERE {_area_folder_owner_sql('pf')} "
-        "  AND pf.is_enabled = 1 "
-        "  AND pf.folder_role IN ('default','include','archive','output') "
-        f"  AND {folder_expr} IS NOT NULL "
-        f"  AND lower({folder_expr}) LIKE lower(pf.path_prefix) || '%' "
-        "ORDER BY LENGTH(pf.path_prefix) DESC, CASE pf.folder_role "
-        "  WHEN 'default' THEN 0 "
-        "  WHEN 'include' THEN 1 "
-        "  WHEN 'output' THEN 2 "
-        "  WHEN 'archive' THEN 3 "
-        "  ELSE 9 END, pf.sort_order, "
-        "  (LENGTH(pf.area_id) - LENGTH(REPLACE(pf.area_id, '/', ''))) ASC, "
-        "  LENGTH(pf.area_id) ASC, pf.area_id, pf.path_prefix "
-        "LIMIT 1"
-        ")"
-    )
-    return f"COALESCE({named_child_expr}, {normal_expr}, NULLIF(t.area, ''))"
+    if not _uses_area_folder_mapping():
+        return "NULLIF(t.area, '')"
+    record_area.ensure_current(data._get_conn(), "notes")
+    return f"COALESCE(({record_area.area_lookup_sql('notes', _current_owner_user_id())}), NULLIF(t.area, ''))"
 
 
 def _area_scope_ids(area):
@@ -922,8 +814,8 @@ def _notes_base_condition(area, folder_path=None, template_filter="notes"):
     else:
         condition = "1=1"
     if folder_path:
-        condition = f"({condition}) AND lower(rtrim(replace(t.path, '/', '\\'))) = lower(?)"
-        params.append(folder_path)
+        condition = f"({condition}) AND {user_paths.path_key_sql('t.path')} = ?"
+        params.append(user_paths.path_key_param(folder_path))
     template_filter = (template_filter or "notes").strip().lower()
     if template_filter == "templates":
         condition = f"({condition}) AND {_note_template_sql_expr('t')} = 1"
@@ -1094,13 +986,7 @@ def _note_display_settings():
 
 
 def _note_body_text(markdown_text, file_name="", title=""):
-    text = markdown_text or ""
-    lines = text.splitlines(keepends=True)
-    if lines and lines[0].strip() == "---":
-        for idx, line in enumerate(lines[1:], 1):
-            if line.strip() in ("---", "..."):
-                return _without_duplicate_title_heading("".join(lines[idx + 1 :]), file_name, title)
-    return _without_duplicate_title_heading(text, file_name, title)
+    return _without_duplicate_title_heading(note_search_index.note_body(markdown_text), file_name, title)
 
 
 def _preview_text(value, max_chars=NOTE_CARD_PREVIEW_CHARS):
@@ -1113,39 +999,119 @@ def _note_preview_from_cached_text(note, cached_text, max_chars=NOTE_CARD_PREVIE
     return _preview_text(_note_body_text(cached_text or "", note.get("file_name"), note.get("title")), max_chars)
 
 
+def _note_card_preview(note, row, max_chars):
+    if row is None:
+        return ""
+    if row["preview_text"] is None:
+        # Indexed before previews were stored; refresh_index fills these in.
+        return _note_preview_from_cached_text(note, row["content_text"], max_chars)
+    text = _without_duplicate_title_heading(row["preview_text"], note.get("file_name"), note.get("title"))
+    return _preview_text(text, max_chars)
+
+
 def _prepare_note_card_previews(notes, max_chars=NOTE_CARD_PREVIEW_CHARS, render_html=True):
     note_ids = [note.get("id") for note in notes or [] if note.get("id")]
+    max_chars = max(1, int(max_chars or NOTE_CARD_PREVIEW_CHARS))
     cached = {}
     if note_ids:
         try:
             conn = data._get_conn()
             note_search_index.ensure_schema(conn)
             placeholders = ", ".join(["?"] * len(note_ids))
+            # Only the start of the stored preview crosses over per card; the
+            # full body is read just for rows indexed before previews existed.
             rows = conn.execute(
-                f"SELECT note_id, content_text FROM lp_note_search_index WHERE note_id IN ({placeholders})",
-                note_ids,
+                "SELECT note_id, substr(preview_text, 1, ?) AS preview_text, "
+                "CASE WHEN preview_text IS NULL THEN content_text END AS content_text, "
+                "file_mtime, file_size "
+                f"FROM lp_note_search_index WHERE note_id IN ({placeholders})",
+                [max_chars + NOTE_CARD_PREVIEW_HEADING_CHARS, *note_ids],
             ).fetchall()
-            cached = {row["note_id"]: row["content_text"] or "" for row in rows}
+            cached = {row["note_id"]: row for row in rows}
         except Exception:
             cached = {}
+    render_items = []
     for note in notes or []:
-        preview = _note_preview_from_cached_text(note, cached.get(note.get("id"), ""), max_chars)
+        row = cached.get(note.get("id"))
+        preview = _note_card_preview(note, row, max_chars)
         note["preview_text"] = preview
+        note["preview_html"] = ""
         if render_html:
-            note["preview_html"] = markdown_utils.render_markdown(
-                preview,
-                asset_resolver=lambda asset_name, note_id=note.get("id"): url_for(
-                    "notes.note_asset_route",
-                    note_id=note_id,
-                    asset_path=asset_name,
-                ),
-                allow_html=False,
+            render_items.append(
+                (
+                    note,
+                    note_render_cache.source_key(
+                        row["file_mtime"] if row else "",
+                        row["file_size"] if row else "",
+                        note.get("file_name"),
+                        note.get("title"),
+                    ),
+                )
             )
-        else:
-            note["preview_html"] = ""
+    if render_items:
+        # Card previews resolve no links, so one render serves every viewer.
+        rendered = note_render_cache.render_many(
+            [
+                (
+                    note.get("id"),
+                    key,
+                    note["preview_text"],
+                    {
+                        "asset_resolver": lambda asset_name, note_id=note.get("id"): url_for(
+                            "notes.note_asset_route",
+                            note_id=note_id,
+                            asset_path=asset_name,
+                        ),
+                        "allow_html": False,
+                    },
+                )
+                for note, key in render_items
+            ],
+            f"card:{max_chars}",
+        )
+        for note, _key in render_items:
+            note["preview_html"] = rendered.get(note.get("id"), "")
     return notes
 
 
+def _note_render_viewer():
+    owner_user_id = _current_owner_user_id()
+    return f"user:{owner_user_id}" if owner_user_id is not None else "anonymous"
+
+
+def _note_render_source_key(note, note_state):
+    state = note_state or {}
+    return note_render_cache.source_key(
+        state.get("mtime_ns", ""),
+        state.get("size", ""),
+        note.get("file_name"),
+        note.get("title"),
+        note.get("path"),
+    )
+
+
+def _render_note_html(note, text, variant, key, asset_resolver=None):
+    """Render ``text`` of ``note`` with wiki and note links resolved, through the render cache.
+
+    Link resolution depends on which notes the viewer can see, so renders are
+    cached per viewer.
+    """
+    return note_render_cache.render(
+        note.get("id"),
+        key,
+        text,
+        variant,
+        viewer=_note_render_viewer(),
+        asset_resolver=asset_resolver,
+        wiki_link_resolver=lambda title, target_note_id=None, current_note=note: _resolve_note_wiki_link(
+            title,
+            target_note_id=target_note_id,
+            current_note=current_note,
+        ),
+        link_resolver=lambda target, current_note=note: _resolve_markdown_note_link(current_note, target),
+    )
+
+
 def _current_user_notes_root(create_dirs=False):
     try:
         if getattr(current_user, "is_authenticated", False):
@@ -1240,13 +1206,6 @@ def _note_folder_breadcrumb(folder_path, area=None):
     return crumbs
 
 
-def _path_prefix_value(folder_path):
-    folder_path = _normalize_folder_filter(folder_path)
-    if not folder_path:
-        return None
-    return folder_path + "\\%"
-
-
 def _fetch_note_subfolders(area, folder_path=None):
     folder_path = _normalize_folder_filter(folder_path)
     if not folder_path:
@@ -1254,16 +1213,34 @@ def _fetch_note_subfolders(area, folder_path=None):
     tbl = get_table_def("notes")
     if not tbl:
         return []
-    areas_mod.ensure_areas_schema(data._get_conn())
+    conn = data._get_conn()
+    areas_mod.ensure_areas_schema(conn)
     condition, params = _notes_base_condition(area)
-    sql = (
+    path_sql = (
         f"SELECT DISTINCT rtrim(t.path) AS path "
         f"FROM {tbl['name']} t "
         f"WHERE {condition} "
-        "AND lower(rtrim(replace(t.path, '/', '\\'))) LIKE lower(?)"
+        f"AND {user_paths.path_under_sql('t.path')}"
     )
-    params.append(_path_prefix_value(folder_path))
-    rows = data._get_conn().execute(sql, params).fetchall()
+    path_params = params + user_paths.path_under_params(folder_path)
+    if data.ensure_folder_closure(conn) and "folder_id" in _table_columns(conn, tbl["name"]):
+        # Direct children of the folder that hold at least one visible note,
+        # found through the folder closure; notes not yet linked to
+        # dim_folder still go through the path prefix scan.
+        sql = (
+            "SELECT child.folder_path AS path "
+            "FROM dim_folder base "
+            "JOIN dim_folder_closure sub ON sub.ancestor_id = base.folder_id AND sub.depth = 1 "
+            "JOIN dim_folder child ON child.folder_id = sub.descendant_id "
+            "WHERE base.folder_path = ? COLLATE NOCASE "
+            "AND EXISTS (SELECT 1 FROM dim_folder_closure d "
+            f"JOIN {tbl['name']} t ON t.folder_id = d.descendant_id "
+            f"WHERE d.ancestor_id = child.folder_id AND {condition}) "
+            f"UNION {path_sql} AND t.folder_id IS NULL"
+        )
+        rows = conn.execute(sql, [folder_path] + params + path_params).fetchall()
+    else:
+        rows = conn.execute(path_sql, path_params).fetchall()
     base = folder_path.rstrip("\\")
     base_lower = base.lower()
     subfolders = {}
@@ -1347,6 +1324,8 @@ def _notes_list_context(
     pages,
     first_url,
     last_url,
+    prev_url="",
+    next_url="",
     card_mode=None,
     note_settings=None,
     template_filter="notes",
@@ -1404,10 +1383,12 @@ def _notes_list_context(
         "pages": pages,
         "first_url": first_url,
         "last_url": last_url,
+        "prev_url": prev_url,
+        "next_url": next_url,
     }
 
 
-def _fetch_notes(area, sort_col=None, sort_dir=None, limit=None, offset=None, folder_path=None, include_derived=False, template_filter="notes"):
+def _fetch_notes(area, sort_col=None, sort_dir=None, limit=None, offset=None, folder_path=None, include_derived=False, template_filter="notes", cursor=None):
     _ensure_notes_schema()
     tbl = get_table_def("notes")
     if not tbl:
@@ -1428,7 +1409,7 @@ def _fetch_notes(area, sort_col=None, sort_dir=None, limit=None, offset=None, fo
         "source_note_id": "t.source_note_id",
         "date_modified": "t.date_modified",
         "updated": "t.rec_extract_date",
-        "derived_area": "derived_area",
+        "derived_area": _derived_area_expr() if include_derived else "COALESCE(NULLIF(t.area, ''), '')",
     }
     sort_col = sort_col or "updated"
     sort_key = order_map.get(sort_col, "t.rec_extract_date")
@@ -1445,22 +1426,27 @@ def _fetch_notes(area, sort_col=None, sort_dir=None, limit=None, offset=None, fo
     else:
         select_cols.append("COALESCE(NULLIF(t.area, ''), '') as derived_area")
     condition, params = _notes_base_condition(area, folder_path, template_filter=template_filter)
-    join_sql = "LEFT JOIN dim_folder df ON df.folder_id = t.folder_id " if include_derived else ""
-    sql = (
-        f"SELECT {', '.join(select_cols)} "
-        f"FROM {tbl['name']} t "
-        f"{join_sql}"
-        f"WHERE {condition} "
-        f"ORDER BY {order_by}"
-    )
     if limit is not None:
-        sql += " LIMIT ?"
-        params.append(int(limit))
-        if offset:
-            sql += " OFFSET ?"
-            params.append(int(offset))
-    rows = data._get_conn().execute(sql, params).fetchall()
-    notes = [dict(row) for row in rows]
+        notes = keyset.fetch_page(
+            data._get_conn(),
+            ", ".join(select_cols),
+            f"{tbl['name']} t",
+            condition,
+            params,
+            order_by,
+            limit,
+            cursor=cursor,
+            offset=offset,
+        )
+    else:
+        sql = (
+            f"SELECT {', '.join(select_cols)} "
+            f"FROM {tbl['name']} t "
+            f"WHERE {condition} "
+            f"ORDER BY {order_by}"
+        )
+        rows = data._get_conn().execute(sql, params).fetchall()
+        notes = [dict(row) for row in rows]
     for note in notes:
         note["updated"] = _parse_datetime(note.get("updated")) or datetime.now()
         note["date_modified_dt"] = _parse_datetime(note.get("date_modified")) or note["updated"]
@@ -1507,23 +1493,6 @@ def _note_window_title(note):
     return _note_display_title(note) or "Untitled"
 
 
-def _parse_note_wiki_link_value(value):
-    parts = [part.strip() for part in (value or "").split("|")]
-    title = parts[0] if parts else ""
-    target_note_id = None
-    for part in parts[1:]:
-        match = NOTE_WIKI_TARGET_ID_RE.match(part or "")
-        if match:
-            target_note_id = int(match.group(1))
-            break
-    if not title:
-        for part in parts:
-            if not NOTE_WIKI_TARGET_ID_RE.match(part or ""):
-                title = part
-                break
-    return title, target_note_id
-
-
 def _note_link_syntax(title, target_note_id):
     title = (title or "").strip()
     if not title or not target_note_id:
@@ -1797,9 +1766,21 @@ def _fuzzy_note_score(query, row):
     return SequenceMatcher(None, query, title or file_name).ratio()
 
 
+def _wiki_search_candidates(query):
+    _ensure_notes_schema()
+    tbl = get_table_def("notes")
+    if not tbl:
+        return []
+    condition, params = security.visible_record_condition("t", current_user)
+    rows = note_title_index.candidates(data._get_conn(), query, condition, params, table=tbl["name"])
+    if rows is None:
+        return _visible_note_rows()
+    return rows
+
+
 def _search_wiki_notes(query, exclude_note_id=None, limit=20):
     current_note = _visible_note_by_id(exclude_note_id) if exclude_note_id else None
-    rows = _visible_note_rows()
+    rows = _wiki_search_candidates(query)
     scored = []
     for row in rows:
         if exclude_note_id and str(row.get("id")) == str(exclude_note_id):
@@ -1829,67 +1810,51 @@ def _search_wiki_notes(query, exclude_note_id=None, limit=20):
     return results
 
 
-def _iter_note_wiki_links(content):
-    for match in NOTE_WIKI_LINK_RE.finditer(content or ""):
-        title, target_note_id = _parse_note_wiki_link_value(match.group(1))
-        if title:
-            yield title, target_note_id, match.group(0)
+def _note_link_items(rows):
+    return [
+        {
+            "id": row["id"],
+            "title": _note_display_title(row),
+            "path": row.get("path") or "",
+            "link_count": row.get("link_count") or 0,
+            "open_url": url_for("notes.view_note_route", note_id=row["id"]),
+        }
+        for row in rows
+    ]
 
 
-def _iter_note_markdown_links(content, current_note):
-    if not current_note:
-        return
-    for match in NOTE_MARKDOWN_LINK_RE.finditer(content or ""):
-        label = (match.group(1) or "").strip()
-        target = (match.group(2) or "").strip()
-        if not label or not target:
-            continue
-        resolved = _resolve_markdown_note_link(current_note, target)
-        if resolved and resolved.get("status") == "resolved" and resolved.get("target_note_id"):
-            yield label, int(resolved["target_note_id"]), match.group(0), resolved
-
-
-def _sync_note_links(note_id, content):
-    _ensure_note_links_schema()
-    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    rows = {}
-    current_note, _tbl = _get_note_record(note_id)
-    for title, target_note_id, link_text in _iter_note_wiki_links(content):
-        resolved = _resolve_note_wiki_link(title, target_note_id=target_note_id, current_note=current_note)
-        if resolved.get("status") != "resolved" or not resolved.get("target_note_id"):
-            continue
-        target_id = int(resolved["target_note_id"])
-        if int(note_id) == target_id:
-            continue
-        rows[(int(note_id), target_id, link_text)] = (
-            int(note_id),
-            target_id,
-            link_text,
-            title,
-            now,
-            now,
-        )
-    for label, target_id, link_text, resolved in _iter_note_markdown_links(content, current_note):
-        if int(note_id) == target_id:
-            continue
-        rows[(int(note_id), target_id, link_text)] = (
-            int(note_id),
-            target_id,
-            link_text,
-            resolved.get("title") or label,
-            now,
-            now,
-        )
+def _note_link_context(note_id):
+    """Backlinks, outgoing links and unresolved links of a note, as the viewer sees them."""
     conn = data._get_conn()
-    conn.execute("DELETE FROM lp_note_links WHERE src_note_id = ?", (int(note_id),))
-    conn.executemany(
-        "INSERT OR REPLACE INTO lp_note_links "
-        "(src_note_id, target_note_id, link_text, link_title, created_utc, updated_utc) "
-        "VALUES (?, ?, ?, ?, ?, ?)",
-        list(rows.values()),
-    )
-    conn.commit()
-    return len(rows)
+    condition, params = security.visible_record_condition("t", current_user)
+    return {
+        "backlinks": _note_link_items(note_link_graph.backlinks(conn, note_id, condition, params)),
+        "outlinks": _note_link_items(note_link_graph.outlinks(conn, note_id, condition, params)),
+        "unresolved": note_link_graph.unresolved(conn, note_id),
+    }
+
+
+@notes_bp.after_request
+def _catch_up_note_links(response):
+    """Re-resolve links affected by notes this request created, renamed or deleted.
+
+    Page views only read ``lp_note_links``; the maintenance runs here, on
+    the writes, and in the notes watcher.
+    """
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return response
+    try:
+        note_link_graph.catch_up(data._get_conn())
+    except Exception as exc:
+        data._log_error(None, f"note link catch-up failed: {exc}")
+    return response
+
+
+def _sync_note_links(note_id, content, notes_root=None):
+    """Re-resolve the ``lp_note_links`` rows of a saved note; returns the link count."""
+    if notes_root is None:
+        notes_root = _notes_root_path(create_dirs=False) or ""
+    return note_link_graph.sync_note(data._get_conn(), note_id, content, notes_root=notes_root)
 
 @notes_bp.route('/')
 def list_notes_route():
@@ -1931,17 +1896,18 @@ def list_notes_route():
     page = request.args.get("page", type=int) or 1
     per_page = note_settings["notes_per_page"]
     total = _count_notes(area, folder_filter, template_filter=template_filter)
-    offset = (page - 1) * per_page
-    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, template_filter=template_filter)
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
+    offset = (page - 1) * per_page
+    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, template_filter=template_filter, cursor=request.args.get("cursor"))
     pagination = build_pagination(
         url_for,
         route_name,
         _notes_url_args(area, folder_filter, template_filter=template_filter, sort=sort_col, dir=sort_dir),
         page,
         total_pages,
+        rows=notes,
     )
     context = _notes_list_context(
         area=area,
@@ -1959,6 +1925,8 @@ def list_notes_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
         note_settings=note_settings,
         template_filter=template_filter,
     )
@@ -2023,17 +1991,18 @@ def list_notes_table_route():
     page = request.args.get("page", type=int) or 1
     per_page = note_settings["notes_per_page"]
     total = _count_notes(area, folder_filter, template_filter=template_filter)
-    offset = (page - 1) * per_page
-    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, template_filter=template_filter)
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
+    offset = (page - 1) * per_page
+    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, template_filter=template_filter, cursor=request.args.get("cursor"))
     pagination = build_pagination(
         url_for,
         route_name,
         _notes_url_args(area, folder_filter, template_filter=template_filter, sort=sort_col, dir=sort_dir),
         page,
         total_pages,
+        rows=notes,
     )
     context = _notes_list_context(
         area=area,
@@ -2051,6 +2020,8 @@ def list_notes_table_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
         note_settings=note_settings,
         template_filter=template_filter,
     )
@@ -2101,17 +2072,18 @@ def list_notes_list_route():
     page = request.args.get("page", type=int) or 1
     per_page = note_settings["notes_per_page"]
     total = _count_notes(area, folder_filter, template_filter=template_filter)
-    offset = (page - 1) * per_page
-    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, include_derived=False, template_filter=template_filter)
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
+    offset = (page - 1) * per_page
+    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, include_derived=False, template_filter=template_filter, cursor=request.args.get("cursor"))
     pagination = build_pagination(
         url_for,
         route_name,
         _notes_url_args(area, folder_filter, template_filter=template_filter, sort=sort_col, dir=sort_dir),
         page,
         total_pages,
+        rows=notes,
     )
     context = _notes_list_context(
         area=area,
@@ -2129,6 +2101,8 @@ def list_notes_list_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
         note_settings=note_settings,
         template_filter=template_filter,
     )
@@ -2179,17 +2153,18 @@ def list_notes_names_route():
     page = request.args.get("page", type=int) or 1
     per_page = note_settings["notes_per_page"]
     total = _count_notes(area, folder_filter, template_filter=template_filter)
-    offset = (page - 1) * per_page
-    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, include_derived=False, template_filter=template_filter)
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
+    offset = (page - 1) * per_page
+    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, include_derived=False, template_filter=template_filter, cursor=request.args.get("cursor"))
     pagination = build_pagination(
         url_for,
         route_name,
         _notes_url_args(area, folder_filter, template_filter=template_filter, sort=sort_col, dir=sort_dir),
         page,
         total_pages,
+        rows=notes,
     )
     context = _notes_list_context(
         area=area,
@@ -2207,6 +2182,8 @@ def list_notes_names_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
         note_settings=note_settings,
         template_filter=template_filter,
     )
@@ -2260,22 +2237,23 @@ def list_notes_cards_route():
     page = request.args.get("page", type=int) or 1
     per_page = note_settings["notes_per_page"]
     total = _count_notes(area, folder_filter, template_filter=template_filter)
+    page_data = paginate_total(total, page, per_page)
+    page = page_data["page"]
+    total_pages = page_data["total_pages"]
     offset = (page - 1) * per_page
-    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, include_derived=False, template_filter=template_filter)
+    notes = _fetch_notes(area, sort_col, sort_dir, limit=per_page, offset=offset, folder_path=folder_filter, include_derived=False, template_filter=template_filter, cursor=request.args.get("cursor"))
     _prepare_note_card_previews(
         notes,
         max_chars=note_settings["preview_chars"],
         render_html=(card_mode == "preview"),
     )
-    page_data = paginate_total(total, page, per_page)
-    page = page_data["page"]
-    total_pages = page_data["total_pages"]
     pagination = build_pagination(
         url_for,
         route_name,
         _notes_url_args(area, folder_filter, template_filter=template_filter, mode=card_mode, sort=sort_col, dir=sort_dir),
         page,
         total_pages,
+        rows=notes,
     )
     card_values = [
         [n.get("file_name"), n.get("path"), url_for("notes.view_note_route", note_id=n.get("id"))]
@@ -2298,6 +2276,8 @@ def list_notes_cards_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
         note_settings=note_settings,
         template_filter=template_filter,
     )
@@ -2384,37 +2364,46 @@ def _note_source_options(area, collection_items, query=""):
 
 
 def _notebook_continuous_entries(collection_items):
+    note_items = [
+        item
+        for item in collection_items or []
+        if item.get("entry_kind") == "item" and item.get("item_type") == "note" and item.get("is_visible", True)
+    ]
+    notes_by_id = _load_notes_by_ids([_safe_int(item.get("item_id")) for item in note_items])
     entries = []
-    for item in collection_items or []:
-        if item.get("entry_kind") == "item" and item.get("item_type") == "note" and item.get("is_visible", True):
-            summary = item.get("summary") or {}
-            note_id = _safe_int(item.get("item_id"))
-            note = _load_note_by_id(note_id) if note_id is not None else None
-            text = ""
-            if note:
-                note_path = _build_note_path(note)
-                if note_path and os.path.isfile(note_path):
-                    text = _note_body_text(_read_note_file(note_path), note.get("file_name"), note.get("title"))
-            entries.append(
-                {
-                    "title": item.get("display_title") or summary.get("title") or f"Note {item.get('item_id')}",
-                    "text": text,
-                    "open_url": summary.get("open_url") or "",
-                }
-            )
+    for item in note_items:
+        summary = item.get("summary") or {}
+        note = notes_by_id.get(_safe_int(item.get("item_id")))
+        text = ""
+        if note:
+            note_path = _build_note_path(note)
+            if note_path and os.path.isfile(note_path):
+                text = _note_body_text(_read_note_file(note_path), note.get("file_name"), note.get("title"))
+        entries.append(
+            {
+                "title": item.get("display_title") or summary.get("title") or f"Note {item.get('item_id')}",
+                "text": text,
+                "open_url": summary.get("open_url") or "",
+            }
+        )
     return entries
 
 
-def _load_note_by_id(note_id):
+def _load_notes_by_ids(note_ids):
+    note_ids = sorted({note_id for note_id in note_ids if note_id is not None})
     tbl = get_table_def("notes")
-    if not tbl:
-        return None
+    if not tbl or not note_ids:
+        return {}
     cols = ["id"] + tbl["col_list"]
-    row = data._get_conn().execute(
-        f"SELECT {', '.join(cols)} FROM {tbl['name']} WHERE id = ?",
-        (note_id,),
-    ).fetchone()
-    return dict(row) if row else None
+    notes = {}
+    for offset in range(0, len(note_ids), 500):
+        chunk = note_ids[offset:offset + 500]
+        rows = data._get_conn().execute(
+            f"SELECT {', '.join(cols)} FROM {tbl['name']} WHERE id IN ({', '.join('?' for _ in chunk)})",
+            chunk,
+        ).fetchall()
+        notes.update((row["id"], dict(row)) for row in rows)
+    return notes
 
 
 def _safe_int(value):
@@ -2565,9 +2554,7 @@ def view_note_route(note_id):
         sql = (
             f"SELECT {', '.join(select_cols)} "
             f"FROM {tbl['name']} t "
-            "LEFT JOIN dim_folder df ON df.folder_id = t.folder_id "
-            "WHERE t.id = ? "
-            "GROUP BY t.id"
+            "WHERE t.id = ?"
         )
         rows = data._get_conn().execute(sql, [note_id]).fetchall()
         if rows:
@@ -2580,6 +2567,7 @@ def view_note_route(note_id):
     note_folder = _normalize_folder_filter(note.get("path"))
     file_exists = note_path and os.path.isfile(note_path)
     note_text = ""
+    note_state = None
     if file_exists:
         note_text = _read_note_file(note_path)
         note_state = _note_file_state(note_path)
@@ -2603,15 +2591,12 @@ def view_note_route(note_id):
         def _asset_url(asset_name):
             return url_for("notes.note_asset_route", note_id=note_id, asset_path=asset_name)
 
-        content_html = markdown_utils.render_markdown(
+        content_html = _render_note_html(
+            note,
             note_body_text,
+            "view",
+            _note_render_source_key(note, note_state),
             asset_resolver=_asset_url,
-            wiki_link_resolver=lambda title, target_note_id=None, current_note=note: _resolve_note_wiki_link(
-                title,
-                target_note_id=target_note_id,
-                current_note=current_note,
-            ),
-            link_resolver=lambda target, current_note=note: _resolve_markdown_note_link(current_note, target),
         )
     elif render_mode == "hex":
         hex_rows = hex_utils.hex_dump(note_text)
@@ -2659,6 +2644,7 @@ def view_note_route(note_id):
             ("metadata", "Metadata"),
         ],
         note_metadata_rows=_note_metadata_rows(note, note_path, file_exists),
+        note_links=_note_link_context(note_id) if render_mode == "metadata" else None,
         front_matter_items=list(front_matter.items()),
         front_matter_raw=front_matter_raw,
         sample_lines=note_settings["sample_lines"],
@@ -2699,15 +2685,12 @@ def note_popout_route(note_id):
         def _asset_url(asset_name):
             return url_for("notes.note_asset_route", note_id=note_id, asset_path=asset_name)
 
-        content_html = markdown_utils.render_markdown(
+        content_html = _render_note_html(
+            note,
             note_body_text,
+            "view",
+            _note_render_source_key(note, note_state),
             asset_resolver=_asset_url,
-            wiki_link_resolver=lambda title, target_note_id=None, current_note=note: _resolve_note_wiki_link(
-                title,
-                target_note_id=target_note_id,
-                current_note=current_note,
-            ),
-            link_resolver=lambda target, current_note=note: _resolve_markdown_note_link(current_note, target),
         )
 
     return render_template(
@@ -2968,7 +2951,6 @@ def _derived_area_for_note_id(note_id):
         row = data._get_conn().execute(
             f"SELECT {_derived_area_expr()} AS derived_area "
             f"FROM {tbl['name']} t "
-            "LEFT JOIN dim_folder df ON df.folder_id = t.folder_id "
             "WHERE t.id = ?",
             (note_id,),
         ).fetchone()
@@ -2998,6 +2980,7 @@ def _archive_and_delete_note(note_id):
         archived_path = _unique_file_path(deleted_folder, archive_name)
         shutil.move(note_path, archived_path)
     data.delete_record(data._get_conn(), tbl["name"], note_id)
+    note_render_cache.forget(data._get_conn(), [note_id])
     return archived_path
 
 
@@ -3652,6 +3635,21 @@ def wiki_search_route():
     return jsonify({"results": _search_wiki_notes(query, exclude_note_id=exclude_note_id, limit=limit)})
 
 
+@notes_bp.route('/api/links/<int:note_id>')
+def note_links_route(note_id):
+    if not security.can_view_note(note_id, current_user):
+        abort(404)
+    return jsonify(_note_link_context(note_id))
+
+
+@notes_bp.route('/api/orphans')
+def note_orphans_route():
+    limit = max(1, min(request.args.get("limit", type=int) or 200, 1000))
+    condition, params = security.visible_record_condition("t", current_user)
+    rows = note_link_graph.orphans(data._get_conn(), condition, params, limit=limit)
+    return jsonify({"results": _note_link_items(rows)})
+
+
 @notes_bp.route('/api/wiki-preview/<int:note_id>', methods=["POST"])
 def wiki_preview_route(note_id):
     if not security.can_edit_note(note_id, current_user):
@@ -3669,15 +3667,12 @@ def wiki_preview_route(note_id):
     if payload.get("body_only"):
         render_content = _note_body_text(content, note.get("file_name"), note.get("title"))
 
-    html_rendered = markdown_utils.render_markdown(
+    html_rendered = _render_note_html(
+        note,
         render_content,
+        "preview",
+        note_render_cache.source_key(render_content, note.get("file_name"), note.get("title"), note.get("path")),
         asset_resolver=_asset_url,
-        wiki_link_resolver=lambda title, target_note_id=None, current_note=note: _resolve_note_wiki_link(
-            title,
-            target_note_id=target_note_id,
-            current_note=current_note,
-        ),
-        link_resolver=lambda target, current_note=note: _resolve_markdown_note_link(current_note, target),
     )
     return jsonify({"html": html_rendered})
 
@@ -3744,10 +3739,11 @@ def import_notes_route():
 def import_notes_folder_route():
     area = request_area_param() or ""
     tbl = get_table_def("notes")
-    imported = None
     error = ""
+    folder_path = ""
     if request.method == "POST":
         folder_path = request.form.get("notes_folder", "").strip()
+        dry_run = request.form.get("action") == "preview"
         if not folder_path:
             error = "No folder provided."
         elif not os.path.isdir(folder_path):
@@ -3755,8 +3751,13 @@ def import_notes_folder_route():
         elif not tbl:
             error = "Notes table not found."
         else:
-            rows = _collect_note_import_rows(folder_path, area)
-            imported = _insert_note_import_rows(tbl, rows)
+            run_id = _start_note_import(tbl, folder_path, area, dry_run=dry_run)
+            return redirect(url_for("notes.import_notes_folder_route", area=area, run=run_id))
+    run = None
+    run_id = request.args.get("run", type=int)
+    if run_id:
+        run = _visible_note_import_run(run_id)
+        folder_path = folder_path or (run or {}).get("folder_path") or ""
     return render_template(
         "notes_import_folder.html",
         active_tab="notes",
@@ -3765,54 +3766,76 @@ def import_notes_folder_route():
         content_title="Import Notes Folder",
         content_html="",
         area=area,
-        imported=imported,
+        folder_path=folder_path,
+        run=run,
         error=error,
     )
 
 
-def _collect_note_import_rows(folder_path, area):
-    rows = []
-    for root, _, files in os.walk(folder_path):
-        for name in files:
-            if not name.lower().endswith(".md"):
-                continue
-            full_path = os.path.join(root, name)
-            if not os.path.isfile(full_path):
-                continue
-            try:
-                stat = os.stat(full_path)
-            except OSError:
-                continue
-            metadata = _note_metadata_from_file(full_path, stat=stat, fallback_area=area)
-            rows.append(
-                {
-                    "file_name": name,
-                    "path": root,
-                    "size": str(stat.st_size),
-                    "title": metadata.get("title") or os.path.splitext(name)[0],
-                    "color": metadata.get("color") or "",
-                    "date_created": metadata.get("date_created") or "",
-                    "date_modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
-                    "area": metadata.get("area") or area,
-                    "important": metadata.get("important") or "",
-                    "is_template": metadata.get("is_template") or "false",
-                    "is_important": metadata.get("is_important") or "false",
-                    "source_note_id": metadata.get("source_note_id") or "",
-                }
-            )
-    return rows
+@notes_bp.route('/api/import-runs/<int:run_id>')
+def note_import_run_route(run_id):
+    run = _visible_note_import_run(run_id)
+    if not run:
+        return jsonify({"error": "Import run not found."}), 404
+    return jsonify(run)
+
+
+def _visible_note_import_run(run_id):
+    run = note_import.get_run(data._get_conn(), run_id)
+    if run and run.get("owner_user_id") not in (None, _current_owner_user_id()):
+        return None
+    return run
 
 
-def _insert_note_import_rows(tbl, rows):
-    count = 0
+def _note_import_row(full_path, stat, front_matter, area):
+    """``lp_notes`` values of a markdown file imported from a folder."""
+    metadata = _note_metadata_from_file(full_path, stat=stat, fallback_area=area, front_matter=front_matter)
+    name = os.path.basename(full_path)
+    return {
+        "file_name": name,
+        "path": os.path.dirname(full_path),
+        "size": str(stat.st_size),
+        "title": metadata.get("title") or os.path.splitext(name)[0],
+        "color": metadata.get("color") or "",
+        "date_created": metadata.get("date_created") or "",
+        "date_modified": metadata.get("date_modified") or "",
+        "area": metadata.get("area") or area,
+        "important": metadata.get("important") or "",
+        "is_template": metadata.get("is_template") or "false",
+        "is_important": metadata.get("is_important") or "false",
+        "source_note_id": metadata.get("source_note_id") or "",
+    }
+
+
+def _run_note_import(tbl, run_id, notes_root=""):
+    return note_import.run_import(
+        data._get_conn(),
+        run_id,
+        _note_import_row,
+        tbl["col_list"],
+        table=tbl["name"],
+        notes_root=notes_root,
+    )
+
+
+def _start_note_import(tbl, folder_path, area, dry_run=False):
+    """Record an import run of ``folder_path`` and run it on a background thread."""
     conn = data._get_conn()
-    for values_map in rows:
-        values = [values_map.get(col, "") for col in tbl["col_list"]]
-        record_id = data.add_record(data.conn, tbl["name"], tbl["col_list"], values)
-        if record_id:
-            _set_note_folder_id(conn, tbl["name"], record_id, values_map.get("path", ""))
-            count += 1
-    return count
+    run_id = note_import.create_run(
+        conn,
+        folder_path,
+        area,
+        owner_user_id=_current_owner_user_id(),
+        dry_run=dry_run,
+        user_name=_current_username(),
+    )
+    threading.Thread(
+        target=_run_note_import,
+        args=(tbl, run_id, _notes_root_path(create_dirs=False) or ""),
+        name=f"lifepim-note-import-{run_id}",
+        daemon=True,
+    ).start()
+    return run_id
 
 
 def _note_full_path_key(folder_path, file_name):
@@ -3838,51 +3861,19 @@ def _note_folder_id_matches(conn, folder_id, folder_path):
     return _normalize_note_path(row["folder_path"]).lower() == _normalize_note_path(folder_path).lower()
 
 
-def _sync_area_fallbacks(conn, owner_user_id=None):
+def _sync_area_trie(conn, owner_user_id=None):
     try:
         areas_mod.ensure_areas_schema(conn)
-        rows = conn.execute(
-            "SELECT area_id, path_prefix, folder_role, sort_order "
-            "FROM lp_area_folders "
-            "WHERE owner_user_id IS ? "
-            "AND is_enabled = 1 "
-            "AND folder_role IN ('default','include','archive','output')",
-            (owner_user_id,),
-        ).fetchall()
+        return areas_mod.area_folder_trie(owner_user_id, conn=conn)
     except Exception:
-        return []
-    priority = {"default": 0, "include": 1, "output": 2, "archive": 3}
-    fallbacks = []
-    for row in rows:
-        path_prefix = _normalize_note_path(row["path_prefix"])
-        area_id = (row["area_id"] or "").strip()
-        if not path_prefix or not area_id:
-            continue
-        fallbacks.append(
-            {
-                "area_id": area_id,
-                "path_prefix": path_prefix,
-                "folder_role": row["folder_role"] or "",
-                "sort_order": row["sort_order"] or 100,
-            }
-        )
-    fallbacks.sort(
-        key=lambda item: (
-            -len(item["path_prefix"]),
-            priority.get(item["folder_role"], 9),
-            item["sort_order"],
-            item["area_id"],
-        )
-    )
-    return fallbacks
+        return None
 
 
-def _sync_area_for_path(folder_path, fallbacks):
-    folder_path = _normalize_note_path(folder_path)
-    for item in fallbacks or []:
-        if _path_startswith(folder_path, item["path_prefix"]):
-            return item["area_id"]
-    return ""
+def _sync_area_for_path(folder_path, area_trie):
+    if not area_trie:
+        return ""
+    match = area_trie.resolve(_normalize_note_path(folder_path))
+    return match[0] if match else ""
 
 
 def _note_owner_filter(owner_user_id, table_columns):
@@ -3900,8 +3891,8 @@ def materialize_note_areas(conn=None, owner_user_id=None, force=False):
     if not tbl or not _table_exists(conn, tbl["name"]):
         return {"scanned": 0, "updated": 0}
     table_columns = _table_columns(conn, tbl["name"])
-    fallbacks = _sync_area_fallbacks(conn, owner_user_id)
-    if not fallbacks:
+    area_trie = _sync_area_trie(conn, owner_user_id)
+    if not area_trie:
         return {"scanned": 0, "updated": 0}
     where = ["1=1"]
     params = []
@@ -3924,7 +3915,7 @@ def materialize_note_areas(conn=None, owner_user_id=None, force=False):
     updates = []
     for row in rows:
         note_path = _normalize_note_path(row["path"] or row["folder_path"] or "")
-        area_id = _sync_area_for_path(note_path, fallbacks)
+        area_id = _sync_area_for_path(note_path, area_trie)
         if area_id and (force or not (row["area"] or "").strip()):
             updates.append((area_id, row["id"]))
     if updates:
@@ -3976,7 +3967,7 @@ def refresh_note_color_metadata(conn=None, owner_user_id=None, only_blank=True):
             note_path = os.path.join(folder_path, file_name)
         else:
             note_path = folder_path or file_name
-        front_matter = _try_read_note_front_matter(note_path)
+        front_matter = note_front_matter.get(row["id"], note_path, conn=conn)
         if front_matter is None:
             missing += 1
             continue
@@ -4012,6 +4003,102 @@ def _ensure_note_areas_materialized(conn):
     return result
 
 
+def _sync_note_file(conn, tbl, full_path, current, row_area="", owner_user_id=None):
+    """Insert or update the notes row of one markdown file and index it.
+
+    ``current`` is the file's existing row (a dict) or None.  A new row is
+    owned by ``owner_user_id`` when given, else by the current user.  Returns
+    ``(status, note_id)`` with status ``"inserted"``, ``"updated"``,
+    ``"unchanged"`` or ``"failed"``, or ``(None, None)`` when the file cannot
+    be stat'ed.
+    """
+    root_norm, name = os.path.split(full_path)
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        return None, None
+    size = str(stat.st_size)
+    date_modified = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+    metadata = _note_metadata_from_file(full_path, stat=stat, fallback_area=row_area)
+    if current:
+        values_map = {col: current.get(col, "") for col in tbl["col_list"]}
+        values_map.update(
+            {
+                "file_name": name,
+                "path": root_norm,
+                "size": size,
+                "title": metadata.get("title") or os.path.splitext(name)[0],
+                "color": metadata.get("color") or current.get("color", ""),
+                "date_created": metadata.get("date_created") or current.get("date_created", ""),
+                "date_modified": date_modified,
+                "area": metadata.get("area") or current.get("area", ""),
+                "important": metadata.get("important") or current.get("important", ""),
+                "is_template": metadata.get("is_template") or current.get("is_template", "false"),
+                "is_important": metadata.get("is_important") or current.get("is_important", "false"),
+                "source_note_id": metadata.get("source_note_id") or current.get("source_note_id", ""),
+            }
+        )
+        needs_update = (
+            (current.get("file_name") or "") != name
+            or _normalize_note_path(current.get("path")).lower() != root_norm.lower()
+            or str(current.get("size") or "") != size
+            or str(current.get("title") or "") != str(values_map.get("title") or "")
+            or str(current.get("color") or "") != str(values_map.get("color") or "")
+            or str(current.get("date_created") or "") != str(values_map.get("date_created") or "")
+            or str(current.get("date_modified") or "") != date_modified
+            or str(current.get("area") or "") != str(values_map.get("area") or "")
+            or str(current.get("important") or "") != str(values_map.get("important") or "")
+            or str(current.get("is_template") or "false") != str(values_map.get("is_template") or "false")
+            or str(current.get("is_important") or "false") != str(values_map.get("is_important") or "false")
+            or str(current.get("source_note_id") or "") != str(values_map.get("source_note_id") or "")
+            or not _note_folder_id_matches(conn, current.get("folder_id"), root_norm)
+        )
+        status = "unchanged"
+        if needs_update:
+            values = [values_map.get(col, "") for col in tbl["col_list"]]
+            if data.update_record(conn, tbl["name"], current["id"], tbl["col_list"], values):
+                _set_note_folder_id(conn, tbl["name"], current["id"], root_norm)
+                status = "updated"
+        note_id = current["id"]
+    else:
+        values_map = {
+            "file_name": name,
+            "path": root_norm,
+            "folder_id": "",
+            "size": size,
+            "title": metadata.get("title") or os.path.splitext(name)[0],
+            "color": metadata.get("color") or "",
+            "date_created": metadata.get("date_created") or "",
+            "date_modified": date_modified,
+            "area": metadata.get("area") or "",
+            "important": metadata.get("important") or "",
+            "is_template": metadata.get("is_template") or "false",
+            "is_important": metadata.get("is_important") or "false",
+            "source_note_id": metadata.get("source_note_id") or "",
+        }
+        cols = list(tbl["col_list"])
+        values = [values_map.get(col, "") for col in cols]
+        if owner_user_id is not None and "owner_user_id" not in cols:
+            cols.append("owner_user_id")
+            values.append(owner_user_id)
+        note_id = data.add_record(conn, tbl["name"], cols, values)
+        if not note_id:
+            return "failed", None
+        _set_note_folder_id(conn, tbl["name"], note_id, root_norm)
+        status = "inserted"
+    try:
+        note_search_index.upsert_note(
+            note_id,
+            full_path,
+            title=values_map.get("title") or name,
+            conn=conn,
+            commit=False,
+        )
+    except Exception:
+        pass
+    return status, note_id
+
+
 def _sync_note_rows(folder_path, fallback_area=""):
     _ensure_notes_schema()
     folder_path = _normalize_note_path(folder_path)
@@ -4024,7 +4111,7 @@ def _sync_note_rows(folder_path, fallback_area=""):
         raise ValueError("Folder not found.")
 
     conn = data._get_conn()
-    area_fallbacks = [] if fallback_area else _sync_area_fallbacks(conn, _current_owner_user_id())
+    area_trie = None if fallback_area else _sync_area_trie(conn, _current_owner_user_id())
     root_lower = folder_path.rstrip("\\").lower()
     existing = {}
     duplicates = 0
@@ -4058,111 +4145,19 @@ def _sync_note_rows(folder_path, fallback_area=""):
             full_path = os.path.join(root_norm, name)
             if not os.path.isfile(full_path):
                 continue
-            try:
-                stat = os.stat(full_path)
-            except OSError:
+            key = _note_full_path_key(root_norm, name)
+            row_area = fallback_area or _sync_area_for_path(root_norm, area_trie)
+            status, _note_id = _sync_note_file(conn, tbl, full_path, existing.get(key), row_area)
+            if not status:
                 continue
             scanned += 1
-            size = str(stat.st_size)
-            date_modified = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
-            row_area = fallback_area or _sync_area_for_path(root_norm, area_fallbacks)
-            metadata = _note_metadata_from_file(full_path, stat=stat, fallback_area=row_area)
-            key = _note_full_path_key(root_norm, name)
             seen.add(key)
-            current = existing.get(key)
-            if current:
-                values_map = {col: current.get(col, "") for col in tbl["col_list"]}
-                values_map.update(
-                    {
-                        "file_name": name,
-                        "path": root_norm,
-                        "size": size,
-                        "title": metadata.get("title") or os.path.splitext(name)[0],
-                        "color": metadata.get("color") or current.get("color", ""),
-                        "date_created": metadata.get("date_created") or current.get("date_created", ""),
-                        "date_modified": date_modified,
-                        "area": metadata.get("area") or current.get("area", ""),
-                        "important": metadata.get("important") or current.get("important", ""),
-                        "is_template": metadata.get("is_template") or current.get("is_template", "false"),
-                        "is_important": metadata.get("is_important") or current.get("is_important", "false"),
-                        "source_note_id": metadata.get("source_note_id") or current.get("source_note_id", ""),
-                    }
-                )
-                needs_update = (
-                    (current.get("file_name") or "") != name
-                    or _normalize_note_path(current.get("path")).lower() != root_norm.lower()
-                    or str(current.get("size") or "") != size
-                    or str(current.get("title") or "") != str(values_map.get("title") or "")
-                    or str(current.get("color") or "") != str(values_map.get("color") or "")
-                    or str(current.get("date_created") or "") != str(values_map.get("date_created") or "")
-                    or str(current.get("date_modified") or "") != date_modified
-                    or str(current.get("area") or "") != str(values_map.get("area") or "")
-                    or str(current.get("important") or "") != str(values_map.get("important") or "")
-                    or str(current.get("is_template") or "false") != str(values_map.get("is_template") or "false")
-                    or str(current.get("is_important") or "false") != str(values_map.get("is_important") or "false")
-                    or str(current.get("source_note_id") or "") != str(values_map.get("source_note_id") or "")
-                    or not _note_folder_id_matches(conn, current.get("folder_id"), root_norm)
-                )
-                if needs_update:
-                    values = [values_map.get(col, "") for col in tbl["col_list"]]
-                    if data.update_record(conn, tbl["name"], current["id"], tbl["col_list"], values):
-                        _set_note_folder_id(conn, tbl["name"], current["id"], root_norm)
-                        try:
-                            note_search_index.upsert_note(
-                                current["id"],
-                                full_path,
-                                title=values_map.get("title") or name,
-                                conn=conn,
-                                commit=False,
-                            )
-                        except Exception:
-                            pass
-                        updated += 1
-                    else:
-                        unchanged += 1
-                else:
-                    try:
-                        note_search_index.upsert_note(
-                            current["id"],
-                            full_path,
-                            title=values_map.get("title") or name,
-                            conn=conn,
-                            commit=False,
-                        )
-                    except Exception:
-                        pass
-                    unchanged += 1
-            else:
-                values_map = {
-                    "file_name": name,
-                    "path": root_norm,
-                    "folder_id": "",
-                    "size": size,
-                    "title": metadata.get("title") or os.path.splitext(name)[0],
-                    "color": metadata.get("color") or "",
-                    "date_created": metadata.get("date_created") or "",
-                    "date_modified": date_modified,
-                    "area": metadata.get("area") or "",
-                    "important": metadata.get("important") or "",
-                    "is_template": metadata.get("is_template") or "false",
-                    "is_important": metadata.get("is_important") or "false",
-                    "source_note_id": metadata.get("source_note_id") or "",
-                }
-                values = [values_map.get(col, "") for col in tbl["col_list"]]
-                record_id = data.add_record(conn, tbl["name"], tbl["col_list"], values)
-                if record_id:
-                    _set_note_folder_id(conn, tbl["name"], record_id, root_norm)
-                    try:
-                        note_search_index.upsert_note(
-                            record_id,
-                            full_path,
-                            title=values_map.get("title") or name,
-                            conn=conn,
-                            commit=False,
-                        )
-                    except Exception:
-                        pass
-                    inserted += 1
+            if status == "inserted":
+                inserted += 1
+            elif status == "updated":
+                updated += 1
+            elif status == "unchanged":
+                unchanged += 1
 
     missing = len([key for key in existing.keys() if key not in seen])
     return {
@@ -4176,6 +4171,258 @@ def _sync_note_rows(folder_path, fallback_area=""):
     }
 
 
+NOTE_SYNC_SKIP_FOLDERS = {"deleted"}
+
+
+def _note_sync_skipped(path_value, root_path=""):
+    """True for hidden folders (``.obsidian``, ``.git``) and the root's ``deleted`` archive."""
+    parts = user_paths.split_path(path_value)
+    if root_path and user_paths.path_startswith(path_value, root_path):
+        parts = parts[len(user_paths.split_path(root_path)):]
+        if parts and parts[0].lower() in NOTE_SYNC_SKIP_FOLDERS:
+            return True
+    return any(part.startswith(".") for part in parts)
+
+
+def _remove_note_rows(conn, tbl, note_ids):
+    """Delete notes rows whose files are gone, with their index, cache and link rows."""
+    removed = [note_id for note_id in note_ids if data.delete_record(conn, tbl["name"], note_id)]
+    if not removed:
+        return 0
+    try:
+        note_search_index.remove_notes(removed, conn=conn, commit=False)
+    except Exception:
+        pass
+    conn.commit()
+    note_link_graph.forget(conn, removed)
+    note_render_cache.forget(conn, removed)
+    return len(removed)
+
+
+def sync_note_paths(paths, root_path="", owner_user_id=None):
+    """Bring the notes rows of changed ``paths`` in line with the disk.
+
+    The incremental counterpart of ``_sync_note_rows`` used by the notes
+    watcher.  ``paths`` are markdown files or folders under ``root_path`` that
+    were created, edited, moved or deleted.  Files on disk are inserted or
+    updated (area from the area folder mapping, ``dim_folder`` id, search
+    index, front matter cache) and their ``lp_note_links`` rows are rebuilt.
+    Notes whose indexed mtime and size still match the file, such as ones
+    just saved from the editor, are skipped.
+
+    A row whose file vanished is paired with a new file of the same batch
+    (see ``_match_moved_notes``) and moved in place, keeping its id and so
+    its collection, project, link and tag rows.  Unpaired rows are only
+    counted as ``missing``, as ``Sync notes`` does; ``prune_missing_notes``
+    removes them on request.
+
+    Runs as ``owner_user_id`` (the current user when None): only that
+    owner's rows are matched or updated, and new rows are owned by them.
+    Nothing is synced while ``root_path`` itself is missing.
+    """
+    _ensure_notes_schema()
+    tbl = get_table_def("notes")
+    if not tbl:
+        raise ValueError("Notes table not found.")
+    result = {"scanned": 0, "inserted": 0, "updated": 0, "unchanged": 0, "moved": 0, "missing": 0, "links": 0}
+    if root_path and not os.path.isdir(root_path):
+        return result
+    conn = data._get_conn()
+    owner_user_id = _current_owner_user_id() if owner_user_id is None else owner_user_id
+    owner_sql, owner_params = _note_owner_filter(owner_user_id, _table_columns(conn, tbl["name"]))
+    files = {}
+    changed = {}
+    folders = []
+    for path_value in paths:
+        path_value = _normalize_note_path(path_value)
+        if not path_value or _note_sync_skipped(path_value, root_path):
+            continue
+        if os.path.isdir(path_value):
+            folders.append(path_value)
+            for root, dirs, names in os.walk(path_value):
+                dirs[:] = [name for name in dirs if not _note_sync_skipped(os.path.join(root, name), root_path)]
+                root_norm = _normalize_note_path(root)
+                for name in names:
+                    if name.lower().endswith(".md"):
+                        files[_note_full_path_key(root_norm, name)] = os.path.join(root_norm, name)
+        elif path_value.lower().endswith(".md"):
+            folder, name = os.path.split(path_value)
+            key = _note_full_path_key(folder, name)
+            changed[key] = path_value
+            if os.path.isfile(path_value):
+                files[key] = path_value
+        else:
+            # A folder that was deleted or moved away.
+            folders.append(path_value)
+    changed.update(files)
+
+    scopes = [
+        (f"{user_paths.path_key_sql('path')} = ?", [user_paths.path_key_param(folder)])
+        for folder in sorted({os.path.dirname(full_path) for full_path in changed.values()})
+    ]
+    scopes.extend((user_paths.path_under_sql("path"), user_paths.path_under_params(folder)) for folder in folders)
+    existing = {}
+    for offset in range(0, len(scopes), 200):
+        chunk = scopes[offset:offset + 200]
+        rows = conn.execute(
+            f"SELECT id, {', '.join(tbl['col_list'])} FROM {tbl['name']} t "
+            f"WHERE COALESCE(path, '') != ''{owner_sql} AND ({' OR '.join(clause for clause, _ in chunk)})",
+            owner_params + [param for _, scope_params in chunk for param in scope_params],
+        ).fetchall()
+        for row in rows:
+            row_dict = dict(row)
+            key = _note_full_path_key(row_dict.get("path"), row_dict.get("file_name"))
+            if key and key not in existing:
+                existing[key] = row_dict
+
+    indexed = {}
+    ids = [row["id"] for row in existing.values()]
+    if ids:
+        note_search_index.ensure_schema(conn)
+        for offset in range(0, len(ids), 500):
+            chunk = ids[offset:offset + 500]
+            for row in conn.execute(
+                "SELECT note_id, file_path, file_mtime, file_size FROM lp_note_search_index "
+                f"WHERE note_id IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall():
+                indexed[row["note_id"]] = (row["file_path"], row["file_mtime"], row["file_size"])
+
+    vanished = [
+        row
+        for key, row in existing.items()
+        if key not in files and (key in changed or any(
+            user_paths.path_startswith(row.get("path"), folder) for folder in folders
+        ))
+    ]
+    moves = _match_moved_notes(
+        vanished, {key: full_path for key, full_path in files.items() if key not in existing}, indexed
+    )
+    result["missing"] = len(vanished) - len(moves)
+
+    area_trie = _sync_area_trie(conn, owner_user_id)
+    for key, full_path in sorted(files.items()):
+        current = existing.get(key)
+        if current and _note_sync_index_current(indexed.get(current["id"]), full_path):
+            result["scanned"] += 1
+            result["unchanged"] += 1
+            continue
+        moved = current is None and key in moves
+        if moved:
+            current = moves[key]
+        row_area = _sync_area_for_path(os.path.dirname(full_path), area_trie)
+        status, note_id = _sync_note_file(conn, tbl, full_path, current, row_area, owner_user_id)
+        if not status:
+            continue
+        result["scanned"] += 1
+        if status == "failed":
+            continue
+        result["moved" if moved else status] += 1
+        try:
+            result["links"] += _sync_note_links(
+                note_id, note_search_index.read_note_text(full_path), notes_root=root_path or None
+            )
+        except Exception as exc:
+            data._log_error(None, f"note link sync failed for {full_path}: {exc}")
+    conn.commit()
+    return result
+
+
+def _match_moved_notes(vanished, new_files, indexed):
+    """Pair rows of vanished files with new files that are the same file moved.
+
+    A rename or move keeps the file's mtime and size, so a new file whose
+    stat matches the indexed mtime and size of a vanished row is taken as
+    that row's file.  Among several candidates the one sharing the longest
+    path tail (file name, then parent folders) wins; a tie is left unpaired
+    rather than guessed.  Returns ``{new file key: vanished row}``.
+    """
+    by_stat = {}
+    for key, full_path in new_files.items():
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            continue
+        by_stat.setdefault((stat.st_mtime, stat.st_size), []).append((key, full_path))
+    moves = {}
+    for row in vanished:
+        indexed_row = indexed.get(row["id"])
+        if not indexed_row:
+            continue
+        candidates = [
+            (key, full_path)
+            for key, full_path in by_stat.get((indexed_row[1], indexed_row[2]), [])
+            if key not in moves
+        ]
+        if not candidates:
+            continue
+        old_parts = user_paths.split_path(os.path.join(row.get("path") or "", row.get("file_name") or ""))
+        scored = sorted(
+            ((_shared_tail(old_parts, user_paths.split_path(full_path)), key) for key, full_path in candidates),
+            reverse=True,
+        )
+        if len(scored) > 1 and scored[0][0] == scored[1][0]:
+            continue
+        moves[scored[0][1]] = row
+    return moves
+
+
+def _shared_tail(parts, other_parts):
+    shared = 0
+    for part, other in zip(reversed(parts), reversed(other_parts)):
+        if part.lower() != other.lower():
+            break
+        shared += 1
+    return shared
+
+
+def prune_missing_notes(folder_path, owner_user_id=None):
+    """Delete the owner's notes rows under ``folder_path`` whose file is gone.
+
+    The explicit counterpart of the ``missing`` count reported by sync and
+    the watcher: their index, render cache and link rows go with them.
+    """
+    _ensure_notes_schema()
+    tbl = get_table_def("notes")
+    if not tbl:
+        raise ValueError("Notes table not found.")
+    folder_path = _normalize_note_path(folder_path)
+    if not folder_path:
+        raise ValueError("No folder provided.")
+    if not os.path.isdir(folder_path):
+        # An unmounted share would look like every note was deleted.
+        raise ValueError("Folder not found.")
+    conn = data._get_conn()
+    owner_user_id = _current_owner_user_id() if owner_user_id is None else owner_user_id
+    owner_sql, owner_params = _note_owner_filter(owner_user_id, _table_columns(conn, tbl["name"]))
+    rows = conn.execute(
+        f"SELECT t.id, t.path, t.file_name FROM {tbl['name']} t "
+        f"WHERE COALESCE(t.path, '') != ''{owner_sql} AND {user_paths.path_under_sql('t.path')}",
+        owner_params + user_paths.path_under_params(folder_path),
+    ).fetchall()
+    gone = [
+        row["id"]
+        for row in rows
+        if not os.path.isfile(os.path.join(_normalize_note_path(row["path"]), row["file_name"] or ""))
+    ]
+    return {"folder_path": folder_path, "checked": len(rows), "removed": _remove_note_rows(conn, tbl, gone)}
+
+
+def _note_sync_index_current(indexed_row, full_path):
+    if not indexed_row:
+        return False
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        return False
+    file_path, file_mtime, file_size = indexed_row
+    return (
+        _note_full_path_key(*os.path.split(file_path or "")) == _note_full_path_key(*os.path.split(full_path))
+        and file_mtime == stat.st_mtime
+        and file_size == stat.st_size
+    )
+
+
 def _sync_notes_message(result):
     return (
         f"Synced notes folder {result['folder_path']}: scanned {result['scanned']}, "
@@ -4198,6 +4445,22 @@ def sync_notes_route():
     return redirect(url_for("admin.settings_route", tab="notes", message=msg))
 
 
+@notes_bp.route('/prune-missing', methods=["POST"])
+def prune_missing_notes_route():
+    folder_path = request.form.get("notes_folder", "").strip()
+    if not folder_path:
+        folder_path = _notes_root_path(create_dirs=True) or ""
+    try:
+        result = prune_missing_notes(folder_path)
+        msg = (
+            f"Removed {result['removed']} missing notes from {result['folder_path']} "
+            f"({result['checked']} checked)."
+        )
+    except Exception as exc:
+        msg = f"Removing missing notes failed: {exc}"
+    return redirect(url_for("admin.settings_route", tab="notes", message=msg))
+
+
 @notes_bp.route('/sync-folder/<int:area_folder_id>', methods=["POST"])
 def sync_area_folder_route(area_folder_id):
     folder = areas_mod.area_folder_get(area_folder_id)
@@ -4213,21 +4476,8 @@ def sync_area_folder_route(area_folder_id):
     return redirect(f"{next_url}{sep}{urlencode({'message': msg})}")
 
 
-def _upsert_note_dim_folder(conn, folder_path):
-    folder_path = _normalize_note_path(folder_path)
-    if not folder_path:
-        return None
-    conn.execute("INSERT OR IGNORE INTO dim_folder(folder_path) VALUES (?)", (folder_path,))
-    conn.execute(
-        "UPDATE dim_folder SET last_seen_at=strftime('%Y-%m-%dT%H:%M:%fZ','now'), is_active=1 WHERE folder_path=?",
-        (folder_path,),
-    )
-    row = conn.execute("SELECT folder_id FROM dim_folder WHERE folder_path = ?", (folder_path,)).fetchone()
-    return row["folder_id"] if row else None
-
-
 def _set_note_folder_id(conn, tbl_name, record_id, folder_path):
-    folder_id = _upsert_note_dim_folder(conn, folder_path)
+    folder_id = data.upsert_note_dim_folder(conn, folder_path)
     if not folder_id:
         return
     conn.execute(f"UPDATE {tbl_name} SET folder_id = ? WHERE id = ?", (folder_id, record_id))
@@ -4346,8 +4596,7 @@ def migrate_notes_source_route():
     elif not tbl:
         msg = "Migration not run: notes table not found."
     else:
-        rows = _collect_note_import_rows(folder_path, area)
-        if not rows:
+        if next(note_import.walk_notes(folder_path), None) is None:
             msg = "Migration not run: no markdown files found in the selected folder."
         else:
             conn = data._get_conn()
@@ -4359,7 +4608,11 @@ def migrate_notes_source_route():
             notes_deleted = _clear_notes_table(conn, tbl["name"])
             mappings_rewritten = _migrate_notes_mapping_roots(conn, new_root, old_roots)
             conn.commit()
-            imported = _insert_note_import_rows(tbl, rows)
+            run_id = note_import.create_run(
+                conn, folder_path, area, owner_user_id=_current_owner_user_id(), user_name=_current_username()
+            )
+            run = _run_note_import(tbl, run_id, _notes_root_path(create_dirs=False) or "")
+            imported = (run or {}).get("notes_imported") or 0
             lg_usr(
                 action="notes_migrate_source",
                 entity_type=tbl["name"],
@@ -0,0 +1,516 @@
+"""Notes-root filesystem watcher.
+
+Keeps ``lp_notes``, the note search index, the front matter cache and
+``lp_note_links`` current while markdown notes are added, edited, moved or
+deleted outside LifePIM (Obsidian, a synced folder, a text editor), instead
+of waiting for the next manual "Sync notes folder".
+
+Each active user's ``notes_root_path`` (``user_paths.get_user_paths``) is
+watched by one backend:
+
+* ``InotifyBackend`` - Linux inotify through ctypes, one watch per folder;
+* ``PollingBackend`` - portable: every ``NOTES_WATCHER_POLL_SECONDS`` it
+  re-lists only the folders whose mtime changed (an entry was added, removed
+  or renamed) and stats the notes it already knows to catch edits.
+
+Changed paths are collected until none has arrived for
+``NOTES_WATCHER_DEBOUNCE_MS`` (an editor's save, a sync client's burst or a
+folder copy becomes one batch, at the latest after ``_MAX_DELAY_FACTOR``
+debounce periods) and handed to ``notes.routes.sync_note_paths`` with the
+root's owner, so rows get the same owner, area mapping, folder id and link
+resolution as the sync route gives them.  The watched roots are re-read every
+``NOTES_WATCHER_ROOTS_SECONDS``, so new users and changed notes roots are
+picked up without a restart.
+
+Runs as a daemon thread of the web app when ``NOTES_WATCHER_ENABLED`` is set,
+or standalone: ``python -m modules.notes.watcher``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from common import config as cfg
+from common import data
+from common import note_link_graph
+from common import user_paths
+from modules.notes import routes as notes_routes
+
+
+_MAX_DELAY_FACTOR = 10
+_IDLE_WAIT_SECONDS = 1.0
+_THREAD = None
+_STOP = threading.Event()
+_LOCK = threading.Lock()
+
+
+def enabled():
+    return bool(getattr(cfg, "NOTES_WATCHER_ENABLED", False))
+
+
+def _debounce_seconds():
+    try:
+        return max(0.0, float(getattr(cfg, "NOTES_WATCHER_DEBOUNCE_MS", 1000) or 0) / 1000.0)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _poll_seconds():
+    try:
+        return max(0.1, float(getattr(cfg, "NOTES_WATCHER_POLL_SECONDS", 5) or 5))
+    except (TypeError, ValueError):
+        return 5.0
+
+
+def _roots_seconds():
+    try:
+        return max(1.0, float(getattr(cfg, "NOTES_WATCHER_ROOTS_SECONDS", 60) or 60))
+    except (TypeError, ValueError):
+        return 60.0
+
+
+def _is_note(name):
+    return name.lower().endswith(".md")
+
+
+def _skip_folder(path_value, root_path):
+    return notes_routes._note_sync_skipped(path_value, root_path)
+
+
+class PollingBackend:
+    """Detect changes by comparing folder mtimes and known note stats."""
+
+    name = "polling"
+
+    def __init__(self, roots, interval=None):
+        self.roots = list(roots)
+        self.interval = _poll_seconds() if interval is None else interval
+        # folder -> [mtime_ns, subfolders, {note name: (mtime_ns, size)}]
+        self._folders = {}
+        self._next_poll = time.monotonic() + self.interval
+        for root in self.roots:
+            self._add_tree(root, root)
+
+    def _root_of(self, folder):
+        return max((root for root in self.roots if user_paths.path_startswith(folder, root)), key=len, default="")
+
+    def _list(self, folder):
+        root = self._root_of(folder)
+        subfolders = set()
+        notes = {}
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _skip_folder(entry.path, root):
+                            subfolders.add(entry.path)
+                    elif _is_note(entry.name) and entry.is_file():
+                        stat = entry.stat()
+                        notes[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    continue
+        return subfolders, notes
+
+    def _add_tree(self, folder, root, changes=None):
+        stack = [folder]
+        while stack:
+            current = stack.pop()
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+                subfolders, notes = self._list(current)
+            except OSError:
+                continue
+            self._folders[current] = [mtime_ns, subfolders, notes]
+            stack.extend(subfolders)
+            if changes is not None:
+                changes.extend(os.path.join(current, name) for name in notes)
+
+    def set_roots(self, roots):
+        """Watch ``roots`` from now on; notes already in added roots are not reported."""
+        roots = list(roots)
+        for folder in [folder for folder in self._folders if self._root_of(folder) not in roots]:
+            del self._folders[folder]
+        self.roots = roots
+        for root in self.roots:
+            if root not in self._folders:
+                self._add_tree(root, root)
+
+    def _drop_tree(self, folder, changes):
+        for known in [known for known in self._folders if user_paths.path_startswith(known, folder)]:
+            notes = self._folders.pop(known)[2]
+            changes.extend(os.path.join(known, name) for name in notes)
+        changes.append(folder)
+
+    def scan(self):
+        """Changed note files and added or removed folders since the last scan."""
+        changes = []
+        for root in self.roots:
+            if root not in self._folders and os.path.isdir(root):
+                self._add_tree(root, root, changes)
+        for folder in list(self._folders):
+            entry = self._folders.get(folder)
+            if entry is None:
+                continue
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+            except OSError:
+                self._drop_tree(folder, changes)
+                continue
+            if mtime_ns != entry[0]:
+                try:
+                    subfolders, notes = self._list(folder)
+                except OSError:
+                    self._drop_tree(folder, changes)
+                    continue
+                entry[0] = mtime_ns
+                for added in subfolders - entry[1]:
+                    self._add_tree(added, self._root_of(added), changes)
+                    changes.append(added)
+                for removed in entry[1] - subfolders:
+                    self._drop_tree(removed, changes)
+                entry[1] = subfolders
+                for name in set(notes) | set(entry[2]):
+                    if notes.get(name) != entry[2].get(name):
+                        changes.append(os.path.join(folder, name))
+                entry[2] = notes
+                continue
+            for name, known in list(entry[2].items()):
+                path_value = os.path.join(folder, name)
+                try:
+                    stat = os.stat(path_value)
+                    current = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    current = None
+                if current == known:
+                    continue
+                changes.append(path_value)
+                if current is None:
+                    del entry[2][name]
+                else:
+                    entry[2][name] = current
+        return changes
+
+    def read(self, timeout):
+        now = time.monotonic()
+        wait = self._next_poll - now
+        if wait > timeout:
+            time.sleep(max(0.0, timeout))
+            return []
+        time.sleep(max(0.0, wait))
+        self._next_poll = time.monotonic() + self.interval
+        return self.scan()
+
+    def close(self):
+        self._folders.clear()
+
+
+class InotifyBackend:
+    """Linux inotify (through ctypes) with one watch per notes folder."""
+
+    name = "inotify"
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = getattr(os, "O_NONBLOCK", 0o4000)
+    IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+    WATCH_MASK = (
+        IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+        | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+    )
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, roots):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.roots = list(roots)
+        self._watches = {}
+        for root in self.roots:
+            self._watch_tree(root, root)
+
+    def _root_of(self, folder):
+        return max((root for root in self.roots if user_paths.path_startswith(folder, root)), key=len, default="")
+
+    def _watch(self, folder):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), self.WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = folder
+        return wd >= 0
+
+    def _watch_tree(self, folder, root, changes=None):
+        for current, subfolders, names in os.walk(folder):
+            subfolders[:] = [name for name in subfolders if not _skip_folder(os.path.join(current, name), root)]
+            self._watch(current)
+            if changes is not None:
+                # Notes written before the new folder's watch existed.
+                changes.extend(os.path.join(current, name) for name in names if _is_note(name))
+
+    def _unwatch_tree(self, folder):
+        for wd, known in list(self._watches.items()):
+            if user_paths.path_startswith(known, folder):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                self._watches.pop(wd, None)
+
+    def set_roots(self, roots):
+        """Watch ``roots`` from now on; notes already in added roots are not reported."""
+        roots = list(roots)
+        for wd, folder in list(self._watches.items()):
+            if self._root_of(folder) not in roots:
+                self._libc.inotify_rm_watch(self._fd, wd)
+                self._watches.pop(wd, None)
+        added = [root for root in roots if root not in self.roots]
+        self.roots = roots
+        for root in added:
+            self._watch_tree(root, root)
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        if not ready:
+            return []
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        changes = []
+        offset = 0
+        while offset + self._EVENT.size <= len(buffer):
+            wd, mask, _cookie, length = self._EVENT.unpack_from(buffer, offset)
+            name = buffer[offset + self._EVENT.size:offset + self._EVENT.size + length].rstrip(b"\0")
+            offset += self._EVENT.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                changes.extend(self.roots)
+                continue
+            if mask & self.IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            folder = self._watches.get(wd)
+            if folder is None:
+                continue
+            if not name:
+                if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                    changes.append(folder)
+                continue
+            path_value = os.path.join(folder, os.fsdecode(name))
+            if mask & self.IN_ISDIR:
+                root = self._root_of(path_value)
+                if _skip_folder(path_value, root):
+                    continue
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._watch_tree(path_value, root, changes)
+                elif mask & self.IN_MOVED_FROM:
+                    self._unwatch_tree(path_value)
+                changes.append(path_value)
+            elif _is_note(path_value):
+                changes.append(path_value)
+        return changes
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_backend(roots, kind=None):
+    """Watch backend for ``roots``: ``inotify`` where available, else ``polling``."""
+    kind = (kind or getattr(cfg, "NOTES_WATCHER_BACKEND", "auto") or "auto").lower()
+    if kind in ("auto", "inotify"):
+        try:
+            return InotifyBackend(roots)
+        except (OSError, AttributeError) as exc:
+            if kind == "inotify":
+                raise
+            data._log_error(None, f"notes watcher: inotify unavailable ({exc}); polling instead")
+    return PollingBackend(roots)
+
+
+class NotesWatcher:
+    """Debounce backend events and sync each root's changed paths as its owner.
+
+    ``roots`` maps notes root paths to owner user ids; ``on_changes(user_id,
+    root_path, paths)`` applies one batch.  When ``roots_source`` is given it
+    is called every ``refresh`` seconds for the current roots.
+    """
+
+    def __init__(self, roots, on_changes, backend=None, debounce=None, roots_source=None, refresh=None):
+        self.roots = dict(roots)
+        self.on_changes = on_changes
+        self.backend = backend if backend is not None else make_backend(self.roots)
+        self.debounce = _debounce_seconds() if debounce is None else debounce
+        self.roots_source = roots_source
+        self.refresh = _roots_seconds() if refresh is None else refresh
+        self._next_refresh = time.monotonic() + self.refresh
+        self._pending = {}
+        self._first_at = None
+        self._last_at = None
+
+    def _root_of(self, path_value):
+        return max((root for root in self.roots if user_paths.path_startswith(path_value, root)), key=len, default="")
+
+    def step(self, timeout=None):
+        """Wait up to ``timeout`` seconds for events; returns the results of the batches applied."""
+        if timeout is None:
+            timeout = self.debounce if self._pending else _IDLE_WAIT_SECONDS
+        changes = self.backend.read(timeout)
+        # Stamped after the read, which can block for the whole timeout.
+        now = time.monotonic()
+        for path_value in changes:
+            root = self._root_of(path_value)
+            if root:
+                self._pending.setdefault(root, set()).add(path_value)
+                self._last_at = now
+                if self._first_at is None:
+                    self._first_at = now
+        if self.roots_source is not None and now >= self._next_refresh:
+            self._next_refresh = now + self.refresh
+            self.refresh_roots()
+        if not self._pending:
+            return []
+        now = time.monotonic()
+        if now - self._last_at < self.debounce and now - self._first_at < self.debounce * _MAX_DELAY_FACTOR:
+            return []
+        return self.flush()
+
+    def refresh_roots(self):
+        """Re-read the roots from ``roots_source``; returns True when they changed."""
+        try:
+            roots = dict(self.roots_source())
+        except Exception as exc:
+            data._log_error(None, f"notes watcher: reading notes roots failed: {exc}")
+            return False
+        if roots == self.roots:
+            return False
+        # Pending paths are applied as the owners they were collected for.
+        self.flush()
+        self.roots = roots
+        self.backend.set_roots(self.roots)
+        return True
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        self._first_at = self._last_at = None
+        results = []
+        for root, paths in pending.items():
+            try:
+                results.append(self.on_changes(self.roots[root], root, sorted(paths)))
+            except Exception as exc:
+                data._log_error(None, f"notes watcher: sync of {root} failed: {exc}")
+        return results
+
+    def run(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        try:
+            while not stop_event.is_set():
+                self.step()
+        finally:
+            self.backend.close()
+
+
+def watched_roots(conn=None):
+    """``{notes_root_path: user_id}`` for active users whose notes root exists."""
+    conn = data._get_conn() if conn is None else conn
+    roots = {}
+    for row in conn.execute("SELECT user_id FROM users WHERE is_active = 1 ORDER BY user_id").fetchall():
+        root = user_paths.get_user_paths(conn, row["user_id"]).get("notes_root_path") or ""
+        if root and os.path.isdir(root) and root not in roots:
+            roots[root] = row["user_id"]
+    return roots
+
+
+def sync_changes(app, user_id, root_path, paths):
+    """Apply one batch through ``sync_note_paths`` as ``user_id``, then catch up the link graph."""
+    with app.app_context():
+        result = notes_routes.sync_note_paths(paths, root_path=root_path, owner_user_id=user_id)
+        note_link_graph.catch_up()
+        return result
+
+
+def start(app, force=False):
+    """Start the watcher thread for ``app`` (once); returns it, or None when disabled."""
+    global _THREAD
+    if not (force or enabled()):
+        return None
+    with _LOCK:
+        if _THREAD is not None and _THREAD.is_alive():
+            return _THREAD
+        # Started even without roots yet: they are re-read while it runs.
+        roots = watched_roots()
+        watcher = NotesWatcher(
+            roots,
+            lambda user_id, root, paths: sync_changes(app, user_id, root, paths),
+            roots_source=watched_roots,
+        )
+        _STOP.clear()
+        _THREAD = threading.Thread(target=watcher.run, args=(_STOP,), name="lifepim-notes-watcher", daemon=True)
+        _THREAD.start()
+        return _THREAD
+
+
+def stop(timeout=5.0):
+    global _THREAD
+    _STOP.set()
+    thread, _THREAD = _THREAD, None
+    if thread is not None:
+        thread.join(timeout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep LifePIM notes in step with the notes folders on disk.")
+    parser.add_argument("--backend", choices=("auto", "inotify", "polling"), help="watch backend (default NOTES_WATCHER_BACKEND)")
+    parser.add_argument("--verbose", action="store_true", help="print each applied batch")
+    args = parser.parse_args(argv)
+
+    from app import app
+
+    stop()
+    roots = watched_roots()
+    if not roots:
+        print("No notes folders to watch.", file=sys.stderr)
+        return 1
+
+    def apply(user_id, root, paths):
+        result = sync_changes(app, user_id, root, paths)
+        if args.verbose:
+            print(f"{root}: {len(paths)} changed path(s) -> {result}")
+        return result
+
+    watcher = NotesWatcher(roots, apply, backend=make_backend(roots, args.backend), roots_source=watched_roots)
+    for root, user_id in roots.items():
+        print(f"Watching {root} (user {user_id}) with {watcher.backend.name}")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    # Run through the importable module so the watcher thread started by
+    # ``app`` (when enabled) is the one stop() sees.
+    from modules.notes import watcher as _watcher
+
+    raise SystemExit(_watcher.main())
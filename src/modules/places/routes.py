@@ -9,6 +9,8 @@ from flask import Blueprint, jsonify, render_template, request, redirect, url_fo
 
 from common import data as db
 from common import config as cfg
+from common import keyset
+from common import row_counts
 from common import projects as projects_mod
 from common import settings as settings_mod
 from common.utils import (
@@ -94,7 +96,7 @@ def _build_condition(area, tbl, realm=None):
     return " AND ".join(clauses) if clauses else "1=1", params
 
 
-def _fetch_places(area=None, sort_col=None, sort_dir=None, limit=None, offset=None, realm=None):
+def _fetch_places(area=None, sort_col=None, sort_dir=None, limit=None, offset=None, realm=None, cursor=None):
     tbl = _get_tbl()
     if not tbl:
         return []
@@ -103,18 +105,26 @@ def _fetch_places(area=None, sort_col=None, sort_dir=None, limit=None, offset=No
     sort_key = order_map.get(sort_col or "name", "t.name")
     sort_dir = "desc" if (sort_dir or "").lower() == "desc" else "asc"
     condition, params = _build_condition(area, tbl, realm)
+    select_sql = ", ".join([f"t.{col}" for col in cols])
+    if limit is not None:
+        rows = keyset.fetch_page(
+            db._get_conn(),
+            select_sql,
+            f"{tbl['name']} t",
+            condition,
+            params,
+            f"{sort_key} {sort_dir}",
+            limit,
+            cursor=cursor,
+            offset=offset,
+        )
+        return _decorate_places(rows)
     sql = (
-        f"SELECT {', '.join([f't.{col}' for col in cols])} "
+        f"SELECT {select_sql} "
         f"FROM {tbl['name']} t "
         f"WHERE {condition} "
         f"ORDER BY {sort_key} {sort_dir}"
     )
-    if limit is not None:
-        sql += " LIMIT ?"
-        params.append(int(limit))
-        if offset:
-            sql += " OFFSET ?"
-            params.append(int(offset))
     rows = db._get_conn().execute(sql, params).fetchall()
     return _decorate_places([dict(row) for row in rows])
 
@@ -124,11 +134,12 @@ def _count_places(area=None, realm=None):
     if not tbl:
         return 0
     condition, params = _build_condition(area, tbl, realm)
-    row = db._get_conn().execute(
+    return row_counts.query_count(
+        db._get_conn(),
+        tbl["name"],
         f"SELECT COUNT(1) as cnt FROM {tbl['name']} t WHERE {condition}",
         params,
-    ).fetchone()
-    return row["cnt"] if row else 0
+    )
 
 
 def _parse_float(value):
@@ -739,7 +750,7 @@ def list_places_table_route():
     per_page = cfg.RECS_PER_PAGE
     total = _count_places(area, realm)
     offset = (page - 1) * per_page
-    items = _fetch_places(area, sort_col, sort_dir, limit=per_page, offset=offset, realm=realm)
+    items = _fetch_places(area, sort_col, sort_dir, limit=per_page, offset=offset, realm=realm, cursor=request.args.get("cursor"))
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
@@ -748,7 +759,7 @@ def list_places_table_route():
         "places.list_places_table_route",
         {"area": area, "realm": realm, "mode": mode, "sort": sort_col, "dir": sort_dir},
         page,
-        total_pages,
+        total_pages,        rows=items,
     )
     tbl = _get_tbl()
     col_list = [
@@ -775,6 +786,8 @@ def list_places_table_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
     )
 
 
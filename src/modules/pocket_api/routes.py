@@ -8,13 +8,15 @@ import secrets
 import time
 import uuid
 from contextlib import contextmanager
-from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
 
 from flask import Blueprint, current_app, jsonify, request
 from flask_login import current_user
 
+from common import areas as areas_mod
 from common import data
+from common import note_front_matter
+from common import schema_registry
 from common import user_paths
 from common.network_log import log_network
 from common.utils import get_table_def, lg_usr, normalize_area_param
@@ -33,28 +35,17 @@ REGISTRATION_FAILURE_WINDOW = timedelta(minutes=15)
 POCKET_MAX_SYNC_PAYLOAD_BYTES = int(os.getenv("LIFEPIM_POCKET_MAX_SYNC_PAYLOAD_BYTES", str(100 * 1024 * 1024)))
 POCKET_MAX_ATTACHMENT_BYTES = int(os.getenv("LIFEPIM_POCKET_MAX_ATTACHMENT_BYTES", str(25 * 1024 * 1024)))
 POCKET_ATTACHMENT_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
-POCKET_FRONT_MATTER_READ_LIMIT = 128 * 1024
 POCKET_MANIFEST_FRONT_MATTER_LIMIT = int(os.getenv("LIFEPIM_POCKET_MANIFEST_FRONT_MATTER_LIMIT", "100"))
-_POCKET_COMMIT_DEFER_DEPTH = ContextVar("pocket_commit_defer_depth", default=0)
 
 
 def _commit_pocket_changes(conn=None):
-    if _POCKET_COMMIT_DEFER_DEPTH.get() > 0:
-        return
-    (conn or data._get_conn()).commit()
+    data.commit(conn or data._get_conn())
 
 
 @contextmanager
 def _defer_pocket_commits():
-    token = _POCKET_COMMIT_DEFER_DEPTH.set(_POCKET_COMMIT_DEFER_DEPTH.get() + 1)
-    try:
+    with data.deferred_commits(data._get_conn()):
         yield
-        data._get_conn().commit()
-    except Exception:
-        data._get_conn().rollback()
-        raise
-    finally:
-        _POCKET_COMMIT_DEFER_DEPTH.reset(token)
 
 
 def _utc_now():
@@ -79,6 +70,8 @@ def _table_columns(conn, table_name):
 
 def ensure_pocket_schema(conn=None):
     conn = data._get_conn() if conn is None else conn
+    if schema_registry.is_ready(conn, "pocket"):
+        return
     conn.executescript(
         """
         CREATE TABLE IF NOT EXISTS pocket_devices (
@@ -184,6 +177,10 @@ def ensure_pocket_schema(conn=None):
     ):
         _add_column_if_missing(conn, "pocket_mobile_files", column_name, column_type)
     _commit_pocket_changes(conn)
+    schema_registry.mark_ready(conn, "pocket")
+
+
+schema_registry.register("pocket", ensure_pocket_schema)
 
 
 def _add_column_if_missing(conn, table_name, column_name, column_type):
@@ -726,39 +723,8 @@ def _file_created_at(stat):
     return datetime.fromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S")
 
 
-def _strip_yaml_scalar(value):
-    value = (value or "").strip()
-    if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"'):
-        return value[1:-1]
-    if " #" in value:
-        value = value.split(" #", 1)[0].rstrip()
-    return value
-
-
 def _read_note_front_matter(note_path):
-    if not note_path:
-        return {}
-    try:
-        with open(note_path, "r", encoding="utf-8-sig", errors="replace") as handle:
-            text = handle.read(POCKET_FRONT_MATTER_READ_LIMIT)
-    except OSError:
-        return {}
-    lines = text.splitlines()
-    if not lines or lines[0].strip() != "---":
-        return {}
-    values = {}
-    for line in lines[1:]:
-        stripped = line.strip()
-        if stripped in ("---", "..."):
-            break
-        if not stripped or stripped.startswith("#") or ":" not in line:
-            continue
-        key, raw_value = line.split(":", 1)
-        key = key.strip().lower().replace(" ", "_")
-        if not key:
-            continue
-        values[key] = _strip_yaml_scalar(raw_value)
-    return values
+    return note_front_matter.read_file(note_path) or {}
 
 
 def _front_matter_bool(value):
@@ -1517,209 +1483,35 @@ def _relative_note_path(note, root=None):
     return os.path.basename(full_path)
 
 
-def _matching_area_folder_rows(note, owner_user_id):
-    conn = data._get_conn()
-    try:
-        table_names = {
-            row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-        }
-        if "lp_area_folders" not in table_names:
-            return []
-    except Exception:
-        return []
-    try:
-        folder_path = notes_routes._normalize_note_path(note.get("path")) or os.path.dirname(notes_routes._build_note_path(note))
-    except Exception:
-        folder_path = os.path.dirname(notes_routes._build_note_path(note))
-    if not folder_path:
-        return []
-    try:
-        full_path = notes_routes._normalize_note_path(notes_routes._build_note_path(note))
-    except Exception:
-        full_path = notes_routes._build_note_path(note)
-    folder_columns = _table_columns(conn, "lp_area_folders")
-    if not {"area_id", "path_prefix"}.issubset(folder_columns):
-        return []
-    area_join = ""
-    area_name_expr = "'' AS area_name"
-    if "lp_areas" in table_names:
-        area_columns = _table_columns(conn, "lp_areas")
-        if {"owner_user_id", "area_id", "area_name"}.issubset(area_columns):
-            area_join = (
-                "LEFT JOIN lp_areas p "
-                "ON p.owner_user_id IS pf.owner_user_id "
-                "AND p.area_id = pf.area_id"
-            )
-            area_name_expr = "COALESCE(p.area_name, '') AS area_name"
-    owner_condition = "pf.owner_user_id IS ?" if "owner_user_id" in folder_columns else "? IS NULL"
-    enabled_condition = "AND pf.is_enabled = 1" if "is_enabled" in folder_columns else ""
-    role_condition = (
-        "AND pf.folder_role IN ('default','include','archive','output')" if "folder_role" in folder_columns else ""
-    )
-    folder_role_expr = "pf.folder_role" if "folder_role" in folder_columns else "'default'"
-    sort_order_expr = "pf.sort_order" if "sort_order" in folder_columns else "100"
-
-    def _rows_for_owner(owner_value):
-        try:
-            rows = conn.execute(
-                f"""
-                SELECT pf.area_id, pf.path_prefix, {folder_role_expr} AS folder_role,
-                       {sort_order_expr} AS sort_order, {area_name_expr}
-                FROM lp_area_folders pf
-                {area_join}
-                WHERE {owner_condition}
-                  {enabled_condition}
-                  {role_condition}
-                """,
-                (owner_value,),
-            ).fetchall()
-        except Exception:
-            return []
-        matched = []
-        folder_lower = folder_path.lower()
-        for row in rows:
-            try:
-                path_prefix = notes_routes._normalize_note_path(row["path_prefix"])
-            except Exception:
-                continue
-            if not path_prefix:
-                continue
-            if folder_lower.startswith(path_prefix.lower()):
-                item = dict(row)
-                item["path_prefix"] = path_prefix
-                item["full_path"] = full_path
-                matched.append(item)
-        return matched
-
-    owner_rows = _rows_for_owner(owner_user_id) if owner_user_id is not None else []
-    return owner_rows or _rows_for_owner(None)
-
-
-def _area_folder_rows_for_manifest(owner_user_id):
-    conn = data._get_conn()
-    try:
-        table_names = {
-            row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-        }
-    except Exception:
-        return []
-    if "lp_area_folders" not in table_names:
-        return []
-    folder_columns = _table_columns(conn, "lp_area_folders")
-    if not {"area_id", "path_prefix"}.issubset(folder_columns):
-        return []
-    area_join = ""
-    area_name_expr = "'' AS area_name"
-    if "lp_areas" in table_names:
-        area_columns = _table_columns(conn, "lp_areas")
-        if {"owner_user_id", "area_id", "area_name"}.issubset(area_columns):
-            area_join = (
-                "LEFT JOIN lp_areas p "
-                "ON p.owner_user_id IS pf.owner_user_id "
-                "AND p.area_id = pf.area_id"
-            )
-            area_name_expr = "COALESCE(p.area_name, '') AS area_name"
-    owner_condition = "pf.owner_user_id IS ?" if "owner_user_id" in folder_columns else "? IS NULL"
-    enabled_condition = "AND pf.is_enabled = 1" if "is_enabled" in folder_columns else ""
-    role_condition = (
-        "AND pf.folder_role IN ('default','include','archive','output')" if "folder_role" in folder_columns else ""
-    )
-    folder_role_expr = "pf.folder_role" if "folder_role" in folder_columns else "'default'"
-    sort_order_expr = "pf.sort_order" if "sort_order" in folder_columns else "100"
-    rows = []
-    for owner_value in (owner_user_id, None):
-        if owner_value is None and owner_user_id is None:
-            continue
-        try:
-            fetched = conn.execute(
-                f"""
-                SELECT pf.area_id, pf.path_prefix, {folder_role_expr} AS folder_role,
-                       {sort_order_expr} AS sort_order, {area_name_expr}
-                FROM lp_area_folders pf
-                {area_join}
-                WHERE {owner_condition}
-                  {enabled_condition}
-                  {role_condition}
-                """,
-                (owner_value,),
-            ).fetchall()
-        except Exception:
-            continue
-        for row in fetched:
-            try:
-                path_prefix = notes_routes._normalize_note_path(row["path_prefix"])
-            except Exception:
-                continue
-            if not path_prefix:
-                continue
-            item = dict(row)
-            item["path_prefix"] = path_prefix
-            item["_manifest_owner_user_id"] = owner_value
-            rows.append(item)
-    return rows
+def _area_folder_tries(owner_user_id):
+    """Tries to resolve a note's area with: the owner's, then the shared one."""
+    tries = []
+    if owner_user_id is not None:
+        tries.append(areas_mod.area_folder_trie(owner_user_id, conn=data._get_conn()))
+    tries.append(areas_mod.area_folder_trie(None, conn=data._get_conn()))
+    return tries
 
 
-def _matching_area_folder_rows_from_cache(note, owner_user_id, area_folder_rows):
-    if area_folder_rows is None:
-        return _matching_area_folder_rows(note, owner_user_id)
+def _derived_area_for_note(note, owner_user_id=None, area_tries=None):
+    fallback = note.get("area") or ""
+    owner_user_id = owner_user_id if owner_user_id is not None else note.get("owner_user_id")
     try:
         folder_path = notes_routes._normalize_note_path(note.get("path")) or os.path.dirname(notes_routes._build_note_path(note))
     except Exception:
         folder_path = os.path.dirname(notes_routes._build_note_path(note))
     if not folder_path:
-        return []
+        return fallback
     try:
         full_path = notes_routes._normalize_note_path(notes_routes._build_note_path(note))
     except Exception:
         full_path = notes_routes._build_note_path(note)
-    folder_lower = folder_path.lower()
-
-    def _matches(owner_value):
-        matched = []
-        for row in area_folder_rows:
-            if row.get("_manifest_owner_user_id") != owner_value:
-                continue
-            path_prefix = row.get("path_prefix") or ""
-            if folder_lower.startswith(path_prefix.lower()):
-                item = dict(row)
-                item["full_path"] = full_path
-                matched.append(item)
-        return matched
-
-    owner_rows = _matches(owner_user_id) if owner_user_id is not None else []
-    return owner_rows or _matches(None)
-
-
-def _derived_area_for_note(note, owner_user_id=None, area_folder_rows=None):
-    fallback = note.get("area") or ""
-    owner_user_id = owner_user_id if owner_user_id is not None else note.get("owner_user_id")
-    rows = _matching_area_folder_rows_from_cache(note, owner_user_id, area_folder_rows)
-    if not rows:
-        return fallback
-    best_prefix_len = max(len(row.get("path_prefix") or "") for row in rows)
-    best_rows = [row for row in rows if len(row.get("path_prefix") or "") == best_prefix_len]
-    role_order = {"default": 0, "include": 1, "output": 2, "archive": 3}
-
-    def _sort_key(row):
-        area_id = row.get("area_id") or ""
-        return (
-            -len(row.get("path_prefix") or ""),
-            role_order.get(row.get("folder_role") or "", 9),
-            area_id.count("/"),
-            len(area_id),
-            area_id,
-            row.get("path_prefix") or "",
-        )
-
-    named_child_rows = []
-    for row in best_rows:
-        area_id = row.get("area_id") or ""
-        area_name = row.get("area_name") or ""
-        if "/" in area_id and area_name and area_name.lower() in (row.get("full_path") or "").lower():
-            named_child_rows.append(row)
-    if named_child_rows:
-        return sorted(named_child_rows, key=_sort_key)[0].get("area_id") or fallback
-    return sorted(best_rows, key=_sort_key)[0].get("area_id") or fallback
+    if area_tries is None:
+        area_tries = _area_folder_tries(owner_user_id)
+    for trie in area_tries:
+        match = trie.resolve(folder_path, full_path=full_path)
+        if match:
+            return match[0] or fallback
+    return fallback
 
 
 def _iso_from_state_or_note(state, note, allow_file_stat=True):
@@ -1767,8 +1559,9 @@ def _serialize_note_item(
     include_front_matter=True,
     item_uuid=None,
     cached_sha="",
-    area_folder_rows=None,
+    area_tries=None,
     allow_file_stat=True,
+    front_matter=None,
 ):
     note_path = note_path_override or notes_routes._build_note_path(note)
     if include_content:
@@ -1777,7 +1570,8 @@ def _serialize_note_item(
     else:
         state = state_override or _note_file_metadata(note_path)
     content = notes_routes._read_note_file(note_path) if include_content else None
-    front_matter = _read_note_front_matter(note_path) if include_front_matter else {}
+    if front_matter is None:
+        front_matter = _read_note_front_matter(note_path) if include_front_matter else {}
     front_matter_metadata = (
         _metadata_from_front_matter(front_matter)
         if include_front_matter
@@ -1802,7 +1596,7 @@ def _serialize_note_item(
     if state and not front_matter_metadata.get("date_created") and state.get("date_created"):
         front_matter_metadata["date_created"] = state.get("date_created") or ""
         front_matter_metadata["created_at"] = state.get("created_at") or _iso_from_note_value(state.get("date_created") or "")
-    derived_area = _derived_area_for_note(note, owner_user_id=user_id, area_folder_rows=area_folder_rows)
+    derived_area = _derived_area_for_note(note, owner_user_id=user_id, area_tries=area_tries)
     item_owner_user_id = _effective_note_owner_user_id(note, user_id=user_id)
     item = {
         "id": item_uuid or _item_uuid_for_note(note["id"], item_owner_user_id),
@@ -2555,15 +2349,19 @@ def sync_manifest_route():
     mobile_rows = _mobile_file_rows(user_id=device.get("user_id"))
     total_records = len(rows) + len(mobile_rows)
     root = _notes_root(user_id=device.get("user_id"), notes=rows)
-    include_front_matter = str(request.args.get("include_metadata") or "").strip().lower() in {"1", "true", "yes"}
-    if not include_front_matter:
-        include_front_matter = len(rows) <= int(current_app.config.get("LIFEPIM_POCKET_MANIFEST_FRONT_MATTER_LIMIT", POCKET_MANIFEST_FRONT_MATTER_LIMIT))
-    include_file_dates = include_front_matter or str(request.args.get("include_file_dates") or "").strip().lower() in {"1", "true", "yes"}
+    read_front_matter_files = str(request.args.get("include_metadata") or "").strip().lower() in {"1", "true", "yes"}
+    if not read_front_matter_files:
+        read_front_matter_files = len(rows) <= int(current_app.config.get("LIFEPIM_POCKET_MANIFEST_FRONT_MATTER_LIMIT", POCKET_MANIFEST_FRONT_MATTER_LIMIT))
+    include_file_dates = read_front_matter_files or str(request.args.get("include_file_dates") or "").strip().lower() in {"1", "true", "yes"}
+    # Front matter cached by the note save paths and the index sweep is used
+    # at any note count; files are only read for notes missing from the cache.
+    cached_front_matter = note_front_matter.lookup_many(data._get_conn(), [note.get("id") for note in rows])
+    include_front_matter = read_front_matter_files or all(int(note["id"]) in cached_front_matter for note in rows)
     item_uuid_map = _item_uuid_map_for_notes(rows, user_id=device.get("user_id"))
     cached_sha_map = _cached_note_sha_map([note.get("id") for note in rows])
     mobile_item_uuid_map = _item_uuid_map_for_mobile_files(mobile_rows)
     mobile_cached_sha_map = _cached_mobile_file_sha_map([row.get("mobile_file_id") for row in mobile_rows])
-    area_folder_rows = _area_folder_rows_for_manifest(device.get("user_id"))
+    area_tries = _area_folder_tries(device.get("user_id"))
     processed_count = 0
     for idx, note in enumerate(rows, start=1):
         processed_count += 1
@@ -2577,6 +2375,9 @@ def sync_manifest_route():
                 error_count += 1
                 errors.append({"note_id": note.get("id"), "error": "missing_note_path"})
                 continue
+            cached_entry = cached_front_matter.get(int(note["id"]))
+            if cached_entry is not None and read_front_matter_files and str(cached_entry["size"]) != str(state.get("size")):
+                cached_entry = None
             items.append(
                 _serialize_note_item(
                     note,
@@ -2585,11 +2386,12 @@ def sync_manifest_route():
                     state_override=state,
                     note_path_override=note_path,
                     user_id=device.get("user_id"),
-                    include_front_matter=include_front_matter,
+                    include_front_matter=read_front_matter_files or cached_entry is not None,
                     item_uuid=item_uuid_map.get(int(note["id"])),
                     cached_sha=cached_sha_map.get(int(note["id"]), ""),
-                    area_folder_rows=area_folder_rows,
+                    area_tries=area_tries,
                     allow_file_stat=include_file_dates,
+                    front_matter=cached_entry["front_matter"] if cached_entry is not None else None,
                 )
             )
         except Exception as exc:
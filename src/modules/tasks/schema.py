@@ -4,8 +4,12 @@ import sqlite3
 from datetime import date, datetime, timezone
 
 from common import data as db
+from common import keyset
 from common import links as links_mod
 from common import projects as projects_mod
+from common import row_counts
+from common import schema_registry
+from common import user_paths
 from common import utils as utils_mod
 from modules.apps import schema as apps_model
 
@@ -56,9 +60,10 @@ ON lp_tasks (owner_user_id, app_action_id);
 
 CREATE INDEX IF NOT EXISTS ix_lp_tasks_area
 ON lp_tasks (owner_user_id, area);
-"""
 
-_TASKS_SCHEMA_READY_CONN_IDS = set()
+CREATE INDEX IF NOT EXISTS ix_lp_tasks_area_key
+ON lp_tasks (owner_user_id, lower(area));
+"""
 
 
 def _utc_now():
@@ -124,15 +129,17 @@ def _table_columns(conn, table_name):
 
 def ensure_tasks_schema(conn=None):
     conn = _get_conn(conn)
-    conn_id = id(conn)
-    if conn_id in _TASKS_SCHEMA_READY_CONN_IDS and _tasks_schema_is_current(conn):
+    if schema_registry.is_ready(conn, "tasks"):
         return
     if _table_exists(conn, "lp_tasks") and not _tasks_schema_is_current(conn):
         _replace_old_tasks_schema(conn)
     conn.executescript(TASKS_SCHEMA_SQL)
     _migrate_tasks_schema(conn)
     conn.commit()
-    _TASKS_SCHEMA_READY_CONN_IDS.add(conn_id)
+    schema_registry.mark_ready(conn, "tasks")
+
+
+schema_registry.register("tasks", ensure_tasks_schema, version=2)
 
 
 def _tasks_schema_is_current(conn):
@@ -215,20 +222,27 @@ def parse_parameter_values(value):
     return parsed if isinstance(parsed, dict) else {}
 
 
-def task_list(area_id=None, view_filter="all", query="", limit=None, offset=None, conn=None, owner_user_id=None):
+def task_list(area_id=None, view_filter="all", query="", limit=None, offset=None, conn=None, owner_user_id=None, cursor=None):
     conn = _get_conn(conn)
     ensure_tasks_schema(conn)
     owner_user_id = _owner_user_id(owner_user_id)
     params = [owner_user_id]
     where = ["t.owner_user_id IS ?"]
     _append_filters(where, params, owner_user_id, area_id, view_filter, query)
-    sql = _task_select_sql() + " WHERE " + " AND ".join(where) + " ORDER BY " + _task_order(view_filter)
     if limit is not None:
-        sql += " LIMIT ?"
-        params.append(int(limit))
-        if offset:
-            sql += " OFFSET ?"
-            params.append(int(offset))
+        rows = keyset.fetch_page(
+            conn,
+            _TASK_SELECT_COLUMNS,
+            _TASK_SELECT_FROM,
+            " AND ".join(where),
+            params,
+            _task_order(view_filter),
+            limit,
+            cursor=cursor,
+            offset=offset,
+        )
+        return rows.derive([_task_row(row) for row in rows])
+    sql = _task_select_sql() + " WHERE " + " AND ".join(where) + " ORDER BY " + _task_order(view_filter)
     return [_task_row(row) for row in conn.execute(sql, params).fetchall()]
 
 
@@ -239,17 +253,24 @@ def task_count(area_id=None, view_filter="all", query="", conn=None, owner_user_
     params = [owner_user_id]
     where = ["t.owner_user_id IS ?"]
     _append_filters(where, params, owner_user_id, area_id, view_filter, query)
-    row = conn.execute("SELECT COUNT(1) AS cnt FROM lp_tasks t WHERE " + " AND ".join(where), params).fetchone()
+    sql = "SELECT COUNT(1) AS cnt FROM lp_tasks t WHERE " + " AND ".join(where)
+    if not _clean_text(query):
+        return row_counts.query_count(conn, "lp_tasks", sql, params)
+    row = conn.execute(sql, params).fetchone()
     return row["cnt"] if row else 0
 
 
 def _append_filters(where, params, owner_user_id, area_id, view_filter, query):
     area_id = _clean_text(area_id)
     if area_id and area_id.lower() not in {"all", "all areas", "any", "unmapped"}:
-        where.append(
-            "(lower(t.area) = lower(?) OR lower(t.area) LIKE lower(?) || '/%' OR lower(?) LIKE lower(t.area) || '/%')"
-        )
-        params.extend([area_id, area_id, area_id])
+        # The area itself and its ancestors by equality, descendants as a
+        # range, all on the lower(area) index.
+        area_key = user_paths.sql_lower(area_id)
+        parts = area_key.split("/")
+        keys = ["/".join(parts[:depth]) for depth in range(1, len(parts) + 1)]
+        marks = ", ".join("?" for _ in keys)
+        where.append(f"(lower(t.area) IN ({marks}) OR (lower(t.area) >= ? AND lower(t.area) < ?))")
+        params.extend(keys + [area_key + "/", area_key + "0"])
     elif area_id.lower() == "unmapped":
         where.append("COALESCE(t.area, '') = ''")
 
@@ -281,13 +302,16 @@ def _append_filters(where, params, owner_user_id, area_id, view_filter, query):
         params.extend([like_value, like_value, like_value])
 
 
+_TASK_SELECT_COLUMNS = "t.*, ax.action_name, ax.parameter_schema_json, ax.app_id, a.title AS app_title"
+_TASK_SELECT_FROM = (
+    "lp_tasks t "
+    "LEFT JOIN lp_app_action ax ON ax.owner_user_id IS t.owner_user_id AND ax.app_action_id = t.app_action_id "
+    "LEFT JOIN lp_app a ON a.owner_user_id IS ax.owner_user_id AND a.app_id = ax.app_id"
+)
+
+
 def _task_select_sql():
-    return (
-        "SELECT t.*, ax.action_name, ax.parameter_schema_json, ax.app_id, a.title AS app_title "
-        "FROM lp_tasks t "
-        "LEFT JOIN lp_app_action ax ON ax.owner_user_id IS t.owner_user_id AND ax.app_action_id = t.app_action_id "
-        "LEFT JOIN lp_app a ON a.owner_user_id IS ax.owner_user_id AND a.app_id = ax.app_id"
-    )
+    return f"SELECT {_TASK_SELECT_COLUMNS} FROM {_TASK_SELECT_FROM}"
 
 
 def _task_order(view_filter):
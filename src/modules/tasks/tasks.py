@@ -113,6 +113,7 @@ def list_tasks_route():
         query=query,
         limit=per_page,
         offset=(page - 1) * per_page,
+        cursor=request.args.get("cursor"),
     )
     pagination = build_pagination(
         url_for,
@@ -120,6 +121,7 @@ def list_tasks_route():
         {"area": area, "view": view_filter, "q": query},
         page,
         page_data["total_pages"],
+        rows=tasks,
     )
     resp = make_response(
         render_template(
@@ -140,6 +142,8 @@ def list_tasks_route():
             pages=pagination["pages"],
             first_url=pagination["first_url"],
             last_url=pagination["last_url"],
+            prev_url=pagination["prev_url"],
+            next_url=pagination["next_url"],
         )
     )
     return resp
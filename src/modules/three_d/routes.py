@@ -23,7 +23,7 @@ def _get_tbl():
     return get_table_def("3d")
 
 
-def _fetch_items(area=None, sort_col=None, sort_dir=None, limit=None, offset=None):
+def _fetch_items(area=None, sort_col=None, sort_dir=None, limit=None, offset=None, cursor=None):
     tbl = _get_tbl()
     if not tbl:
         return []
@@ -38,13 +38,22 @@ def _fetch_items(area=None, sort_col=None, sort_dir=None, limit=None, offset=Non
     sort_key = order_map.get(sort_col or "file_name", "t.file_name")
     sort_dir = sort_dir or "asc"
     order_by = f"{sort_key} {sort_dir}"
+    if limit is not None:
+        return db.get_mapped_page(
+            db.conn,
+            tbl["name"],
+            cols,
+            tab=area,
+            limit=limit,
+            order_by=order_by,
+            cursor=cursor,
+            offset=offset,
+        )
     rows = db.get_mapped_rows(
         db.conn,
         tbl["name"],
         cols,
         tab=area,
-        limit=limit,
-        offset=offset,
         order_by=order_by,
     )
     return [dict(row) for row in rows]
@@ -68,17 +77,18 @@ def list_3d_table_route():
     page = request.args.get("page", type=int) or 1
     per_page = cfg.RECS_PER_PAGE
     total = db.count_mapped_rows(db.conn, _get_tbl()["name"], tab=area)
-    offset = (page - 1) * per_page
-    items = _fetch_items(area, sort_col, sort_dir, limit=per_page, offset=offset)
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
+    offset = (page - 1) * per_page
+    items = _fetch_items(area, sort_col, sort_dir, limit=per_page, offset=offset, cursor=request.args.get("cursor"))
     pagination = build_pagination(
         url_for,
         "three_d.list_3d_table_route",
         {"area": area, "sort": sort_col, "dir": sort_dir},
         page,
         total_pages,
+        rows=items,
     )
     tbl = _get_tbl()
     col_list = tbl["col_list"] if tbl else []
@@ -99,6 +109,8 @@ def list_3d_table_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
     )
 
 
@@ -108,17 +120,18 @@ def list_3d_list_route():
     page = request.args.get("page", type=int) or 1
     per_page = cfg.RECS_PER_PAGE
     total = db.count_mapped_rows(db.conn, _get_tbl()["name"], tab=area)
-    offset = (page - 1) * per_page
-    items = _fetch_items(area, limit=per_page, offset=offset)
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
+    offset = (page - 1) * per_page
+    items = _fetch_items(area, limit=per_page, offset=offset, cursor=request.args.get("cursor"))
     pagination = build_pagination(
         url_for,
         "three_d.list_3d_list_route",
         {"area": area},
         page,
         total_pages,
+        rows=items,
     )
     return render_template(
         "three_d_list_list.html",
@@ -134,6 +147,8 @@ def list_3d_list_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
     )
 
 
@@ -143,17 +158,18 @@ def list_3d_cards_route():
     page = request.args.get("page", type=int) or 1
     per_page = cfg.RECS_PER_PAGE
     total = db.count_mapped_rows(db.conn, _get_tbl()["name"], tab=area)
-    offset = (page - 1) * per_page
-    items = _fetch_items(area, limit=per_page, offset=offset)
     page_data = paginate_total(total, page, per_page)
     page = page_data["page"]
     total_pages = page_data["total_pages"]
+    offset = (page - 1) * per_page
+    items = _fetch_items(area, limit=per_page, offset=offset, cursor=request.args.get("cursor"))
     pagination = build_pagination(
         url_for,
         "three_d.list_3d_cards_route",
         {"area": area},
         page,
         total_pages,
+        rows=items,
     )
     card_values = [[i.get("file_name"), i.get("path"), url_for("three_d.view_3d_route", item_id=i.get("id"))] for i in items]
     return render_template(
@@ -171,6 +187,8 @@ def list_3d_cards_route():
         pages=pagination["pages"],
         first_url=pagination["first_url"],
         last_url=pagination["last_url"],
+        prev_url=pagination["prev_url"],
+        next_url=pagination["next_url"],
     )
 
 
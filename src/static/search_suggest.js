@@ -0,0 +1,121 @@
+
+(function () {
+  "use strict";
+
+  const form = document.querySelector(".search-form");
+  const input = form ? form.querySelector('input[name="q"]') : null;
+  if (!form || !input || !window.fetch || !window.TextDecoder) {
+    return;
+  }
+
+  const endpoint = form.dataset.suggestUrl;
+  const client = Math.random().toString(36).slice(2);
+  const box = document.createElement("div");
+  box.className = "search-suggest";
+  box.hidden = true;
+  form.style.position = "relative";
+  form.appendChild(box);
+
+  let seq = 0;
+  let controller = null;
+
+  function clear() {
+    box.replaceChildren();
+    box.hidden = true;
+  }
+
+  function addDomain(line) {
+    if (!line.items || !line.items.length) {
+      return;
+    }
+    const heading = document.createElement("div");
+    heading.className = "search-suggest-domain";
+    heading.textContent = line.label;
+    box.appendChild(heading);
+    line.items.forEach((item) => {
+      const link = document.createElement("a");
+      link.className = "search-suggest-item";
+      link.href = item.url || "#";
+      link.textContent = item.title || item.id;
+      if (item.subtitle) {
+        const sub = document.createElement("span");
+        sub.className = "search-suggest-sub";
+        sub.textContent = item.subtitle;
+        link.appendChild(sub);
+      }
+      box.appendChild(link);
+    });
+    box.hidden = false;
+  }
+
+  async function suggest() {
+    const query = input.value.trim();
+    seq += 1;
+    const mySeq = seq;
+    if (controller) {
+      controller.abort();
+    }
+    if (!query) {
+      clear();
+      return;
+    }
+    controller = new AbortController();
+    const params = new URLSearchParams({ q: query, seq: String(mySeq), client: client });
+    let response;
+    try {
+      response = await fetch(`${endpoint}?${params}`, { signal: controller.signal });
+    } catch (err) {
+      return;
+    }
+    if (!response.ok || !response.body) {
+      return;
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = "";
+    let first = true;
+    try {
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) {
+          break;
+        }
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split("\n");
+        buffered = lines.pop();
+        for (const text of lines) {
+          if (!text || mySeq !== seq) {
+            continue;
+          }
+          const line = JSON.parse(text);
+          if (line.cancelled || line.done) {
+            continue;
+          }
+          if (first) {
+            box.replaceChildren();
+            first = false;
+          }
+          addDomain(line);
+        }
+      }
+    } catch (err) {
+      return;
+    }
+    if (first && mySeq === seq) {
+      clear();
+    }
+  }
+
+  input.setAttribute("autocomplete", "off");
+  input.addEventListener("input", suggest);
+  input.addEventListener("keydown", (event) => {
+    if (event.key === "Escape") {
+      clear();
+    }
+  });
+  document.addEventListener("click", (event) => {
+    if (!form.contains(event.target)) {
+      clear();
+    }
+  });
+})();
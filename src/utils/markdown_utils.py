@@ -21,6 +21,15 @@ _HTML_IMG_RE = re.compile(r"(?is)<img\b([^>]*?)\bsrc\s*=\s*(['\"]?)([^'\"\s>]+)\
 _FENCE_RE = re.compile(r"^```[\w+-]*\s*$")
 _FENCE_CLOSE_RE = re.compile(r"^```\s*$")
 
+# Bump whenever render_markdown's output changes; cached renders of an older
+# version are discarded.
+RENDERER_VERSION = "1"
+
+
+def renderer_version():
+    backend = getattr(md_lib, "__version__", "") if md_lib else "fallback"
+    return f"{RENDERER_VERSION}:{backend}"
+
 
 def _is_absolute_asset(source):
     source = (source or "").strip().lower()
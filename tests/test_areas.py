@@ -524,6 +524,48 @@ class TestAreas(unittest.TestCase):
         self.assertTrue(any(row["icon"] for row in rows))
         self.assertIn("All", [row["id"] for row in rows])
 
+    def test_area_folder_trie_resolves_longest_whole_segment_prefix(self):
+        for area_id, name in [("work", "Work"), ("work/ue5", "UE5"), ("work/docs", "Docs")]:
+            areas.area_upsert(
+                {"area_id": area_id, "tab": "WORK", "group_name": "WORK", "area_name": name},
+                owner_user_id=1,
+                conn=self.conn,
+            )
+        areas.area_folder_add("work", r"C:\Work", owner_user_id=1, conn=self.conn)
+        areas.area_folder_add("work/docs", r"C:\Work\Projects", folder_role="archive", owner_user_id=1, conn=self.conn)
+        areas.area_folder_add("work/ue5", r"C:\Work\Projects", owner_user_id=1, conn=self.conn)
+
+        trie = areas.area_folder_trie(1, conn=self.conn)
+        self.assertEqual(len(trie), 3)
+        self.assertEqual(trie.resolve(r"c:/work/projects/game"), ("work/ue5", "include", r"C:\Work\Projects"))
+        self.assertEqual(trie.resolve(r"C:\Work\Other")[0], "work")
+        self.assertIsNone(trie.resolve(r"C:\Workshop"))
+        self.assertEqual(
+            [entry["area_id"] for entry in trie.matches(r"C:\Work\Projects\Docs")],
+            ["work", "work/docs", "work/ue5"],
+        )
+        named = trie.resolve(r"C:\Work\Projects", full_path=r"C:\Work\Projects\Docs\readme.md")
+        self.assertEqual(named[0], "work/docs")
+        self.assertIs(areas.area_folder_trie(1, conn=self.conn), trie)
+        self.assertIsNone(areas.resolve_area_folder(r"C:\Work", owner_user_id=2, conn=self.conn))
+
+    def test_area_folder_trie_is_rebuilt_after_any_mapping_write(self):
+        areas.area_folder_add("area.one", r"C:\One", owner_user_id=1, conn=self.conn)
+        trie = areas.area_folder_trie(1, conn=self.conn)
+        self.assertEqual(trie.resolve(r"C:\One\x")[0], "area.one")
+
+        self.conn.execute("UPDATE lp_area_folders SET path_prefix = 'C:\\Two' WHERE owner_user_id = 1")
+        rebuilt = areas.area_folder_trie(1, conn=self.conn)
+        self.assertIsNot(rebuilt, trie)
+        self.assertIsNone(rebuilt.resolve(r"C:\One\x"))
+        self.assertEqual(rebuilt.resolve(r"C:\Two")[0], "area.one")
+
+        areas.area_folder_add("area.shared", r"C:\One", owner_user_id=None, conn=self.conn)
+        self.assertEqual(
+            areas.resolve_area_folder(r"C:\One\x", owner_user_id=1, conn=self.conn, shared_fallback=True)[0],
+            "area.shared",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
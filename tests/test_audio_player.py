@@ -1,12 +1,15 @@
 import os
 import sqlite3
 import unittest
+from unittest.mock import patch
 
 root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
 if root_folder not in os.sys.path:
     os.sys.path.append(root_folder)
 
 from common import data
+from common import schema_registry
+from common import search
 from modules.audio import routes as audio_routes
 
 
@@ -42,5 +45,55 @@ class TestAudioPlayerCurrentList(unittest.TestCase):
         self.assertEqual([item["file_name"] for item in items], ["three.mp3", "one.mp3", "two.mp3"])
 
 
+class TestAudioSearch(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        self.conn.execute(
+            "CREATE TABLE lp_audio ("
+            "id INTEGER PRIMARY KEY, file_name TEXT, path TEXT, folder_id TEXT, file_type TEXT, size TEXT, "
+            "date_modified TEXT, duration TEXT, artist TEXT, album TEXT, song TEXT, area TEXT, "
+            "user_name TEXT, rec_extract_date TEXT)"
+        )
+        rows = [
+            (1, "blue-train.mp3", "Coltrane", "Blue Train"),
+            (2, "moment.mp3", "Coltrane", "Giant Steps"),
+            (3, "so-what.mp3", "Miles Davis", "Kind of Blue"),
+            (4, "ab.mp3", "Other", "AB Side"),
+        ]
+        for audio_id, name, artist, album in rows:
+            self.conn.execute(
+                "INSERT INTO lp_audio (id, file_name, path, file_type, artist, album) "
+                "VALUES (?, ?, 'C:\\audio', 'mp3', ?, ?)",
+                (audio_id, name, artist, album),
+            )
+        self.conn.commit()
+
+    def tearDown(self):
+        data.conn = self._old_conn
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def _ids(self, query, **kwargs):
+        return [item["id"] for item in audio_routes._fetch_audio_search(query=query, **kwargs)]
+
+    def test_terms_sorting_and_paging_run_in_sql(self):
+        self.assertEqual(self._ids("blue"), [1, 3])
+        self.assertEqual(self._ids("BLUE coltrane"), [1])
+        self.assertEqual(self._ids("ab"), [4])
+        self.assertEqual(self._ids("coltrane", sort_col="file_name", sort_dir="desc"), [2, 1])
+        self.assertEqual(self._ids("", sort_col="artist", sort_dir="bogus", limit=2, offset=1), [2, 3])
+        self.assertEqual(audio_routes._count_audio_search(query="blue"), 2)
+        self.conn.execute("UPDATE lp_audio SET album = 'Blue Note' WHERE id = 2")
+        self.assertEqual(audio_routes._count_audio_search(query="blue"), 3)
+
+    def test_like_fallback_without_search_index(self):
+        with patch.object(search, "doc_match_condition", return_value=None):
+            self.assertEqual(self._ids("blue"), [1, 3])
+            self.assertEqual(self._ids("miles kind"), [3])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import data
+
+
+class TestDataConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, "pool.db")
+        self._old_conn = data.conn
+        self._old_owned = data._OWNED_WRITER_CONN
+        self._patches = [
+            patch.object(data, "DB_FILE", self.db_file),
+            patch.object(data, "_pool_size", return_value=2),
+            patch.object(data, "_pool_wait_seconds", return_value=0.05),
+        ]
+        for item in self._patches:
+            item.start()
+        data.conn = None
+        data.close_pool()
+
+    def tearDown(self):
+        data.end_request_scope()
+        data.close_pool()
+        if data.conn is not None and data.conn is not self._old_conn:
+            data.conn.close()
+        for item in reversed(self._patches):
+            item.stop()
+        data.conn = self._old_conn
+        data._OWNED_WRITER_CONN = self._old_owned
+        self.tmpdir.cleanup()
+
+    def test_outside_request_scope_uses_shared_writer(self):
+        self.assertIs(data._get_conn(), data.conn)
+        self.assertIs(data._get_write_conn(), data.conn)
+
+    def test_request_scope_leases_and_returns_connection(self):
+        writer = data._get_write_conn()
+        writer.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+        writer.commit()
+        checkouts = data.pool_stats()["checkouts"]
+        data.begin_request_scope()
+        leased = data._get_conn()
+        self.assertIsNot(leased, writer)
+        self.assertIs(data._get_conn(), leased)
+        self.assertEqual(leased.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+        leased.execute("INSERT INTO t (name) VALUES ('pending')")
+        data.end_request_scope()
+        self.assertEqual(writer.execute("SELECT COUNT(1) FROM t").fetchone()[0], 1)
+        stats = data.pool_stats()
+        self.assertEqual(stats["checkouts"], checkouts + 1)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_concurrent_requests_get_separate_connections(self):
+        data._get_write_conn()
+        seen = []
+        ready = threading.Barrier(2)
+
+        def worker():
+            data.begin_request_scope()
+            try:
+                seen.append(data._get_conn())
+                ready.wait(timeout=2)
+            finally:
+                data.end_request_scope()
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(item) for item in seen}), 2)
+        self.assertGreaterEqual(data.pool_stats()["peak_in_use"], 2)
+
+    def test_exhausted_pool_falls_back_to_shared_connection(self):
+        writer = data._get_write_conn()
+        timeouts = data.pool_stats()["timeouts"]
+        held = [data._pool_checkout(), data._pool_checkout()]
+        data.begin_request_scope()
+        self.assertIs(data._get_conn(), writer)
+        self.assertEqual(data.pool_stats()["timeouts"], timeouts + 1)
+        for item in held:
+            data._pool_release(item)
+
+    def test_assigned_conn_overrides_pool(self):
+        override = sqlite3.connect(":memory:")
+        data.conn = override
+        data.begin_request_scope()
+        try:
+            self.assertIs(data._get_conn(), override)
+            self.assertTrue(data.pool_stats()["writer_is_shared_override"])
+        finally:
+            data.end_request_scope()
+            data.conn = None
+            override.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import data
+from common import db_writer
+
+
+class TestDbWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, "writer.db")
+        self._old_conn = data.conn
+        self._old_owned = data._OWNED_WRITER_CONN
+        self._patches = [
+            patch.object(data, "DB_FILE", self.db_file),
+            patch.object(db_writer, "is_enabled", return_value=True),
+            patch.object(db_writer, "_batch_ms", return_value=20.0),
+        ]
+        for item in self._patches:
+            item.start()
+        data.conn = None
+        writer = data._get_write_conn()
+        writer.executescript(
+            """
+            CREATE TABLE lp_items (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+            CREATE TABLE sys_log (log_date TEXT, log_level INTEGER, details TEXT);
+            """
+        )
+
+    def tearDown(self):
+        db_writer.shutdown()
+        if data.conn is not None:
+            data.conn.close()
+        for item in reversed(self._patches):
+            item.stop()
+        data.conn = self._old_conn
+        data._OWNED_WRITER_CONN = self._old_owned
+        self.tmpdir.cleanup()
+
+    def _count(self):
+        reader = sqlite3.connect(self.db_file)
+        try:
+            return reader.execute("SELECT COUNT(1) FROM lp_items").fetchone()[0]
+        finally:
+            reader.close()
+
+    def test_run_write_returns_result_after_commit(self):
+        def insert(conn, name):
+            cur = conn.execute("INSERT INTO lp_items (name) VALUES (?)", (name,))
+            conn.commit()
+            return cur.lastrowid
+
+        record_id = data.run_write(insert, "alpha")
+        self.assertEqual(record_id, 1)
+        self.assertEqual(self._count(), 1)
+        self.assertTrue(db_writer.stats()["running"])
+
+    def test_concurrent_units_share_a_group_commit(self):
+        start = threading.Barrier(8)
+        futures = []
+        lock = threading.Lock()
+
+        def insert(conn, name):
+            conn.execute("INSERT INTO lp_items (name) VALUES (?)", (name,))
+
+        def worker(idx):
+            start.wait(timeout=2)
+            future = data.submit_write(insert, f"item-{idx}")
+            with lock:
+                futures.append(future)
+
+        before = db_writer.stats()["batches"]
+        threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(self._count(), 8)
+        self.assertLess(db_writer.stats()["batches"] - before, 8)
+
+    def test_failing_unit_only_rolls_back_itself(self):
+        def insert(conn, name):
+            conn.execute("INSERT INTO lp_items (name) VALUES (?)", (name,))
+
+        def insert_then_fail(conn):
+            conn.execute("INSERT INTO lp_items (name) VALUES ('doomed')")
+            raise ValueError("boom")
+
+        ok = data.submit_write(insert, "kept")
+        bad = data.submit_write(insert_then_fail)
+        ok.result(timeout=5)
+        with self.assertRaises(ValueError):
+            bad.result(timeout=5)
+        reader = sqlite3.connect(self.db_file)
+        try:
+            names = [row[0] for row in reader.execute("SELECT name FROM lp_items")]
+        finally:
+            reader.close()
+        self.assertEqual(names, ["kept"])
+
+    def test_executescript_inside_unit_stays_in_group(self):
+        def create_and_insert(conn):
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS lp_extra (id INTEGER PRIMARY KEY); INSERT INTO lp_extra DEFAULT VALUES;"
+            )
+            conn.execute("INSERT INTO lp_items (name) VALUES ('scripted')")
+            return conn.in_transaction
+
+        self.assertTrue(data.run_write(create_and_insert))
+        self.assertEqual(self._count(), 1)
+
+    def test_deferred_commits_skip_the_queue(self):
+        writer = data._get_write_conn()
+        with data.deferred_commits(writer):
+            data.run_write(lambda conn: conn.execute("INSERT INTO lp_items (name) VALUES ('a')"))
+            data.run_write(lambda conn: conn.execute("INSERT INTO lp_items (name) VALUES ('b')"))
+            self.assertTrue(writer.in_transaction)
+            self.assertEqual(self._count(), 0)
+        self.assertEqual(self._count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+import etl_folder_mapping as folder_etl
+from common import data
+from common import schema_registry
+from modules.media import routes as media_routes
+
+
+class TestFolderClosure(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+
+    def tearDown(self):
+        data.conn = self._old_conn
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def _closure(self):
+        rows = self.conn.execute(
+            "SELECT a.folder_path AS ancestor, d.folder_path AS descendant, c.depth "
+            "FROM dim_folder_closure c "
+            "JOIN dim_folder a ON a.folder_id = c.ancestor_id "
+            "JOIN dim_folder d ON d.folder_id = c.descendant_id"
+        ).fetchall()
+        return {(row["ancestor"], row["descendant"]): row["depth"] for row in rows}
+
+    def test_parent_folder_path_stops_at_roots(self):
+        self.assertEqual(folder_etl.parent_folder_path("C:\\media\\photos"), "C:\\media")
+        self.assertEqual(folder_etl.parent_folder_path("C:\\media"), "C:\\")
+        self.assertEqual(folder_etl.parent_folder_path("C:\\"), "")
+        self.assertEqual(folder_etl.parent_folder_path("/home/ann"), "/home")
+        self.assertEqual(folder_etl.parent_folder_path("/home"), "/")
+        self.assertEqual(folder_etl.parent_folder_path("\\\\nas\\share\\music"), "\\\\nas\\share")
+        self.assertEqual(folder_etl.parent_folder_path("\\\\nas\\share"), "")
+
+    def test_upsert_links_missing_ancestors(self):
+        self.conn.executescript(folder_etl.DDL_CREATE_NO_FK)
+        leaf_id = data.upsert_dim_folder(self.conn, "C:\\media\\photos\\2020")
+        self.assertEqual(data.upsert_dim_folder(self.conn, "C:\\media\\photos\\2020"), leaf_id)
+        data.upsert_dim_folder(self.conn, "C:\\media\\music")
+        closure = self._closure()
+        self.assertEqual(closure[("C:\\", "C:\\media\\photos\\2020")], 3)
+        self.assertEqual(closure[("C:\\media", "C:\\media\\music")], 1)
+        self.assertEqual(closure[("C:\\media\\music", "C:\\media\\music")], 0)
+        self.assertNotIn(("C:\\media\\photos", "C:\\media\\music"), closure)
+        parent = self.conn.execute(
+            "SELECT p.folder_path FROM dim_folder f JOIN dim_folder p ON p.folder_id = f.parent_folder_id "
+            "WHERE f.folder_id = ?",
+            (leaf_id,),
+        ).fetchone()
+        self.assertEqual(parent["folder_path"], "C:\\media\\photos")
+
+    def test_existing_folders_are_linked_when_closure_is_added(self):
+        self.conn.executescript(
+            """
+            CREATE TABLE dim_folder (folder_id INTEGER PRIMARY KEY, folder_path TEXT UNIQUE,
+                                     last_seen_at TEXT, is_active INTEGER);
+            INSERT INTO dim_folder (folder_path) VALUES ('D:\\docs\\work\\2024'), ('D:\\docs');
+            """
+        )
+        self.assertTrue(data.ensure_folder_closure(self.conn))
+        closure = self._closure()
+        self.assertEqual(closure[("D:\\docs", "D:\\docs\\work\\2024")], 2)
+        self.assertEqual(closure[("D:\\", "D:\\docs")], 1)
+        self.assertEqual(len(closure), 10)
+
+    def test_backfill_uses_media_file_directory(self):
+        self.conn.executescript(folder_etl.DDL_RESET_NO_FK)
+        self.conn.execute(
+            "CREATE TABLE lp_media (media_id INTEGER PRIMARY KEY, path TEXT, filename TEXT, folder_id INTEGER)"
+        )
+        self.conn.execute(
+            "INSERT INTO lp_media (path, filename) VALUES ('C:\\media\\photos\\a.jpg', 'a.jpg')"
+        )
+        self.assertEqual(folder_etl.backfill_folder_ids(self.conn), 1)
+        row = self.conn.execute(
+            "SELECT f.folder_path FROM lp_media m JOIN dim_folder f ON f.folder_id = m.folder_id"
+        ).fetchone()
+        self.assertEqual(row["folder_path"], "C:\\media\\photos")
+        self.assertEqual(self._closure()[("C:\\media", "C:\\media\\photos")], 1)
+
+    def test_media_folder_filter_uses_closure_with_path_fallback(self):
+        self.conn.executescript(folder_etl.DDL_CREATE_NO_FK)
+        self.conn.execute(
+            "CREATE TABLE lp_media (media_id INTEGER PRIMARY KEY, path TEXT, folder_id INTEGER)"
+        )
+        rows = [
+            ("C:\\media\\photos\\2020\\a.jpg", "C:\\media\\photos\\2020"),
+            ("C:\\media\\photos_old\\b.jpg", "C:\\media\\photos_old"),
+            ("C:\\media\\photos\\c.jpg", None),
+            ("C:\\media\\music\\d.mp3", "C:\\media\\music"),
+        ]
+        for path, folder in rows:
+            folder_id = data.upsert_dim_folder(self.conn, folder) if folder else None
+            self.conn.execute("INSERT INTO lp_media (path, folder_id) VALUES (?, ?)", (path, folder_id))
+        sql, params = media_routes._media_folder_condition("c:\\Media\\Photos")
+        found = self.conn.execute(f"SELECT m.path FROM lp_media m WHERE {sql} ORDER BY m.path", params).fetchall()
+        self.assertEqual(
+            [row["path"] for row in found],
+            ["C:\\media\\photos\\2020\\a.jpg", "C:\\media\\photos\\c.jpg"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
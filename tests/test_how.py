@@ -157,7 +157,7 @@ class TestHowSchemaMigration(unittest.TestCase):
                 ("Tighten the fitting.", "project.steps", now, now),
             )
 
-            ensure_how_schema(conn)
+            ensure_how_schema(conn, force=True)
 
             self.assertEqual(conn.execute("SELECT area_id FROM lp_howto").fetchone()["area_id"], "area/home")
             self.assertEqual(conn.execute("SELECT area_id FROM lp_howto_parts").fetchone()["area_id"], "area/garage")
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import keyset
+
+
+class TestKeyset(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("CREATE TABLE lp_items (id INTEGER PRIMARY KEY, name TEXT, size INTEGER, area TEXT)")
+        rows = []
+        for item_id in range(1, 48):
+            name = None if item_id % 7 == 0 else f"item {item_id % 9}"
+            size = None if item_id % 5 == 0 else item_id % 4
+            rows.append((item_id, name, size, "Work" if item_id % 3 else "Home"))
+        self.conn.executemany("INSERT INTO lp_items (id, name, size, area) VALUES (?, ?, ?, ?)", rows)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _expected(self, order_by, where_sql=""):
+        terms = keyset.seek_terms(order_by, "t.id")
+        sql = "SELECT t.id FROM lp_items t"
+        if where_sql:
+            sql += f" WHERE {where_sql}"
+        sql += f" ORDER BY {keyset.order_clause(terms)}"
+        return [row["id"] for row in self.conn.execute(sql)]
+
+    def _page(self, order_by, cursor=None, offset=None, where_sql=""):
+        return keyset.fetch_page(
+            self.conn,
+            "t.id, t.name",
+            "lp_items t",
+            where_sql,
+            [],
+            order_by,
+            10,
+            cursor=cursor,
+            offset=offset,
+        )
+
+    def _walk(self, order_by, where_sql=""):
+        pages = [self._page(order_by, where_sql=where_sql)]
+        while pages[-1].next_cursor:
+            pages.append(self._page(order_by, cursor=pages[-1].next_cursor, where_sql=where_sql))
+        return pages
+
+    def test_forward_walk_matches_order_by(self):
+        for order_by in (
+            "t.name ASC",
+            "t.name DESC",
+            "t.size desc",
+            "(t.size IS NULL) ASC, t.size DESC, lower(t.name)",
+            "CASE WHEN t.area = 'Home' THEN 1 ELSE 0 END DESC, t.name ASC",
+        ):
+            with self.subTest(order_by=order_by):
+                pages = self._walk(order_by)
+                ids = [row["id"] for page in pages for row in page]
+                self.assertEqual(ids, self._expected(order_by))
+                self.assertIsNone(pages[0].prev_cursor)
+                self.assertTrue(all(len(page) == 10 for page in pages[:-1]))
+
+    def test_backward_walk_returns_same_pages(self):
+        for order_by in ("t.name ASC", "t.size DESC", "lower(t.name), t.size DESC"):
+            with self.subTest(order_by=order_by):
+                pages = self._walk(order_by, where_sql="t.area = 'Work'")
+                page = pages[-1]
+                for expected in reversed(pages[:-1]):
+                    page = self._page(order_by, cursor=page.prev_cursor, where_sql="t.area = 'Work'")
+                    self.assertEqual([row["id"] for row in page], [row["id"] for row in expected])
+                    self.assertTrue(page.next_cursor)
+                self.assertIsNone(page.prev_cursor)
+
+    def test_offset_fallback_still_returns_cursors(self):
+        page = self._page("t.name ASC", offset=20)
+        self.assertEqual([row["id"] for row in page], self._expected("t.name ASC")[20:30])
+        self.assertTrue(page.prev_cursor)
+        previous = self._page("t.name ASC", cursor=page.prev_cursor)
+        self.assertEqual([row["id"] for row in previous], self._expected("t.name ASC")[10:20])
+
+    def test_cursor_for_other_sort_is_ignored(self):
+        page = self._page("t.name ASC", offset=10)
+        fallback = self._page("t.size DESC", cursor=page.next_cursor, offset=0)
+        self.assertEqual([row["id"] for row in fallback], self._expected("t.size DESC")[:10])
+        self.assertEqual(len(self._page("t.name ASC", cursor="not-a-cursor")), 10)
+
+    def test_seek_columns_are_not_returned(self):
+        page = self._page("lower(t.name) DESC")
+        self.assertEqual(sorted(page[0].keys()), ["id", "name"])
+
+    def test_ascending_key_uses_row_value_comparison(self):
+        terms = keyset.seek_terms("t.name ASC", "t.id")
+        sql, params = keyset.seek_predicate(terms, ["item 3", 12])
+        self.assertEqual(sql, "(t.name, t.id) > (?, ?)")
+        self.assertEqual(params, ["item 3", 12])
+
+
+if __name__ == "__main__":
+    unittest.main()
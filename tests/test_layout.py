@@ -23,6 +23,10 @@ class TestLayoutNavigation(unittest.TestCase):
         def search_route():
             return ""
 
+        @app.route("/api/search/suggest")
+        def search_suggest_route():
+            return ""
+
         projects_bp = Blueprint("projects", __name__)
 
         @projects_bp.route("/")
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+from flask import Flask
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import data
+from common import links_records
+from common import schema_registry
+from modules.money import dao as money_dao
+
+
+class TestRecordSummaries(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        self.conn.executescript(
+            """
+            CREATE TABLE lp_notes (id INTEGER PRIMARY KEY, file_name TEXT, path TEXT, area TEXT);
+            INSERT INTO lp_notes (id, file_name, path) VALUES (1, 'rome.md', 'travel'), (2, 'food.md', 'cooking');
+            CREATE TABLE lp_contacts (contact_id INTEGER PRIMARY KEY, display_name TEXT, normalized_name TEXT);
+            INSERT INTO lp_contacts (contact_id, display_name, normalized_name) VALUES (7, 'Ada Lovelace', 'ada lovelace');
+            """
+        )
+        money_dao.ensure_money_schema(self.conn)
+        self.conn.execute("INSERT INTO lp_money_assets (asset_id, asset_type, name) VALUES (3, 'cash', 'Savings')")
+        self.statements = []
+        self.conn.set_trace_callback(self.statements.append)
+
+    def tearDown(self):
+        self.conn.set_trace_callback(None)
+        data.conn = self._old_conn
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def _selects(self, table):
+        return [sql for sql in self.statements if sql.startswith("SELECT") and f"FROM {table} " in sql]
+
+    def test_one_query_per_table(self):
+        refs = [("note", 1), ("notes", "2"), ("note", 99), ("person", "7"), ("money", "assets:3"), ("bogus", 1)]
+        summaries = links_records.get_record_summaries(refs)
+        self.assertEqual(summaries[("note", "1")]["title"], "rome.md")
+        self.assertEqual(summaries[("notes", "2")]["subtitle"], "cooking")
+        self.assertEqual(summaries[("note", "1")]["open_url"], "/notes/view/1")
+        self.assertIsNone(summaries[("note", "99")])
+        self.assertEqual(summaries[("person", "7")]["title"], "Ada Lovelace")
+        self.assertEqual(summaries[("money", "assets:3")]["title"], "Savings")
+        self.assertIsNone(summaries[("bogus", "1")])
+        self.assertEqual(len(self._selects("lp_notes")), 1)
+        self.assertEqual(len(self._selects("lp_contacts")), 1)
+        self.assertEqual(links_records.get_record_summary("note", 2)["title"], "food.md")
+
+    def test_request_memo_reuses_summaries(self):
+        with Flask(__name__).test_request_context("/"):
+            first = links_records.get_record_summaries([("note", 1)])
+            first[("note", "1")]["title"] = "changed"
+            again = links_records.get_record_summary("note", "1")
+        self.assertEqual(again["title"], "rome.md")
+        self.assertEqual(len(self._selects("lp_notes")), 1)
+
+    def test_post_request_reads_edited_titles(self):
+        with Flask(__name__).test_request_context("/", method="POST"):
+            self.assertEqual(links_records.get_record_summary("note", 1)["title"], "rome.md")
+            self.conn.execute("UPDATE lp_notes SET file_name = 'roma.md' WHERE id = 1")
+            self.assertEqual(links_records.get_record_summary("note", 1)["title"], "roma.md")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,13 +13,14 @@ if root_folder not in sys.path:
     sys.path.append(root_folder)
 
 from common import data
+from common import schema_registry
 from common import settings
 from modules.logger_api.routes import logger_api_bp, list_raw_files, logger_raw_root
 
 
 class TestLoggerApi(unittest.TestCase):
     def setUp(self):
-        settings._SCHEMA_READY_CONN_IDS.clear()
+        schema_registry.forget()
         self.conn = sqlite3.connect(":memory:")
         self.conn.row_factory = sqlite3.Row
         self.old_conn = data.conn
@@ -43,7 +44,7 @@ class TestLoggerApi(unittest.TestCase):
         data.conn = self.old_conn
         self.conn.close()
         self.tmpdir.cleanup()
-        settings._SCHEMA_READY_CONN_IDS.clear()
+        schema_registry.forget()
 
     def headers(self, token="logger-secret"):
         return {
@@ -95,6 +95,10 @@ class TestNoteCreation(unittest.TestCase):
         def search_route():
             return ""
 
+        @app.route("/api/search/suggest")
+        def search_suggest_route():
+            return ""
+
         @app.route("/site.webmanifest")
         def site_webmanifest():
             return {}
@@ -268,6 +272,19 @@ class TestNoteCreation(unittest.TestCase):
         self.assertIn("This is **bold** preview text.", note["preview_text"])
         self.assertIn("<strong>bold</strong>", note["preview_html"])
 
+    def test_note_card_preview_reads_stored_preview_not_body(self):
+        note = {"id": 45, "file_name": "long.md", "path": self.tmpdir.name, "title": "Long", "color": ""}
+        note_search_index.ensure_schema(self.conn)
+        body = "# Long\n\nStart of the note. " + "filler " * 2000
+        self.conn.execute(
+            note_search_index.UPSERT_SQL,
+            (45, "", 1.0, 10, "Long", "full body is not shown", "2026-01-01T00:00:00Z", body),
+        )
+
+        notes_routes._prepare_note_card_previews([note], max_chars=40, render_html=False)
+
+        self.assertEqual(note["preview_text"], "\nStart of the note. filler filler filler")
+
     def test_note_card_grid_preview_skips_markdown_rendering(self):
         note = {"id": 43, "file_name": "grid.md", "path": self.tmpdir.name, "title": "Grid", "color": ""}
         note_search_index.ensure_schema(self.conn)
@@ -280,7 +297,7 @@ class TestNoteCreation(unittest.TestCase):
             (43, "", 1.0, 10, "Grid", "This is **raw** text.", "2026-01-01T00:00:00Z"),
         )
 
-        with patch("modules.notes.routes.markdown_utils.render_markdown") as render_markdown:
+        with patch("common.note_render_cache.markdown_utils.render_markdown") as render_markdown:
             notes_routes._prepare_note_card_previews([note], max_chars=80, render_html=False)
 
         render_markdown.assert_not_called()
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import config as cfg
+from common import data
+from common import note_import
+from common import note_link_graph
+from common import schema_registry
+from common import utils as common_utils
+from modules.notes import routes as notes_routes
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(text)
+
+
+class TestNoteImport(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        for tbl in cfg.table_def:
+            cols = ", ".join(f"{col} TEXT" for col in tbl["col_list"])
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {tbl['name']} "
+                f"(id INTEGER PRIMARY KEY AUTOINCREMENT, {cols}, user_name TEXT, rec_extract_date TEXT)"
+            )
+        data.ensure_folder_schema(self.conn)
+        common_utils.ensure_user_log_schema(self.conn)
+        self.tbl = common_utils.get_table_def("notes")
+        tmp_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp")
+        os.makedirs(tmp_root, exist_ok=True)
+        self.tmpdir = tempfile.TemporaryDirectory(dir=tmp_root)
+        self.root = os.path.join(self.tmpdir.name, "vault")
+        _write(os.path.join(self.root, "index.md"), "---\ntitle: Start Here\narea: fun\n---\nSee [[Recipes]] and [b](deep/b.md)")
+        _write(os.path.join(self.root, "recipes.md"), "# Recipes\nback to [[Start Here]]")
+        _write(os.path.join(self.root, "deep", "b.md"), "plain body")
+        _write(os.path.join(self.root, "deep", "image.png"), "not a note")
+
+    def tearDown(self):
+        try:
+            self.tmpdir.cleanup()
+        finally:
+            data.conn = self._old_conn
+            schema_registry.forget(self.conn)
+            self.conn.close()
+
+    def _import(self, dry_run=False, owner_user_id=None):
+        run_id = note_import.create_run(
+            self.conn, self.root, "home", owner_user_id=owner_user_id, dry_run=dry_run, user_name="alice"
+        )
+        # One note per batch: links between batches must still resolve.
+        with patch.dict(cfg._CONFIG_DEFAULTS, {"NOTE_SEARCH_INDEX_WRITE_BATCH": 1}):
+            return note_import.run_import(
+                self.conn, run_id, notes_routes._note_import_row, self.tbl["col_list"], table=self.tbl["name"]
+            )
+
+    def _rows(self):
+        return {
+            row["file_name"]: dict(row)
+            for row in self.conn.execute("SELECT id, file_name, path, title, area, folder_id FROM lp_notes")
+        }
+
+    def test_dry_run_only_counts(self):
+        run = self._import(dry_run=True)
+
+        self.assertEqual(run["status"], "done")
+        self.assertEqual((run["files_found"], run["notes_new"], run["notes_imported"]), (3, 3, 0))
+        self.assertEqual(self._rows(), {})
+
+    def test_import_writes_rows_index_and_links_then_skips_existing(self):
+        note_link_graph.catch_up(self.conn)
+        run = self._import()
+
+        self.assertEqual(run["status"], "done", run["error_message"])
+        self.assertEqual((run["notes_imported"], run["files_failed"], run["links"]), (3, 0, 3))
+        rows = self._rows()
+        self.assertEqual(rows["index.md"]["title"], "Start Here")
+        self.assertEqual(rows["index.md"]["area"], "fun")
+        self.assertEqual(rows["recipes.md"]["area"], "home")
+        self.assertEqual(rows["b.md"]["path"], os.path.join(self.root, "deep"))
+        self.assertTrue(all(row["folder_id"] for row in rows.values()))
+        hits = self.conn.execute("SELECT note_id FROM lp_note_search_index WHERE content_text LIKE '%plain body%'")
+        self.assertEqual([row[0] for row in hits], [rows["b.md"]["id"]])
+        cached = self.conn.execute("SELECT title FROM lp_note_front_matter WHERE note_id = ?", (rows["index.md"]["id"],))
+        self.assertEqual(cached.fetchone()[0], "Start Here")
+        outlinks = note_link_graph.outlinks(self.conn, rows["index.md"]["id"])
+        self.assertEqual([row["id"] for row in outlinks], [rows["b.md"]["id"], rows["recipes.md"]["id"]])
+        logged = self.conn.execute("SELECT user_name FROM sys_user_log WHERE action = 'notes_import_folder'")
+        self.assertEqual([row[0] for row in logged], ["alice"])
+        # Written on a background thread, but attributed to who asked.
+        names = self.conn.execute("SELECT DISTINCT user_name FROM lp_notes").fetchall()
+        self.assertEqual([row[0] for row in names], ["alice"])
+
+        _write(os.path.join(self.root, "new.md"), "[[Start Here]]")
+        run = self._import()
+        self.assertEqual((run["files_found"], run["notes_existing"], run["notes_imported"]), (4, 3, 1))
+        self.assertEqual(len(self._rows()), 4)
+
+
+    def test_existing_notes_are_matched_for_the_runs_owner_only(self):
+        self.conn.execute("ALTER TABLE lp_notes ADD COLUMN owner_user_id INTEGER")
+        self.conn.execute(
+            "INSERT INTO lp_notes (file_name, path, title, owner_user_id) VALUES ('index.md', ?, 'theirs', 2)",
+            (self.root,),
+        )
+
+        run = self._import(owner_user_id=1)
+        self.assertEqual((run["notes_existing"], run["notes_imported"]), (0, 3))
+        owners = self.conn.execute(
+            "SELECT owner_user_id, COUNT(*) FROM lp_notes WHERE file_name = 'index.md' GROUP BY owner_user_id"
+        ).fetchall()
+        self.assertEqual([tuple(row) for row in owners], [(1, 1), (2, 1)])
+
+        run = self._import(owner_user_id=1)
+        self.assertEqual((run["notes_existing"], run["notes_imported"]), (3, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import note_link_graph
+from common import schema_registry
+
+
+class TestNoteLinkGraph(unittest.TestCase):
+    def setUp(self):
+        tmp_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp")
+        os.makedirs(tmp_root, exist_ok=True)
+        self.tmpdir = tempfile.TemporaryDirectory(dir=tmp_root)
+        self.root = os.path.join(self.tmpdir.name, "data", "notes")
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT);
+            INSERT INTO users (user_id, username) VALUES (1, 'alice'), (2, 'bob');
+            CREATE TABLE lp_notes (
+                id INTEGER PRIMARY KEY, file_name TEXT, title TEXT, path TEXT,
+                owner_user_id INTEGER, visibility TEXT NOT NULL DEFAULT 'private', is_public INTEGER DEFAULT 0
+            );
+            """
+        )
+        self._note(1, "home.md", "Home", "", "[[Projects]] [[Missing Note]] [[Secret]] [[Home]]\n[sub](work/tasks.md)")
+        self._note(2, "projects.md", "Projects", "", "back to [[Home|note:1]]")
+        self._note(3, "tasks.md", "", "work", "nothing here")
+        self._note(4, "secret.md", "Secret", "", "bob's", owner=2)
+        self._note(5, "lonely.md", "Lonely", "", "no links")
+
+    def tearDown(self):
+        schema_registry.forget(self.conn)
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def _note(self, note_id, file_name, title, folder, text, owner=1):
+        path = os.path.join(self.root, folder) if folder else self.root
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, file_name), "w", encoding="utf-8") as handle:
+            handle.write(text)
+        self.conn.execute(
+            "INSERT INTO lp_notes (id, file_name, title, path, owner_user_id) VALUES (?, ?, ?, ?, ?)",
+            (note_id, file_name, title, path, owner),
+        )
+
+    def _ids(self, rows):
+        return [row["id"] for row in rows]
+
+    def _unresolved(self, note_id):
+        return {row["link_text"]: row["status"] for row in note_link_graph.unresolved(self.conn, note_id)}
+
+    def test_rebuild_resolves_wiki_and_markdown_links_for_the_owner(self):
+        result = note_link_graph.rebuild(self.conn)
+
+        self.assertEqual((result["notes"], result["links"]), (5, 3))
+        self.assertEqual(self._ids(note_link_graph.outlinks(self.conn, 1)), [2, 3])
+        self.assertEqual(self._ids(note_link_graph.backlinks(self.conn, 1)), [2])
+        self.assertEqual(self._unresolved(1), {"[[Missing Note]]": "broken", "[[Secret]]": "broken"})
+        self.assertEqual(self._ids(note_link_graph.orphans(self.conn)), [5, 4])
+        visible = ("t.owner_user_id = ?", [1])
+        self.assertEqual(self._ids(note_link_graph.orphans(self.conn, *visible)), [5])
+        titles = self.conn.execute(
+            "SELECT link_title FROM lp_note_links WHERE src_note_id = 1 ORDER BY target_note_id"
+        ).fetchall()
+        self.assertEqual([row[0] for row in titles], ["Projects", "tasks"])
+
+    def test_note_changes_re_resolve_affected_links(self):
+        note_link_graph.rebuild(self.conn)
+
+        # A note created under a broken link's title picks up the backlink.
+        self._note(6, "missing.md", "Missing Note", "", "")
+        note_link_graph.catch_up(self.conn)
+        self.assertEqual(self._ids(note_link_graph.backlinks(self.conn, 6)), [1])
+        self.assertNotIn("[[Missing Note]]", self._unresolved(1))
+
+        # Sharing a note resolves links its owner could not see before.
+        self.conn.execute("UPDATE lp_notes SET visibility = 'family' WHERE id = 4")
+        note_link_graph.catch_up(self.conn)
+        self.assertEqual(self._ids(note_link_graph.backlinks(self.conn, 4)), [1])
+
+        # Renaming the target breaks title links but not note:<id> links.
+        self.conn.execute("UPDATE lp_notes SET title = 'Start' WHERE id = 1")
+        self.conn.execute("UPDATE lp_notes SET title = 'Project List' WHERE id = 2")
+        note_link_graph.catch_up(self.conn)
+        self.assertEqual(self._ids(note_link_graph.backlinks(self.conn, 1)), [2])
+        self.assertEqual(self._ids(note_link_graph.backlinks(self.conn, 2)), [])
+        self.assertEqual(self._unresolved(1), {"[[Home]]": "broken", "[[Projects]]": "broken"})
+
+        # Deleting a note turns links to it unresolved until a match appears.
+        self.conn.execute("DELETE FROM lp_notes WHERE id = 3")
+        note_link_graph.forget(self.conn, [3])
+        note_link_graph.catch_up(self.conn)
+        self.assertEqual(self._ids(note_link_graph.outlinks(self.conn, 1)), [6, 4])
+        self.assertEqual(self._unresolved(1)["[sub](work/tasks.md)"], "broken")
+        self._note(7, "tasks.md", "Tasks v2", "work", "")
+        note_link_graph.catch_up(self.conn)
+        self.assertEqual(self._ids(note_link_graph.backlinks(self.conn, 7)), [1])
+
+    def test_queries_do_not_catch_up(self):
+        note_link_graph.rebuild(self.conn)
+        self._note(6, "missing.md", "Missing Note", "", "")
+
+        self.assertEqual(self._ids(note_link_graph.backlinks(self.conn, 6)), [])
+        self.assertIn("[[Missing Note]]", self._unresolved(1))
+        self.assertEqual(note_link_graph.catch_up(self.conn), 1)
+        self.assertEqual(self._ids(note_link_graph.backlinks(self.conn, 6)), [1])
+
+    def test_sync_note_rewrites_one_note_and_tracks_ambiguous_titles(self):
+        note_link_graph.catch_up(self.conn)
+        self._note(6, "projects-old.md", "Projects", "work", "")
+        text = "[[Projects]] [[work/tasks]] [[Lonely]]"
+        with open(os.path.join(self.root, "lonely.md"), "w", encoding="utf-8") as handle:
+            handle.write(text)
+        count = note_link_graph.sync_note(self.conn, 5, text)
+
+        self.assertEqual(count, 1)
+        self.assertEqual(self._ids(note_link_graph.outlinks(self.conn, 5)), [3])
+        self.assertEqual(self._unresolved(5), {"[[Projects]]": "ambiguous"})
+        self.conn.execute("DELETE FROM lp_notes WHERE id = 6")
+        note_link_graph.catch_up(self.conn)
+        self.assertEqual(self._ids(note_link_graph.outlinks(self.conn, 5)), [2, 3])
+        self.assertEqual(self._unresolved(5), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import sys
+import unittest
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import config as cfg
+from common import note_render_cache
+from common import schema_registry
+from utils import markdown_utils
+
+
+class TestNoteRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE lp_notes (id INTEGER PRIMARY KEY, file_name TEXT, title TEXT, path TEXT);
+            INSERT INTO lp_notes (id, file_name, title, path) VALUES
+                (1, 'alpha.md', 'Alpha', 'C:\\notes'),
+                (2, 'beta.md', 'Beta', 'C:\\notes');
+            """
+        )
+        self.resolved = []
+
+    def tearDown(self):
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def _resolve(self, title, target_note_id=None):
+        self.resolved.append(title)
+        row = self.conn.execute("SELECT id FROM lp_notes WHERE title = ?", (title,)).fetchone()
+        if not row:
+            return {"status": "broken"}
+        return {"status": "resolved", "url": f"/notes/{row['id']}", "title": title}
+
+    def _render(self, items, variant="view", viewer="user:1"):
+        with patch.object(markdown_utils, "render_markdown", wraps=markdown_utils.render_markdown) as render:
+            html = note_render_cache.render_many(items, variant, viewer=viewer, conn=self.conn)
+        return html, render.call_count
+
+    def test_cards_render_once_until_their_source_changes(self):
+        items = [
+            (note_id, note_render_cache.source_key(100, 20, f"note-{note_id}.md"), f"**card {note_id}**", {"allow_html": False})
+            for note_id in range(1, 101)
+        ]
+        first, calls = self._render(items, "card:300", viewer="")
+        self.assertEqual(calls, 100)
+        self.assertIn("<strong>card 7</strong>", first[7])
+        again, calls = self._render(items, "card:300", viewer="")
+        self.assertEqual((again, calls), (first, 0))
+        # A rename elsewhere does not touch renders that resolved no links.
+        self.conn.execute("UPDATE lp_notes SET title = 'Gamma' WHERE id = 2")
+        _html, calls = self._render(items, "card:300", viewer="")
+        self.assertEqual(calls, 0)
+        items[0] = (1, note_render_cache.source_key(101, 20, "note-1.md"), "**edited**", {"allow_html": False})
+        changed, calls = self._render(items, "card:300", viewer="")
+        self.assertEqual(calls, 1)
+        self.assertIn("edited", changed[1])
+        with patch.object(markdown_utils, "RENDERER_VERSION", "test-next"):
+            _html, calls = self._render(items, "card:300", viewer="")
+        self.assertEqual(calls, 100)
+
+    def test_note_renames_invalidate_renders_with_links(self):
+        item = (1, note_render_cache.source_key(100, 20), "See [[Beta]]", {"wiki_link_resolver": self._resolve})
+        html, calls = self._render([item])
+        self.assertEqual(calls, 1)
+        self.assertIn('href="/notes/2"', html[1])
+        _html, calls = self._render([item])
+        self.assertEqual((calls, self.resolved), (0, ["Beta"]))
+        _html, calls = self._render([item], viewer="user:2")
+        self.assertEqual(calls, 1)
+        self.conn.execute("UPDATE lp_notes SET title = 'Renamed' WHERE id = 2")
+        html, calls = self._render([item])
+        self.assertEqual(calls, 1)
+        self.assertNotIn('href="/notes/2"', html[1])
+        # Edits that cannot change link targets keep the cached render.
+        self.conn.execute("UPDATE lp_notes SET id = id WHERE id = 2")
+        _html, calls = self._render([item])
+        self.assertEqual(calls, 0)
+
+    def test_cache_is_bounded_least_recently_used_first(self):
+        items = [(note_id, "k", f"note {note_id}", {}) for note_id in (1, 2, 3)]
+        with patch.dict(cfg._CONFIG_DEFAULTS, {"NOTE_RENDER_CACHE_MAX_ENTRIES": 2}):
+            for item in items:
+                self._render([item])
+        rows = self.conn.execute(f"SELECT note_id FROM {note_render_cache.CACHE_TABLE} ORDER BY note_id").fetchall()
+        self.assertEqual([row["note_id"] for row in rows], [2, 3])
+        note_render_cache.forget(self.conn, [2])
+        _html, calls = self._render([items[1]])
+        self.assertEqual(calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import data
+from common import note_front_matter
+from common import note_search_index
+from common import schema_registry
+from common import search
+
+
+NOTES = [
+    (1, "Garden plan", "Plant tomatoes near the fence. Tomatoes need sun."),
+    (2, "Shopping", "Buy tomato seeds and a watering can."),
+    (3, "Travel", "The train leaves early; pack the garden gloves for the fence repair."),
+]
+
+
+class TestNoteSearchFts(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        self.conn.execute("CREATE TABLE lp_notes (id INTEGER PRIMARY KEY, file_name TEXT, path TEXT, area TEXT)")
+        note_search_index.ensure_schema(self.conn)
+        for note_id, title, text in NOTES:
+            self.conn.execute(
+                note_search_index.UPSERT_SQL,
+                (note_id, f"/notes/{note_id}.md", 1.0, len(text), title, text, "2026-01-01T00:00:00Z", text),
+            )
+            self.conn.execute("INSERT INTO lp_notes (id, file_name, area) VALUES (?, ?, 'home')", (note_id, f"{note_id}.md"))
+
+    def tearDown(self):
+        data.conn = self._old_conn
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def _ids(self, query):
+        results = search.search_note_content(query)
+        return [item["id"] for item in results["primary"] + results["secondary"]]
+
+    def test_match_query_translation(self):
+        self.assertEqual(search.fts_match_query('tomato* "garden plan"'), '"tomato"* "garden plan"')
+        self.assertEqual(search.fts_match_query("NEAR(garden fence, 5) it's"), 'NEAR("garden" "fence", 5) "it\'s"')
+        self.assertEqual(search.fts_match_query('say "hi'), '"say" "hi"')
+
+    def test_ranked_stemmed_prefix_phrase_and_near_queries(self):
+        self.assertTrue(note_search_index.fts_available(self.conn))
+        self.assertEqual(self._ids("tomatoes"), [1, 2])
+        self.assertEqual(self._ids("tom*"), [1, 2])
+        self.assertEqual(self._ids('"garden gloves"'), [3])
+        self.assertEqual(self._ids("NEAR(tomatoes fence, 3)"), [1])
+        result = search.search_note_content("watering")["secondary"][0]
+        self.assertIn("<mark>watering</mark>", str(result["match_html"]))
+        self.assertNotIn("\x02", result["match_snippet"])
+
+    def test_upsert_replaces_indexed_terms(self):
+        self.conn.execute(
+            note_search_index.UPSERT_SQL,
+            (2, "/notes/2.md", 2.0, 10, "Shopping", "Buy bread.", "2026-01-02T00:00:00Z", "Buy bread."),
+        )
+        self.assertEqual(self._ids("seeds"), [])
+        self.assertEqual(self._ids("bread"), [2])
+        self.conn.execute("DELETE FROM lp_note_search_index WHERE note_id = 1")
+        self.assertEqual(self._ids("tomatoes"), [])
+
+    def test_like_scan_is_used_without_fts(self):
+        with patch.object(note_search_index, "fts_available", return_value=False):
+            self.assertEqual(self._ids("tomato*"), [1, 2])
+
+
+class TestNoteSearchRefresh(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        self.conn.execute("CREATE TABLE lp_notes (id INTEGER PRIMARY KEY, file_name TEXT, path TEXT, area TEXT)")
+        for note_id, name, text in [(1, "a.md", "alpha"), (2, "b.md", "bravo"), (3, "c.txt", "plain")]:
+            self._write(name, text)
+            self.conn.execute("INSERT INTO lp_notes (id, file_name, path) VALUES (?, ?, ?)", (note_id, name, self.tmpdir.name))
+
+    def tearDown(self):
+        data.conn = self._old_conn
+        schema_registry.forget(self.conn)
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def _write(self, name, text):
+        with open(os.path.join(self.tmpdir.name, name), "w", encoding="utf-8") as handle:
+            handle.write(text)
+
+    def _indexed(self):
+        rows = self.conn.execute("SELECT note_id, content_text FROM lp_note_search_index ORDER BY note_id").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def test_incremental_refresh_rereads_only_changed_notes(self):
+        first = note_search_index.refresh_index(self.conn)
+        self.assertEqual((first["indexed"], first["skipped"], first["unchanged"]), (2, 1, 0))
+        self.assertEqual(self._indexed(), {1: "alpha", 2: "bravo"})
+
+        self._write("b.md", "bravo changed")
+        os.remove(os.path.join(self.tmpdir.name, "a.md"))
+        self.conn.execute("INSERT INTO lp_notes (id, file_name, path) VALUES (4, 'D.MD', ?)", (self.tmpdir.name,))
+        self._write("D.MD", "delta")
+        with patch.object(note_search_index, "read_note_text", wraps=note_search_index.read_note_text) as reader:
+            second = note_search_index.refresh_index(self.conn)
+        self.assertEqual(sorted(os.path.basename(call.args[0]) for call in reader.call_args_list), ["D.MD", "b.md"])
+        self.assertEqual((second["indexed"], second["removed"], second["missing"]), (2, 1, 1))
+        self.assertEqual(self._indexed(), {2: "bravo changed", 4: "delta"})
+
+        third = note_search_index.refresh_index(self.conn)
+        self.assertEqual((third["indexed"], third["unchanged"]), (0, 2))
+        self.assertEqual(note_search_index.rebuild_index(self.conn)["indexed"], 2)
+        self.assertIn("elapsed_ms", third)
+
+    def test_refresh_and_upsert_keep_front_matter_cache_current(self):
+        self._write("a.md", "---\ntitle: Alpha Note\ncolour: Red\ntemplate: yes\n---\nalpha")
+        note_search_index.refresh_index(self.conn)
+        cached = note_front_matter.lookup_many(self.conn, [1, 2, 3])
+        self.assertEqual(sorted(cached), [1, 2])
+        self.assertEqual(cached[1]["front_matter"], {"title": "Alpha Note", "colour": "Red", "template": "yes"})
+        self.assertEqual(cached[2]["front_matter"], {})
+        row = self.conn.execute("SELECT title, color, is_template FROM lp_note_front_matter WHERE note_id = 1").fetchone()
+        self.assertEqual(tuple(row), ("Alpha Note", "Red", "yes"))
+
+        # Notes indexed before the cache existed are re-read by the next sweep.
+        self.conn.execute("DELETE FROM lp_note_front_matter WHERE note_id = 2")
+        self.assertEqual(note_search_index.refresh_index(self.conn)["indexed"], 1)
+        self.assertIn(2, note_front_matter.lookup_many(self.conn, [2]))
+
+        path = os.path.join(self.tmpdir.name, "b.md")
+        self._write("b.md", "\ufeff---\ntitle: Bravo\n---\nbravo")
+        note_search_index.upsert_note(2, path, content=note_search_index.read_note_text(path), conn=self.conn)
+        self.assertEqual(note_front_matter.lookup_many(self.conn, [2])[2]["front_matter"], {"title": "Bravo"})
+        with patch.object(note_front_matter, "read_file", side_effect=AssertionError("cache hit expected")):
+            self.assertEqual(note_front_matter.get(2, path, conn=self.conn), {"title": "Bravo"})
+
+    def test_preview_text_is_stored_without_front_matter(self):
+        self._write("a.md", "---\ntitle: Alpha\n---\n# Alpha\n" + "x" * (note_search_index.PREVIEW_CHARS + 50))
+        note_search_index.refresh_index(self.conn)
+        previews = dict(self.conn.execute("SELECT note_id, preview_text FROM lp_note_search_index").fetchall())
+        self.assertEqual(previews[2], "bravo")
+        self.assertEqual(len(previews[1]), note_search_index.PREVIEW_CHARS)
+        self.assertTrue(previews[1].startswith("# Alpha\nxxx"))
+
+        # Rows indexed before previews were stored are re-read once.
+        self.conn.execute("UPDATE lp_note_search_index SET preview_text = NULL WHERE note_id = 2")
+        result = note_search_index.refresh_index(self.conn)
+        self.assertEqual((result["indexed"], result["unchanged"]), (1, 1))
+        row = self.conn.execute("SELECT preview_text FROM lp_note_search_index WHERE note_id = 2").fetchone()
+        self.assertEqual(row[0], "bravo")
+
+
+if __name__ == "__main__":
+    unittest.main()
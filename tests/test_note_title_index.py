@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import note_title_index
+from common import schema_registry
+
+
+VISIBLE = "(t.owner_user_id = ? OR t.visibility = 'family')"
+
+
+class TestNoteTitleIndex(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE lp_notes (
+                id INTEGER PRIMARY KEY, file_name TEXT, title TEXT, path TEXT, area TEXT,
+                owner_user_id INTEGER, visibility TEXT NOT NULL DEFAULT 'private'
+            );
+            INSERT INTO lp_notes (id, file_name, title, path, owner_user_id) VALUES
+                (1, 'alpha-project.md', 'Alpha Project', 'C:\\notes\\work', 1),
+                (2, 'sql-tips.md', '', 'C:\\notes\\dev', 1),
+                (3, 'shopping.md', 'Shopping', 'C:\\notes\\home', 2);
+            """
+        )
+
+    def tearDown(self):
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def _ids(self, query, limit=note_title_index.CANDIDATE_LIMIT):
+        rows = note_title_index.candidates(self.conn, query, VISIBLE, [1], limit=limit)
+        return [row["id"] for row in rows]
+
+    def test_candidates_ranked_by_shared_trigrams(self):
+        self.assertEqual(self._ids("alpha proj"), [1])
+        self.assertEqual(self._ids("sql", limit=1), [2])
+        self.assertEqual(self._ids("no"), [1, 2])
+        self.assertEqual(sorted(self._ids("")), [1, 2])
+        self.assertNotIn(3, self._ids("shopping"))
+
+    def test_index_follows_note_changes(self):
+        self.assertEqual(self._ids("gardening"), [])
+        self.conn.execute(
+            "INSERT INTO lp_notes (id, file_name, title, path, owner_user_id) "
+            "VALUES (4, 'gardening.md', 'Gardening', 'C:\\notes\\home', 1)"
+        )
+        self.assertEqual(self._ids("gardening")[0], 4)
+        cached = list(note_title_index._INDEX_CACHE.values())
+        self.conn.execute("UPDATE lp_notes SET title = 'Beta Release' WHERE id = 1")
+        self.conn.execute("UPDATE lp_notes SET visibility = 'family' WHERE id = 3")
+        self.conn.execute("DELETE FROM lp_notes WHERE id = 2")
+        self.assertEqual(self._ids("beta release")[0], 1)
+        self.assertEqual(self._ids("shopping")[0], 3)
+        self.assertNotIn(2, self._ids("sql tips"))
+        self.assertEqual(list(note_title_index._INDEX_CACHE.values()), cached)
+        changes = self.conn.execute(f"SELECT COUNT(*) FROM {note_title_index.CHANGES_TABLE}").fetchone()[0]
+        self.assertEqual(changes, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
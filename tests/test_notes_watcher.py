@@ -0,0 +1,357 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+from flask import Flask
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import config as cfg
+from common import data
+from common import schema_registry
+from common import utils as common_utils
+from common import areas as areas_mod
+from modules.notes import routes as notes_routes
+from modules.notes import watcher as notes_watcher
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(text)
+
+
+class _FakeBackend:
+    name = "fake"
+
+    def __init__(self, block=False):
+        self.events = []
+        self.block = block
+        self.roots = None
+
+    def read(self, timeout):
+        if self.block:
+            time.sleep(timeout)
+        events, self.events = self.events, []
+        return events
+
+    def set_roots(self, roots):
+        self.roots = list(roots)
+
+    def close(self):
+        pass
+
+
+class TestNotesWatcherBackends(unittest.TestCase):
+    def setUp(self):
+        tmp_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp")
+        os.makedirs(tmp_root, exist_ok=True)
+        self.tmpdir = tempfile.TemporaryDirectory(dir=tmp_root)
+        self.root = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _bump(self, path_value):
+        # Folder mtimes can be coarse; move them on explicitly.
+        stat = os.stat(path_value)
+        os.utime(path_value, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_polling_reports_added_edited_and_removed_notes(self):
+        _write(os.path.join(self.root, "a.md"), "a")
+        _write(os.path.join(self.root, "sub", "b.md"), "b")
+        backend = notes_watcher.PollingBackend([self.root], interval=0)
+        self.assertEqual(backend.scan(), [])
+
+        _write(os.path.join(self.root, "a.md"), "a edited")
+        os.utime(os.path.join(self.root, "a.md"), ns=(0, 10**18))
+        _write(os.path.join(self.root, "new.md"), "new")
+        _write(os.path.join(self.root, "new.txt"), "not a note")
+        _write(os.path.join(self.root, ".obsidian", "cache.md"), "hidden")
+        _write(os.path.join(self.root, "deleted", "old.md"), "archived")
+        self._bump(self.root)
+        changes = set(backend.scan())
+        self.assertEqual(changes, {os.path.join(self.root, "a.md"), os.path.join(self.root, "new.md")})
+
+        os.remove(os.path.join(self.root, "sub", "b.md"))
+        os.rmdir(os.path.join(self.root, "sub"))
+        _write(os.path.join(self.root, "moved", "c.md"), "c")
+        self._bump(self.root)
+        changes = set(backend.scan())
+        self.assertEqual(
+            changes,
+            {
+                os.path.join(self.root, "sub"),
+                os.path.join(self.root, "sub", "b.md"),
+                os.path.join(self.root, "moved"),
+                os.path.join(self.root, "moved", "c.md"),
+            },
+        )
+        self.assertEqual(backend.scan(), [])
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_reports_notes_in_new_folders(self):
+        backend = notes_watcher.InotifyBackend([self.root])
+        try:
+            _write(os.path.join(self.root, "a.md"), "a")
+            _write(os.path.join(self.root, "new", "b.md"), "b")
+            changes = set()
+            deadline = time.monotonic() + 2
+            while time.monotonic() < deadline and os.path.join(self.root, "new", "b.md") not in changes:
+                changes.update(backend.read(0.2))
+            self.assertIn(os.path.join(self.root, "a.md"), changes)
+            self.assertIn(os.path.join(self.root, "new", "b.md"), changes)
+        finally:
+            backend.close()
+
+    def test_watcher_debounces_bursts_into_one_batch_per_root(self):
+        other = os.path.join(self.root, "other")
+        backend = _FakeBackend()
+        batches = []
+        watcher = notes_watcher.NotesWatcher(
+            {self.root: 1, other: 2},
+            lambda user_id, root, paths: batches.append((user_id, root, paths)) or len(paths),
+            backend=backend,
+            debounce=0.05,
+        )
+        backend.events = [os.path.join(self.root, "a.md"), os.path.join(self.root, "a.md")]
+        self.assertEqual(watcher.step(0), [])
+        backend.events = [os.path.join(other, "b.md"), "/elsewhere/c.md"]
+        self.assertEqual(watcher.step(0), [])
+        time.sleep(0.06)
+        self.assertEqual(sorted(watcher.step(0)), [1, 1])
+        self.assertEqual(
+            sorted(batches),
+            [(1, self.root, [os.path.join(self.root, "a.md")]), (2, other, [os.path.join(other, "b.md")])],
+        )
+        self.assertEqual(watcher.step(0), [])
+
+    def test_events_are_stamped_after_a_blocking_read(self):
+        backend = _FakeBackend(block=True)
+        watcher = notes_watcher.NotesWatcher({self.root: 1}, lambda user_id, root, paths: paths, backend=backend, debounce=0.1)
+        backend.events = [os.path.join(self.root, "a.md")]
+        self.assertEqual(watcher.step(0.15), [])
+        time.sleep(0.11)
+        self.assertEqual(watcher.step(0), [[os.path.join(self.root, "a.md")]])
+
+    def test_roots_are_refreshed_and_pending_changes_flushed_first(self):
+        other = self.root + "-other"
+        roots = {self.root: 1}
+        backend = _FakeBackend()
+        batches = []
+        watcher = notes_watcher.NotesWatcher(
+            {self.root: 1},
+            lambda user_id, root, paths: batches.append((user_id, root, paths)),
+            backend=backend,
+            debounce=60,
+            roots_source=lambda: roots,
+            refresh=0,
+        )
+        backend.events = [os.path.join(self.root, "a.md")]
+        watcher.step(0)
+        self.assertEqual((batches, backend.roots), ([], None))
+
+        roots = {other: 2}
+        backend.events = [os.path.join(other, "b.md")]
+        watcher.step(0)
+        self.assertEqual(batches, [(1, self.root, [os.path.join(self.root, "a.md")])])
+        self.assertEqual(backend.roots, [other])
+        self.assertEqual(watcher.roots, {other: 2})
+        backend.events = [os.path.join(other, "b.md")]
+        watcher.step(0)
+        self.assertEqual(watcher.flush(), [None])
+        self.assertEqual(batches[-1], (2, other, [os.path.join(other, "b.md")]))
+
+    def test_polling_set_roots_adds_and_forgets_trees(self):
+        first = os.path.join(self.root, "first")
+        second = os.path.join(self.root, "second")
+        _write(os.path.join(first, "a.md"), "a")
+        _write(os.path.join(second, "b.md"), "b")
+        backend = notes_watcher.PollingBackend([first], interval=0)
+        backend.set_roots([second])
+        self.assertEqual(set(backend._folders), {second})
+        _write(os.path.join(second, "b.md"), "b edited")
+        os.utime(os.path.join(second, "b.md"), ns=(0, 10**18))
+        self.assertEqual(backend.scan(), [os.path.join(second, "b.md")])
+
+
+class TestSyncNotePaths(unittest.TestCase):
+    def setUp(self):
+        notes_routes._NOTE_AREA_MATERIALIZED_KEYS.clear()
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        for tbl in cfg.table_def:
+            cols = ", ".join(f"{col} TEXT" for col in tbl["col_list"])
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {tbl['name']} "
+                f"(id INTEGER PRIMARY KEY AUTOINCREMENT, {cols}, user_name TEXT, rec_extract_date TEXT)"
+            )
+        data.ensure_folder_schema(self.conn)
+        areas_mod.ensure_areas_schema(self.conn)
+        common_utils.ensure_user_log_schema(self.conn)
+        tmp_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp")
+        os.makedirs(tmp_root, exist_ok=True)
+        self.tmpdir = tempfile.TemporaryDirectory(dir=tmp_root)
+        self.root = os.path.join(self.tmpdir.name, "notes")
+        os.makedirs(self.root)
+        self.app = Flask(__name__)
+        self.app.register_blueprint(notes_routes.notes_bp, url_prefix="/notes")
+
+    def tearDown(self):
+        try:
+            self.tmpdir.cleanup()
+        finally:
+            notes_routes._NOTE_AREA_MATERIALIZED_KEYS.clear()
+            data.conn = self._old_conn
+            schema_registry.forget(self.conn)
+            self.conn.close()
+
+    def _sync(self, *paths, root=None):
+        with self.app.test_request_context("/notes/"):
+            return notes_routes.sync_note_paths(list(paths), root_path=self.root if root is None else root)
+
+    def _prune(self, root=None):
+        with self.app.test_request_context("/notes/"):
+            return notes_routes.prune_missing_notes(self.root if root is None else root)
+
+    def _rows(self):
+        return {
+            row["file_name"]: dict(row)
+            for row in self.conn.execute("SELECT id, file_name, path, title, area, folder_id FROM lp_notes")
+        }
+
+    def test_changes_update_rows_index_links_and_area(self):
+        areas_mod.area_upsert(
+            {"area_id": "fun/games", "tab": "FUN", "group_name": "FUN", "area_name": "Games"},
+            conn=self.conn,
+        )
+        games = os.path.join(self.root, "Games")
+        areas_mod.area_folder_add("fun/games", games, folder_role="default", is_write_enabled=1, conn=self.conn)
+        target = os.path.join(games, "Target.md")
+        source = os.path.join(self.root, "source.md")
+        _write(target, "---\ntitle: Target\n---\ntarget body")
+        _write(source, "links to [[Target]]")
+        _write(os.path.join(self.root, "deleted", "gone.md"), "archived")
+
+        result = self._sync(target, source, os.path.join(self.root, "deleted", "gone.md"))
+
+        self.assertEqual((result["inserted"], result["links"]), (2, 1))
+        rows = self._rows()
+        self.assertEqual(set(rows), {"Target.md", "source.md"})
+        self.assertEqual(rows["Target.md"]["area"], "fun/games")
+        self.assertTrue(rows["Target.md"]["folder_id"])
+        link = self.conn.execute("SELECT src_note_id, target_note_id FROM lp_note_links").fetchone()
+        self.assertEqual(tuple(link), (rows["source.md"]["id"], rows["Target.md"]["id"]))
+        hits = self.conn.execute("SELECT note_id FROM lp_note_search_index WHERE content_text LIKE '%target body%'")
+        self.assertEqual([row["note_id"] for row in hits], [rows["Target.md"]["id"]])
+
+        # Replaying the same events is a no-op; an edit re-reads the file.
+        self.assertEqual(self._sync(target, source)["unchanged"], 2)
+        _write(target, "---\ntitle: Renamed Target\n---\nnew body")
+        os.utime(target, (1_900_000_000, 1_900_000_000))
+        result = self._sync(target)
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(self._rows()["Target.md"]["title"], "Renamed Target")
+
+        os.remove(target)
+        result = self._sync(target)
+        self.assertEqual(result["missing"], 1)
+        self.assertEqual(set(self._rows()), {"Target.md", "source.md"})
+        self.assertEqual(self._prune()["removed"], 1)
+        self.assertEqual(set(self._rows()), {"source.md"})
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM lp_note_links").fetchone()[0], 0)
+        indexed = self.conn.execute("SELECT COUNT(*) FROM lp_note_search_index").fetchone()[0]
+        self.assertEqual(indexed, 1)
+
+    def test_sync_only_touches_the_owners_rows(self):
+        self.conn.execute("ALTER TABLE lp_notes ADD COLUMN owner_user_id INTEGER")
+        shared = os.path.join(self.root, "shared.md")
+        gone = os.path.join(self.root, "gone.md")
+        _write(shared, "shared body")
+        for name in ("shared.md", "gone.md"):
+            self.conn.execute(
+                "INSERT INTO lp_notes (file_name, path, title, owner_user_id) VALUES (?, ?, 'theirs', 2)",
+                (name, self.root),
+            )
+
+        result = notes_routes.sync_note_paths([shared, gone], root_path=self.root, owner_user_id=1)
+
+        self.assertEqual((result["inserted"], result["updated"], result["missing"]), (1, 0, 0))
+        rows = self.conn.execute("SELECT file_name, title, owner_user_id FROM lp_notes ORDER BY id").fetchall()
+        self.assertEqual(
+            [tuple(row) for row in rows],
+            [("shared.md", "theirs", 2), ("gone.md", "theirs", 2), ("shared.md", "shared", 1)],
+        )
+
+    def test_removed_folder_keeps_its_notes_until_pruned(self):
+        folder = os.path.join(self.root, "project")
+        _write(os.path.join(folder, "one.md"), "one")
+        _write(os.path.join(folder, "two.md"), "two")
+        self.assertEqual(self._sync(folder)["inserted"], 2)
+
+        for name in ("one.md", "two.md"):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+        unmounted = os.path.join(self.tmpdir.name, "unmounted")
+        self.assertEqual(self._sync(folder, root=unmounted)["missing"], 0)
+        self.assertEqual(self._sync(folder)["missing"], 2)
+        self.assertEqual(len(self._rows()), 2)
+        with self.assertRaises(ValueError):
+            self._prune(unmounted)
+        self.assertEqual(self._prune(), {"folder_path": self.root, "checked": 2, "removed": 2})
+        self.assertEqual(self._rows(), {})
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM lp_note_search_index").fetchone()[0], 0)
+
+    def test_renamed_and_moved_notes_keep_their_rows(self):
+        target = os.path.join(self.root, "Target.md")
+        source = os.path.join(self.root, "source.md")
+        _write(target, "target body")
+        _write(source, "links to [[Target]]")
+        self._sync(target, source)
+        ids = {name: row["id"] for name, row in self._rows().items()}
+
+        renamed = os.path.join(self.root, "Renamed.md")
+        os.rename(target, renamed)
+        result = self._sync(target, renamed)
+        self.assertEqual((result["moved"], result["inserted"], result["missing"]), (1, 0, 0))
+        self.assertEqual(self._rows()["Renamed.md"]["id"], ids["Target.md"])
+
+        folder = os.path.join(self.root, "project")
+        archive = os.path.join(self.root, "archive")
+        os.makedirs(folder)
+        moved = os.path.join(folder, "source.md")
+        os.rename(source, moved)
+        self.assertEqual(self._sync(source, moved)["moved"], 1)
+        os.makedirs(archive)
+        os.rename(folder, os.path.join(archive, "project"))
+        result = self._sync(folder, os.path.join(archive, "project"))
+        self.assertEqual((result["moved"], result["missing"]), (1, 0))
+        rows = self._rows()
+        self.assertEqual(rows["source.md"]["id"], ids["source.md"])
+        self.assertEqual(rows["source.md"]["path"], os.path.join(archive, "project"))
+        self.assertEqual(len(rows), 2)
+
+    def test_ambiguous_move_is_not_guessed(self):
+        first = os.path.join(self.root, "a", "same.md")
+        second = os.path.join(self.root, "b", "same.md")
+        for path_value in (first, second):
+            _write(path_value, "same")
+            os.utime(path_value, (1_800_000_000, 1_800_000_000))
+        self._sync(first, second)
+        moved_first = os.path.join(self.root, "c", "one.md")
+        moved_second = os.path.join(self.root, "c", "two.md")
+        os.makedirs(os.path.dirname(moved_first))
+        os.rename(first, moved_first)
+        os.rename(second, moved_second)
+        result = self._sync(first, second, moved_first, moved_second)
+        self.assertEqual((result["moved"], result["inserted"], result["missing"]), (0, 2, 2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -16,6 +16,7 @@ if root_folder not in sys.path:
     sys.path.append(root_folder)
 
 from common import data
+from common import note_search_index
 from common import utils as common_utils
 from core import security
 from modules.pocket_api.routes import (
@@ -467,6 +468,24 @@ class TestPocketApi(unittest.TestCase):
         item_payload = self.client.get(f"/api/pocket/v1/items/{payload['items'][0]['id']}", headers=headers).get_json()
         self.assertEqual(item_payload["title"], "First")
 
+    def test_large_manifest_uses_cached_front_matter(self):
+        self.app.config["LIFEPIM_POCKET_MANIFEST_FRONT_MATTER_LIMIT"] = 1
+        self._add_note(file_name="first.md", content="---\ntitle: First\n---\nBody")
+        self._add_note(file_name="second.md", content="---\ntitle: Second\ncolor: Blue\n---\nBody")
+        note_search_index.refresh_index(self.conn)
+        headers = self._register_headers()
+
+        with patch("modules.pocket_api.routes._read_note_front_matter", side_effect=AssertionError("front matter read")):
+            manifest_resp = self.client.get("/api/pocket/v1/sync/manifest", headers=headers)
+
+        self.assertEqual(manifest_resp.status_code, 200)
+        payload = manifest_resp.get_json()
+        self.assertTrue(payload["front_matter_included"])
+        self.assertFalse(payload["file_dates_included"])
+        self.assertEqual(payload["error_count"], 0)
+        self.assertEqual([item["title"] for item in payload["items"]], ["First", "Second"])
+        self.assertEqual(payload["items"][1]["color"], "Blue")
+
     def test_large_manifest_skips_per_file_date_stats(self):
         self.app.config["LIFEPIM_POCKET_MANIFEST_FRONT_MATTER_LIMIT"] = 1
         self._add_note(file_name="first.md", content="first")
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import config as cfg
+from common import data
+from common import record_area
+from common import schema_registry
+from common import areas as areas_mod
+
+
+def _create_table(conn, tbl):
+    col_defs = [f"{col} TEXT" for col in tbl["col_list"] if col != "folder_id"]
+    col_defs.extend(["folder_id INTEGER", "rec_extract_date TEXT"])
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {tbl['name']} (id INTEGER PRIMARY KEY AUTOINCREMENT, {', '.join(col_defs)})"
+    )
+
+
+class TestRecordArea(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        for tbl in cfg.table_def:
+            _create_table(self.conn, tbl)
+        data.ensure_folder_schema(self.conn)
+        areas_mod.ensure_areas_schema(self.conn)
+        for area_id, name in (("music", "Music"), ("music/rock", "Rock"), ("work", "Work")):
+            areas_mod.area_upsert(
+                {"area_id": area_id, "tab": "AREAS", "group_name": "AREAS", "area_name": name},
+                conn=self.conn,
+            )
+        self.music_id = areas_mod.area_folder_add("music", "C:\\media\\music", conn=self.conn)
+
+    def tearDown(self):
+        data.conn = self._old_conn
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def _add_audio(self, file_name, folder):
+        folder_id = data.upsert_dim_folder(self.conn, folder)
+        cur = self.conn.execute(
+            "INSERT INTO lp_audio (file_name, path, folder_id) VALUES (?, ?, ?)",
+            (file_name, folder, folder_id),
+        )
+        return cur.lastrowid
+
+    def _assigned(self, record_type="audio"):
+        rows = self.conn.execute(
+            "SELECT record_id, area_id FROM lp_record_area WHERE record_type = ? AND owner_key = 0",
+            (record_type,),
+        ).fetchall()
+        return {row["record_id"]: row["area_id"] for row in rows}
+
+    def _audio_names(self, tab):
+        rows = data.get_mapped_rows(self.conn, "lp_audio", ["file_name"], tab=tab, order_by="t.file_name")
+        return [row["file_name"] for row in rows]
+
+    def test_longest_prefix_wins_and_follows_record_moves(self):
+        self.assertTrue(record_area.ensure_current(self.conn, "audio"))
+        areas_mod.area_folder_add("music/rock", "C:\\media\\music\\rock", conn=self.conn)
+        song = self._add_audio("song", "C:\\media\\music\\rock\\live")
+        other = self._add_audio("other", "C:\\media\\music\\jazz")
+        loose = self._add_audio("loose", "C:\\downloads")
+        self.assertEqual(self._assigned(), {song: "music/rock", other: "music"})
+
+        new_folder = data.upsert_dim_folder(self.conn, "C:\\downloads")
+        self.conn.execute("UPDATE lp_audio SET folder_id = ? WHERE id = ?", (new_folder, song))
+        self.conn.execute("DELETE FROM lp_audio WHERE id = ?", (other,))
+        self.assertEqual(self._assigned(), {})
+        self.assertEqual(self._audio_names("unmapped"), ["loose", "song"])
+        self.assertNotIn(loose, self._assigned())
+
+    def test_area_folder_changes_refresh_only_affected_records(self):
+        song = self._add_audio("song", "C:\\media\\music\\rock")
+        report = self._add_audio("report", "C:\\docs\\work")
+        self.assertEqual(self._audio_names("music"), ["song"])
+        self.assertEqual(data.count_mapped_rows(self.conn, "lp_audio", tab="unmapped"), 1)
+
+        work_id = areas_mod.area_folder_add("work", "C:\\docs", conn=self.conn)
+        self.assertEqual(self._assigned(), {song: "music", report: "work"})
+        self.assertEqual(data.count_mapped_rows(self.conn, "lp_audio", tab="unmapped"), 0)
+
+        areas_mod.area_folder_disable(self.music_id, conn=self.conn)
+        self.assertEqual(self._assigned(), {report: "work"})
+        self.assertEqual(self._audio_names("music"), [])
+
+        areas_mod.area_folder_remove(work_id, conn=self.conn)
+        self.assertEqual(self._assigned(), {})
+        self.assertEqual(data.count_mapped_rows(self.conn, "lp_audio", tab="unmapped"), 2)
+
+    def test_existing_rows_are_assigned_when_tracking_starts(self):
+        song = self._add_audio("song", "C:\\Media\\Music")
+        self.conn.execute("UPDATE lp_area_folders SET sort_order = 5")
+        self.assertTrue(record_area.ensure_current(self.conn, "audio"))
+        self.assertEqual(self._assigned(), {song: "music"})
+        self.assertEqual(data.count_mapped_rows(self.conn, "lp_audio", tab="music"), 1)
+
+    def test_notes_prefer_named_child_area_at_same_prefix(self):
+        areas_mod.area_folder_add("music/rock", "C:\\media\\music", conn=self.conn)
+        self.assertTrue(record_area.ensure_current(self.conn, "notes"))
+        cur = self.conn.execute(
+            "INSERT INTO lp_notes (file_name, path) VALUES ('a.md', 'C:/media/music/Rock/setlists')"
+        )
+        rows = self.conn.execute(
+            "SELECT area_id, match_rule FROM lp_record_area WHERE record_type = 'notes' AND record_id = ?",
+            (cur.lastrowid,),
+        ).fetchall()
+        self.assertEqual([tuple(row) for row in rows], [("music/rock", "named_child")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import row_counts
+from common import schema_registry
+
+
+AREA_SQL = (
+    "SELECT COUNT(1) FROM lp_audio t JOIN lp_record_area ra "
+    "ON ra.record_type = 'audio' AND ra.record_id = t.rowid WHERE ra.area_id = ?"
+)
+
+
+class TestRowCounts(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE lp_audio (id INTEGER PRIMARY KEY, file_name TEXT, folder_id INTEGER);
+            CREATE TABLE lp_record_area (record_type TEXT, record_id INTEGER, area_id TEXT);
+            INSERT INTO lp_audio (file_name, folder_id) VALUES ('a', 1), ('b', 2), ('c', NULL);
+            INSERT INTO lp_record_area VALUES ('audio', 1, 'music');
+            """
+        )
+        row_counts.ensure_row_counts_schema(self.conn)
+
+    def tearDown(self):
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def _counts(self):
+        return (
+            row_counts.folder_count(self.conn, "lp_audio", "SELECT COUNT(1) FROM lp_audio t"),
+            row_counts.query_count(self.conn, "lp_audio", AREA_SQL, ["music"]),
+        )
+
+    def _stored(self):
+        rows = self.conn.execute("SELECT scope_key, cnt FROM lp_row_counts ORDER BY scope_key").fetchall()
+        return {row["scope_key"]: row["cnt"] for row in rows}
+
+    def test_triggers_keep_all_counter_current(self):
+        self.assertEqual(self._counts(), (3, 1))
+        self.conn.execute("INSERT INTO lp_audio (file_name, folder_id) VALUES ('d', 1)")
+        self.conn.execute("UPDATE lp_audio SET folder_id = 1 WHERE file_name = 'b'")
+        self.conn.execute("DELETE FROM lp_audio WHERE file_name = 'c'")
+        self.assertEqual(self._stored(), {"all": 3})
+        self.assertEqual(self._counts(), (3, 1))
+
+    def test_mapping_change_drops_query_counters_reading_it(self):
+        self._counts()
+        self.assertEqual(len(self._stored()), 2)
+        self.conn.execute("INSERT INTO lp_record_area VALUES ('audio', 2, 'music')")
+        self.assertEqual(self._stored(), {"all": 3})
+        self.assertEqual(self._counts(), (3, 2))
+
+    def test_query_counter_is_dropped_on_write(self):
+        sql = "SELECT COUNT(1) FROM lp_audio t WHERE t.file_name > ?"
+        self.assertEqual(row_counts.query_count(self.conn, "lp_audio", sql, ["a"]), 2)
+        self.assertEqual(len(self._stored()), 1)
+        self.conn.execute("INSERT INTO lp_audio (file_name) VALUES ('z')")
+        self.assertEqual(self._stored(), {})
+        self.assertEqual(row_counts.query_count(self.conn, "lp_audio", sql, ["a"]), 3)
+
+    def test_untracked_table_is_counted_without_ddl(self):
+        self.conn.execute("CREATE TABLE lp_scratch (id INTEGER PRIMARY KEY)")
+        self.conn.execute("INSERT INTO lp_scratch DEFAULT VALUES")
+        triggers = "SELECT COUNT(1) FROM sqlite_master WHERE type = 'trigger'"
+        before = self.conn.execute(triggers).fetchone()[0]
+        self.assertEqual(row_counts.query_count(self.conn, "lp_scratch", "SELECT COUNT(1) FROM lp_scratch"), 1)
+        self.assertEqual(self.conn.execute(triggers).fetchone()[0], before)
+        self.assertEqual(self._stored(), {})
+
+    def test_migration_replaces_area_counters_and_triggers(self):
+        self.conn.execute(
+            "INSERT INTO lp_row_counts (tbl_name, scope_key, cnt, count_sql, updated_utc) "
+            "VALUES ('lp_audio', 'area::music', 7, 'SELECT 7', '')"
+        )
+        self.conn.execute("CREATE TRIGGER lp_rc_cnt_lp_audio_mv AFTER UPDATE OF folder_id ON lp_audio BEGIN SELECT 1; END")
+        schema_registry.forget(self.conn)
+        self.conn.execute("DELETE FROM sys_schema_migrations")
+        row_counts.ensure_row_counts_schema(self.conn)
+        self.assertEqual(self._stored(), {})
+        names = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        self.assertNotIn("lp_rc_cnt_lp_audio_mv", names)
+        self.assertIn("lp_rc_cnt_lp_audio_ins", names)
+
+    def test_recount_corrects_drift(self):
+        self._counts()
+        self.conn.execute("UPDATE lp_row_counts SET cnt = 99 WHERE scope_key = 'all'")
+        result = row_counts.recount(self.conn)
+        self.assertEqual(result["checked"], 2)
+        self.assertEqual(
+            [(row["scope_key"], row["stored"], row["actual"]) for row in result["mismatches"]],
+            [("all", 99, 3)],
+        )
+        self.assertEqual(self._counts(), (3, 1))
+
+    def test_dropped_table_is_not_served_from_stale_counter(self):
+        self._counts()
+        self.conn.executescript(
+            "DROP TABLE lp_audio; CREATE TABLE lp_audio (id INTEGER PRIMARY KEY, file_name TEXT, folder_id INTEGER);"
+        )
+        self.assertEqual(self._counts(), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
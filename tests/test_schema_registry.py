@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from collections import OrderedDict
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import data
+from common import schema_registry
+
+
+class TestSchemaRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, "registry.db")
+        self.calls = []
+        self._registry = patch.object(schema_registry, "_MIGRATIONS", OrderedDict())
+        self._registry.start()
+        schema_registry.register("widgets", self._ensure_widgets)
+        self.conns = []
+
+    def tearDown(self):
+        for conn in self.conns:
+            schema_registry.forget(conn)
+            conn.close()
+        self._registry.stop()
+        self.tmpdir.cleanup()
+
+    def _connect(self, path=None):
+        conn = sqlite3.connect(path or self.db_file)
+        self.conns.append(conn)
+        return conn
+
+    def _ensure_widgets(self, conn):
+        if schema_registry.is_ready(conn, "widgets"):
+            return
+        self.calls.append(conn)
+        conn.execute("CREATE TABLE IF NOT EXISTS lp_widgets (id INTEGER PRIMARY KEY)")
+        conn.commit()
+        schema_registry.mark_ready(conn, "widgets")
+
+    def test_second_connection_to_same_file_skips_migration(self):
+        first = self._connect()
+        second = self._connect()
+        self._ensure_widgets(first)
+        self._ensure_widgets(second)
+        self._ensure_widgets(first)
+        self.assertEqual(self.calls, [first])
+        self.assertTrue(schema_registry.is_ready(second, "widgets"))
+
+    def test_applied_version_is_read_back_from_database(self):
+        conn = self._connect()
+        self._ensure_widgets(conn)
+        schema_registry.forget()
+        reopened = self._connect()
+        self._ensure_widgets(reopened)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(schema_registry.applied_versions(reopened), {"widgets": "1"})
+
+    def test_changed_version_runs_again(self):
+        conn = self._connect()
+        self._ensure_widgets(conn)
+        schema_registry.register("widgets", self._ensure_widgets, version=2)
+        self.assertFalse(schema_registry.is_ready(conn, "widgets"))
+        self._ensure_widgets(conn)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(schema_registry.applied_versions(conn)["widgets"], "2")
+
+    def test_memory_databases_are_tracked_per_connection(self):
+        first = self._connect(":memory:")
+        second = self._connect(":memory:")
+        self._ensure_widgets(first)
+        self._ensure_widgets(second)
+        self.assertEqual(self.calls, [first, second])
+
+    def test_replaced_database_file_is_not_trusted(self):
+        conn = self._connect()
+        self._ensure_widgets(conn)
+        conn.close()
+        self.conns.remove(conn)
+        os.remove(self.db_file)
+        fresh = self._connect()
+        self._ensure_widgets(fresh)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_run_all_reports_status(self):
+        def broken(conn):
+            raise RuntimeError("no table")
+
+        schema_registry.register("broken", broken)
+        schema_registry.register("later", lambda conn: None, startup=False)
+        conn = self._connect()
+        self.assertEqual(
+            schema_registry.run_all(conn),
+            [("widgets", "ran"), ("broken", "failed: no table")],
+        )
+        self.assertEqual(schema_registry.run_all(conn)[0], ("widgets", "ready"))
+
+    def test_cli_migrates_database_file(self):
+        old_conn = data.conn
+        old_owned = data._OWNED_WRITER_CONN
+        data.conn = None
+        try:
+            with patch.object(data, "DB_FILE", data.DB_FILE), patch.object(schema_registry, "load_all_migrations"):
+                with patch("sys.stdout"):
+                    self.assertEqual(schema_registry.main(["--db", self.db_file]), 0)
+                self.conns.append(data.conn)
+        finally:
+            data.conn = old_conn
+            data._OWNED_WRITER_CONN = old_owned
+        reader = self._connect()
+        self.assertEqual(schema_registry.applied_versions(reader), {"widgets": "1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import sys
+import unittest
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import config as cfg
+from common import data
+from common import schema_registry
+from common import search
+from common import search_cache
+
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        self.conn.executescript(
+            """
+            CREATE TABLE lp_notes (id INTEGER PRIMARY KEY, file_name TEXT, path TEXT, area TEXT);
+            CREATE TABLE lp_tags (tag_id INTEGER PRIMARY KEY, name TEXT);
+            INSERT INTO lp_notes (id, file_name, path, area) VALUES
+                (1, 'budget-2026.md', 'C:\\notes', 'home'),
+                (2, 'budget-old.md', 'C:\\notes', 'work');
+            """
+        )
+        search_cache.clear()
+
+    def tearDown(self):
+        data.conn = self._old_conn
+        search_cache.clear()
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def test_writes_bump_table_generations(self):
+        first = search_cache.table_generations(self.conn, ["lp_notes", "lp_tags", "lp_missing"])
+        self.assertEqual(dict(first)["lp_missing"], None)
+        self.conn.execute("UPDATE lp_notes SET area = 'work' WHERE id = 1")
+        second = search_cache.table_generations(self.conn, ["lp_notes", "lp_tags", "lp_missing"])
+        self.assertEqual(dict(second)["lp_notes"], dict(first)["lp_notes"] + 1)
+        self.assertEqual(dict(second)["lp_tags"], dict(first)["lp_tags"])
+
+    def test_cached_values_are_invalidated_and_evicted(self):
+        calls = []
+
+        def compute(value):
+            calls.append(value)
+            return [value]
+
+        self.assertEqual(search_cache.cached("a", ["lp_notes"], lambda: compute("a")), ["a"])
+        self.assertEqual(search_cache.cached("a", ["lp_notes"], lambda: compute("a")), ["a"])
+        self.conn.execute("DELETE FROM lp_notes WHERE id = 2")
+        search_cache.cached("a", ["lp_notes"], lambda: compute("a"))
+        self.assertEqual(calls, ["a", "a"])
+        with patch.dict(cfg._CONFIG_DEFAULTS, {"SEARCH_CACHE_MAX_ENTRIES": 1}):
+            search_cache.cached("b", ["lp_tags"], lambda: compute("b"))
+            search_cache.cached("a", ["lp_notes"], lambda: compute("a"))
+        self.assertEqual(calls, ["a", "a", "b", "a"])
+        stats = search_cache.stats()
+        self.assertEqual((stats["hits"], stats["stale"], stats["evictions"], stats["entries"]), (1, 1, 2, 1))
+
+    def test_route_switch_slices_the_cached_ranking(self):
+        # The first search creates the module tables it reads.
+        search.search_all("budget")
+        search_cache.clear()
+        home = search.search_all("budget", route="home", secondary_limit=1)
+        self.assertEqual([item["route"] for item in home["more"]], ["notes"])
+        misses = search_cache.stats()["misses"]
+        notes = search.search_all("budget", route="notes", secondary_limit=1)
+        self.assertEqual(len(notes["primary"]), 2)
+        self.assertEqual(notes["more"], [])
+        notes["primary"][0]["url"] = "/changed"
+        again = search.search_all("budget", route="notes", secondary_limit=1)
+        self.assertNotIn("url", again["primary"][0])
+        stats = search_cache.stats()
+        self.assertEqual(stats["misses"], misses)
+        self.assertEqual(stats["hits"], 2 * misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
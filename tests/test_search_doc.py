@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import sys
+import unittest
+from dataclasses import dataclass
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import data
+from common import schema_registry
+from common import search
+from common import search_doc
+
+
+@dataclass
+class SearchUser:
+    user_id: int
+    role: str = "user"
+    is_authenticated: bool = True
+
+
+class TestSearchDoc(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        self._old_current_search_user = search._current_search_user
+        self._old_routes = search._visible_search_routes
+        data.conn = self.conn
+        search._current_search_user = lambda: SearchUser(user_id=1)
+        search._visible_search_routes = lambda: {"notes", "media", "calendar"}
+        self.conn.executescript(
+            """
+            CREATE TABLE lp_notes (
+                id INTEGER PRIMARY KEY, file_name TEXT, path TEXT, area TEXT,
+                owner_user_id INTEGER, visibility TEXT NOT NULL DEFAULT 'private',
+                is_public INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE lp_media (
+                media_id INTEGER PRIMARY KEY, path TEXT, filename TEXT, ext TEXT, media_type TEXT
+            );
+            CREATE TABLE lp_calendar_events (id INTEGER PRIMARY KEY, title TEXT, content TEXT, event_date TEXT, area TEXT);
+            INSERT INTO lp_notes (id, file_name, path, area, owner_user_id) VALUES
+                (1, 'tomato-garden.md', 'C:\\notes', 'home', 1),
+                (2, 'tomato-secret.md', 'C:\\notes', 'home', 2),
+                (3, 'recipes.md', 'C:\\notes\\tomatoes', 'food', 1);
+            INSERT INTO lp_media (media_id, path, filename, ext, media_type) VALUES
+                (1, 'C:\\pics\\tomato.jpg', 'tomato.jpg', 'jpg', 'image');
+            INSERT INTO lp_calendar_events (id, title, content, event_date, area) VALUES
+                (1, 'Plant seedlings', 'tomato bed', '2026-05-01', 'home');
+            """
+        )
+
+    def tearDown(self):
+        search._current_search_user = self._old_current_search_user
+        search._visible_search_routes = self._old_routes
+        data.conn = self._old_conn
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def _by_route(self, results):
+        found = {}
+        for item in results["primary"] + results["secondary"]:
+            found.setdefault(item["route"], []).append(item)
+        return found
+
+    def test_single_index_answers_every_route(self):
+        found = self._by_route(search.search_all("omat"))
+        self.assertEqual([item["id"] for item in found["notes"]], [1, 3])
+        self.assertEqual(found["notes"][1]["match_field"], "path")
+        self.assertEqual(found["media"][0]["title"], "tomato.jpg")
+        self.assertEqual(found["calendar"][0]["match_snippet"], "tomato bed")
+        self.assertEqual(found["calendar"][0]["record_type"], "event")
+        count = self.conn.execute(f"SELECT COUNT(*) FROM {search_doc.DOC_TABLE}").fetchone()[0]
+        self.assertEqual(count, 5)
+
+    def test_triggers_follow_record_writes(self):
+        search.search_all("tomato")
+        self.conn.execute("UPDATE lp_notes SET file_name = 'potato-garden.md' WHERE id = 1")
+        self.conn.execute("DELETE FROM lp_media WHERE media_id = 1")
+        self.conn.execute("INSERT INTO lp_notes (id, file_name, path, area, owner_user_id) VALUES (4, 'tomato-soup.md', 'C:\\notes', 'food', 1)")
+        found = self._by_route(search.search_all("tomato"))
+        self.assertEqual([item["id"] for item in found["notes"]], [4, 3])
+        self.assertNotIn("media", found)
+        self.assertEqual([item["id"] for item in self._by_route(search.search_all("potato"))["notes"]], [1])
+
+    def test_per_route_limits_and_short_terms(self):
+        results = search.search_all("md", route="notes", primary_limit=1, secondary_limit=1)
+        found = self._by_route(results)
+        self.assertEqual(len(found["notes"]), 1)
+        self.assertEqual([item["route"] for item in results["more"]], ["notes"])
+        self.assertEqual([item["id"] for item in self._by_route(search.search_all("re md"))["notes"]], [3])
+
+    def test_new_visibility_columns_reindex_the_route(self):
+        search.search_all("tomato")
+        self.conn.execute("ALTER TABLE lp_media ADD COLUMN is_public INTEGER NOT NULL DEFAULT 0")
+        search._current_search_user = lambda: None
+        self.assertNotIn("media", self._by_route(search.search_all("tomato")))
+        self.conn.execute("UPDATE lp_media SET is_public = 1")
+        self.assertIn("media", self._by_route(search.search_all("tomato")))
+
+
+if __name__ == "__main__":
+    unittest.main()
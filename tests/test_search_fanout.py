@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import config as cfg
+from common import data
+from common import schema_registry
+from common import search
+from common import search_cache
+from common import search_fanout
+from common import sql_profile
+
+
+class TestSearchFanout(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.parallel_patch = patch.object(search_fanout, "parallel_enabled", return_value=True)
+        self.parallel_patch.start()
+
+    def tearDown(self):
+        self.release.set()
+        self.parallel_patch.stop()
+
+    def _slow(self, value):
+        def job():
+            self.release.wait(5)
+            return value
+
+        return job
+
+    def test_slow_source_is_left_pending(self):
+        budgets = {"SEARCH_SOURCE_BUDGET_MS": 1000, "SEARCH_SOURCE_BUDGETS_MS": {"slow": 20}}
+        with patch.dict(cfg._CONFIG_DEFAULTS, budgets):
+            results, pending = search_fanout.run(
+                [("fast", lambda: "fast"), ("slow", self._slow("slow")), ("broken", lambda: 1 / 0)]
+            )
+        self.assertEqual(results, {"fast": "fast", "broken": None})
+        self.assertEqual(list(pending), ["slow"])
+        token = search_fanout.register_pending(7, pending, {"query": "q"})
+        self.assertIsNone(search_fanout.collect_pending(token, 8))
+        self.assertEqual(search_fanout.collect_pending(token, 7), ({}, ["slow"], {"query": "q"}))
+        self.release.set()
+        self.assertEqual(search_fanout.collect_pending(token, 7, timeout=5), ({"slow": "slow"}, [], {"query": "q"}))
+        self.assertIsNone(search_fanout.collect_pending(token, 7))
+
+    def test_jobs_see_caller_context(self):
+        seen = []
+        token = search._SEARCH_USER.set("user-one")
+        try:
+            search_fanout.run([("who", lambda: seen.append(search._current_search_user()))])
+        finally:
+            search._SEARCH_USER.reset(token)
+        self.assertEqual(seen, ["user-one"])
+
+    def test_job_sql_is_recorded_in_the_callers_profile(self):
+        conn = sqlite3.connect(":memory:", check_same_thread=False, factory=sql_profile.ProfiledConnection)
+        profile = sql_profile.RequestProfile("search_route")
+        previous = sql_profile.activate(profile)
+        try:
+            search_fanout.run([("one", lambda: conn.execute("SELECT 1").fetchall())])
+        finally:
+            sql_profile.activate(previous)
+            conn.close()
+        self.assertEqual(profile.statements, 1)
+        self.assertEqual(profile.rows, 1)
+
+
+class TestSearchAllPending(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        self.conn.execute("CREATE TABLE lp_notes (id INTEGER PRIMARY KEY, file_name TEXT, path TEXT, area TEXT)")
+        self.conn.execute("INSERT INTO lp_notes (id, file_name, path, area) VALUES (1, 'budget.md', 'C:\\\\notes', 'home')")
+        search.search_all("budget")
+        search_cache.clear()
+
+    def tearDown(self):
+        data.conn = self._old_conn
+        search_cache.clear()
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def test_pending_catalog_is_collected_later(self):
+        release = threading.Event()
+        original = search._search_content_catalog
+
+        def slow_catalog(terms, limit=None):
+            release.wait(5)
+            return original(terms, limit=limit)
+
+        budgets = {"SEARCH_SOURCE_BUDGETS_MS": {"catalog": 0}}
+        with patch.object(search_fanout, "parallel_enabled", return_value=True), patch.object(
+            search, "_search_content_catalog", slow_catalog
+        ), patch.dict(cfg._CONFIG_DEFAULTS, budgets):
+            results = search.search_all("budget", route="notes")
+            self.assertEqual([marker["source"] for marker in results["pending"]], ["catalog"])
+            self.assertEqual([item["id"] for item in results["primary"]], [1])
+            release.set()
+            late = search.collect_pending_results(results["pending_token"], timeout=5)
+        self.assertEqual(late["pending"], [])
+        self.assertEqual(late["primary"] + late["secondary"], [])
+        self.assertIsNone(search.collect_pending_results(results["pending_token"], timeout=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import sys
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import config as cfg
+from common import data
+from common import schema_registry
+from common import search
+from common import search_suggest
+
+
+class TestSearchSuggest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self._old_conn = data.conn
+        data.conn = self.conn
+        self.conn.executescript(
+            """
+            CREATE TABLE lp_notes (
+                id INTEGER PRIMARY KEY, file_name TEXT, title TEXT, path TEXT, area TEXT,
+                owner_user_id INTEGER, visibility TEXT NOT NULL DEFAULT 'private', is_public INTEGER DEFAULT 0
+            );
+            INSERT INTO lp_notes (id, file_name, title, path, owner_user_id) VALUES
+                (1, 'garden-plan.md', '', 'C:\\notes\\home', 1),
+                (2, 'misc.md', 'Garage Sale', 'C:\\notes\\home', 1),
+                (3, 'gardening-secret.md', '', 'C:\\notes\\other', 2),
+                (4, 'shopping.md', 'Shopping', 'C:\\notes\\home', 1);
+            CREATE TABLE lp_app (app_id INTEGER PRIMARY KEY, title TEXT, kind TEXT, owner_user_id INTEGER);
+            INSERT INTO lp_app (app_id, title, kind, owner_user_id) VALUES
+                (1, 'GarageBand', 'audio', 1), (2, 'Gimp', 'image', 1), (3, 'Garmin Express', 'maps', 2);
+            CREATE TABLE lp_tasks (id INTEGER PRIMARY KEY, title TEXT, due_date TEXT, owner_user_id INTEGER);
+            INSERT INTO lp_tasks (id, title, owner_user_id) VALUES (1, 'Garden beds', 1), (2, 'Garage key', 2);
+            CREATE TABLE lp_contacts (contact_id INTEGER PRIMARY KEY, display_name TEXT);
+            INSERT INTO lp_contacts (contact_id, display_name) VALUES (1, 'Gary');
+            """
+        )
+        self.patches = [
+            patch.object(search, "_current_search_user", lambda: SimpleNamespace(user_id=1)),
+            patch.object(search, "_visible_search_routes", lambda: {"notes", "tasks", "contacts", "apps"}),
+            patch.dict(cfg._CONFIG_DEFAULTS, {"SEARCH_SUGGEST_DEBOUNCE_MS": 0}),
+        ]
+        for item in self.patches:
+            item.start()
+
+    def tearDown(self):
+        for item in reversed(self.patches):
+            item.stop()
+        data.conn = self._old_conn
+        schema_registry.forget(self.conn)
+        self.conn.close()
+
+    def test_streams_visible_prefix_matches_per_domain(self):
+        lines = list(search_suggest.stream("GAR", client_key="a", seq=1))
+        by_domain = {line["domain"]: line["items"] for line in lines if "domain" in line}
+        self.assertEqual([item["title"] for item in by_domain["notes"]], ["Garage Sale", "garden-plan.md"])
+        self.assertEqual(by_domain["notes"][0]["url"], "/notes/view/2")
+        self.assertEqual([item["title"] for item in by_domain["apps"]], ["GarageBand"])
+        self.assertEqual([item["title"] for item in by_domain["tasks"]], ["Garden beds"])
+        self.assertNotIn("contacts", by_domain)
+        self.assertEqual(lines[-1], {"seq": 1, "done": True})
+        plan = " ".join(
+            row[3]
+            for row in self.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT app_id FROM lp_app t "
+                "WHERE t.title >= ? COLLATE NOCASE AND t.title < ? COLLATE NOCASE",
+                ("gar", "gar\U0010ffff"),
+            ).fetchall()
+        )
+        self.assertIn("ix_lp_suggest_lp_app_title", plan)
+
+    def test_client_limit_is_capped(self):
+        with patch.dict(cfg._CONFIG_DEFAULTS, {"SEARCH_SUGGEST_LIMIT": 1}):
+            lines = list(search_suggest.stream("g", client_key="d", seq=1, limit=1000000))
+        notes = next(line["items"] for line in lines if line.get("domain") == "notes")
+        self.assertEqual(len(notes), 1)
+
+    def test_newer_request_wakes_request_waiting_out_debounce(self):
+        with patch.dict(cfg._CONFIG_DEFAULTS, {"SEARCH_SUGGEST_DEBOUNCE_MS": 60000}):
+            waiting = search_suggest.stream("gar", client_key="e", seq=1)
+            result = []
+            thread = threading.Thread(target=lambda: result.append(next(waiting)))
+            thread.start()
+            search_suggest._register_seq("e", 2)
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(result, [{"seq": 1, "cancelled": True}])
+
+    def test_newer_request_cancels_older_stream(self):
+        older = search_suggest.stream("gar", client_key="b", seq=1)
+        first = next(older)
+        self.assertEqual(first["domain"], "notes")
+        list(search_suggest.stream("gard", client_key="b", seq=2))
+        self.assertEqual(next(older), {"seq": 1, "cancelled": True})
+        self.assertTrue(search_suggest.superseded("b", 1))
+        self.assertFalse(search_suggest.superseded("c", 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
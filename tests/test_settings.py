@@ -6,15 +6,16 @@ root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.se
 if root_folder not in os.sys.path:
     os.sys.path.append(root_folder)
 
+from common import schema_registry
 from common import settings
 
 
 class TestSettingsSchema(unittest.TestCase):
     def setUp(self):
-        settings._SCHEMA_READY_CONN_IDS.clear()
+        schema_registry.forget()
 
     def tearDown(self):
-        settings._SCHEMA_READY_CONN_IDS.clear()
+        schema_registry.forget()
 
     def test_old_settings_table_gets_missing_columns(self):
         conn = sqlite3.connect(":memory:")
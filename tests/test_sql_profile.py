@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import sys
+import unittest
+from unittest.mock import patch
+
+root_folder = os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + os.sep + ".." + os.sep + "src")
+if root_folder not in sys.path:
+    sys.path.append(root_folder)
+
+from common import sql_profile
+
+
+class TestSqlProfile(unittest.TestCase):
+    def setUp(self):
+        sql_profile.reset_stats()
+        self.conn = sql_profile.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(
+            """
+            CREATE TABLE lp_items (id INTEGER PRIMARY KEY, name TEXT);
+            INSERT INTO lp_items (name) VALUES ('a'), ('b'), ('c');
+            """
+        )
+
+    def tearDown(self):
+        sql_profile.discard_request()
+        sql_profile.reset_stats()
+        self.conn.close()
+
+    def test_connection_is_still_a_sqlite_connection(self):
+        self.assertIsInstance(self.conn, sqlite3.Connection)
+        row = self.conn.execute("SELECT name FROM lp_items WHERE id = ?", (2,)).fetchone()
+        self.assertEqual(row["name"], "b")
+
+    def test_counts_statements_and_rows_for_request(self):
+        sql_profile.begin_request("items.list")
+        self.conn.execute("SELECT * FROM lp_items").fetchall()
+        names = [row["name"] for row in self.conn.execute("SELECT name FROM lp_items")]
+        self.conn.execute("SELECT name FROM lp_items WHERE id = 1").fetchone()
+        summary = sql_profile.end_request()
+        self.assertEqual(names, ["a", "b", "c"])
+        self.assertEqual(summary["sql_statements"], 3)
+        self.assertEqual(summary["sql_rows"], 7)
+        self.assertEqual(len(summary["sql_slowest"]), 3)
+        self.assertEqual(summary["sql_repeated"], [])
+
+    def test_flags_repeated_statement_text(self):
+        sql_profile.begin_request("items.detail")
+        for item_id in range(6):
+            self.conn.execute("SELECT name FROM lp_items WHERE id = ?", (item_id,)).fetchone()
+        with self.conn:
+            self.conn.execute("INSERT INTO lp_items (name) VALUES ('d')")
+        summary = sql_profile.end_request()
+        self.assertEqual(len(summary["sql_repeated"]), 1)
+        self.assertEqual(summary["sql_repeated"][0]["sql"], "SELECT name FROM lp_items WHERE id = ?")
+        self.assertEqual(summary["sql_repeated"][0]["count"], 6)
+
+    def test_no_collection_outside_request(self):
+        self.conn.execute("SELECT * FROM lp_items").fetchall()
+        self.assertIsNone(sql_profile.end_request())
+        self.assertEqual(sql_profile.endpoint_stats(), [])
+
+    def test_endpoint_percentiles(self):
+        for duration in range(1, 21):
+            sql_profile.begin_request("items.list")
+            self.conn.execute("SELECT * FROM lp_items").fetchall()
+            sql_profile.end_request(duration_ms=duration)
+        rows = sql_profile.endpoint_stats()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["endpoint"], "items.list")
+        self.assertEqual(rows[0]["requests"], 20)
+        self.assertEqual(rows[0]["p50_ms"], 10.0)
+        self.assertEqual(rows[0]["p95_ms"], 19.0)
+        self.assertEqual(rows[0]["statements_p95"], 1)
+
+    def test_disabled_profiling_records_nothing(self):
+        with patch.object(sql_profile, "enabled", return_value=False):
+            self.assertIsNone(sql_profile.begin_request("items.list"))
+            self.conn.execute("SELECT * FROM lp_items").fetchall()
+            self.assertIsNone(sql_profile.end_request())
+
+
+if __name__ == "__main__":
+    unittest.main()
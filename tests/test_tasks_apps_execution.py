@@ -30,6 +30,16 @@ class TestTasksAppsExecution(unittest.TestCase):
         data.conn = self.old_conn
         self.conn.close()
 
+    def test_area_filter_matches_non_ascii_area_names(self):
+        for area in ("Ärzte", "Ärzte/Termine", "Ärzte2", "Work"):
+            self.conn.execute(
+                "INSERT INTO lp_tasks (owner_user_id, title, area, status, task_kind) VALUES (1, ?, ?, 'open', 'task')",
+                (area, area),
+            )
+        self.assertEqual(tasks_model.task_count("Ärzte", conn=self.conn, owner_user_id=1), 2)
+        # The area and its ancestors match.
+        self.assertEqual(tasks_model.task_count("ÄRZTE/termine", conn=self.conn, owner_user_id=1), 2)
+
     def test_app_action_ids_survive_edit_and_new_actions_get_new_ids(self):
         app_id = apps_model.create_app(
             {
@@ -185,6 +195,19 @@ class TestTasksAppsExecution(unittest.TestCase):
         tasks_model.set_status(task_id, "open", conn=self.conn, owner_user_id=1)
         self.assertEqual(tasks_model.task_get(task_id, conn=self.conn, owner_user_id=1)["completed_date"] or "", "")
 
+    def test_area_filter_matches_area_ancestors_and_descendants(self):
+        for title, area in (
+            ("Self", "Home/Garden"),
+            ("Parent", "home"),
+            ("Child", "home/garden/beds"),
+            ("Sibling", "home/gardening"),
+            ("Other", "work"),
+        ):
+            tasks_model.quick_add(title, area=area, conn=self.conn, owner_user_id=1)
+        rows = tasks_model.task_list(area_id="home/garden", conn=self.conn, owner_user_id=1)
+        self.assertEqual(sorted(row["title"] for row in rows), ["Child", "Parent", "Self"])
+        self.assertEqual(tasks_model.task_count(area_id="home/garden", conn=self.conn, owner_user_id=1), 3)
+
     def test_executable_task_delegates_to_apps_and_does_not_complete(self):
         schema = {
             "version": 1,
@@ -30,6 +30,23 @@ class TestUserPaths(unittest.TestCase):
         data.conn = self._old_conn
         self.conn.close()
 
+    def test_path_under_sql_is_segment_aware_and_uses_key_index(self):
+        self.conn.execute("CREATE TABLE lp_files (id INTEGER PRIMARY KEY, path TEXT, area TEXT)")
+        data.ensure_path_indexes(self.conn, ["lp_files"])
+        for path in ("C:\\Docs", "c:/docs/Tax/2024/", "C:\\Docs2", "D:\\docs"):
+            self.conn.execute("INSERT INTO lp_files (path) VALUES (?)", (path,))
+        sql = f"SELECT path FROM lp_files t WHERE {user_paths.path_under_sql('t.path')} ORDER BY id"
+        params = user_paths.path_under_params("C:\\docs\\")
+        rows = self.conn.execute(sql, params).fetchall()
+        self.assertEqual([row["path"] for row in rows], ["C:\\Docs", "c:/docs/Tax/2024/"])
+        plan = " ".join(row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+        self.assertIn("ix_lp_files_path_key", plan)
+
+        # SQLite lower() leaves non-ASCII capitals alone; the parameters must too.
+        self.conn.execute("INSERT INTO lp_files (path) VALUES (?)", ("D:\\Notes\\Ärzte\\2024",))
+        rows = self.conn.execute(sql, user_paths.path_under_params("d:/notes/Ärzte")).fetchall()
+        self.assertEqual([row["path"] for row in rows], ["D:\\Notes\\Ärzte\\2024"])
+
     def test_create_user_creates_isolated_file_roots_and_simple_area_list(self):
         with tempfile.TemporaryDirectory() as tmpdir:
             old_env = os.environ.get("LIFEPIM_LAN_USER_ROOT_BASE")